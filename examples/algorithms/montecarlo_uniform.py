@@ -18,6 +18,8 @@ class MonteCarlo_Uniform:
 
         self.n_samples = 0
         self.variables = {}
+        # Outputs told one at a time in asynchronous mode (fzd asynchronous=True)
+        self.Y = []
 
         import numpy as np
         np.random.seed(int(options.get("seed", 42)))
@@ -51,9 +53,42 @@ class MonteCarlo_Uniform:
         Returns:
             List[Dict[str, float]] - next points, or [] if finished
         """
+        if self._finished(Y):
+            return []
+
+        # Generate more samples
+        return self._generate_samples(self.options["batch_sample_size"])
+
+    def tell(self, x, y):
+        """
+        Record the output of a finished point (asynchronous mode)
+
+        Args:
+            x: Dict[str, float] - evaluated input
+            y: float - output (None if the evaluation failed)
+        """
+        self.Y.append(y)
+
+    def ask(self, n):
+        """
+        Generate up to n new points as soon as calculators free up (asynchronous mode)
+
+        Args:
+            n: int - number of free calculators
+
+        Returns:
+            List[Dict[str, float]] - new points, or [] if finished
+        """
+        if self._finished(self.Y):
+            return []
+        remaining = self.options["max_iterations"] * self.options["batch_sample_size"] - self.n_samples
+        return self._generate_samples(min(n, remaining))
+
+    def _finished(self, Y):
+        """Whether the sample budget is spent or the confidence interval is narrow enough"""
         # Check max iterations
         if self.n_samples >= self.options["max_iterations"] * self.options["batch_sample_size"]:
-            return []
+            return True
 
         # Filter out None values
         import numpy as np
@@ -61,7 +96,7 @@ class MonteCarlo_Uniform:
         Y_valid = [y for y in Y if y is not None]
 
         if len(Y_valid) < 2:
-            return self._generate_samples(self.options["batch_sample_size"])
+            return False
 
         Y_array = np.array(Y_valid)
         mean = np.mean(Y_array)
@@ -74,11 +109,7 @@ class MonteCarlo_Uniform:
         conf_range = conf_int[1] - conf_int[0]
 
         # Stop if confidence interval is narrow enough
-        if conf_range <= self.options["target_confidence_range"]:
-            return []
-
-        # Generate more samples
-        return self._generate_samples(self.options["batch_sample_size"])
+        return conf_range <= self.options["target_confidence_range"]
       
     def _generate_samples(self, n):
         import numpy as np
@@ -55,6 +55,23 @@ Each algorithm must be a class with the following methods:
 
    Note: This method is optional. If present, it will be called after each iteration
          to show progress. If not present, no intermediate results are displayed.
+
+6. tell(self, x, y): [OPTIONAL, required by fzd(asynchronous=True)]
+   Receives the result of one evaluated point, as soon as its case finishes
+   Args:
+       x: Dict[str, float] - Evaluated input combination
+       y: float - Corresponding output value (None if the evaluation failed)
+
+7. ask(self, n): [OPTIONAL, required by fzd(asynchronous=True)]
+   Returns new points to evaluate when calculators free up
+   Args:
+       n: int - Number of free calculators (more points may be returned, they are queued)
+   Returns:
+       List[Dict[str, float]] - Input variable combinations to evaluate
+       Returns empty list [] to wait for running cases, or to finish when none is left
+
+   Note: In asynchronous mode, get_initial_design() is evaluated first, then ask()
+         and tell() replace get_next_design(): no batch waits for its slowest case.
 """
 
 import re
@@ -156,6 +173,25 @@ def parse_fixed_vars(input_vars: Dict[str, str]) -> Dict[str, float]:
     return fixed
 
 
+def _array_aware(py_func, np_name: str, **np_kwargs):
+    """
+    Wrap a reduction so that a single numpy array argument is handed to the
+    numpy equivalent (``np.<np_name>``) instead of the pure-Python one.
+
+    Any other call (lists, generators, several arguments, ...) goes to
+    ``py_func`` unchanged, so expressions behave exactly as before on
+    list-valued outputs.
+    """
+    def reduce(*args, **kwargs):
+        np = sys.modules.get("numpy")
+        if (np is not None and len(args) == 1 and not kwargs
+                and isinstance(args[0], np.ndarray) and args[0].ndim >= 1):
+            return getattr(np, np_name)(args[0], **np_kwargs)
+        return py_func(*args, **kwargs)
+    reduce.__name__ = getattr(py_func, "__name__", np_name)
+    return reduce
+
+
 def evaluate_output_expression(
     expression: str,
     output_data: Dict[str, Any]
@@ -209,8 +245,8 @@ def evaluate_output_expression(
     safe_dict = {
         # Math functions
         'abs': abs,
-        'min': min,
-        'max': max,
+        'min': _array_aware(min, 'min'),
+        'max': _array_aware(max, 'max'),
         'pow': pow,
         'sqrt': math.sqrt,
         'exp': math.exp,
@@ -227,14 +263,16 @@ def evaluate_output_expression(
         'e': math.e,
         # Vector-reduction helpers, for expressions that need to turn a
         # vector-valued output (e.g. a time series) into fzd's scalar
-        # objective
-        'sum': sum,
+        # objective. Vectors stored as numpy arrays (vector_format="numpy"
+        # or "arrow") are reduced by numpy directly, without boxing every
+        # element into a Python float first.
+        'sum': _array_aware(sum, 'sum'),
         'len': len,
-        'sorted': sorted,
-        'mean': statistics.mean,
-        'median': statistics.median,
-        'stdev': statistics.stdev,
-        'variance': statistics.variance,
+        'sorted': _array_aware(sorted, 'sort'),
+        'mean': _array_aware(statistics.mean, 'mean'),
+        'median': _array_aware(statistics.median, 'median'),
+        'stdev': _array_aware(statistics.stdev, 'std', ddof=1),
+        'variance': _array_aware(statistics.variance, 'var', ddof=1),
         # 'zip' lets an expression combine two *different* vector outputs
         # element-wise (e.g. a residual/RMSE between a simulated and a
         # reference series: "sqrt(sum((x-y)**2 for x,y in zip(a, b)) /
@@ -245,7 +283,8 @@ def evaluate_output_expression(
         'zip': zip,
     }
 
-    # Add output variables
+    # Add output variables (Arrow list cells come back from pandas as plain
+    # lists; numpy array cells are passed through as-is)
     safe_dict.update(output_data)
     # No separate builtins: block them explicitly.
     safe_dict['__builtins__'] = {}
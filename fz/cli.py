@@ -259,6 +259,17 @@ def _add_format_arg(parser):
                         choices=["json", "csv", "html", "markdown", "table"],
                         help="Output format (default: markdown)")
 
+
+def _add_manifest_arg(parser):
+    parser.add_argument("--manifest", default=None,
+                        help="Manifest file for incremental parsing: only directories whose "
+                             "files changed since the last call are re-parsed")
+
+def _add_jobs_arg(parser):
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Number of processes compiling cases in parallel "
+                             "(default: FZ_COMPILE_JOBS or 1; 0 for one per CPU)")
+
 def format_output(data, format_type='markdown'):
     """
     Format output data in various formats
@@ -542,6 +553,7 @@ def fzc_main():
     _add_variables_arg(parser)
     parser.add_argument("--output_dir", "--output", "-o", dest="output_dir", default="output",
                         help="Output directory (default: output)")
+    _add_jobs_arg(parser)
 
     args = parser.parse_args()
 
@@ -549,7 +561,7 @@ def fzc_main():
         input_path = _resolve_path(parser, args.input_path, args.input_path_pos, "input_path")
         model = _resolve_model(parser, args)
         variables = parse_variables(args.input_variables)
-        fzc_func(input_path, variables, model, output_dir=args.output_dir)
+        fzc_func(input_path, variables, model, output_dir=args.output_dir, jobs=args.jobs)
         print(f"Compiled input saved to {args.output_dir}")
         return 0
     except TypeError as e:
@@ -574,13 +586,14 @@ def fzo_main():
     _add_output_path_args(parser)
     _add_model_args(parser)
     _add_format_arg(parser)
+    _add_manifest_arg(parser)
 
     args = parser.parse_args()
 
     try:
         output_path = _resolve_path(parser, args.output_path, args.output_path_pos, "output_path")
         model = _resolve_model(parser, args)
-        result = fzo_func(output_path, model)
+        result = fzo_func(output_path, model, manifest=args.manifest)
         print(format_output(result, args.format))
         return 0
     except TypeError as e:
@@ -659,6 +672,8 @@ def fzd_main():
     parser.add_argument("--results_dir", "-r", default="results_fzd", help="Results directory (default: results_fzd)")
     parser.add_argument("--calculators", "-c", help="Calculator specifications (JSON file or inline JSON)")
     parser.add_argument("--options", "-o", help="Algorithm options (JSON file or inline JSON)")
+    parser.add_argument("--async", dest="asynchronous", action="store_true",
+                        help="Ask the algorithm for new points as calculators free up (algorithm with ask/tell)")
 
     args = parser.parse_args()
 
@@ -678,6 +693,7 @@ def fzd_main():
             calculators=calculators,
             algorithm_options=(algo_options if isinstance(algo_options, dict) else {}),
             analysis_dir=args.results_dir,
+            asynchronous=args.asynchronous,
         )
 
         # Print summary
@@ -725,12 +741,14 @@ def main():
     _add_variables_arg(parser_compile)
     parser_compile.add_argument("--output_dir", "--output", "-o", dest="output_dir",
                                 default="output", help="Output directory (default: output)")
+    _add_jobs_arg(parser_compile)
 
     # output command (fzo)
     parser_output = subparsers.add_parser("output", help="Parse output files")
     _add_output_path_args(parser_output)
     _add_model_args(parser_output)
     _add_format_arg(parser_output)
+    _add_manifest_arg(parser_output)
 
     # run command (fzr)
     parser_run = subparsers.add_parser("run", help="Run full parametric calculations")
@@ -755,6 +773,8 @@ def main():
     parser_design.add_argument("--results_dir", "-r", default="results_fzd", help="Results directory (default: results_fzd)")
     parser_design.add_argument("--calculators", "-c", help="Calculator specifications (JSON file or inline JSON)")
     parser_design.add_argument("--options", "-o", help="Algorithm options (JSON file or inline JSON)")
+    parser_design.add_argument("--async", dest="asynchronous", action="store_true",
+                               help="Ask the algorithm for new points as calculators free up (algorithm with ask/tell)")
 
     # list command (fzl)
     parser_list = subparsers.add_parser("list", help="List installed models and calculators")
@@ -817,13 +837,13 @@ def main():
             input_path = _resolve_path(parser, args.input_path, args.input_path_pos, "input_path")
             model = _resolve_model(parser, args)
             variables = parse_variables(args.input_variables)
-            fzc_func(input_path, variables, model, output_dir=args.output_dir)
+            fzc_func(input_path, variables, model, output_dir=args.output_dir, jobs=args.jobs)
             print(f"Compiled input saved to {args.output_dir}")
 
         elif args.command == "output":
             output_path = _resolve_path(parser, args.output_path, args.output_path_pos, "output_path")
             model = _resolve_model(parser, args)
-            result = fzo_func(output_path, model)
+            result = fzo_func(output_path, model, manifest=args.manifest)
             print(format_output(result, args.format))
 
         elif args.command == "run":
@@ -862,6 +882,7 @@ def main():
                 calculators=calculators,
                 algorithm_options=algo_options,
                 analysis_dir=args.results_dir,
+                asynchronous=args.asynchronous,
             )
 
             # Print summary
@@ -73,10 +73,46 @@ class Config:
 
         # Parallel execution configuration
         self.max_workers = self._parse_int_env('FZ_MAX_WORKERS', None)
+        # Processes compiling cases in parallel in fzc/fzr (0: one per CPU)
+        self.compile_jobs = self._parse_int_env('FZ_COMPILE_JOBS', 1)
 
         # SSH configuration
         self.ssh_auto_accept_hostkeys = self._parse_bool_env('FZ_SSH_AUTO_ACCEPT_HOSTKEYS', False)
         self.ssh_keepalive = self._parse_int_env('FZ_SSH_KEEPALIVE', 300)  # 5 minutes default
+        # SSH connection pool: concurrent calculations per host (None: no limit)
+        # and seconds before an unused connection is closed
+        self.ssh_max_sessions = self._parse_int_env('FZ_SSH_MAX_SESSIONS', None)
+        self.ssh_pool_idle_timeout = self._parse_int_env('FZ_SSH_POOL_IDLE_TIMEOUT', 300)
+        # Case file transfer: "tar" (one streamed archive each way) or "sftp" (file by file)
+        self.ssh_transfer = os.getenv('FZ_SSH_TRANSFER', 'tar').lower()
+        self.ssh_compress = self._parse_bool_env('FZ_SSH_COMPRESS', False)
+
+        # Local slurm:// backend: "srun" (one blocking srun per case), "array"
+        # (cases submitted together as sbatch job arrays, tracked by polling) or
+        # "alloc" (cases run by an fz worker inside one long-lived allocation)
+        self.slurm_mode = os.getenv('FZ_SLURM_MODE', 'srun').lower()
+        self.slurm_poll_interval = self._parse_float_env('FZ_SLURM_POLL_INTERVAL', 5.0)
+        self.slurm_array_size = self._parse_int_env('FZ_SLURM_ARRAY_SIZE', 1000)
+        # Allocation mode: cases run at once, time limit (minutes) and seconds
+        # without a case before the worker releases the allocation
+        self.slurm_alloc_tasks = self._parse_int_env('FZ_SLURM_ALLOC_TASKS', 1)
+        self.slurm_alloc_time = self._parse_int_env('FZ_SLURM_ALLOC_TIME', 60)
+        self.slurm_alloc_idle = self._parse_float_env('FZ_SLURM_ALLOC_IDLE', 60.0)
+
+        # Funz calculators: seconds a case waits for a matching UDP broadcast,
+        # and seconds without broadcast before a calculator is forgotten
+        self.funz_discovery_timeout = self._parse_float_env('FZ_FUNZ_DISCOVERY_TIMEOUT', 10.0)
+        self.funz_server_ttl = self._parse_float_env('FZ_FUNZ_SERVER_TTL', 30.0)
+        # Seconds a case's reserved calculator is kept for the next case (0: one
+        # reservation per case)
+        self.funz_session_idle = self._parse_float_env('FZ_FUNZ_SESSION_IDLE', 0.0)
+
+        # pool:// calculators: cases a worker process runs before it is
+        # restarted (0: kept until it exits)
+        self.pool_max_cases = self._parse_int_env('FZ_POOL_MAX_CASES', 0)
+        # py:// calculators: worker processes calling the function (0: called
+        # in the fz process)
+        self.py_processes = self._parse_int_env('FZ_PY_PROCESSES', 0)
 
         # Run timeout configuration (default 600 seconds = 10 minutes)
         self.run_timeout = self._parse_int_env('FZ_RUN_TIMEOUT', 600)
@@ -84,6 +120,9 @@ class Config:
         # Shell path configuration (overrides system PATH for binary resolution)
         self.shell_path = os.getenv('FZ_SHELL_PATH', None)
 
+        # Storage of vector-valued outputs in result DataFrames: list, numpy or arrow
+        self.vector_format = os.getenv('FZ_VECTOR_FORMAT', 'list').lower()
+
     def _parse_int_env(self, key: str, default: Optional[int]) -> Optional[int]:
         """Parse integer environment variable"""
         value = os.getenv(key)
@@ -94,6 +133,16 @@ class Config:
         except ValueError:
             return default
 
+    def _parse_float_env(self, key: str, default: Optional[float]) -> Optional[float]:
+        """Parse float environment variable"""
+        value = os.getenv(key)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            return default
+
     def _parse_bool_env(self, key: str, default: bool) -> bool:
         """Parse boolean environment variable"""
         value = os.getenv(key, '').lower()
@@ -126,10 +175,27 @@ class Config:
             'max_retries': self.max_retries,
             'interpreter': self.interpreter.value,
             'max_workers': self.max_workers,
+            'compile_jobs': self.compile_jobs,
             'ssh_auto_accept_hostkeys': self.ssh_auto_accept_hostkeys,
             'ssh_keepalive': self.ssh_keepalive,
+            'ssh_max_sessions': self.ssh_max_sessions,
+            'ssh_pool_idle_timeout': self.ssh_pool_idle_timeout,
+            'ssh_transfer': self.ssh_transfer,
+            'ssh_compress': self.ssh_compress,
+            'slurm_mode': self.slurm_mode,
+            'slurm_poll_interval': self.slurm_poll_interval,
+            'slurm_array_size': self.slurm_array_size,
+            'slurm_alloc_tasks': self.slurm_alloc_tasks,
+            'slurm_alloc_time': self.slurm_alloc_time,
+            'slurm_alloc_idle': self.slurm_alloc_idle,
+            'funz_discovery_timeout': self.funz_discovery_timeout,
+            'funz_server_ttl': self.funz_server_ttl,
+            'funz_session_idle': self.funz_session_idle,
+            'pool_max_cases': self.pool_max_cases,
+            'py_processes': self.py_processes,
             'run_timeout': self.run_timeout,
-            'shell_path': self.shell_path
+            'shell_path': self.shell_path,
+            'vector_format': self.vector_format
         }
 
 
@@ -211,10 +277,33 @@ def print_config():
 
     print("\n⚡ PERFORMANCE:")
     print(f"  FZ_MAX_WORKERS = {summary['max_workers'] or 'auto'}")
+    print(f"  FZ_COMPILE_JOBS = {summary['compile_jobs']}")
+    print(f"  FZ_VECTOR_FORMAT = {summary['vector_format']}")
 
     print("\n🌐 SSH:")
     print(f"  FZ_SSH_AUTO_ACCEPT_HOSTKEYS = {summary['ssh_auto_accept_hostkeys']}")
     print(f"  FZ_SSH_KEEPALIVE = {summary['ssh_keepalive']}s")
+    print(f"  FZ_SSH_MAX_SESSIONS = {summary['ssh_max_sessions'] or 'unlimited'}")
+    print(f"  FZ_SSH_POOL_IDLE_TIMEOUT = {summary['ssh_pool_idle_timeout']}s")
+    print(f"  FZ_SSH_TRANSFER = {summary['ssh_transfer']}")
+    print(f"  FZ_SSH_COMPRESS = {summary['ssh_compress']}")
+
+    print("\n🖥️  SLURM:")
+    print(f"  FZ_SLURM_MODE = {summary['slurm_mode']}")
+    print(f"  FZ_SLURM_POLL_INTERVAL = {summary['slurm_poll_interval']}s")
+    print(f"  FZ_SLURM_ARRAY_SIZE = {summary['slurm_array_size']}")
+    print(f"  FZ_SLURM_ALLOC_TASKS = {summary['slurm_alloc_tasks']}")
+    print(f"  FZ_SLURM_ALLOC_TIME = {summary['slurm_alloc_time']} min")
+    print(f"  FZ_SLURM_ALLOC_IDLE = {summary['slurm_alloc_idle']}s")
+
+    print("\n📡 FUNZ:")
+    print(f"  FZ_FUNZ_DISCOVERY_TIMEOUT = {summary['funz_discovery_timeout']}s")
+    print(f"  FZ_FUNZ_SERVER_TTL = {summary['funz_server_ttl']}s")
+    print(f"  FZ_FUNZ_SESSION_IDLE = {summary['funz_session_idle']}s")
+
+    print("\n♻️  WORKER POOLS:")
+    print(f"  FZ_POOL_MAX_CASES = {summary['pool_max_cases'] or '(unlimited)'}")
+    print(f"  FZ_PY_PROCESSES = {summary['py_processes'] or '(in-process)'}")
 
     print("\n⏱️  RUN TIMEOUT:")
     print(f"  FZ_RUN_TIMEOUT = {summary['run_timeout']}s")
@@ -12,8 +12,10 @@ import uuid
 import threading
 from collections import defaultdict
 import signal
+import subprocess
 import sys
 import platform
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Dict, List, Union, Any, Optional, Callable, TYPE_CHECKING
 
@@ -74,6 +76,7 @@ from .helpers import (
     run_cases_parallel,
     compile_to_result_directories,
     prepare_temp_directories,
+    AsyncCaseRunner,
 )
 from .shell import run_command, replace_commands_in_string
 from .outparsers import (
@@ -89,6 +92,16 @@ from .outparsers import (
 )
 from .io import (
     flatten_dict_columns,
+    parse_dirname_variables,
+    directory_signature,
+    output_spec_fingerprint,
+    load_fzo_manifest,
+    save_fzo_manifest,
+    load_remote_outputs,
+    resolve_vector_format,
+    to_vector_cell,
+    convert_vector_columns,
+    vector_row,
     get_analysis,
     get_and_process_analysis,
     ensure_unique_directory,
@@ -97,7 +110,8 @@ from .io import (
     process_analysis_content,
 )
 from .interpreter import (
-    parse_variables_from_path,
+    parse_variables_from_content,
+    scan_input_files,
     cast_output,
     _get_comment_char,
     _get_var_prefix,
@@ -747,6 +761,24 @@ def _validate_calculator(calc_spec, calc_display):
             # SLURM calculator - can't test without cluster connection
             return ("passed", None)
 
+        elif protocol == "pool":
+            # Worker pool - check the URI, workers only start with a case
+            from .runners import parse_pool_uri
+            try:
+                parse_pool_uri(calc_uri)
+            except ValueError as e:
+                return ("failed", str(e))
+            return ("passed", None)
+
+        elif protocol == "py":
+            # Python function - check that it can be imported
+            from .pycalculator import load_function, parse_py_uri
+            try:
+                load_function(*parse_py_uri(calc_uri), search_dir=os.getcwd())
+            except Exception as e:
+                return ("failed", f"{type(e).__name__}: {e}")
+            return ("passed", None)
+
         else:
             return ("failed", f"Unknown calculator protocol: {protocol}")
 
@@ -980,24 +1012,21 @@ def fzi(input_path: str, model: Union[str, Dict]) -> Dict[str, Any]:
         if not input_path.exists():
             raise FileNotFoundError(f"Input path '{input_path}' not found")
 
+        # Read each text file once: binary files and files without any
+        # variable or formula marker cannot contribute to the result
+        scanned = scan_input_files(input_path, (varprefix, formulaprefix))
+
         # Parse variables
-        variables = parse_variables_from_path(input_path, varprefix, var_delim)
+        variables = set()
+        for _, text in scanned:
+            variables.update(parse_variables_from_content(text, varprefix, var_delim))
 
-        # Read content to extract defaults and formulas
+        # Content to extract defaults and formulas
         if input_path.is_file():
-            with open(input_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = scanned[0][1] if scanned else ""
         else:
             # For directories, concatenate all file contents
-            content = ""
-            for filepath in input_path.rglob("*"):
-                if filepath.is_file():
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            content += f.read() + "\n"
-                    except UnicodeDecodeError:
-                        # Skip binary files
-                        pass
+            content = "".join(text + "\n" for _, text in scanned)
 
         # Extract default values from variables
         from .interpreter import parse_formulas_from_content, evaluate_single_formula, parse_static_objects_from_content, evaluate_static_objects, parse_static_objects_with_expressions
@@ -1114,6 +1143,7 @@ def fzc(
     input_variables: Dict,
     model: Union[str, Dict],
     output_dir: str = "output",
+    jobs: Optional[int] = None,
 ) -> None:
     """
     Compile input file(s) replacing variables with values
@@ -1123,6 +1153,8 @@ def fzc(
         input_variables: Dict of variable values or lists/numpy arrays of values for grid
         model: Model definition dict or alias string
         output_dir: Output directory for compiled files
+        jobs: Number of processes compiling cases in parallel (default:
+            FZ_COMPILE_JOBS, 1; 0 for one per CPU)
 
     Raises:
         TypeError: If arguments have invalid types
@@ -1167,16 +1199,137 @@ def fzc(
 
     # Use compile_to_result_directories helper to avoid code duplication
     compile_to_result_directories(
-        input_path, model, input_variables, var_combinations, output_dir
+        input_path, model, input_variables, var_combinations, output_dir, jobs=jobs
     )
 
     # Always restore the original working directory
     os.chdir(working_dir)
 
 
+def _parse_output_directory(
+    output_dir: Path, output_spec: Dict, output_path_rel: Union[str, Path]
+) -> Dict[str, Any]:
+    """
+    Apply the model output commands to one result directory.
+
+    Args:
+        output_dir: Result directory the commands run in
+        output_spec: Model "output" section
+        output_path_rel: Directory path as shown in warnings
+
+    Returns:
+        Dict of output values, plus "_output_error" if any output failed
+    """
+    row = {}
+
+    # Values of shell output commands already run on a remote host (model
+    # "remote_output"), valid while the command is unchanged
+    remote_outputs = load_remote_outputs(output_dir)
+
+    # Execute model output commands from this directory
+    output_errors = []  # Collect output parsing errors for this directory
+    for key, command in output_spec.items():
+        try:
+            # Native Python output extraction: callable, or "python://" expression
+            # (no shell involved — portable across platforms)
+            if callable(command) or is_python_expression(command):
+                row[key] = evaluate_python_output(
+                    command, output_dir.absolute()
+                )
+                continue
+
+            # Native jq output extraction: "jq://" expression (requires the
+            # jq executable, no shell/bash involved)
+            if is_jq_expression(command):
+                row[key] = evaluate_jq_output(
+                    command, output_dir.absolute()
+                )
+                continue
+
+            # Native yq output extraction: "yq://" expression (requires the
+            # yq executable, no shell/bash involved)
+            if is_yq_expression(command):
+                row[key] = evaluate_yq_output(
+                    command, output_dir.absolute()
+                )
+                continue
+
+            # Native XPath output extraction: "xpath://" expression
+            # (requires the xmllint executable, no shell/bash involved)
+            if is_xpath_expression(command):
+                row[key] = evaluate_xpath_output(
+                    command, output_dir.absolute()
+                )
+                continue
+
+            # Legacy shell command, implicit default or explicit "bash://"
+            # prefix. Apply shell path resolution if FZ_SHELL_PATH is set.
+            resolved_command = replace_commands_in_string(strip_bash_prefix(command))
+
+            remote = remote_outputs.get(key)
+            if remote is not None and remote.get("command") == command:
+                result = subprocess.CompletedProcess(
+                    resolved_command, remote["returncode"], remote["stdout"], remote["stderr"]
+                )
+            else:
+                # Execute shell command from the matched output directory
+                result = run_command(
+                    resolved_command,
+                    shell=True,
+                    capture_output=True,
+                    text=True,
+                    cwd=str(output_dir.absolute()),
+                )
+
+            if result.returncode == 0:
+                raw_output = result.stdout.strip()
+                # Try to cast to appropriate Python type
+                parsed_value = cast_output(raw_output)
+                row[key] = parsed_value
+                # If output is empty/None but stderr has content, report it
+                if parsed_value is None and raw_output == "":
+                    stderr_msg = result.stderr.strip() if result.stderr else ""
+                    if stderr_msg:
+                        output_errors.append(
+                            f"Output '{key}': command returned empty output — {stderr_msg}"
+                        )
+                    else:
+                        output_errors.append(
+                            f"Output '{key}': command returned empty output (no result produced)"
+                        )
+            else:
+                stderr_msg = result.stderr.strip() if result.stderr else ""
+                error_detail = (
+                    f"Output '{key}': command failed (exit code {result.returncode})"
+                )
+                if stderr_msg:
+                    error_detail += f" — {stderr_msg}"
+                output_errors.append(error_detail)
+                log_warning(
+                    f"Warning: Command for '{output_path_rel}/{key}' failed: {result.stderr}"
+                )
+                row[key] = None
+
+        except Exception as e:
+            output_errors.append(f"Output '{key}': {e}")
+            log_warning(
+                f"Warning: Error executing command for '{output_path_rel}/{key}': {e}"
+            )
+            row[key] = None
+
+    # If there are output parsing errors, add an _output_error column
+    if output_errors:
+        row["_output_error"] = "; ".join(output_errors)
+
+    return row
+
+
 @with_helpful_errors
 def fzo(
-    output_path: str, model: Union[str, Dict]
+    output_path: str,
+    model: Union[str, Dict],
+    vector_format: Optional[str] = None,
+    manifest: Optional[Union[str, Path]] = None,
 ) -> Union[Dict[str, Any], "pandas.DataFrame"]:
     """
     Read and parse output file(s) according to model
@@ -1188,6 +1341,14 @@ def fzo(
                     Subdirectories within matched directories are NOT processed.
         model: Model definition dict or alias string. Output commands are executed from
                each matched directory and reference files relative to that directory.
+        vector_format: Storage of numeric vector outputs: "list" (plain Python lists),
+               "numpy" (one numpy array per cell) or "arrow" (pyarrow list column,
+               requires pyarrow). None uses FZ_VECTOR_FORMAT (default "list").
+        manifest: Optional manifest file enabling incremental parsing. It records
+               each directory's files (path, mtime, size) with the parsed values;
+               on the next call only directories whose files changed (or that are
+               new) are re-parsed, the others reuse the cached values. Meant for
+               monitoring a running campaign by calling fzo in a loop.
 
     Returns:
         DataFrame with one row per matched directory.
@@ -1209,6 +1370,7 @@ def fzo(
 
     model = _resolve_model(model)
     output_spec = model.get("output", {})
+    vector_format = resolve_vector_format(vector_format)
 
     # If any output uses a legacy shell command (not a native Python
     # expression/callable), bash must be available on Windows. Check once,
@@ -1235,6 +1397,15 @@ def fzo(
 
     rows = []  # List of dicts, one per matched output directory
 
+    # Incremental mode: reuse values parsed by a previous call for unchanged directories
+    manifest_entries = None
+    if manifest is not None:
+        manifest_file = Path(manifest).absolute()
+        fingerprint = output_spec_fingerprint(output_spec)
+        manifest_entries = load_fzo_manifest(manifest_file, fingerprint)
+        new_manifest_entries = {}
+        reused = 0
+
     # Process each matched output directory (apply model output parsing at first level only)
     for output_path_single in output_paths:
         # Compute relative path for the 'path' column
@@ -1247,165 +1418,49 @@ def fzo(
             # output_path is outside original launch directory, use as-is
             output_path_rel = output_path_single
 
+        if manifest_entries is not None:
+            key_abs = str(output_path_single.absolute())
+            signature = directory_signature(output_path_single, exclude=manifest_file)
+            cached = manifest_entries.get(key_abs)
+            if cached is not None and cached["signature"] == signature:
+                parsed = cached["row"]
+                reused += 1
+            else:
+                parsed = _parse_output_directory(output_path_single, output_spec, output_path_rel)
+            new_manifest_entries[key_abs] = {"signature": signature, "row": parsed}
+        else:
+            parsed = _parse_output_directory(output_path_single, output_spec, output_path_rel)
+
         # Create one row per matched directory (apply model output parsing at this level)
         row = {"path": str(output_path_rel)}
+        row.update(parsed)
 
-        # Execute model output commands from this directory
-        output_errors = []  # Collect output parsing errors for this directory
-        for key, command in output_spec.items():
-            try:
-                # Native Python output extraction: callable, or "python://" expression
-                # (no shell involved — portable across platforms)
-                if callable(command) or is_python_expression(command):
-                    row[key] = evaluate_python_output(
-                        command, output_path_single.absolute()
-                    )
-                    continue
-
-                # Native jq output extraction: "jq://" expression (requires the
-                # jq executable, no shell/bash involved)
-                if is_jq_expression(command):
-                    row[key] = evaluate_jq_output(
-                        command, output_path_single.absolute()
-                    )
-                    continue
-
-                # Native yq output extraction: "yq://" expression (requires the
-                # yq executable, no shell/bash involved)
-                if is_yq_expression(command):
-                    row[key] = evaluate_yq_output(
-                        command, output_path_single.absolute()
-                    )
-                    continue
-
-                # Native XPath output extraction: "xpath://" expression
-                # (requires the xmllint executable, no shell/bash involved)
-                if is_xpath_expression(command):
-                    row[key] = evaluate_xpath_output(
-                        command, output_path_single.absolute()
-                    )
-                    continue
-
-                # Legacy shell command, implicit default or explicit "bash://"
-                # prefix. Apply shell path resolution if FZ_SHELL_PATH is set.
-                resolved_command = replace_commands_in_string(strip_bash_prefix(command))
-
-                # Execute shell command from the matched output directory
-                result = run_command(
-                    resolved_command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    cwd=str(output_path_single.absolute()),
-                )
-
-                if result.returncode == 0:
-                    raw_output = result.stdout.strip()
-                    # Try to cast to appropriate Python type
-                    parsed_value = cast_output(raw_output)
-                    row[key] = parsed_value
-                    # If output is empty/None but stderr has content, report it
-                    if parsed_value is None and raw_output == "":
-                        stderr_msg = result.stderr.strip() if result.stderr else ""
-                        if stderr_msg:
-                            output_errors.append(
-                                f"Output '{key}': command returned empty output — {stderr_msg}"
-                            )
-                        else:
-                            output_errors.append(
-                                f"Output '{key}': command returned empty output (no result produced)"
-                            )
-                else:
-                    stderr_msg = result.stderr.strip() if result.stderr else ""
-                    error_detail = (
-                        f"Output '{key}': command failed (exit code {result.returncode})"
-                    )
-                    if stderr_msg:
-                        error_detail += f" — {stderr_msg}"
-                    output_errors.append(error_detail)
-                    log_warning(
-                        f"Warning: Command for '{output_path_rel}/{key}' failed: {result.stderr}"
-                    )
-                    row[key] = None
-
-            except Exception as e:
-                output_errors.append(f"Output '{key}': {e}")
-                log_warning(
-                    f"Warning: Error executing command for '{output_path_rel}/{key}': {e}"
-                )
-                row[key] = None
-
-        # If there are output parsing errors, add an _output_error column
-        if output_errors:
-            row["_output_error"] = "; ".join(output_errors)
+        # Store numeric vectors as arrays right away (no-op for "list")
+        if vector_format != "list":
+            for key in output_spec:
+                row[key] = to_vector_cell(row.get(key), vector_format)
 
         rows.append(row)
 
+    if manifest_entries is not None:
+        save_fzo_manifest(manifest_file, fingerprint, new_manifest_entries)
+        log_info(f"fzo manifest: {len(rows) - reused} directories parsed, {reused} unchanged")
+
     # Return DataFrame if pandas is available, otherwise return first row as dict for backward compatibility
     if True:  # pandas is always available
         df = pd.DataFrame(rows)
 
-        # Check if all 'path' values follow the "key1=val1,key2=val2,..." pattern
+        # If all 'path' values follow the "key1=val1,key2=val2,..." pattern,
+        # add the extracted variables as columns
         if len(df) > 0 and "path" in df.columns:
-            # Try to parse all path values
-            parsed_vars = {}
-            all_parseable = True
-
-            for path_val in df["path"]:
-                # Extract just the last component (subdirectory name) for parsing
-                path_obj = Path(path_val)
-                last_component = path_obj.name
-
-                # If last component doesn't contain '=', it's not a key=value pattern
-                if '=' not in last_component:
-                    all_parseable = False
-                    break
-
-                # Try to parse "key1=val1,key2=val2,..." pattern from last component
-                try:
-                    parts = last_component.split(",")
-                    row_vars = {}
-                    for part in parts:
-                        if "=" in part:
-                            key, val = part.split("=", 1)
-                            row_vars[key.strip()] = val.strip()
-                        else:
-                            # Not a key=value pattern
-                            all_parseable = False
-                            break
-
-                    if not all_parseable:
-                        break
-
-                    # Add to parsed_vars for this row
-                    for key in row_vars:
-                        if key not in parsed_vars:
-                            parsed_vars[key] = []
-                        parsed_vars[key].append(row_vars[key])
-
-                except Exception:
-                    all_parseable = False
-                    break
-
-            # If all paths were parseable, add the extracted columns
-            if all_parseable and parsed_vars:
-                for key, values in parsed_vars.items():
-                    # Try to cast values to appropriate types
-                    cast_values = []
-                    for v in values:
-                        try:
-                            # Try int first
-                            if "." not in v:
-                                cast_values.append(int(v))
-                            else:
-                                cast_values.append(float(v))
-                        except ValueError:
-                            # Keep as string
-                            cast_values.append(v)
-                    df[key] = cast_values
+            dirname_vars = parse_dirname_variables(df["path"])
+            if dirname_vars is not None:
+                for key in dirname_vars.columns:
+                    df[key] = dirname_vars[key]
 
         # Flatten any dict-valued columns into separate columns
         df = flatten_dict_columns(df)
+        df = convert_vector_columns(df, vector_format)
 
         # Always restore the original working directory
         os.chdir(working_dir)
@@ -1423,6 +1478,7 @@ def fzr(
     calculators: Union[str, Dict, List[Union[str, Dict]]] = None,
     callbacks: Optional[Dict[str, callable]] = None,
     timeout: int = None,
+    vector_format: Optional[str] = None,
 ) -> Union[Dict[str, List[Any]], "pandas.DataFrame"]:
     """
     Run full parametric calculations
@@ -1443,6 +1499,9 @@ def fzr(
                   - 'on_progress': Called periodically. Args: (completed, total, eta_seconds)
                   - 'on_complete': Called when all cases finish. Args: (total_cases, completed_cases, results)
         timeout: Timeout in seconds for each calculation (None uses FZ_RUN_TIMEOUT from config, default 600)
+        vector_format: Storage of numeric vector outputs: "list" (plain Python lists),
+                      "numpy" (one numpy array per cell) or "arrow" (pyarrow list column,
+                      requires pyarrow). None uses FZ_VECTOR_FORMAT (default "list").
 
     Returns:
         DataFrame with variable values and results (if pandas available), otherwise Dict with lists
@@ -1503,6 +1562,7 @@ def fzr(
     original_cwd = os.getcwd()
 
     model = _resolve_model(model)
+    vector_format = resolve_vector_format(vector_format)
 
     # Validate input path exists early
     input_path_obj = Path(input_path).resolve()
@@ -1622,6 +1682,7 @@ def fzr(
                 has_input_variables,
                 callbacks,
                 timeout,
+                vector_format=vector_format,
             )
 
             # Collect results in the correct order, filtering out None (interrupted/incomplete cases)
@@ -1696,6 +1757,7 @@ def fzr(
     df = pd.DataFrame(non_empty_results)
     # Flatten any dict-valued columns into separate columns
     final_results = flatten_dict_columns(df)
+    final_results = convert_vector_columns(final_results, vector_format)
 
     # Call on_complete callback
     if callbacks and 'on_complete' in callbacks:
@@ -1899,28 +1961,72 @@ def _evaluate_function_model_point(model_func, point, output_expression):
     return output_data, output_value
 
 
-def _run_function_model_design(model_func, design_points, output_expression, max_workers):
-    """Evaluate design_points against model_func, one at a time, in the calling thread.
-
-    Always sequential (a plain loop, like R's lapply), regardless of
-    max_workers: concurrent.futures.ThreadPoolExecutor always dispatches to a
-    *worker* thread, even with max_workers=1 — never the calling thread. That
-    breaks model_func callables that are only safe to call from the thread
-    that created them, such as an R closure bridged in via reticulate, which
-    crashes the host process if invoked from any thread other than the main
-    one. There is no way to distinguish such callables from an ordinary,
-    thread-safe Python function, so we always run sequentially to stay safe
-    for both. max_workers is accepted for API compatibility but currently has
-    no effect on execution.
-    """
-    def _call(point):
+def _evaluate_function_model_points(model_func, points, output_expression):
+    """Evaluate points one at a time, as (output_data, output_value, error) tuples."""
+    results = []
+    for point in points:
         try:
             output_data, output_value = _evaluate_function_model_point(model_func, point, output_expression)
-            return output_data, output_value, None
+            results.append((output_data, output_value, None))
         except Exception as e:
-            return None, None, str(e)
+            results.append((None, None, str(e)))
+    return results
+
+
+def _run_function_model_design(model_func, design_points, output_expression, max_workers, executor=None):
+    """Evaluate design_points against model_func, in order.
+
+    Without executor, sequential in the calling thread (a plain loop, like R's
+    lapply), regardless of max_workers: concurrent.futures.ThreadPoolExecutor
+    always dispatches to a *worker* thread, even with max_workers=1 — never the
+    calling thread. That breaks model_func callables that are only safe to call
+    from the thread that created them, such as an R closure bridged in via
+    reticulate, which crashes the host process if invoked from any thread other
+    than the main one. There is no way to distinguish such callables from an
+    ordinary, thread-safe Python function, so this stays the default.
+
+    With a ProcessPoolExecutor (fzd parallel="process", for picklable
+    functions), the points are sent in about four chunks per worker, few
+    enough to amortize pickling and many enough to balance uneven call
+    durations, and the results gathered back in design order.
+    """
+    if executor is None or len(design_points) < 2:
+        return _evaluate_function_model_points(model_func, design_points, output_expression)
+
+    chunk_size = max(1, -(-len(design_points) // (max_workers * 4)))
+    chunks = [design_points[i:i + chunk_size] for i in range(0, len(design_points), chunk_size)]
+    futures = [executor.submit(_evaluate_function_model_points, model_func, chunk, output_expression)
+               for chunk in chunks]
+    results = []
+    try:
+        for chunk, future in zip(chunks, futures):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                # The worker died, or the call or its result could not be pickled
+                results.extend([(None, None, f"{type(e).__name__}: {e}")] * len(chunk))
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return results
 
-    return [_call(point) for point in design_points]
+
+def _function_model_executor(model_func, max_workers):
+    """A ProcessPoolExecutor for fzd parallel="process", or None if model_func cannot be sent to one."""
+    import pickle
+    from concurrent.futures import ProcessPoolExecutor
+
+    try:
+        pickle.dumps(model_func)
+    except Exception as e:
+        model_name = getattr(model_func, "__name__", repr(model_func))
+        log_warning(
+            f"⚠️  Target function '{model_name}' cannot be pickled ({e}): "
+            "running it sequentially instead of in worker processes"
+        )
+        return None
+    return ProcessPoolExecutor(max_workers=max_workers)
 
 
 def _save_function_model_iteration_csv(iteration_result_dir, all_var_names, unique_design, unique_results):
@@ -1944,6 +2050,120 @@ def _save_function_model_iteration_csv(iteration_result_dir, all_var_names, uniq
             f.write(','.join(row) + '\n')
 
 
+def _save_design_xy_csv(results_dir, iteration, all_input_vars, all_output_values, output_expression):
+    """Write the X_<iteration>.csv inputs and Y_<iteration>.csv objectives of fzd, returning both paths."""
+    # Save X (input variables) to CSV
+    x_file = results_dir / f"X_{iteration}.csv"
+    with open(x_file, 'w') as f:
+        if all_input_vars:
+            # Get all variable names from the first entry
+            var_names = list(all_input_vars[0].keys())
+            f.write(','.join(var_names) + '\n')
+            for inp in all_input_vars:
+                f.write(','.join(str(inp[var]) for var in var_names) + '\n')
+
+    # Save Y (output values) to CSV
+    y_file = results_dir / f"Y_{iteration}.csv"
+    with open(y_file, 'w') as f:
+        if isinstance(output_expression, (list, tuple)):
+            f.write(','.join(str(e) for e in output_expression) + '\n')
+            n_obj = len(output_expression)
+            for val in all_output_values:
+                vals = val if isinstance(val, (list, tuple)) else [None]*n_obj
+                f.write(','.join('NA' if v is None else str(v) for v in vals) + '\n')
+        else:
+            f.write('output\n')
+            for val in all_output_values:
+                f.write(f"{val if val is not None else 'NA'}\n")
+    return x_file, y_file
+
+
+def _run_async_design(algo_instance, initial_design, fixed_input_vars, submit, objective, capacity):
+    """Evaluate points as calculators free up, telling each result to the algorithm (fzd asynchronous=True).
+
+    The initial design is submitted first, then algo_instance.ask(n) is asked
+    for as many points as there are free calculators, each time a case
+    finishes. An empty list from ask() waits for the next case to finish, or
+    ends the design when none is running. Every finished point is told to
+    algo_instance.tell(x, y) right away, y being None for a failed case.
+    Duplicate points reuse the result of their first evaluation.
+
+    Args:
+        algo_instance: Algorithm with ask(n) and tell(x, y) methods
+        initial_design: Points of the initial design (fixed variables included)
+        fixed_input_vars: Fixed variable values, added to the points from ask()
+        submit: submit(point) starts evaluating a point, returning a Future
+        objective: objective(point, result) converts a Future result to
+            (output_value, error), error None on success
+        capacity: Number of points evaluated at the same time
+
+    Returns:
+        Tuple of (input_vars, output_values), in the order the points finished
+    """
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    queued = list(initial_design)
+    pending = {}    # future -> (key, points waiting for its result)
+    running = {}    # key -> future
+    finished = {}   # key -> (output_value, error)
+    all_input_vars = []
+    all_output_values = []
+    # Cleared when ask() returns no point, until the next case finishes
+    may_ask = True
+
+    def record(point, output_value, error):
+        all_input_vars.append(point)
+        all_output_values.append(output_value)
+        n = len(all_input_vars)
+        if error is not None:
+            log_warning(f"  Point {n}: {point} → FAILED: {error}")
+        else:
+            log_info(f"  Point {n}: {point} → {_format_objective(output_value)}")
+        algo_instance.tell(point, output_value)
+
+    try:
+        while not _interrupt_requested:
+            # Keep every calculator busy: initial design first, then ask the algorithm
+            while len(pending) < capacity and not _interrupt_requested:
+                if not queued:
+                    if not may_ask:
+                        break
+                    queued = [{**p, **fixed_input_vars} for p in algo_instance.ask(capacity - len(pending))]
+                    if not queued:
+                        may_ask = False
+                        break
+                point = queued.pop(0)
+                key = tuple(sorted(point.items()))
+                if key in finished:
+                    record(point, *finished[key])
+                elif key in running:
+                    pending[running[key]][1].append(point)
+                else:
+                    future = submit(point)
+                    running[key] = future
+                    pending[future] = (key, [point])
+
+            if not pending:
+                break
+
+            done, _ = wait(list(pending), timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                may_ask = True
+                key, points = pending.pop(future)
+                del running[key]
+                try:
+                    finished[key] = objective(points[0], future.result())
+                except Exception as e:
+                    finished[key] = (None, f"{type(e).__name__}: {e}")
+                for point in points:
+                    record(point, *finished[key])
+    finally:
+        for future in pending:
+            future.cancel()
+
+    return all_input_vars, all_output_values
+
+
 def fzd(
     input_path: Optional[str],
     input_variables: Dict[str, str],
@@ -1952,7 +2172,9 @@ def fzd(
     algorithm: str,
     calculators: Union[str, List[str], int] = None,
     algorithm_options: Union[Dict[str, Any], str] = None,
-    analysis_dir: str = "analysis"
+    analysis_dir: str = "analysis",
+    parallel: str = "sequential",
+    asynchronous: bool = False
 ) -> Dict[str, Any]:
     """
     Run iterative design of experiments with algorithms
@@ -1969,12 +2191,13 @@ def fzd(
        - output_expression may be None, in which case the value of the first
          key of the function's return value is used (or the return value
          itself if it's a plain scalar)
-       - calculators must be an int (defaults to 1), accepted for API
-         compatibility; function calls are always run sequentially, one at a
-         time in the calling thread — never via a thread pool. This is
-         required for model callables that are only safe to call from that
-         thread (e.g. an R function bridged in via reticulate), which cannot
-         be reliably distinguished from an ordinary thread-safe function
+       - calculators must be an int (defaults to 1). By default function
+         calls run sequentially, one at a time in the calling thread — never
+         via a thread pool. This is required for model callables that are
+         only safe to call from that thread (e.g. an R function bridged in
+         via reticulate), which cannot be reliably distinguished from an
+         ordinary thread-safe function. With parallel="process", a picklable
+         function runs on calculators worker processes instead
        - analysis_dir behaves as usual, except the per-iteration directory
          only contains a CSV of the function's inputs/outputs (no case dirs)
 
@@ -1992,14 +2215,22 @@ def fzd(
         calculators: Calculator specifications. If omitted, installed calculator
             aliases supporting the model id are auto-discovered (like fzr);
             falls back to ["sh://"] when none are found.
-            When model is a callable, this must be an int (defaults to 1),
-            accepted for API compatibility but currently has no effect:
-            calls always run sequentially (see above).
+            When model is a callable, this must be an int (defaults to 1):
+            the number of worker processes with parallel="process", no
+            effect otherwise (calls run sequentially, see above).
         algorithm_options: Algorithm-specific options. Can be:
             - Dict: {"batch_size": 10, "max_iter": 100}
             - JSON string: '{"batch_size": 10, "max_iter": 100}'
             - JSON file path: "options.json"
         analysis_dir: Analysis results directory (default: "analysis"; the CLI uses "results_fzd")
+        parallel: How a Python callable model is called: "sequential" (default,
+            in the calling thread) or "process" (on a pool of `calculators`
+            worker processes, for picklable module-level functions)
+        asynchronous: Evaluate points as calculators free up instead of by
+            batches: the algorithm, which must have ask(n) and tell(x, y)
+            methods, is told each result as soon as its case finishes and
+            asked for new points to keep every calculator busy. Results are
+            saved in a single iteration (iter001, X_1.csv, Y_1.csv)
 
     Returns:
         Dict with algorithm results including:
@@ -2052,10 +2283,15 @@ def fzd(
     _interrupt_requested = False
     _install_signal_handler()
 
-    
+    function_executor = None
     try:
         is_function_model = callable(model) and not isinstance(model, (str, dict))
 
+        if parallel not in ("sequential", "process"):
+            raise ValueError(f"parallel must be 'sequential' or 'process', got {parallel!r}")
+        if parallel == "process" and not is_function_model:
+            raise ValueError("parallel='process' only applies when model is a Python callable")
+
         if is_function_model:
             if input_path is not None:
                 raise ValueError("input_path must be None when model is a Python callable")
@@ -2078,6 +2314,8 @@ def fzd(
                 raise TypeError("calculators must be an int (number of parallel calls) when model is a Python callable")
 
             model_func = model
+            if parallel == "process" and function_workers > 1:
+                function_executor = _function_model_executor(model_func, function_workers)
 
             results_dir = Path(analysis_dir).resolve()
             results_dir, renamed_results_dir = ensure_unique_directory(results_dir)
@@ -2141,6 +2379,71 @@ def fzd(
             full_point = {**design_point, **fixed_input_vars}
             initial_design.append(full_point)
 
+        if asynchronous:
+            if not (callable(getattr(algo_instance, "ask", None)) and callable(getattr(algo_instance, "tell", None))):
+                raise ValueError(f"asynchronous=True requires an algorithm with ask(n) and tell(x, y) methods: {algorithm}")
+
+            iteration = 1
+            iteration_result_dir = results_dir / f"iter{iteration:03d}"
+            iteration_result_dir.mkdir(parents=True, exist_ok=True)
+            all_var_names = list(parsed_input_vars.keys()) + list(fixed_input_vars.keys())
+
+            if is_function_model:
+                log_info(f"\n📊 Evaluating points asynchronously on {function_workers if function_executor else 1} worker(s)...")
+                evaluated = []
+
+                def submit(point):
+                    if function_executor is not None:
+                        return function_executor.submit(
+                            _evaluate_function_model_points, model_func, [point], output_expression
+                        )
+                    # Sequential: evaluated in the calling thread, as in batches
+                    future = Future()
+                    future.set_result(_evaluate_function_model_points(model_func, [point], output_expression))
+                    return future
+
+                def objective(point, result):
+                    evaluated.append((point, result[0]))
+                    return result[0][1], result[0][2]
+
+                all_input_vars, all_output_values = _run_async_design(
+                    algo_instance, initial_design, fixed_input_vars, submit, objective,
+                    function_workers if function_executor is not None else 1
+                )
+                _save_function_model_iteration_csv(
+                    iteration_result_dir, all_var_names,
+                    [point for point, _ in evaluated], [result for _, result in evaluated]
+                )
+            else:
+                cache_paths = []
+                if renamed_results_dir is not None:
+                    cache_paths = [f"cache://{renamed_results_dir / f'iter{j:03d}'}" for j in range(1, 100)]
+
+                def objective(point, result):
+                    if result.get("status") != "done":
+                        return None, result.get("error") or f"Calculation failed (status: {result.get('status')})"
+                    return evaluate_output_expressions(output_expression, result), None
+
+                with AsyncCaseRunner(input_dir, model, [*cache_paths, *calculators],
+                                     iteration_result_dir, working_dir) as runner:
+                    log_info(f"\n📊 Evaluating points asynchronously on {runner.capacity} calculator(s)...")
+                    all_input_vars, all_output_values = _run_async_design(
+                        algo_instance, initial_design, fixed_input_vars, runner.submit, objective, runner.capacity
+                    )
+
+            try:
+                x_file, y_file = _save_design_xy_csv(
+                    results_dir, iteration, all_input_vars, all_output_values, output_expression
+                )
+                log_info(f"  💾 Saved results: {x_file.name}, {y_file.name}")
+            except Exception as e:
+                log_warning(f"⚠️  Failed to save iteration files: {e}")
+
+            return get_analysis(
+                algo_instance, all_input_vars, all_output_values,
+                output_expression or "output", algorithm, iteration, results_dir
+            )
+
         # Track all evaluations
         all_input_vars = []
         all_output_values = []
@@ -2182,7 +2485,8 @@ def fzd(
 
                 if is_function_model:
                     unique_results = _run_function_model_design(
-                        model_func, unique_design, output_expression, function_workers
+                        model_func, unique_design, output_expression, function_workers,
+                        executor=function_executor
                     )
                     _save_function_model_iteration_csv(
                         iteration_result_dir, all_var_names, unique_design, unique_results
@@ -2223,7 +2527,7 @@ def fzd(
                         iteration_inputs.append(point)
 
                         if i < len(result_df):
-                            row = result_df.iloc[i]
+                            row = vector_row(result_df, i)
                             output_data = row #{key: row.get(key, None) for key in output_var_names}
 
                             # Check if the case itself failed (status != 'done')
@@ -2281,29 +2585,9 @@ def fzd(
 
             # Save iteration results to files
             try:
-                # Save X (input variables) to CSV
-                x_file = results_dir / f"X_{iteration}.csv"
-                with open(x_file, 'w') as f:
-                    if all_input_vars:
-                        # Get all variable names from the first entry
-                        var_names = list(all_input_vars[0].keys())
-                        f.write(','.join(var_names) + '\n')
-                        for inp in all_input_vars:
-                            f.write(','.join(str(inp[var]) for var in var_names) + '\n')
-
-                # Save Y (output values) to CSV
-                y_file = results_dir / f"Y_{iteration}.csv"
-                with open(y_file, 'w') as f:
-                    if isinstance(output_expression, (list, tuple)):
-                        f.write(','.join(str(e) for e in output_expression) + '\n')
-                        n_obj = len(output_expression)
-                        for val in all_output_values:
-                            vals = val if isinstance(val, (list, tuple)) else [None]*n_obj
-                            f.write(','.join('NA' if v is None else str(v) for v in vals) + '\n')
-                    else:
-                        f.write('output\n')
-                        for val in all_output_values:
-                            f.write(f"{val if val is not None else 'NA'}\n")
+                x_file, y_file = _save_design_xy_csv(
+                    results_dir, iteration, all_input_vars, all_output_values, output_expression
+                )
 
                 # Save HTML results
                 html_file = results_dir / f"results_{iteration}.html"
@@ -2424,6 +2708,9 @@ def fzd(
         # Restore signal handler
         _restore_signal_handler()
 
+        if function_executor is not None:
+            function_executor.shutdown(wait=not _interrupt_requested)
+
         # Always restore the original working directory
         os.chdir(working_dir)
 
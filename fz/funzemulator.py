@@ -0,0 +1,343 @@
+"""
+Pure-Python emulator of Funz calculators, for load tests and benchmarks of funz:// calculators
+
+The Java calculator (tools/setup_funz_calculator.sh) is heavy to install and
+run many times. FunzCalculatorEmulator serves the calculator side of the Funz
+protocol instead: it broadcasts its state by UDP like
+org.funz.calculator.network.Host, and answers RESERVE, NEWCASE, PUTFILE,
+EXECUTE, ARCHIVE, GETFILE and UNRESERVE on a TCP port of its own. Cases either
+run a shell command in a temporary directory, or are emulated with a given
+execution time, failure rate and result archive size.
+
+Many emulators can share a UDP port on one host:
+
+    python -m fz.funzemulator --count 50 --udp-port 5555 --exec-time 0.5 --failure-rate 0.1
+
+then run fzr with calculators="funz://:5555/bash".
+"""
+import argparse
+import getpass
+import io
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+#: File of the emulated results holding archive_size bytes
+PAYLOAD_FILE = "payload.bin"
+
+
+class FunzCalculatorEmulator:
+    """
+    An emulated Funz calculator, serving from creation until close()
+
+    Args:
+        udp_port: UDP port to broadcast on
+        codes: Funz codes offered
+        command: Shell command run for each case in its directory (None:
+            emulated run, writing out.txt)
+        exec_time: Seconds each case takes (added to the command, if any)
+        failure_rate: Probability that a case fails
+        archive_size: Bytes of extra result data (in payload.bin) per case
+        broadcast_interval: Seconds between two UDP broadcasts
+        broadcast_host: Address the broadcasts are sent to
+        name: Calculator name in the broadcasts
+        seed: Seed of the failure draws
+
+    Attributes:
+        tcp_port: TCP port the calculator listens on
+        requests: Number of requests received, by method
+        cases: Number of cases executed
+        failures: Number of cases failed
+        reserved_by: Reservation owner, or None when idle
+    """
+
+    def __init__(self, udp_port: int, codes: Sequence[str] = ("bash",), command: Optional[str] = None,
+                 exec_time: float = 0.0, failure_rate: float = 0.0, archive_size: int = 0,
+                 broadcast_interval: float = 5.0, broadcast_host: str = "127.0.0.1",
+                 name: str = "emulator", seed: Optional[int] = None):
+        self.udp_port = udp_port
+        self.codes = list(codes)
+        self.command = command
+        self.exec_time = exec_time
+        self.failure_rate = failure_rate
+        self.archive_size = archive_size
+        self.broadcast_interval = broadcast_interval
+        self.broadcast_host = broadcast_host
+        self.name = name
+        self.requests = Counter()
+        self.cases = 0
+        self.failures = 0
+        self.reserved_by: Optional[str] = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._connections: List[socket.socket] = []
+        self._stop = threading.Event()
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(16)
+        self._server.settimeout(0.2)
+        self.tcp_port = self._server.getsockname()[1]
+        self._threads = [
+            threading.Thread(target=self._accept, name=f"funz-emulator-{self.tcp_port}", daemon=True),
+            threading.Thread(target=self._broadcast, name=f"funz-emulator-udp-{self.tcp_port}", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop serving and broadcasting"""
+        self._stop.set()
+        self.drop_connections()
+        for thread in self._threads:
+            thread.join(2)
+        self._server.close()
+
+    def drop_connections(self):
+        """Close the client connections, as a restarted calculator would"""
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _broadcast(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            while True:
+                owner = self.reserved_by
+                activity = "idle" if owner is None else f"already reserved by {owner}"
+                packet = "\n".join([self.name, str(self.tcp_port), "0", "Python", activity,
+                                    str(len(self.codes)), *self.codes]) + "\n"
+                try:
+                    sock.sendto(packet.encode(), (self.broadcast_host, self.udp_port))
+                except OSError:
+                    pass
+                if self._stop.wait(self.broadcast_interval):
+                    return
+        finally:
+            sock.close()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            with self._lock:
+                self._connections.append(conn)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        rfile = conn.makefile("rb")
+        workdir: Optional[Path] = None
+        owner = f"{getpass.getuser()}@{id(conn)}"
+
+        def readline() -> str:
+            return rfile.readline().decode().rstrip("\n")
+
+        def reply(*lines):
+            conn.sendall("".join(f"{line}\n" for line in (*lines, "/")).encode())
+
+        try:
+            while not self._stop.is_set():
+                method = readline()
+                if not method:
+                    break
+                args = []
+                while True:
+                    line = readline()
+                    if line in ("/", ""):
+                        break
+                    args.append(line)
+                with self._lock:
+                    self.requests[method] += 1
+                    reserved = self.reserved_by == owner
+
+                if method == "RESERVE":
+                    with self._lock:
+                        free = self.reserved_by is None
+                        if free:
+                            self.reserved_by = owner
+                    if not free:
+                        reply("N", f"already reserved by {self.reserved_by}")
+                        continue
+                    reply("Y")
+                    readline()  # code
+                    for _ in range(2 * int(readline() or 0)):
+                        readline()
+                    reply("Y", f"{self.tcp_port}", "127.0.0.1", "0")
+                elif not reserved:
+                    reply("N", "not reserved")
+                elif method == "NEWCASE":
+                    for _ in range(2 * int(readline() or 0)):
+                        readline()
+                    if workdir is not None:
+                        shutil.rmtree(workdir, ignore_errors=True)
+                    workdir = Path(tempfile.mkdtemp(prefix="funz_emulator_"))
+                    reply("Y")
+                elif method == "PUTFILE":
+                    reply("Y")
+                    with open(workdir / Path(args[0]).name, "wb") as f:
+                        remaining = int(args[1])
+                        while remaining:
+                            data = rfile.read(min(remaining, 1024 * 1024))
+                            if not data:
+                                break
+                            f.write(data)
+                            remaining -= len(data)
+                elif method == "EXECUTE":
+                    error = self._execute(workdir)
+                    if error is None:
+                        reply("Y")
+                    else:
+                        reply("N", error)
+                elif method == "ARCHIVE":
+                    reply("Y")
+                elif method == "GETFILE":
+                    with self._archive(workdir) as archive:
+                        reply("Y")
+                        conn.sendall(f"{archive.seek(0, io.SEEK_END)}\n".encode())
+                        readline()  # ACK
+                        archive.seek(0)
+                        conn.sendfile(archive)
+                elif method == "UNRESERVE":
+                    with self._lock:
+                        self.reserved_by = None
+                    reply("Y")
+                elif method == "INTERUPT":
+                    reply("Y")
+                else:
+                    reply("E", f"unknown method {method}")
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                if self.reserved_by == owner:
+                    self.reserved_by = None
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            if workdir is not None:
+                shutil.rmtree(workdir, ignore_errors=True)
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _execute(self, workdir: Path) -> Optional[str]:
+        """Run a case, returning None on success or the failure message"""
+        with self._lock:
+            self.cases += 1
+            fails = self.failure_rate > 0 and self._random.random() < self.failure_rate
+        if self.exec_time:
+            time.sleep(self.exec_time)
+        if fails:
+            error = "emulated failure"
+        elif self.command is None:
+            (workdir / "out.txt").write_text(f"done by {self.name}\n")
+            error = None
+        else:
+            proc = subprocess.run(self.command, shell=True, cwd=workdir)
+            error = f"exit code {proc.returncode}" if proc.returncode != 0 else None
+        if error is not None:
+            with self._lock:
+                self.failures += 1
+            return error
+        if self.archive_size:
+            with open(workdir / PAYLOAD_FILE, "wb") as f:
+                f.truncate(self.archive_size)
+        return None
+
+    def _archive(self, workdir: Optional[Path]):
+        """ZIP archive of the case directory, in a temporary file"""
+        archive = tempfile.TemporaryFile()
+        with zipfile.ZipFile(archive, "w") as zf:
+            if workdir is not None:
+                for path in sorted(workdir.iterdir()):
+                    zf.write(path, path.name)
+        return archive
+
+
+def start_emulators(count: int, udp_port: int, **options) -> List[FunzCalculatorEmulator]:
+    """
+    Start count emulated calculators broadcasting on one UDP port
+
+    Args:
+        count: Number of calculators
+        udp_port: UDP port to broadcast on
+        **options: FunzCalculatorEmulator options (names and seeds are derived
+            from "name" and "seed")
+
+    Returns:
+        The running emulators, to be closed by the caller
+    """
+    seed = options.pop("seed", None)
+    name = options.pop("name", "emulator")
+    return [
+        FunzCalculatorEmulator(udp_port, name=f"{name}{i}",
+                               seed=None if seed is None else seed + i, **options)
+        for i in range(count)
+    ]
+
+
+def _parse_size(value: str) -> int:
+    """'1500', '64K', '10M', '1G' to bytes"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    value = value.strip().upper()
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Emulated Funz calculators on localhost")
+    parser.add_argument("--count", type=int, default=1, help="number of calculators")
+    parser.add_argument("--udp-port", type=int, default=5555, help="UDP port to broadcast on")
+    parser.add_argument("--code", action="append", dest="codes", help="Funz code offered (repeatable)")
+    parser.add_argument("--command", help="shell command run for each case (default: emulated run)")
+    parser.add_argument("--exec-time", type=float, default=0.0, help="seconds per case")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="probability of a case failure")
+    parser.add_argument("--archive-size", type=_parse_size, default=0, help="extra result bytes per case (e.g. 10M)")
+    parser.add_argument("--broadcast-interval", type=float, default=5.0, help="seconds between broadcasts")
+    parser.add_argument("--seed", type=int, help="seed of the failure draws")
+    args = parser.parse_args(argv)
+
+    emulators = start_emulators(
+        args.count, args.udp_port, codes=args.codes or ["bash"], command=args.command,
+        exec_time=args.exec_time, failure_rate=args.failure_rate, archive_size=args.archive_size,
+        broadcast_interval=args.broadcast_interval, seed=args.seed,
+    )
+    print(f"{len(emulators)} Funz calculator(s) broadcasting on UDP port {args.udp_port}. Ctrl-C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for emulator in emulators:
+            emulator.close()
+        cases = sum(e.cases for e in emulators)
+        failures = sum(e.failures for e in emulators)
+        print(f"{cases} case(s) executed, {failures} failed")
+
+
+if __name__ == "__main__":
+    main()
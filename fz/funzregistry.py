@@ -0,0 +1,213 @@
+"""
+Live registry of the Funz calculators broadcasting on UDP ports, for funz:// calculators
+
+Funz calculators announce themselves (TCP port, activity, codes) by UDP
+broadcast every few seconds. Discovering them case by case means binding the
+UDP port and listening up to a full broadcast cycle for every case, with the
+parallel cases competing for the same port. Instead, one background thread per
+UDP port keeps listening for the whole process and records the last broadcast
+of each calculator; cases pick an idle calculator offering their code from this
+registry, and only wait when no such calculator has been heard of yet.
+
+Calculators handed out to a case are marked as claimed until the case releases
+them, so that two cases are not sent to the same idle calculator before its
+next broadcast reports it busy. Calculators silent for longer than the
+registry TTL are dropped.
+"""
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logging import log_debug, log_warning
+from .runners import _parse_funz_broadcast
+
+#: Seconds between two checks of the stop flag by a listener thread
+LISTEN_TICK = 1.0
+
+_Key = Tuple[str, int]
+
+
+class FunzRegistry:
+    """
+    Funz calculators heard on UDP ports, kept up to date by background listeners
+
+    Args:
+        ttl: Seconds after its last broadcast before a calculator is dropped
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._cond = threading.Condition()
+        # UDP port -> {(host, TCP port): server}
+        self._servers: Dict[int, Dict[_Key, Dict[str, Any]]] = {}
+        # (UDP port, host, TCP port) -> number of cases using the calculator
+        self._claims: Dict[Tuple[int, str, int], int] = {}
+        self._last_claimed: Dict[Tuple[int, str, int], float] = {}
+        self._listeners: Dict[int, Tuple[threading.Event, threading.Thread]] = {}
+
+    def listen(self, udp_port: int):
+        """
+        Start the listener of a UDP port, if not already running
+
+        Raises:
+            OSError: if the UDP port cannot be bound
+        """
+        with self._cond:
+            if udp_port in self._listeners:
+                return
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind(("", udp_port))
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(LISTEN_TICK)
+            stop = threading.Event()
+            thread = threading.Thread(target=self._listen, args=(udp_port, sock, stop),
+                                      name=f"fz-funz-udp-{udp_port}", daemon=True)
+            self._listeners[udp_port] = (stop, thread)
+            self._servers.setdefault(udp_port, {})
+        thread.start()
+        log_debug(f"Listening for Funz calculator broadcasts on UDP port {udp_port}")
+
+    def _listen(self, udp_port: int, sock: socket.socket, stop: threading.Event):
+        try:
+            while not stop.is_set():
+                try:
+                    data, addr = sock.recvfrom(4096)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    break
+                parsed = _parse_funz_broadcast(data)
+                if parsed is not None:
+                    self.update(udp_port, {**parsed, "host": addr[0]})
+        finally:
+            sock.close()
+            with self._cond:
+                if self._listeners.get(udp_port, (None,))[0] is stop:
+                    del self._listeners[udp_port]
+
+    def update(self, udp_port: int, server: Dict[str, Any]):
+        """Record the broadcast of a calculator ({"host", "tcp_port", "idle", "codes", ...})"""
+        with self._cond:
+            key = (server["host"], server["tcp_port"])
+            self._servers.setdefault(udp_port, {})[key] = {**server, "last_seen": time.monotonic()}
+            self._cond.notify_all()
+
+    def servers(self, udp_port: int) -> List[Dict[str, Any]]:
+        """Calculators currently known on a UDP port"""
+        with self._cond:
+            self._expire(udp_port)
+            return [dict(server) for server in self._servers.get(udp_port, {}).values()]
+
+    def _expire(self, udp_port: int):
+        """Drop the calculators silent for longer than the TTL (lock held)"""
+        servers = self._servers.get(udp_port, {})
+        limit = time.monotonic() - self.ttl
+        for key in [k for k, s in servers.items() if s["last_seen"] < limit]:
+            log_debug(f"Funz calculator {key[0]}:{key[1]} expired (no broadcast for {self.ttl}s)")
+            del servers[key]
+
+    def _pick(self, udp_port: int, code: str) -> Optional[Dict[str, Any]]:
+        """The idle, unclaimed calculator offering code claimed least recently (lock held)"""
+        candidates = [
+            server for key, server in self._servers.get(udp_port, {}).items()
+            if server["idle"] and code in server["codes"] and not self._claims.get((udp_port, *key))
+        ]
+        if not candidates:
+            return None
+        # Spreads the cases, and a retried case goes to another calculator
+        return min(candidates, key=lambda s: self._last_claimed.get((udp_port, s["host"], s["tcp_port"]), 0.0))
+
+    def acquire(self, udp_port: int, code: str, timeout: float,
+                fallback: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Claim a calculator for a case
+
+        Waits up to timeout for an idle, unclaimed calculator offering code.
+        Failing that, falls back to a busy calculator offering the code, then
+        to any calculator heard on the port (as one-shot discovery did).
+
+        Args:
+            udp_port: UDP port the calculators broadcast on
+            code: Requested Funz code
+            timeout: Seconds to wait for a matching calculator
+            fallback: Whether to fall back to other calculators after timeout
+
+        Returns:
+            The claimed calculator ({"host", "tcp_port", "name", "os",
+            "activity", "idle", "codes", "last_seen"}), to be passed to
+            release() once the case is done, or None if none was heard.
+
+        Raises:
+            OSError: if the UDP port cannot be bound
+        """
+        self.listen(udp_port)
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._expire(udp_port)
+                server = self._pick(udp_port, code)
+                remaining = deadline - time.monotonic()
+                if server is not None or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if server is None:
+                if not fallback:
+                    return None
+                servers = list(self._servers.get(udp_port, {}).values())
+                server = next((s for s in servers if code in s["codes"]), servers[0] if servers else None)
+                if server is None:
+                    return None
+            claim = (udp_port, server["host"], server["tcp_port"])
+            self._claims[claim] = self._claims.get(claim, 0) + 1
+            self._last_claimed[claim] = time.monotonic()
+            return dict(server)
+
+    def release(self, udp_port: int, server: Dict[str, Any]):
+        """Give back a calculator claimed with acquire(), once the case has unreserved it"""
+        with self._cond:
+            claim = (udp_port, server["host"], server["tcp_port"])
+            count = self._claims.get(claim, 0) - 1
+            if count > 0:
+                self._claims[claim] = count
+            else:
+                self._claims.pop(claim, None)
+                # Just unreserved by the case: idle again, without waiting for
+                # the next broadcast to say so
+                known = self._servers.get(udp_port, {}).get((server["host"], server["tcp_port"]))
+                if known is not None:
+                    known["idle"] = True
+            self._cond.notify_all()
+
+    def close(self):
+        """Stop the listeners and forget the known calculators"""
+        with self._cond:
+            listeners = list(self._listeners.values())
+            self._listeners.clear()
+            self._servers.clear()
+            self._claims.clear()
+            self._last_claimed.clear()
+        for stop, _ in listeners:
+            stop.set()
+        for _, thread in listeners:
+            thread.join(2 * LISTEN_TICK)
+            if thread.is_alive():
+                log_warning(f"⚠️  Funz listener {thread.name} did not stop")
+
+
+_registry: Optional[FunzRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_funz_registry() -> FunzRegistry:
+    """The process-wide Funz calculator registry, created on first use from the configuration"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            from .config import get_config
+            _registry = FunzRegistry(ttl=get_config().funz_server_ttl)
+        return _registry
@@ -0,0 +1,646 @@
+"""
+Reserved connections to Funz calculators, for funz:// calculators
+
+A Funz case is a reservation (RESERVE, in two phases) followed by NEWCASE,
+PUTFILE..., EXECUTE, ARCHIVE and GETFILE, and UNRESERVE. For short runs the
+TCP connection and reservation handshakes are a large share of the case. With
+FZ_FUNZ_SESSION_IDLE > 0 a finished case hands its reserved connection back to
+a process-wide pool instead of unreserving, and the next case for the same
+code runs its NEWCASE...GETFILE cycle on it straight away. Pooled sessions are
+unreserved after staying idle that long, and at the end of each fzr run.
+
+With the default FZ_FUNZ_SESSION_IDLE=0, every case reserves and unreserves its
+calculator as before.
+"""
+import getpass
+import io
+import socket
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logging import log_debug, log_error, log_info, log_warning
+
+# Funz protocol constants (per org.funz.Protocol in Java source)
+METHOD_RESERVE = "RESERVE"
+METHOD_UNRESERVE = "UNRESERVE"
+METHOD_PUT_FILE = "PUTFILE"
+METHOD_NEW_CASE = "NEWCASE"
+METHOD_EXECUTE = "EXECUTE"
+METHOD_ARCH_RES = "ARCHIVE"
+METHOD_GET_ARCH = "GETFILE"
+METHOD_INTERRUPT = "INTERUPT"  # Note: typo in original Java code
+
+RET_YES = "Y"
+RET_NO = "N"
+RET_ERROR = "E"
+RET_INFO = "I"
+RET_HEARTBEAT = "H"
+RET_SYNC = "S"
+
+END_OF_REQ = "/"
+
+#: Seconds between two looks at the pool while waiting for a calculator
+CHECKOUT_SLICE = 0.5
+
+#: Bytes read from the socket at once when downloading results
+RECEIVE_BUFFER_SIZE = 1024 * 1024
+
+#: Result archives up to this size are received in memory, larger ones in a temporary file
+ARCHIVE_SPOOL_SIZE = 64 * 1024 * 1024
+
+
+class FunzError(Exception):
+    """
+    A failed step of the Funz protocol
+
+    Attributes:
+        status: Case status to report ("error", "timeout" or "failed")
+        broken: Whether the session can no longer be used
+        started: Whether the case was already sent for execution
+    """
+
+    def __init__(self, message: str, status: str = "error", broken: bool = True, started: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.broken = broken
+        self.started = started
+
+
+class FunzSession:
+    """
+    A TCP connection to a Funz calculator, holding a reservation once opened
+
+    Args:
+        host: Host to connect to
+        server: Calculator picked from the registry ({"tcp_port", "name", ...})
+        udp_port: UDP port the calculator broadcasts on
+        code: Funz code to reserve the calculator for
+    """
+
+    def __init__(self, host: str, server: Dict[str, Any], udp_port: int, code: str):
+        self.host = host
+        self.server = server
+        self.tcp_port = server["tcp_port"]
+        self.udp_port = udp_port
+        self.code = code
+        self.secret_code: Optional[str] = None
+        self.cases = 0
+        self.last_used = time.monotonic()
+        self.sock: Optional[socket.socket] = None
+        self.sock_file = None
+        self.timeout: float = 600
+
+    @property
+    def key(self) -> Tuple[str, int, str]:
+        return (self.host, self.udp_port, self.code)
+
+    @property
+    def is_open(self) -> bool:
+        return self.sock_file is not None
+
+    def open(self, timeout: float):
+        """
+        Connect and reserve the calculator
+
+        Raises:
+            FunzError: if the reservation failed
+            OSError: if the connection failed
+        """
+        self.timeout = timeout
+        log_debug(f"Creating TCP socket connection to {self.host}:{self.tcp_port}")
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        connection_timeout = min(timeout, 30)
+        self.sock.settimeout(connection_timeout)
+        log_debug(f"Socket timeout set to {connection_timeout}s")
+        log_debug(f"Attempting TCP connection to {self.host}:{self.tcp_port}...")
+        self.sock.connect((self.host, self.tcp_port))
+        log_info(f"✅ Connected to Funz server at {self.host}:{self.tcp_port}")
+        log_debug(f"Socket state: connected, local={self.sock.getsockname()}, remote={self.sock.getpeername()}")
+
+        # Create buffered reader/writer
+        self.sock_file = self.sock.makefile('rw', buffering=1, encoding='utf-8', newline='\n')
+        log_debug("Socket file created with UTF-8 encoding and line buffering")
+
+        # Reserve calculator (two-phase protocol)
+        log_info("🔒 Reserving calculator...")
+
+        # Phase 1: Send RESERVE command
+        log_debug(f"Sending {METHOD_RESERVE} request (phase 1)")
+        self.send_message(METHOD_RESERVE)
+        ret, response = self.read_response()
+
+        # Check for errors/timeout
+        if ret == "TIMEOUT":
+            log_error(f"❌ Reservation timed out")
+            raise FunzError("Calculator reservation timed out", "timeout")
+        elif ret == "ERROR":
+            log_error(f"❌ Error during reservation")
+            raise FunzError("Error during calculator reservation")
+        elif ret != RET_YES:
+            error_msg = response[1] if len(response) > 1 else "Unknown error"
+            log_error(f"❌ Calculator reservation failed: {error_msg}")
+            log_debug(f"Full response: {response}")
+            raise FunzError(f"Failed to reserve calculator: {error_msg}")
+
+        log_debug(f"✅ Phase 1 complete")
+
+        # Phase 2: Send project code and tagged values
+        tagged_values = {
+            "USERNAME": getpass.getuser()
+        }
+
+        log_debug(f"Sending project code '{self.code}' and tagged values (phase 2)")
+        # Send code
+        self.sock_file.write(self.code + '\n')
+        # Send number of tagged values
+        self.sock_file.write(str(len(tagged_values)) + '\n')
+        # Send each tagged value
+        for key, value in tagged_values.items():
+            self.sock_file.write(key + '\n')
+            self.sock_file.write(str(value) + '\n')
+        self.sock_file.flush()
+
+        # Read phase 2 response
+        ret, response = self.read_response()
+
+        if ret == "TIMEOUT":
+            log_error(f"❌ Reservation phase 2 timed out")
+            raise FunzError("Calculator reservation phase 2 timed out", "timeout")
+        elif ret != RET_YES:
+            error_msg = response[1] if len(response) > 1 else "Unknown error"
+            log_error(f"❌ Calculator reservation phase 2 failed: {error_msg}")
+            raise FunzError(f"Failed to reserve calculator (phase 2): {error_msg}")
+
+        # Get secret code from response (for authentication)
+        # Response contains: [RET_YES, secret, ip, security]
+        self.secret_code = response[1] if len(response) > 1 else None
+        log_info(f"✅ Calculator reserved successfully")
+        log_debug(f"Secret code: {self.secret_code}")
+
+    def send_message(self, *lines):
+        """Send a protocol message"""
+        log_debug(f"→ Sending message: {lines}")
+        for line in lines:
+            self.sock_file.write(str(line) + '\n')
+        self.sock_file.write(END_OF_REQ + '\n')
+        self.sock_file.flush()
+        log_debug(f"→ Message sent and flushed")
+
+    def read_response(self) -> Tuple[Optional[str], List[str]]:
+        """Read a protocol response until END_OF_REQ
+
+        Returns:
+            Tuple of (status, response_lines) where:
+            - status is the first line (RET_YES, RET_NO, RET_ERROR, etc.), "TIMEOUT",
+              "ERROR", or None if the connection was closed
+            - response_lines is the full response including status line
+        """
+        response = []
+        line_count = 0
+
+        # Set socket timeout for reading
+        original_timeout = self.sock.gettimeout()
+        self.sock.settimeout(self.timeout)
+
+        try:
+            while True:
+                try:
+                    line = self.sock_file.readline().strip()
+                except socket.timeout:
+                    log_error(f"❌ Timeout waiting for response after {self.timeout}s")
+                    return "TIMEOUT", []
+
+                line_count += 1
+                log_debug(f"← Received line {line_count}: '{line}'")
+
+                if not line:
+                    # Connection closed
+                    log_warning(f"⚠️  Connection closed by server (empty line received)")
+                    return None, []
+
+                if line == END_OF_REQ:
+                    log_debug(f"← End of response marker received (total {line_count} lines)")
+                    break
+
+                # Handle special responses
+                if line == RET_HEARTBEAT:
+                    log_debug("← Heartbeat received, ignoring")
+                    continue  # Ignore heartbeats
+
+                if line == RET_INFO:
+                    # Info message - read next line
+                    info_line = self.sock_file.readline().strip()
+                    log_info(f"ℹ️  Funz info: {info_line}")
+                    continue
+
+                response.append(line)
+
+            if not response:
+                log_debug("← Empty response received")
+                return None, []
+
+            log_debug(f"← Response parsed: status={response[0]}, lines={len(response)}")
+            return response[0], response
+
+        except Exception as e:
+            log_error(f"❌ Error reading response: {e}")
+            return "ERROR", []
+        finally:
+            self.sock.settimeout(original_timeout)
+
+    def run_case(self, working_dir: Path, timeout: float) -> float:
+        """
+        Run a case on the reserved calculator: NEWCASE, PUTFILE..., EXECUTE,
+        ARCHIVE and GETFILE, the results being extracted in working_dir
+
+        Args:
+            working_dir: Case directory (its files are uploaded)
+            timeout: Seconds to wait for each response
+
+        Returns:
+            Execution time in seconds
+
+        Raises:
+            FunzError: if a step failed
+            KeyboardInterrupt: if interrupted during the execution
+        """
+        from .core import is_interrupted
+
+        self.timeout = timeout
+        self.cases += 1
+
+        # Step 1: Create new case (MUST come before uploading files!)
+        # The Funz protocol requires NEW_CASE before PUT_FILE
+        log_info("📝 Step 1: Creating new case...")
+
+        # Prepare variables (must include USERNAME)
+        variables = {
+            "USERNAME": getpass.getuser()
+        }
+
+        log_debug(f"Sending {METHOD_NEW_CASE} request with variables: {variables}")
+        try:
+            self.send_message(METHOD_NEW_CASE)
+
+            # Send variable count
+            self.sock_file.write(str(len(variables)) + '\n')
+
+            # Send each variable
+            for key, value in variables.items():
+                # Truncate multi-line values to first line
+                value_str = str(value).split('\n')[0]
+                if '\n' in str(value):
+                    value_str += "..."
+
+                self.sock_file.write(key + '\n')
+                self.sock_file.write(value_str + '\n')
+
+            self.sock_file.flush()
+        except OSError as e:
+            # e.g. a kept session closed by the calculator meanwhile
+            raise FunzError(f"Connection lost: {e}")
+
+        # Read response
+        ret, case_response = self.read_response()
+
+        if ret == "TIMEOUT":
+            log_error(f"❌ New case creation timed out")
+            raise FunzError("New case creation timed out", "timeout")
+        elif ret != RET_YES:
+            error_msg = case_response[1] if len(case_response) > 1 else "Unknown error"
+            log_error(f"❌ Failed to create new case: {error_msg}")
+            raise FunzError(f"Failed to create new case: {error_msg}")
+
+        log_info(f"✅ Case created successfully")
+
+        # Step 2: Upload input files (after NEW_CASE)
+        log_info("📤 Step 2: Uploading input files...")
+        files_to_upload = [item for item in working_dir.iterdir() if item.is_file()]
+        log_debug(f"Found {len(files_to_upload)} files to upload")
+
+        uploaded_count = 0
+        for item in files_to_upload:
+            # Send PUT_FILE request
+            file_size = item.stat().st_size
+            relative_path = item.name
+
+            log_info(f"  📄 Uploading {relative_path} ({file_size} bytes)")
+            log_debug(f"Sending {METHOD_PUT_FILE} request for {relative_path}")
+            self.send_message(METHOD_PUT_FILE, relative_path, file_size)
+
+            # Wait for acknowledgment
+            ret, ack_response = self.read_response()
+            if ret != RET_YES:
+                log_warning(f"❌ Failed to upload {relative_path}: {ack_response}")
+                continue
+
+            log_debug(f"Server ready to receive {relative_path}")
+
+            # Send file content, copied by the kernel from the file to the socket
+            with open(item, 'rb') as f:
+                bytes_sent = self.sock.sendfile(f)
+                log_debug(f"Sent {bytes_sent} bytes of file data")
+
+            uploaded_count += 1
+            log_debug(f"✅ Successfully uploaded {relative_path}")
+
+        log_info(f"✅ Uploaded {uploaded_count}/{len(files_to_upload)} files")
+
+        # Step 3: Execute calculation
+        log_info(f"⚙️  Step 3: Executing calculation...")
+        log_info(f"  Code: {self.code}")
+        log_debug(f"Sending {METHOD_EXECUTE} request")
+        self.send_message(METHOD_EXECUTE, self.code)
+
+        # Read execution response (may include INFO messages)
+        execution_start = datetime.now()
+        log_debug(f"Execution started at {execution_start.isoformat()}")
+        ret, response = self.read_response()
+
+        # Check for interrupt during execution
+        if is_interrupted():
+            log_warning("⚠️  Interrupt detected, sending interrupt to Funz server...")
+            self.send_message(METHOD_INTERRUPT, self.secret_code if self.secret_code else "")
+            raise KeyboardInterrupt("Execution interrupted by user")
+
+        if ret == "TIMEOUT":
+            log_error(f"❌ Execution timed out after {timeout}s")
+            raise FunzError(f"Execution timed out after {timeout}s", "timeout", started=True)
+        elif ret == "ERROR":
+            log_error(f"❌ Error during execution")
+            raise FunzError("Error during execution", started=True)
+        elif ret != RET_YES:
+            error_msg = response[1] if len(response) > 1 else "Execution failed"
+            log_error(f"❌ Execution failed: {error_msg}")
+            log_debug(f"Full response: {response}")
+            # The calculator answered: its reservation still holds
+            raise FunzError(error_msg, "failed", broken=ret is None, started=True)
+
+        execution_end = datetime.now()
+        execution_time = (execution_end - execution_start).total_seconds()
+
+        log_info(f"✅ Execution completed in {execution_time:.2f}s")
+        log_debug(f"Execution ended at {execution_end.isoformat()}")
+
+        # Step 4: Archive results (required before GET_ARCH)
+        log_info("📦 Step 4: Archiving results...")
+        log_debug(f"Sending {METHOD_ARCH_RES} request")
+        self.send_message(METHOD_ARCH_RES)
+        ret, arch_response = self.read_response()
+
+        if ret != RET_YES:
+            log_error(f"❌ Failed to archive results: {arch_response}")
+            raise FunzError("Failed to archive results", started=True)
+
+        log_info(f"✅ Results archived successfully")
+
+        # Step 5: Download results archive
+        log_info("📥 Step 5: Downloading results...")
+        log_debug(f"Sending {METHOD_GET_ARCH} request")
+        self.send_message(METHOD_GET_ARCH)
+
+        # Read response (should be Y\n/\n, possibly with INFO messages)
+        ret, response = self.read_response()
+
+        if ret == "TIMEOUT":
+            log_error(f"❌ Archive download timed out")
+            raise FunzError("Archive download timed out", "timeout", started=True)
+        elif ret != RET_YES:
+            error_msg = response[1] if len(response) > 1 else "Unknown error"
+            log_error(f"❌ Failed to get results archive: {error_msg}")
+            raise FunzError(f"Failed to get results archive: {error_msg}", started=True)
+
+        # Read lines until we find one that's all digits (the size)
+        # Skip any additional protocol responses (Y, /, INFO lines, etc.)
+        # This is necessary because transferArchive sends multiple Y\n/\n responses
+        max_lines = 50
+        archive_size = None
+
+        try:
+            for i in range(max_lines):
+                line = self.sock_file.readline().strip()
+                log_debug(f"Reading size line {i}: '{line}'")
+
+                if not line:
+                    log_error(f"❌ Connection closed while reading archive size")
+                    raise FunzError("Connection closed while reading archive size", started=True)
+
+                if line.isdigit():
+                    archive_size = int(line)
+                    log_info(f"  Archive size: {archive_size} bytes ({archive_size/1024:.2f} KB)")
+                    break
+        except socket.timeout:
+            log_error(f"❌ Timeout while reading archive size")
+            raise FunzError("Timeout while reading archive size", "timeout", started=True)
+
+        if archive_size is None:
+            log_error(f"❌ Could not find archive size in {max_lines} lines")
+            raise FunzError("Could not determine archive size", started=True)
+
+        # Send acknowledgment (just a line, per Java: _reader.readLine())
+        log_debug(f"Sending ACK for archive transfer")
+        self.sock_file.write("ACK\n")
+        self.sock_file.flush()
+
+        # Receive archive data into memory when small, a temporary file otherwise
+        in_memory = archive_size <= ARCHIVE_SPOOL_SIZE
+        with (io.BytesIO() if in_memory else tempfile.TemporaryFile()) as archive:
+            bytes_received = self._receive(archive, archive_size)
+            log_info(f"✅ Downloaded {bytes_received} bytes")
+
+            # Extract archive to working directory, member by member
+            if bytes_received:
+                log_debug(f"Extracting ZIP archive ({bytes_received} bytes)")
+                archive.seek(0)
+                try:
+                    with zipfile.ZipFile(archive) as zf:
+                        file_list = zf.namelist()
+                        log_debug(f"Archive contains {len(file_list)} files: {file_list}")
+                        zf.extractall(working_dir)
+                        log_info(f"✅ Extracted {len(file_list)} files to {working_dir}")
+                except Exception as e:
+                    log_error(f"❌ Failed to extract archive: {e}")
+                    archive.seek(0)
+                    log_debug(f"Archive data (first 100 bytes): {archive.read(100)}")
+            else:
+                log_warning("⚠️  No archive data received")
+
+        self.last_used = time.monotonic()
+        return execution_time
+
+    def _receive(self, out, size: int) -> int:
+        """Copy size bytes from the socket to the file out, through one reused buffer"""
+        buffer = bytearray(RECEIVE_BUFFER_SIZE)
+        view = memoryview(buffer)
+        bytes_received = 0
+        next_report = ARCHIVE_SPOOL_SIZE
+        while bytes_received < size:
+            n = self.sock.recv_into(view, min(len(buffer), size - bytes_received))
+            if not n:
+                log_warning(f"⚠️  Connection closed before all data received ({bytes_received}/{size} bytes)")
+                break
+            out.write(view[:n])
+            bytes_received += n
+            if bytes_received >= next_report or bytes_received >= size:
+                log_debug(f"Download progress: {bytes_received}/{size} bytes "
+                          f"({bytes_received / size * 100:.1f}%)")
+                next_report += ARCHIVE_SPOOL_SIZE
+        return bytes_received
+
+    def close(self):
+        """Unreserve the calculator, close the connection and release it in the registry"""
+        if self.sock_file is not None:
+            log_info("Unreserving calculator...")
+            try:
+                self.send_message(METHOD_UNRESERVE, self.secret_code if self.secret_code else "")
+                self.read_response()  # Ignore response
+            except Exception as e:
+                log_warning(f"Failed to unreserve: {e}")
+
+            try:
+                self.sock_file.close()
+            except Exception:
+                pass
+            self.sock_file = None
+
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except Exception:
+                pass
+            self.sock = None
+
+        from .funzregistry import get_funz_registry
+        get_funz_registry().release(self.udp_port, self.server)
+
+
+class FunzSessionPool:
+    """
+    Reserved Funz sessions waiting for their next case, by (host, UDP port, code)
+
+    Args:
+        idle_timeout: Seconds after which an unused session is unreserved;
+            0 to unreserve every session after its case
+    """
+
+    def __init__(self, idle_timeout: float = 0.0):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, int, str], List[FunzSession]] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def checkout(self, host: str, udp_port: int, code: str, timeout: float) -> Optional[FunzSession]:
+        """
+        Session for a case: a pooled one, or a new (unopened) one on a
+        calculator claimed from the registry
+
+        Args:
+            host: Host to connect to
+            udp_port: UDP port the calculators broadcast on
+            code: Funz code
+            timeout: Seconds to wait for a calculator
+
+        Returns:
+            FunzSession (opened if pooled), or None if no calculator was found
+
+        Raises:
+            OSError: if the UDP port cannot be bound
+        """
+        from .funzregistry import get_funz_registry
+        registry = get_funz_registry()
+        deadline = time.monotonic() + timeout
+        while True:
+            session = self.take(host, udp_port, code)
+            if session is not None:
+                log_debug(f"Reusing Funz session to {host}:{session.tcp_port} ({session.cases} cases)")
+                return session
+            remaining = max(0.0, deadline - time.monotonic())
+            # While all calculators are claimed, look again at the pool now and
+            # then: a running case may hand its session back
+            wait = remaining if self.idle_timeout <= 0 else min(remaining, CHECKOUT_SLICE)
+            last = wait >= remaining
+            server = registry.acquire(udp_port, code, timeout=wait, fallback=last)
+            if server is not None:
+                return FunzSession(host, server, udp_port, code)
+            if last:
+                return None
+
+    def take(self, host: str, udp_port: int, code: str) -> Optional[FunzSession]:
+        """A pooled session for the calculators of (host, udp_port, code), if any"""
+        with self._lock:
+            sessions = self._idle.get((host, udp_port, code))
+            return sessions.pop() if sessions else None
+
+    def give_back(self, session: FunzSession):
+        """Keep a session for the next case, or close it if sessions are not kept"""
+        if self.idle_timeout <= 0:
+            session.close()
+            return
+        session.last_used = time.monotonic()
+        with self._lock:
+            self._idle.setdefault(session.key, []).append(session)
+            if self._reaper is None or not self._reaper.is_alive():
+                self._stop.clear()
+                self._reaper = threading.Thread(target=self._reap, name="fz-funz-sessions", daemon=True)
+                self._reaper.start()
+
+    def idle_count(self) -> int:
+        """Number of pooled sessions"""
+        with self._lock:
+            return sum(len(sessions) for sessions in self._idle.values())
+
+    def expire_idle(self):
+        """Close the sessions unused for idle_timeout seconds"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for sessions in self._idle.values():
+                for session in list(sessions):
+                    if now - session.last_used >= self.idle_timeout:
+                        sessions.remove(session)
+                        expired.append(session)
+        for session in expired:
+            log_debug(f"Closing idle Funz session to {session.host}:{session.tcp_port} "
+                      f"({session.cases} cases)")
+            session.close()
+
+    def _reap(self):
+        while not self._stop.wait(max(0.1, min(self.idle_timeout / 2, 30.0))):
+            self.expire_idle()
+
+    def close_all(self):
+        """Unreserve every pooled session"""
+        self._stop.set()
+        with self._lock:
+            sessions = [s for ss in self._idle.values() for s in ss]
+            self._idle.clear()
+        for session in sessions:
+            session.close()
+
+
+_sessions: Optional[FunzSessionPool] = None
+_sessions_lock = threading.Lock()
+
+
+def get_funz_sessions() -> FunzSessionPool:
+    """The process-wide Funz session pool, created on first use from the configuration"""
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None:
+            from .config import get_config
+            _sessions = FunzSessionPool(idle_timeout=get_config().funz_session_idle)
+        return _sessions
+
+
+def close_funz_sessions():
+    """Unreserve the pooled Funz sessions (end of a run), if any"""
+    with _sessions_lock:
+        sessions = _sessions
+    if sessions is not None:
+        sessions.close_all()
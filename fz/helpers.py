@@ -4,12 +4,14 @@ Helper functions for fz package - internal utilities for core operations
 import os
 import platform
 import shutil
+import stat
 import threading
 import time
 import uuid
 import itertools
+import fnmatch
 from pathlib import Path
-from typing import Dict, List, Tuple, Union, Any, Optional
+from typing import Dict, Iterable, List, Set, Tuple, Union, Any, Optional
 from contextlib import contextmanager
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -258,6 +260,13 @@ def _cleanup_fzr_resources():
             log_warning(f"⚠️ Error during calculator cleanup: {e}")
         _calculator_manager = None
 
+    # Unreserve the Funz calculators kept for further cases
+    try:
+        from .funzsession import close_funz_sessions
+        close_funz_sessions()
+    except Exception as e:
+        log_warning(f"⚠️ Error while releasing Funz sessions: {e}")
+
 
 def _validate_model(model: Dict) -> None:
     """
@@ -604,7 +613,7 @@ def try_calculators_with_retry(non_cache_calculator_ids: List[str], case_index:
                     history.append(f"Calculation completed (status: done)")
                 used_calculator = calc_result.get("calculator_uri", selected_calculator_uri)
                 elapsed = time.time() - start_time
-                calc_type = "LOCAL" if used_calculator.startswith("sh://") else "REMOTE" if used_calculator.startswith("ssh://") else "CALCULATOR"
+                calc_type = "LOCAL" if used_calculator.startswith(("sh://", "pool://", "py://")) else "REMOTE" if used_calculator.startswith("ssh://") else "CALCULATOR"
                 success_label = f"✓ [Thread {thread_id}] Case {case_index}: {calc_type} ({used_calculator}) ({elapsed:.2f}s)"
                 if total_attempts > 1:
                     success_label += f" [RETRY SUCCESS after {total_attempts - 1} failed attempts]"
@@ -763,6 +772,8 @@ def run_single_case(case_info: Dict) -> Dict[str, Any]:
     has_input_variables = case_info.get("has_input_variables", True)  # Directory structure flag
     callbacks = case_info.get("callbacks")  # Optional callbacks for progress monitoring
     timeout = case_info.get("timeout")  # Optional timeout for calculations
+    # Arrow columns are assembled by fzr from per-case numpy arrays
+    vector_format = "list" if case_info.get("vector_format", "list") == "list" else "numpy"
 
     # Get thread ID for debugging
     thread_id = threading.get_ident()
@@ -1018,7 +1029,8 @@ def run_single_case(case_info: Dict) -> Dict[str, Any]:
                                 # Recursively copy output subdirectories back (e.g. an
                                 # OpenFOAM case's time dirs and postProcessing/), so output
                                 # parsers run against the full case, not just top-level files.
-                                shutil.copytree(item, dest_file, dirs_exist_ok=True)
+                                shutil.copytree(item, dest_file, dirs_exist_ok=True,
+                                                copy_function=_copy_unless_same)
                                 files_copied += 1
                                 log_debug(f"📁 [Thread {thread_id}] {case_name}: Copied dir {item.name}: {item} → {dest_file}")
                             elif item.is_file():
@@ -1029,7 +1041,7 @@ def run_single_case(case_info: Dict) -> Dict[str, Any]:
                                     break
 
                                 # Copy the file to the existing result directory
-                                shutil.copy2(item, dest_file)
+                                _copy_unless_same(item, dest_file)
                                 files_copied += 1
                                 log_debug(f"📁 [Thread {thread_id}] {case_name}: Copied {item.name}: {item} → {dest_file}")
 
@@ -1069,7 +1081,7 @@ def run_single_case(case_info: Dict) -> Dict[str, Any]:
                 files_in_result_dir = [f.name for f in result_dir.iterdir() if f.is_file()]
                 log_debug(f"🔍 [Thread {thread_id}] {case_name}: Files in result_dir: {files_in_result_dir}")
 
-            result_output = fzo(result_dir, model)
+            result_output = fzo(result_dir, model, vector_format=vector_format)
             log_debug(f"🔄 [Thread {thread_id}] {case_name}: Parsed output: {list(result_output.keys())}")
 
             # Extract all columns from fzo result (includes flattened dict columns)
@@ -1279,11 +1291,62 @@ def run_single_case(case_info: Dict) -> Dict[str, Any]:
 
 
 
+def _expand_array_calculators(calculators: List[str], n_cases: int) -> List[str]:
+    """
+    Repeat the local slurm:// calculators of the job-array and allocation modes
+    (FZ_SLURM_MODE=array or alloc)
+
+    A calculator runs one case at a time; in these modes a local slurm://
+    calculator only queues its case for SLURM, so it is repeated to keep up
+    to FZ_SLURM_ARRAY_SIZE cases in flight.
+    """
+    config = get_config()
+    if config.slurm_mode not in ("array", "alloc"):
+        return calculators
+    from .runners import parse_slurm_uri
+
+    expanded = []
+    for uri in calculators:
+        try:
+            is_local_slurm = uri.startswith("slurm://") and parse_slurm_uri(uri)[0] is None
+        except ValueError:
+            is_local_slurm = False
+        copies = max(1, min(n_cases, config.slurm_array_size)) if is_local_slurm else 1
+        expanded.extend([uri] * copies)
+    return expanded
+
+
+def _expand_pool_calculators(calculators: List[str], n_cases: int) -> List[str]:
+    """
+    Repeat each pool://N/command calculator N times, and each py:// calculator
+    FZ_PY_PROCESSES times when it runs on worker processes (at most once per case)
+
+    A calculator runs one case at a time, so the N workers of a pool are only
+    kept busy by N copies of its URI.
+    """
+    from .runners import parse_pool_uri
+
+    py_processes = get_config().py_processes
+    expanded = []
+    for uri in calculators:
+        try:
+            if uri.startswith("pool://"):
+                copies = min(n_cases, parse_pool_uri(uri)[0])
+            elif uri.startswith("py://") and py_processes > 0:
+                copies = min(n_cases, py_processes)
+            else:
+                copies = 1
+        except ValueError:
+            copies = 1
+        expanded.extend([uri] * max(1, copies))
+    return expanded
+
+
 def run_cases_parallel(var_combinations: List[Dict], temp_path: Path, resultsdir: Path,
                       calculators: List[str], model: Dict, original_input_was_dir: bool,
                       var_names: List[str], output_keys: List[str], original_cwd: str = None,
                       has_input_variables: bool = True, callbacks: Optional[Dict[str, callable]] = None,
-                      timeout: int = None) -> List[Dict[str, Any]]:
+                      timeout: int = None, vector_format: str = "list") -> List[Dict[str, Any]]:
     """
     Run multiple cases in parallel across available calculators
 
@@ -1299,6 +1362,7 @@ def run_cases_parallel(var_combinations: List[Dict], temp_path: Path, resultsdir
         has_input_variables: Whether input_variables dict is non-empty
         callbacks: Optional dict of callback functions for progress monitoring
         timeout: Timeout in seconds for each calculation (None uses FZ_RUN_TIMEOUT from config, default 600)
+        vector_format: Storage of numeric vector outputs ("list", "numpy" or "arrow")
 
     Returns:
         List of case results in the same order as var_combinations
@@ -1308,6 +1372,9 @@ def run_cases_parallel(var_combinations: List[Dict], temp_path: Path, resultsdir
     if not var_combinations:
         return []
 
+    calculators = _expand_array_calculators(calculators, len(var_combinations))
+    calculators = _expand_pool_calculators(calculators, len(var_combinations))
+
     # Get calculator manager instance
     calc_mgr = get_calculator_manager()
 
@@ -1345,7 +1412,8 @@ def run_cases_parallel(var_combinations: List[Dict], temp_path: Path, resultsdir
             "spinner": spinner,  # Add spinner instance
             "has_input_variables": has_input_variables,  # Add flag for directory structure
             "callbacks": callbacks,  # Add callbacks for progress monitoring
-            "timeout": timeout  # Add timeout for calculations
+            "timeout": timeout,  # Add timeout for calculations
+            "vector_format": vector_format  # Storage of vector outputs
         }
         case_infos.append(case_info)
         case_name = ",".join(f"{k}={v}" for k, v in var_combo.items()) if len(var_combinations) > 1 else "single case"
@@ -1539,9 +1607,321 @@ def run_cases_parallel(var_combinations: List[Dict], temp_path: Path, resultsdir
 
 
 
+class AsyncCaseRunner:
+    """
+    Run cases as they are submitted, each on the next calculator to free up
+
+    run_cases_parallel() runs a batch of cases known beforehand; the
+    asynchronous fzd submits cases while others are running instead, and
+    handles each result as soon as its case finishes. Cases are compiled to
+    their result directory when submitted, then run by run_single_case() like
+    fzr cases.
+
+    Args:
+        input_path: Input file or directory (absolute)
+        model: Model definition dict
+        calculators: Resolved calculator URIs
+        resultsdir: Results directory of the cases
+        original_cwd: Directory fzd was called from
+        timeout: Timeout in seconds of each case (None uses FZ_RUN_TIMEOUT)
+        vector_format: Storage of numeric vector outputs
+
+    Attributes:
+        capacity: Number of cases run at the same time (the non-cache calculators)
+    """
+
+    def __init__(self, input_path: Path, model: Dict, calculators: List[str], resultsdir: Path,
+                 original_cwd: str, timeout: int = None, vector_format: str = "list"):
+        self.input_path = Path(input_path)
+        self.model = model
+        self.resultsdir = Path(resultsdir)
+        self.original_cwd = original_cwd
+        self.timeout = timeout
+        self.vector_format = vector_format
+        # Calculators repeated as for a batch as large as any number of cases
+        unbounded = 1 << 30
+        self.calculators = _expand_pool_calculators(_expand_array_calculators(calculators, unbounded), unbounded)
+        non_cache_calculators = [calc for calc in self.calculators if not calc.startswith("cache://")]
+        self.capacity = max(1, len(non_cache_calculators))
+        if get_config().max_workers is not None:
+            self.capacity = max(1, min(self.capacity, get_config().max_workers))
+        self._cases: List[Dict] = []
+        self._temp_dir = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self):
+        calc_mgr = get_calculator_manager()
+        self._calculator_ids = calc_mgr.register_calculator_instances(self.calculators)
+        self._id_to_uri_map = {calc_id: calc_mgr.get_original_uri(calc_id) for calc_id in self._calculator_ids}
+        self._temp_dir = fz_temporary_directory(self.original_cwd)
+        self._temp_path = Path(self._temp_dir.__enter__())
+        self._executor = ThreadPoolExecutor(max_workers=self.capacity)
+        log_info(f"🚀 Asynchronous execution on {self.capacity} calculator(s): {self.calculators}")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._executor.shutdown(wait=True)
+            # Let the worker threads finish copying their files (see fzr)
+            time.sleep(0.1)
+            _cleanup_fzr_resources()
+        finally:
+            self._temp_dir.__exit__(*exc)
+
+    def submit(self, var_combo: Dict):
+        """
+        Compile a case and queue it for the next free calculator
+
+        Args:
+            var_combo: Variable values of the case
+
+        Returns:
+            concurrent.futures.Future of the case result dict (as in fzr)
+        """
+        case_index = len(self._cases)
+        self._cases.append(var_combo)
+        compile_to_result_directories(self.input_path, self.model, var_combo, [var_combo], self.resultsdir, jobs=1)
+        prepare_temp_directories([var_combo], self._temp_path, self.resultsdir)
+        case_info = {
+            "var_combo": var_combo,
+            "case_index": case_index,
+            "temp_path": self._temp_path,
+            "resultsdir": self.resultsdir,
+            "calculators": self.calculators,
+            "calculator_ids": self._calculator_ids,
+            "id_to_uri_map": self._id_to_uri_map,
+            "model": self.model,
+            "original_input_was_dir": self.input_path.is_dir(),
+            "output_keys": list(self.model.get("output", {}).keys()),
+            # Cases submitted so far
+            "total_cases": self._cases,
+            "original_cwd": self.original_cwd,
+            "spinner": None,
+            "has_input_variables": True,
+            "callbacks": None,
+            "timeout": self.timeout,
+            "vector_format": self.vector_format,
+        }
+        return self._executor.submit(run_single_case, case_info)
+
+
+#: Input files larger than this (bytes) are compiled in chunks, not in one string
+_STREAM_COMPILE_THRESHOLD = 64 * 1024 * 1024
+
+#: Number of characters read at once when compiling a file in chunks
+_STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+
+#: Delimited variables and formulas opened in the last characters of a chunk
+#: (up to this many) are carried over to the next chunk to be compiled whole
+_STREAM_CARRY_SIZE = 64 * 1024
+
+
+def _is_template_file(path: Path, markers: Tuple[str, ...]) -> bool:
+    """
+    Check whether a file may need compiling: a text file containing a marker
+
+    Binary files (a NUL byte in the first block) and files whose raw bytes
+    contain none of the markers are not. The file is read block by block,
+    without decoding, and only until the first marker is found.
+    """
+    encoded = [marker.encode('utf-8') for marker in markers if marker]
+    if not encoded:
+        return False
+    overlap = max(len(marker) for marker in encoded) - 1
+    tail = b""
+    with open(path, 'rb') as f:
+        block = f.read(_STREAM_CHUNK_SIZE)
+        if b"\0" in block:
+            return False
+        while block:
+            data = tail + block
+            if any(marker in data for marker in encoded):
+                return True
+            tail = data[len(data) - overlap:] if overlap else b""
+            block = f.read(_STREAM_CHUNK_SIZE)
+    return False
+
+
+def _stream_context_lines(path: Path, commentline: str, formulaprefix: str) -> List[str]:
+    """Formula context lines of a file, read in chunks of whole lines"""
+    from .interpreter import _formula_context_lines
+
+    marker = commentline + formulaprefix
+    context_lines = []
+    rest = ""
+    with open(path, 'r') as f:
+        while True:
+            chunk = f.read(_STREAM_CHUNK_SIZE)
+            text = rest + chunk
+            cut = text.rfind("\n") + 1 if chunk else len(text)
+            lines, rest = text[:cut], text[cut:]
+            if marker in lines:
+                context_lines.extend(_formula_context_lines(lines.rstrip("\n"), commentline, formulaprefix))
+            if not chunk:
+                return context_lines
+
+
+def _stream_cut(text: str, openers: List[Tuple[str, str]]) -> int:
+    """
+    Length of the head of text that can be compiled on its own
+
+    The head ends at the last line break (or, in a file without line breaks,
+    the last blank), moved back before any delimited variable or formula
+    opened in the last _STREAM_CARRY_SIZE characters and not closed there, so
+    that no marker is split between two chunks.
+    """
+    cut = text.rfind("\n") + 1
+    if cut == 0:
+        cut = max(text.rfind(" "), text.rfind("\t")) + 1 or len(text)
+    lower = max(0, cut - _STREAM_CARRY_SIZE)
+    moved = True
+    while moved:
+        moved = False
+        for opener, closer in openers:
+            start = text.rfind(opener, lower, cut)
+            if start >= 0 and text.find(closer, start + len(opener), cut) < 0:
+                cut = start
+                moved = True
+    return cut
+
+
+def _compile_file_streamed(src_path: Path, dst_path: Path, model: Dict, var_combo: Dict,
+                           interpreter: str, varprefix: str, delim: str,
+                           context_lines: List[str], context_cache: Dict) -> None:
+    """
+    Compile a large input file chunk by chunk
+
+    Same output as compiling the whole content at once, with a memory use
+    bounded by a few chunks: each chunk ends on a line break, and markers
+    open at its end are carried over to the next one. Formulas are evaluated
+    with the context lines of the whole file.
+
+    Raises:
+        UnicodeDecodeError: If the file is not a text file
+    """
+    from .interpreter import replace_variables_in_content, evaluate_formulas, _get_formula_prefix
+
+    formulaprefix = _get_formula_prefix(model)
+    formula_delim = model.get("formula_delim", model.get("delim", "{}"))
+    openers = []
+    if len(delim) == 2:
+        openers.append((varprefix + delim[0], delim[1]))
+    if len(formula_delim) == 2:
+        openers.append((formulaprefix + formula_delim[0], formula_delim[1]))
+
+    # The context lines are read from the raw source: substitute the case's
+    # variables, as compiling the whole content does before reading them
+    if context_lines:
+        context_lines = replace_variables_in_content(
+            "\n".join(context_lines), var_combo, varprefix, delim
+        ).split("\n")
+
+    eol = None
+    rest = ""
+    with open(src_path, 'r') as src, open(dst_path, 'w', newline='') as dst:
+        while True:
+            chunk = src.read(_STREAM_CHUNK_SIZE)
+            text = rest + chunk
+            cut = _stream_cut(text, openers) if chunk else len(text)
+            head, rest = text[:cut], text[cut:]
+            if eol is None and isinstance(src.newlines, str):
+                # Line endings of the source, as with f.newlines in compile_file
+                eol = src.newlines
+            if head:
+                head = replace_variables_in_content(head, var_combo, varprefix, delim)
+                head = evaluate_formulas(head, model, var_combo, interpreter,
+                                         context_cache=context_cache, context_lines=context_lines)
+                dst.write(head.replace("\n", eol) if eol and eol != "\n" else head)
+            if not chunk:
+                return
+
+
+#: With "shared_files": True, input files without variables nor formulas of
+#: at least this size (bytes) are shared by the cases of a run
+_SHARED_FILE_MIN_SIZE = 1024 * 1024
+
+#: (device, inode) of the shared input files staged by compile_to_result_directories()
+_shared_inodes: Set[Tuple[int, int]] = set()
+
+
+def _is_shared_input(rel_path: str, size: int, shared_files: Any) -> bool:
+    """
+    Whether a marker-free input file is shared by the cases of a run
+
+    Args:
+        rel_path: Path of the file relative to the input directory (POSIX)
+        size: File size in bytes
+        shared_files: The model "shared_files" declaration: None or False
+            (default) to copy every file, True to share the files of
+            _SHARED_FILE_MIN_SIZE bytes or more, or a list of glob patterns
+            matched on the relative path or the file name.
+    """
+    if not shared_files:
+        return False
+    if shared_files is True:
+        return size >= _SHARED_FILE_MIN_SIZE
+    if isinstance(shared_files, str):
+        shared_files = [shared_files]
+    return any(
+        fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(Path(rel_path).name, pattern)
+        for pattern in shared_files or []
+    )
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    """Hard link dst to src, or copy src when the file system cannot link"""
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _stage_shared_copy(src: Path, dst: Path) -> None:
+    """Copy a shared input file for the first case, read-only, and record it as shared"""
+    shutil.copy2(src, dst)
+    # A calculator rewriting it in place would change it for every case of the run.
+    # Not on Windows, where shutil.rmtree cannot remove read-only files.
+    if os.name == "posix":
+        mode = stat.S_IMODE(os.stat(dst).st_mode)
+        os.chmod(dst, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+    _register_shared_copies([dst])
+
+
+def _register_shared_copies(paths: Iterable[Path]) -> None:
+    """Record files as shared input copies, to be linked again by _copy_or_relink()"""
+    for path in paths:
+        st = os.stat(path)
+        _shared_inodes.add((st.st_dev, st.st_ino))
+
+
+def _copy_or_relink(src: str, dst: str) -> str:
+    """Copy function keeping the shared input files staged by fz linked"""
+    st = os.stat(src)
+    if (st.st_dev, st.st_ino) in _shared_inodes:
+        _link_or_copy(Path(src), Path(dst))
+        return dst
+    return shutil.copy2(src, dst)
+
+
+def _copy_unless_same(src, dst):
+    """shutil.copy2, skipping shared input files already linked at dst"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return dst
+    return shutil.copy2(src, dst)
+
+
+#: Parallel compilation only gives each process at least this many cases
+_MIN_CASES_PER_COMPILE_JOB = 16
+
+#: Case blocks submitted per compiling process (progress and load balance)
+_COMPILE_BLOCKS_PER_JOB = 4
+
+
 def compile_to_result_directories(input_path: str, model: Dict, input_variables: Dict,
                                  var_combinations: List[Dict],
-                                 resultsdir: Path) -> None:
+                                 resultsdir: Path, jobs: Optional[int] = None) -> None:
     """
     Compile input files directly to result directories for each case
 
@@ -1551,18 +1931,14 @@ def compile_to_result_directories(input_path: str, model: Dict, input_variables:
         input_variables: Dict of variable values. If non-empty, subdirectories are created for each case.
         var_combinations: List of variable combinations (cases)
         resultsdir: Results directory
+        jobs: Number of processes compiling blocks of cases in parallel
+            (default: FZ_COMPILE_JOBS, 1; 0 for one per CPU). The compiled
+            files do not depend on it, provided formula contexts keep no
+            state from one case to the next.
     """
-    from .interpreter import replace_variables_in_content, evaluate_formulas
-    from .io import create_hash_file
-    from .config import get_interpreter
-
-    # Get the formula interpreter from model, or fall back to global setting
-    interpreter = model.get("interpreter", get_interpreter())
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
 
-    # Variable prefix: use var_prefix if set, else varprefix (old name), else default to "$"
-    varprefix = model.get("var_prefix", model.get("varprefix", "$"))
-    # Variable delimiters: use var_delim if set, else delim if set, else default to ()
-    delim = model.get("var_delim", model.get("delim", "()"))
     input_path = Path(input_path)
 
     # Determine if input_variables is non-empty
@@ -1575,30 +1951,191 @@ def compile_to_result_directories(input_path: str, model: Dict, input_variables:
     # Ensure main results directory exists
     resultsdir.mkdir(parents=True, exist_ok=True)
 
-    for case_index, var_combo in enumerate(var_combinations):
+    cases = list(enumerate(var_combinations))
+    if jobs is None:
+        jobs = get_config().compile_jobs
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(cases) // _MIN_CASES_PER_COMPILE_JOB)
+
+    if jobs <= 1:
+        _compile_cases(input_path, model, cases, len(cases), resultsdir, has_input_variables)
+        return
+
+    # First case here, so that shared input files are stored once and
+    # linked by all the processes
+    shared_copies = _compile_cases(input_path, model, cases[:1], len(cases), resultsdir, has_input_variables)
+
+    rest = cases[1:]
+    block_size = -(-len(rest) // (jobs * _COMPILE_BLOCKS_PER_JOB))
+    blocks = [rest[i:i + block_size] for i in range(0, len(rest), block_size)]
+    log_info(f"Compiling {len(cases)} cases with {jobs} processes")
+
+    compiled = 1
+    remaining = list(range(len(blocks)))
+    # spawn, not fork: by now this process usually runs threads (R session,
+    # SSH pool reaper, worker pool pumps, ...) whose locks a forked child
+    # could inherit held
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {
+                pool.submit(_compile_cases, input_path, model, block, len(cases), resultsdir,
+                            has_input_variables, shared_copies): i
+                for i, block in enumerate(blocks)
+            }
+            for future in as_completed(futures):
+                # Shared copies staged in the other processes, if any
+                _register_shared_copies(future.result().values())
+                remaining.remove(futures[future])
+                compiled += len(blocks[futures[future]])
+                log_progress(f"📊 Compiled {compiled}/{len(cases)} cases ({compiled / len(cases) * 100:.1f}%)")
+    except Exception as e:
+        # Model not picklable (e.g. output callables of a script), or a script
+        # without a __main__ guard failing to start in the new processes
+        log_warning(f"⚠️  Parallel compilation failed ({type(e).__name__}: {e}), compiling in-process")
+        for i in remaining:
+            _compile_cases(input_path, model, blocks[i], len(cases), resultsdir, has_input_variables, shared_copies)
+
+
+def _compile_cases(input_path: Path, model: Dict, cases: List[Tuple[int, Dict]], n_cases: int,
+                   resultsdir: Path, has_input_variables: bool,
+                   shared_copies: Optional[Dict[Path, Path]] = None) -> Dict[Path, Path]:
+    """
+    Compile a block of cases to their result directories
+
+    Args:
+        input_path: Path to input file or directory
+        model: Model definition dict
+        cases: (case index, variable combination) of the cases to compile
+        n_cases: Total number of cases (for the result directory names)
+        resultsdir: Results directory
+        has_input_variables: Whether cases get their own subdirectory
+        shared_copies: Copies of the shared input files already made for
+            another case, by source path
+
+    Returns:
+        Copies of the shared input files, by source path
+    """
+    from .interpreter import (
+        replace_variables_in_content,
+        evaluate_formulas,
+        precompute_formula_values,
+        _get_comment_char,
+        _get_formula_prefix,
+    )
+    from .io import create_hash_file
+    from .config import get_interpreter
+
+    # Get the formula interpreter from model, or fall back to global setting
+    interpreter = model.get("interpreter", get_interpreter())
+
+    # Variable prefix: use var_prefix if set, else varprefix (old name), else default to "$"
+    varprefix = model.get("var_prefix", model.get("varprefix", "$"))
+    # Variable delimiters: use var_delim if set, else delim if set, else default to ()
+    delim = model.get("var_delim", model.get("delim", "()"))
+    formulaprefix = _get_formula_prefix(model)
+    block_combinations = [var_combo for _, var_combo in cases]
+
+    # Formula contexts independent of the variables are executed once for
+    # the whole block, not once per file per case
+    formula_context_cache = {}
+    # Formula values computed for all cases of the block at once, per input file
+    formula_values = {}
+    # How each input file is compiled ("copy" when it contains no variable
+    # nor formula marker, "share" when such a file is also shared by the
+    # cases, "stream" for large files, else "text"), and the formula context
+    # lines of the streamed files
+    compile_modes = {}
+    stream_context_lines = {}
+    # Shared input files: copied for the first case, then hard linked to
+    # that copy in the other cases, so that they are stored and hashed once
+    shared_files = model.get("shared_files")
+    shared_copies = dict(shared_copies or {})
+
+    # Input files (relative paths) in their compilation order
+    if input_path.is_file():
+        input_files = [Path(input_path.name)]
+    elif input_path.is_dir():
+        input_files = [p.relative_to(input_path) for p in input_path.rglob("*") if p.is_file()]
+    else:
+        input_files = []
+
+    for position, (case_index, var_combo) in enumerate(cases):
         # Use dedicated result directory function to avoid any temp_path contamination
         result_dir, case_name = _get_result_directory(
-            var_combo, case_index, resultsdir, len(var_combinations), has_input_variables
+            var_combo, case_index, resultsdir, n_cases, has_input_variables
         )
 
         # Create result directory
         result_dir.mkdir(parents=True, exist_ok=True)
 
+        def copy_mode(src_path: Path) -> str:
+            """"share" or "copy" for an input file copied as-is"""
+            rel_path = src_path.relative_to(input_path) if input_path.is_dir() else Path(src_path.name)
+            shared = _is_shared_input(rel_path.as_posix(), src_path.stat().st_size, shared_files)
+            return "share" if shared else "copy"
+
         def compile_file(src_path: Path, dst_path: Path):
+            if src_path not in compile_modes:
+                if not _is_template_file(src_path, (varprefix, formulaprefix)):
+                    compile_modes[src_path] = copy_mode(src_path)
+                elif src_path.stat().st_size > _STREAM_COMPILE_THRESHOLD:
+                    try:
+                        stream_context_lines[src_path] = _stream_context_lines(
+                            src_path, _get_comment_char(model), formulaprefix
+                        )
+                        compile_modes[src_path] = "stream"
+                    except UnicodeDecodeError:
+                        # Binary file
+                        compile_modes[src_path] = copy_mode(src_path)
+                else:
+                    compile_modes[src_path] = "text"
+
+            if compile_modes[src_path] == "copy":
+                # Nothing to substitute: copy the file as-is, without decoding it
+                shutil.copy2(src_path, dst_path)
+                return
+
+            if compile_modes[src_path] == "share":
+                if src_path in shared_copies:
+                    _link_or_copy(shared_copies[src_path], dst_path)
+                else:
+                    _stage_shared_copy(src_path, dst_path)
+                    shared_copies[src_path] = dst_path
+                return
+
+            if compile_modes[src_path] == "stream":
+                _compile_file_streamed(
+                    src_path, dst_path, model, var_combo, interpreter, varprefix, delim,
+                    stream_context_lines[src_path], formula_context_cache
+                )
+                return
+
             try:
                 with open(src_path, 'r') as f:
                     content = f.read()
                     eol = f.newlines if f.newlines else '\n'
             except UnicodeDecodeError:
                 # Copy binary files as-is
-                shutil.copy2(src_path, dst_path)
+                compile_modes[src_path] = copy_mode(src_path)
+                compile_file(src_path, dst_path)
                 return
 
+            if src_path not in formula_values:
+                formula_values[src_path] = precompute_formula_values(
+                    content, model, block_combinations, interpreter, varprefix, delim,
+                    context_cache=formula_context_cache
+                )
+            case_formula_values = formula_values[src_path]
+
             # Replace variables
             content = replace_variables_in_content(content, var_combo, varprefix, delim)
 
             # Evaluate formulas
-            content = evaluate_formulas(content, model, var_combo, interpreter)
+            content = evaluate_formulas(
+                content, model, var_combo, interpreter, context_cache=formula_context_cache,
+                formula_values=case_formula_values[position] if case_formula_values else None
+            )
 
             # Write compiled content
             with open(dst_path, 'w', newline=eol) as f:
@@ -1610,15 +2147,13 @@ def compile_to_result_directories(input_path: str, model: Dict, input_variables:
             dst_path = result_dir / input_path.name
             compile_file(input_path, dst_path)
             input_files_list.append(input_path.name)
-        elif input_path.is_dir():
+        else:
             # Copy directory structure
-            for src_file in input_path.rglob("*"):
-                if src_file.is_file():
-                    rel_path = src_file.relative_to(input_path)
-                    dst_file = result_dir / rel_path
-                    dst_file.parent.mkdir(parents=True, exist_ok=True)
-                    compile_file(src_file, dst_file)
-                    input_files_list.append(str(rel_path))
+            for rel_path in input_files:
+                dst_file = result_dir / rel_path
+                dst_file.parent.mkdir(parents=True, exist_ok=True)
+                compile_file(input_path / rel_path, dst_file)
+                input_files_list.append(str(rel_path))
 
         # Create hash file of compiled input files with input files in order
         try:
@@ -1627,6 +2162,7 @@ def compile_to_result_directories(input_path: str, model: Dict, input_variables:
         except Exception as e:
             log_warning(f"Warning: Could not create hash file for case {var_combo}: {e}")
 
+    return shared_copies
 
 
 def prepare_temp_directories(var_combinations: List[Dict], temp_path: Path, resultsdir: Path, has_input_variables: bool = True) -> None:
@@ -1659,6 +2195,8 @@ def prepare_temp_directories(var_combinations: List[Dict], temp_path: Path, resu
         # Copy files from result directory to temp directory (excluding .fz_hash).
         # Subdirectories are copied recursively so directory-tree inputs (e.g. an
         # OpenFOAM case with system/, constant/, 0/) reach the calculator intact.
+        # Shared input files (hard linked by compile_to_result_directories) are
+        # linked again instead of copied.
         try:
             if result_dir.exists():
                 files_copied = 0
@@ -1666,10 +2204,11 @@ def prepare_temp_directories(var_combinations: List[Dict], temp_path: Path, resu
                     if item.name == ".fz_hash":
                         continue
                     if item.is_dir():
-                        shutil.copytree(item, tmp_dir / item.name, dirs_exist_ok=True)
+                        shutil.copytree(item, tmp_dir / item.name, dirs_exist_ok=True,
+                                        copy_function=_copy_or_relink)
                         files_copied += 1
                     elif item.is_file():
-                        shutil.copy2(item, tmp_dir)
+                        _copy_or_relink(str(item), str(tmp_dir / item.name))
                         files_copied += 1
 
                 log_debug(f"Prepared temp directory: {tmp_dir} ({files_copied} items copied from {result_dir})")
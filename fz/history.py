@@ -75,6 +75,9 @@ def write_info_file(directory: Path, *,
 
     if output_values:
         for k, v in output_values.items():
+            if hasattr(v, "tolist"):
+                # numpy arrays print truncated ("[1. 2. ... 9.]"), lists don't
+                v = v.tolist()
             lines.append(f"output.{k}={v}")
 
     (directory / "info.txt").write_text("\n".join(lines) + "\n")
@@ -4,8 +4,16 @@ Interpreter utilities for fz package: variable parsing, formula evaluation, and
 import re
 import json
 import ast
+import builtins
+import functools
+import math
+import operator
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Union, Any, Set
+from typing import Dict, List, Optional, Union, Any, Set, Tuple, Iterable
 
 
 def _get_comment_char(model: Dict) -> str:
@@ -179,17 +187,116 @@ def parse_variables_from_path(input_path: Path, varprefix: str = "$", delim: str
         Set of variable names found
     """
     variables = set()
+    for _, content in scan_input_files(input_path, (varprefix,)):
+        variables.update(parse_variables_from_content(content, varprefix, delim))
+    return variables
+
+
+#: Size of the first block read from a file to tell binary files from text
+_SNIFF_SIZE = 8192
+
+#: Text of scanned files larger than this is not kept in the scan cache
+_SCAN_CACHE_MAX_TEXT = 16 * 1024 * 1024
+
+#: Total text kept in the scan cache; the least recently used files go first
+_SCAN_CACHE_MAX_TOTAL = 64 * 1024 * 1024
+
+#: Files kept in the scan cache, with or without text
+_SCAN_CACHE_MAX_FILES = 100000
+
+#: (path, markers) -> (size, mtime_ns, text) for files read by scan_input_files(),
+#: in least to most recently used order
+_scan_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_scan_cache_size = 0
+_scan_cache_lock = threading.Lock()
+
+
+def _scan_cache_put(key: tuple, entry: tuple):
+    """Store a scan cache entry, evicting the least recently used ones over the cache limits"""
+    global _scan_cache_size
+    with _scan_cache_lock:
+        previous = _scan_cache.pop(key, None)
+        if previous is not None and previous[2] is not None:
+            _scan_cache_size -= len(previous[2])
+        _scan_cache[key] = entry
+        if entry[2] is not None:
+            _scan_cache_size += len(entry[2])
+        while len(_scan_cache) > 1 and (_scan_cache_size > _SCAN_CACHE_MAX_TOTAL
+                                        or len(_scan_cache) > _SCAN_CACHE_MAX_FILES):
+            _, evicted = _scan_cache.popitem(last=False)
+            if evicted[2] is not None:
+                _scan_cache_size -= len(evicted[2])
+
+
+def _scan_input_file(filepath: Path, markers: tuple) -> Optional[str]:
+    """
+    Text of a file, or None for binary files and files containing none of
+    the markers. Binary files (a NUL byte in the first block) are not read
+    further; the others are read once, and decoded only if a marker is found.
+    """
+    stat = filepath.stat()
+    key = (str(filepath), markers)
+    with _scan_cache_lock:
+        cached = _scan_cache.get(key)
+        if cached is not None:
+            _scan_cache.move_to_end(key)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    text = None
+    with open(filepath, 'rb') as f:
+        data = f.read(_SNIFF_SIZE)
+        if b"\0" not in data:
+            data += f.read()
+            if any(marker.encode('utf-8') in data for marker in markers):
+                try:
+                    # Same text as open(filepath, 'r', encoding='utf-8').read()
+                    text = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                except UnicodeDecodeError:
+                    text = None
+
+    if text is None or len(text) <= _SCAN_CACHE_MAX_TEXT:
+        _scan_cache_put(key, (stat.st_size, stat.st_mtime_ns, text))
+    return text
+
+
+def scan_input_files(input_path: Path, markers: Iterable[str],
+                     max_workers: Optional[int] = None) -> List[Tuple[Path, str]]:
+    """
+    Read the text input files that may contain variables or formulas.
+
+    Each file is read once; the files of a directory are read in parallel.
+    Binary files and files containing none of the markers (e.g. the variable
+    and formula prefixes) are skipped. Results are cached by path, size and
+    modification time, so scanning an unchanged tree again reads nothing.
+
+    Args:
+        input_path: Path to input file or directory
+        markers: Strings at least one of which a file must contain
+        max_workers: Number of reading threads (default: from the CPU count)
 
+    Returns:
+        List of (path, text) in directory traversal order
+
+    Raises:
+        FileNotFoundError: If input_path doesn't exist
+    """
+    input_path = Path(input_path)
+    markers = tuple(markers)
     if input_path.is_file():
-        variables.update(parse_variables_from_file(input_path, varprefix, delim))
+        files = [input_path]
     elif input_path.is_dir():
-        for filepath in input_path.rglob("*"):
-            if filepath.is_file():
-                variables.update(parse_variables_from_file(filepath, varprefix, delim))
+        files = [p for p in input_path.rglob("*") if p.is_file()]
     else:
         raise FileNotFoundError(f"Input path '{input_path}' not found")
 
-    return variables
+    if len(files) > 1:
+        workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=min(workers, len(files))) as pool:
+            texts = list(pool.map(lambda p: _scan_input_file(p, markers), files))
+    else:
+        texts = [_scan_input_file(p, markers) for p in files]
+    return [(p, text) for p, text in zip(files, texts) if text is not None]
 
 
 def replace_variables_in_content(content: str, input_variables: Dict[str, Any],
@@ -201,6 +308,11 @@ def replace_variables_in_content(content: str, input_variables: Dict[str, Any],
     If a variable is not found in input_variables but has a default value,
     the default will be used and a warning will be printed.
 
+    Delimited and prefix-only forms are resolved together in a single scan
+    of the content. The few layouts where that could differ from resolving
+    them one variable at a time (a replacement glued to another variable
+    reference, values containing the prefix, ...) use the sequential passes.
+
     Args:
         content: Text content to process
         input_variables: Dict of variable values
@@ -210,6 +322,22 @@ def replace_variables_in_content(content: str, input_variables: Dict[str, Any],
     Returns:
         Content with variables replaced
     """
+    result = _substitute_variables_single_pass(
+        content, input_variables, varprefix, delim, with_defaults=True
+    )
+    if result is None:
+        result = _replace_variables_sequential(content, input_variables, varprefix, delim)
+    return result
+
+
+def _replace_variables_sequential(content: str, input_variables: Dict[str, Any],
+                                  varprefix: str = "$", delim: str = "()") -> str:
+    """
+    Replace variables with one pass for delimited forms, then one per variable.
+
+    Reference implementation of replace_variables_in_content(), used when
+    the single-pass scan cannot guarantee the same result.
+    """
     if len(delim) == 2:
         left_delim, right_delim = delim[0], delim[1]
         esc_varprefix = re.escape(varprefix)
@@ -251,6 +379,151 @@ def replace_variables_in_content(content: str, input_variables: Dict[str, Any],
     return content
 
 
+@functools.lru_cache(maxsize=64)
+def _variable_scan_patterns(names: tuple, varprefix: str, delim: str, with_defaults: bool) -> tuple:
+    """
+    Compile the alternation regexes used by _substitute_variables_single_pass.
+
+    Returns:
+        (scan, hazard), or (None, None) if nothing can match. scan matches
+        every variable reference at once, with groups "dname"/"default" for
+        the delimited form (any identifier with an optional ~default when
+        with_defaults, else only the given names) and "sname" for the
+        prefix-only form of the given names. hazard matches a reference
+        preceded by a prefix character and word characters ("$$a", "$a$b",
+        "$x$(y)"), where a replacement could form or break another reference.
+    """
+    esc_varprefix = re.escape(varprefix)
+    # Longest names first, so that the alternation never stops on a shorter prefix
+    name_alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+
+    alternatives = []
+    if len(delim) == 2:
+        esc_left, esc_right = re.escape(delim[0]), re.escape(delim[1])
+        if with_defaults:
+            alternatives.append(
+                rf"{esc_left}(?P<dname>[a-zA-Z_][a-zA-Z0-9_]*)(?:~(?P<default>[^{esc_right}]*))?{esc_right}"
+            )
+        elif names:
+            alternatives.append(rf"{esc_left}(?P<dname>{name_alternation}){esc_right}")
+    if names:
+        alternatives.append(rf"(?P<sname>{name_alternation})\b")
+
+    if not alternatives:
+        return None, None
+    reference = rf"{esc_varprefix}(?:{'|'.join(alternatives)})"
+    prefix_chars = re.escape("".join(sorted(set(varprefix))))
+    return re.compile(reference), re.compile(rf"[{prefix_chars}]\w*{reference}")
+
+
+class _SequentialFallback(Exception):
+    """Raised during a single-pass scan that cannot match the sequential passes"""
+
+
+_WORD_NAME = re.compile(r"\w+")
+
+
+def _substitute_variables_single_pass(text: str, input_variables: Dict[str, Any], varprefix: str,
+                                      delim: str, with_defaults: bool) -> Union[str, None]:
+    """
+    Substitute delimited and prefix-only variable references in one scan.
+
+    Reproduces the sequential substitution (delimited forms first, then one
+    re.sub per variable in input_variables order) whenever the result cannot
+    depend on that order. Returns None otherwise, so the caller falls back to
+    the sequential passes:
+    - empty prefix, or variable names that are not plain word characters
+    - values containing a prefix character or a backslash (the sequential
+      passes would re-substitute or template-expand them)
+    - a reference preceded by a prefix character and word characters, e.g.
+      "$$a" or "$a$b" (a replacement could form a new reference, or change
+      the word boundary of the previous one)
+    - a default value containing a prefix character
+
+    Args:
+        text: Content or formula to process
+        input_variables: Dict of variable values
+        varprefix: Variable prefix (e.g., "$")
+        delim: Variable delimiters (e.g., "()"), or "" for prefix-only
+        with_defaults: Resolve $(name~default) and leave unknown $(name)
+            untouched (file content); otherwise only $(name) of known
+            variables is delimited (formulas)
+
+    Returns:
+        Substituted text, or None if the sequential passes must be used
+    """
+    if not varprefix:
+        return None
+    values = {}
+    for name, value in input_variables.items():
+        if not isinstance(name, str) or not _WORD_NAME.fullmatch(name):
+            return None
+        value = str(value)
+        if "\\" in value or any(c in value for c in varprefix):
+            return None
+        values[name] = value
+
+    if varprefix not in text:
+        return text
+    scan, hazard = _variable_scan_patterns(tuple(values), varprefix, delim, with_defaults)
+    if scan is None:
+        return text
+    if hazard.search(text):
+        return None
+
+    simple_group = scan.groupindex.get("sname")
+    warnings = []
+
+    def replace(match):
+        if match.lastindex == simple_group:
+            return values[match.group(simple_group)]
+        name = match.group("dname")
+        if name in values:
+            return values[name]
+        default_value = match.group("default") if with_defaults else None
+        if default_value is None:
+            # Variable not found and no default, leave unchanged
+            return match.group(0)
+        if any(c in default_value for c in varprefix):
+            raise _SequentialFallback()
+        warnings.append(
+            f"Warning: Variable '{name}' not found in input_variables, using default value: '{default_value}'"
+        )
+        return default_value
+
+    try:
+        result = scan.sub(replace, text)
+    except _SequentialFallback:
+        return None
+
+    for warning in warnings:
+        print(warning)
+    return result
+
+
+def _substitute_formula_variables(formula: str, input_variables: Dict[str, Any],
+                                  varprefix: str = "$", var_delim: str = "()") -> str:
+    """
+    Replace $(var) and $var references of known variables inside a formula.
+
+    Single scan when possible (see _substitute_variables_single_pass),
+    otherwise one delimited and one prefix-only re.sub per variable.
+    """
+    result = _substitute_variables_single_pass(
+        formula, input_variables, varprefix, var_delim, with_defaults=False
+    )
+    if result is not None:
+        return result
+
+    for var, val in input_variables.items():
+        if len(var_delim) == 2:
+            var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(var_delim[0])}{re.escape(var)}{re.escape(var_delim[1])}'
+            formula = re.sub(var_pattern_delim, str(val), formula)
+        var_pattern = rf'{re.escape(varprefix)}{re.escape(var)}\b'
+        formula = re.sub(var_pattern, str(val), formula)
+    return formula
+
+
 def parse_formulas_from_content(content: str, formula_prefix: str = "@", delim: str = "{}") -> List[str]:
     """
     Parse formulas from text content using specified prefix and delimiters
@@ -495,32 +768,42 @@ def evaluate_static_objects(static_lines: List[str], interpreter: str = "python"
             print(f"Warning: Error executing static objects: {e}")
 
     elif interpreter.lower() == "r":
-        try:
-            from rpy2 import robjects as ro
-            from rpy2.robjects import conversion, default_converter
-        except Exception:
-            print("Warning: rpy2 not available, cannot evaluate R static objects")
-            return {}
+        # R is not thread-safe: evaluate in the R session thread
+        from .rsession import get_r_session
+        static_objects = get_r_session().call(_evaluate_static_objects_r, static_lines)
 
-        # Use textwrap.dedent for proper dedenting
-        import textwrap
-        full_code = "\n".join(static_lines)
-        dedented_code = textwrap.dedent(full_code)
+    return static_objects
 
-        try:
-            ro.r(dedented_code)
-            # Extract defined names from R global environment
-            for name in ro.r('ls()'):
-                try:
-                    value = ro.r[name]
-                    # Convert R objects to Python
-                    with conversion.localconverter(default_converter):
-                        static_objects[name] = conversion.rpy2py(value)
-                except Exception:
-                    # For functions or complex objects, store None
-                    static_objects[name] = None
-        except Exception as e:
-            print(f"Warning: Error executing R static objects: {e}")
+
+def _evaluate_static_objects_r(static_lines: List[str]) -> Dict[str, Any]:
+    """R part of evaluate_static_objects(), run in the R session thread"""
+    static_objects = {}
+    try:
+        from rpy2 import robjects as ro
+        from rpy2.robjects import conversion, default_converter
+    except Exception:
+        print("Warning: rpy2 not available, cannot evaluate R static objects")
+        return {}
+
+    # Use textwrap.dedent for proper dedenting
+    import textwrap
+    full_code = "\n".join(static_lines)
+    dedented_code = textwrap.dedent(full_code)
+
+    try:
+        ro.r(dedented_code)
+        # Extract defined names from R global environment
+        for name in ro.r('ls()'):
+            try:
+                value = ro.r[name]
+                # Convert R objects to Python
+                with conversion.localconverter(default_converter):
+                    static_objects[name] = conversion.rpy2py(value)
+            except Exception:
+                # For functions or complex objects, store None
+                static_objects[name] = None
+    except Exception as e:
+        print(f"Warning: Error executing R static objects: {e}")
 
     return static_objects
 
@@ -567,17 +850,7 @@ def evaluate_single_formula(formula: str, model: Dict, input_variables: Dict, in
 
         # Replace variables in formula using the model's variable prefix
         # Handle both delimited and non-delimited variables
-        for var, val in input_variables.items():
-            if len(var_delim) == 2:
-                # Try with delimiters first: $(...) or V(...)
-                left_delim = var_delim[0]
-                right_delim = var_delim[1]
-                var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(left_delim)}{re.escape(var)}{re.escape(right_delim)}'
-                formula = re.sub(var_pattern_delim, str(val), formula)
-            
-            # Also try without delimiters: $var or Vvar
-            var_pattern = rf'{re.escape(varprefix)}{re.escape(var)}\b'
-            formula = re.sub(var_pattern, str(val), formula)
+        formula = _substitute_formula_variables(formula, input_variables, varprefix, var_delim)
 
         try:
             result = eval(formula, env)
@@ -596,76 +869,234 @@ def evaluate_single_formula(formula: str, model: Dict, input_variables: Dict, in
             return None
 
     elif interpreter.lower() == "r":
-        try:
-            from rpy2 import robjects
-            from rpy2.robjects import r
-        except Exception:
-            return None
+        # R is not thread-safe: evaluate in the R session thread
+        from .rsession import get_r_session
+        return get_r_session().call(
+            _evaluate_single_formula_r, formula, input_variables, varprefix, var_delim
+        )
 
-        # Set R variables
-        for var, val in input_variables.items():
-            try:
-                if isinstance(val, (int, float)):
-                    robjects.globalenv[var] = val
-                elif isinstance(val, str):
-                    robjects.globalenv[var] = val
-                elif isinstance(val, (list, tuple)):
-                    robjects.globalenv[var] = robjects.FloatVector(val)
-                elif hasattr(val, '__module__') and 'rpy2' in str(val.__module__):
-                    # R object (function, vector, etc.) - assign directly
-                    robjects.globalenv[var] = val
-                else:
-                    robjects.globalenv[var] = str(val)
-            except Exception:
-                # Ignore errors for individual variable assignments so that other
-                # variables can still be set and the R formula evaluation can proceed.
-                pass
+    return None
 
-        # Handle format suffix
-        format_spec = None
-        if '|' in formula:
-            formula, format_spec = formula.split('|', 1)
-            formula = formula.strip()
-            format_spec = format_spec.strip()
 
-        # Replace variables in formula (remove variable prefix for R)
-        # Handle both delimited and non-delimited variables
-        r_formula = formula
-        for var in input_variables.keys():
-            if len(var_delim) == 2:
-                # Try with delimiters first
-                left_delim = var_delim[0]
-                right_delim = var_delim[1]
-                var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(left_delim)}{re.escape(var)}{re.escape(right_delim)}'
-                r_formula = re.sub(var_pattern_delim, var, r_formula)
-            
-            # Also try without delimiters
-            var_pattern = rf'{re.escape(varprefix)}{re.escape(var)}\b'
-            r_formula = re.sub(var_pattern, var, r_formula)
+def _evaluate_single_formula_r(formula: str, input_variables: Dict, varprefix: str,
+                               var_delim: str) -> Any:
+    """R part of evaluate_single_formula(), run in the R session thread"""
+    try:
+        from rpy2 import robjects
+        from rpy2.robjects import r
+    except Exception:
+        return None
 
+    # Set R variables
+    for var, val in input_variables.items():
         try:
-            result = r(r_formula)
-            if hasattr(result, '__len__') and len(result) == 1:
-                value = result[0]
+            if isinstance(val, (int, float)):
+                robjects.globalenv[var] = val
+            elif isinstance(val, str):
+                robjects.globalenv[var] = val
+            elif isinstance(val, (list, tuple)):
+                robjects.globalenv[var] = robjects.FloatVector(val)
+            elif hasattr(val, '__module__') and 'rpy2' in str(val.__module__):
+                # R object (function, vector, etc.) - assign directly
+                robjects.globalenv[var] = val
             else:
-                value = result if not (hasattr(result, '__len__') and len(result) == 0) else result
+                robjects.globalenv[var] = str(val)
+        except Exception:
+            # Ignore errors for individual variable assignments so that other
+            # variables can still be set and the R formula evaluation can proceed.
+            pass
+
+    # Handle format suffix
+    format_spec = None
+    if '|' in formula:
+        formula, format_spec = formula.split('|', 1)
+        formula = formula.strip()
+        format_spec = format_spec.strip()
+
+    # Replace variables in formula (remove variable prefix for R)
+    # Handle both delimited and non-delimited variables
+    r_formula = _substitute_formula_variables(
+        formula, {var: var for var in input_variables}, varprefix, var_delim
+    )
 
-            # Apply format if specified
-            if format_spec and '.' in format_spec:
-                decimals = len(format_spec.split('.')[1])
+    try:
+        result = r(r_formula)
+        if hasattr(result, '__len__') and len(result) == 1:
+            value = result[0]
+        else:
+            value = result if not (hasattr(result, '__len__') and len(result) == 0) else result
+
+        # Apply format if specified
+        if format_spec and '.' in format_spec:
+            decimals = len(format_spec.split('.')[1])
+            try:
+                return float(f"{float(value):.{decimals}f}")
+            except (ValueError, TypeError):
+                return value
+
+        return value
+    except Exception:
+        return None
+
+
+def _dedent_context_lines(context_lines: List[str]) -> List[str]:
+    """Remove the common indentation of formula context lines (empty lines kept)"""
+    non_empty_lines = [line for line in context_lines if line.strip()]
+    if not non_empty_lines:
+        return []
+    min_indent = min(len(line) - len(line.lstrip()) for line in non_empty_lines)
+    dedented_lines = []
+    for line in context_lines:
+        if line.strip():  # Non-empty line
+            dedented_lines.append(line[min_indent:] if len(line) > min_indent else line.lstrip())
+        else:  # Empty line
+            dedented_lines.append("")
+    return dedented_lines
+
+
+def _exec_formula_context(dedented_lines: List[str], env: Dict) -> None:
+    """Execute context lines in env, line by line if the whole block fails"""
+    full_context = "\n".join(dedented_lines)
+    try:
+        exec(full_context, env)
+    except Exception as e:
+        print(f"Warning: Error executing full context: {e}")
+        # Try line by line if full context fails
+        for context_line in dedented_lines:
+            if context_line.strip():
                 try:
-                    return float(f"{float(value):.{decimals}f}")
-                except (ValueError, TypeError):
-                    return value
+                    exec(context_line, env)
+                except Exception as e:
+                    print(f"Warning: Error executing context line '{context_line}': {e}")
 
-            return value
-        except Exception:
-            return None
 
-    return None
+#: Builtins giving context code dynamic access to its namespace
+_DYNAMIC_NAME_ACCESS = {"globals", "locals", "vars", "eval", "exec"}
+
+
+def _context_names(full_context: str) -> Optional[Set[str]]:
+    """
+    Names a formula context reads or assigns anywhere (including function bodies).
+
+    Returns None when the context cannot be analyzed statically (syntax
+    error, or dynamic namespace access through globals()/eval()/...).
+    """
+    try:
+        tree = ast.parse(full_context)
+    except SyntaxError:
+        return None
+    names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+    if names & _DYNAMIC_NAME_ACCESS:
+        return None
+    return names
+
+
+def _formula_namespace(context_lines: List[str], input_variables: Dict,
+                       context_cache: Optional[Dict] = None) -> Dict:
+    """
+    Build the Python namespace formulas are evaluated in: the variable
+    values, then whatever the context lines define.
+
+    With a context_cache, a context that never mentions a variable name
+    (checked on its syntax tree, function bodies included) is executed only
+    once; each case then gets a shallow copy of that base namespace with its
+    variables added. Objects defined by such a context are therefore shared
+    between cases and must not be mutated by formulas. A context that reads
+    or assigns a variable, or that cannot be analyzed (syntax error,
+    globals()/eval()/...), is executed again for every call, as without a
+    cache.
+
+    Args:
+        context_lines: Code of the formula context lines (prefixes removed)
+        input_variables: Dict of variable values for this case
+        context_cache: Run-wide cache, or None to always execute the context
+
+    Returns:
+        Namespace dict, suitable as eval() globals
+    """
+    dedented_lines = _dedent_context_lines(context_lines)
+    if not dedented_lines:
+        return dict(input_variables)
+
+    if context_cache is not None:
+        base = _shared_context_namespace(dedented_lines, input_variables.keys(), context_cache)
+        if base is not None:
+            env = dict(base)
+            env.update(input_variables)
+            return env
+
+    env = dict(input_variables)  # Start with variable values
+    _exec_formula_context(dedented_lines, env)
+    return env
+
+
+def _shared_context_namespace(dedented_lines: List[str], variable_names,
+                              context_cache: Dict) -> Optional[Dict]:
+    """
+    Namespace of a formula context executed once for the run, or None when
+    the context mentions one of variable_names or cannot be analyzed.
+    The returned dict is shared: callers must copy it before adding to it.
+    """
+    full_context = "\n".join(dedented_lines)
+    cached = context_cache.get(full_context)
+    if cached is None:
+        cached = {"names": _context_names(full_context), "base": None}
+        context_cache[full_context] = cached
+    names = cached["names"]
+    if names is None or (names & set(variable_names)):
+        return None
+    if cached["base"] is None:
+        base = {}
+        _exec_formula_context(dedented_lines, base)
+        cached["base"] = base
+    return cached["base"]
+
+
+def _formula_context_lines(content: str, commentline: str, formulaprefix: str) -> List[str]:
+    """Code of the formula context lines (comment + formula prefix), indentation preserved"""
+    context_lines = []
+    lines = content.split('\n')
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith(commentline + formulaprefix):
+            # Extract the code part and preserve any indentation from original
+            code_part = stripped[len(commentline + formulaprefix):]
+            # Remove Funz-specific prefixes (: for code, ? for tests)
+            if code_part.startswith(':') or code_part.startswith('?'):
+                code_part = code_part[1:]
+            context_lines.append(code_part)
+    return context_lines
+
+
+def _formula_pattern(formulaprefix: str, left_delim: str, right_delim: str) -> str:
+    """Regex matching a formula, the expression (with its format suffix) in group 1"""
+    esc_formulaprefix = re.escape(formulaprefix)
+    esc_left = re.escape(left_delim)
+    esc_right = re.escape(right_delim)
+
+    # Use a more sophisticated pattern to handle nested parentheses
+    if left_delim == '(' and right_delim == ')':
+        return rf"{esc_formulaprefix}\(([^()]*(?:\([^()]*\)[^()]*)*)\)"
+    return rf"{esc_formulaprefix}{esc_left}([^{esc_right}]+){esc_right}"
+
+
+def _render_formula_result(result: Any, format_spec: Optional[str]) -> str:
+    """Text replacing a Python formula: str(result), or fixed decimals for a "0.000" format"""
+    if format_spec:
+        # Parse format like "0.0000" → 4 decimals
+        if '.' in format_spec:
+            decimals = len(format_spec.split('.')[1])
+            try:
+                return f"{float(result):.{decimals}f}"
+            except (ValueError, TypeError):
+                return str(result)
+    return str(result)
 
 
-def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpreter: str = "python") -> str:
+def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpreter: str = "python",
+                      context_cache: Optional[Dict] = None,
+                      formula_values: Optional[Dict[str, str]] = None,
+                      context_lines: Optional[List[str]] = None) -> str:
     """
     Evaluate formulas in content using specified interpreter
     Supports format specifier: @{expr | format}
@@ -675,6 +1106,15 @@ def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpre
         model: Model definition dict
         input_variables: Dict of variable values
         interpreter: Interpreter for evaluation ("python", "R", etc.)
+        context_cache: Optional dict shared by the calls of one run (all files
+            of all cases). Python formula contexts that do not refer to any
+            variable are then executed once and reused; see _formula_namespace.
+        formula_values: Optional rendered values of Python formulas for this
+            case, keyed by formula text, as computed for all cases by
+            precompute_formula_values(). Other formulas are evaluated here.
+        context_lines: Optional formula context code of the whole file, when
+            content is only a part of it (streamed compilation). By default
+            the context lines are read from content.
 
     Returns:
         Content with formulas evaluated
@@ -696,18 +1136,8 @@ def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpre
     else:
         left_delim, right_delim = "", ""
 
-    # Collect formula context lines (comment + formula prefix) and preserve indentation
-    context_lines = []
-    lines = content.split('\n')
-    for line in lines:
-        stripped = line.strip()
-        if stripped.startswith(commentline + formulaprefix):
-            # Extract the code part and preserve any indentation from original
-            code_part = stripped[len(commentline + formulaprefix):]
-            # Remove Funz-specific prefixes (: for code, ? for tests)
-            if code_part.startswith(':') or code_part.startswith('?'):
-                code_part = code_part[1:]
-            context_lines.append(code_part)
+    if context_lines is None:
+        context_lines = _formula_context_lines(content, commentline, formulaprefix)
     # If delimiters are empty, skip formula evaluation (no formulas possible)
     if len(delim) == 0:
         return content
@@ -718,48 +1148,26 @@ def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpre
 
     # Setup interpreter environment
     if interpreter.lower() == "python":
-        # Create execution environment
-        env = dict(input_variables)  # Start with variable values
-
-        # Execute context lines (collect them first to handle multi-line functions)
-        if context_lines:
-            # Find minimum indentation for proper dedenting
-            non_empty_lines = [line for line in context_lines if line.strip()]
-            if non_empty_lines:
-                min_indent = min(len(line) - len(line.lstrip()) for line in non_empty_lines if line.strip())
-                dedented_lines = []
-                for line in context_lines:
-                    if line.strip():  # Non-empty line
-                        dedented_lines.append(line[min_indent:] if len(line) > min_indent else line.lstrip())
-                    else:  # Empty line
-                        dedented_lines.append("")
-
-                full_context = "\n".join(dedented_lines)
-                try:
-                    exec(full_context, env)
-                except Exception as e:
-                    print(f"Warning: Error executing full context: {e}")
-                    # Try line by line if full context fails
-                    for context_line in dedented_lines:
-                        if context_line.strip():
-                            try:
-                                exec(context_line, env)
-                            except Exception as e:
-                                print(f"Warning: Error executing context line '{context_line}': {e}")
+        # Create execution environment: variable values, then the context lines
+        # (executed once per run and shared when they do not use the variables)
+        env = _formula_namespace(context_lines, input_variables, context_cache)
 
         # Find and evaluate formulas
-        esc_formulaprefix = re.escape(formulaprefix)
-        esc_left = re.escape(left_delim)
-        esc_right = re.escape(right_delim)
-
-        # Use a more sophisticated pattern to handle nested parentheses
-        if left_delim == '(' and right_delim == ')':
-            formula_pattern = rf"{esc_formulaprefix}\(([^()]*(?:\([^()]*\)[^()]*)*)\)"
-        else:
-            formula_pattern = rf"{esc_formulaprefix}{esc_left}([^{esc_right}]+){esc_right}"
+        formula_pattern = _formula_pattern(formulaprefix, left_delim, right_delim)
 
         def replace_formula(match):
             formula = match.group(1)
+            precomputed = formula_values.get(formula) if formula_values is not None else None
+            if isinstance(precomputed, str):
+                # Value computed for all cases by precompute_formula_values()
+                return precomputed
+            if precomputed is not None:
+                # Formula compiled once: run it with this case's placeholder values
+                code, bindings, format_spec = precomputed
+                try:
+                    return _render_formula_result(eval(code, {**env, **bindings}), format_spec)
+                except Exception:
+                    pass  # evaluated again below, reporting the error as usual
             try:
                 # Handle format suffix (e.g., "expr | 0.0000" for number formatting)
                 format_spec = None
@@ -769,28 +1177,12 @@ def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpre
                     format_spec = format_spec.strip()
 
                 # Replace variables in formula with their values
-                for var, val in input_variables.items():
-                    if len(var_delim) == 2:
-                        var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(var_delim[0])}{re.escape(var)}{re.escape(var_delim[1])}'
-                        formula = re.sub(var_pattern_delim, str(val), formula)
-                    var_pattern = rf'{re.escape(varprefix)}{re.escape(var)}\b'
-                    formula = re.sub(var_pattern, str(val), formula)
+                formula = _substitute_formula_variables(formula, input_variables, varprefix, var_delim)
 
                 result = eval(formula, env)
 
                 # Apply format if specified
-                if format_spec:
-                    # Parse format like "0.0000" → 4 decimals
-                    if '.' in format_spec:
-                        decimals = len(format_spec.split('.')[1])
-                        try:
-                            return f"{float(result):.{decimals}f}"
-                        except (ValueError, TypeError):
-                            return str(result)
-                    else:
-                        return str(result)
-                else:
-                    return str(result)
+                return _render_formula_result(result, format_spec)
             except Exception as e:
                 print(f"Warning: Error evaluating formula '{formula}': {e}")
                 return match.group(0)  # Return original if evaluation fails
@@ -798,119 +1190,668 @@ def evaluate_formulas(content: str, model: Dict, input_variables: Dict, interpre
         content = re.sub(formula_pattern, replace_formula, content)
 
     elif interpreter.lower() == "r":
-        # R interpreter using rpy2
-        try:
-            from rpy2 import robjects
-            from rpy2.robjects import r
-        except Exception:
-            print("Warning: rpy2 not available. Install with: pip install rpy2")
-            print("Skipping formula evaluation")
-            return content
+        # R is not thread-safe: evaluate in the R session thread
+        from .rsession import get_r_session
+        content = get_r_session().call(
+            _evaluate_formulas_r, content, context_lines, formulaprefix, left_delim, right_delim,
+            input_variables, varprefix, var_delim, formula_values
+        )
 
-        # Create R environment with variable values
-        for var, val in input_variables.items():
-            try:
-                # Convert Python values to R
-                if isinstance(val, (int, float)):
-                    robjects.globalenv[var] = val
-                elif isinstance(val, str):
-                    robjects.globalenv[var] = val
-                elif isinstance(val, (list, tuple)):
-                    robjects.globalenv[var] = robjects.FloatVector(val)
-                else:
-                    robjects.globalenv[var] = str(val)
-            except Exception as e:
-                print(f"Warning: Error setting R variable '{var}': {e}")
-
-        # Execute context lines (function definitions, imports, etc.)
-        if context_lines:
-            # Find minimum indentation for proper dedenting
-            non_empty_lines = [line for line in context_lines if line.strip()]
-            if non_empty_lines:
-                min_indent = min(len(line) - len(line.lstrip()) for line in non_empty_lines if line.strip())
-                dedented_lines = []
-                for line in context_lines:
-                    if line.strip():  # Non-empty line
-                        dedented_lines.append(line[min_indent:] if len(line) > min_indent else line.lstrip())
-                    else:  # Empty line
-                        dedented_lines.append("")
-
-                full_context = "\n".join(dedented_lines)
-                try:
-                    r(full_context)
-                except Exception as e:
-                    print(f"Warning: Error executing R context: {e}")
-                    # Try line by line if full context fails
-                    for context_line in dedented_lines:
-                        if context_line.strip():
-                            try:
-                                r(context_line)
-                            except Exception as e:
-                                print(f"Warning: Error executing R context line '{context_line}': {e}")
+    else:
+        # For other interpreters, we'd need to implement support
+        print(f"Warning: Interpreter '{interpreter}' not yet implemented, skipping formula evaluation")
 
-        # Find and evaluate formulas
-        esc_formulaprefix = re.escape(formulaprefix)
-        esc_left = re.escape(left_delim)
-        esc_right = re.escape(right_delim)
+    return content
 
-        # Use a more sophisticated pattern to handle nested parentheses
-        if left_delim == '(' and right_delim == ')':
-            formula_pattern = rf"{esc_formulaprefix}\(([^()]*(?:\([^()]*\)[^()]*)*)\)"
-        else:
-            formula_pattern = rf"{esc_formulaprefix}{esc_left}([^{esc_right}]+){esc_right}"
 
-        def replace_formula(match):
-            formula = match.group(1)
+def _evaluate_formulas_r(content: str, context_lines: List[str], formulaprefix: str,
+                         left_delim: str, right_delim: str, input_variables: Dict,
+                         varprefix: str, var_delim: str,
+                         formula_values: Optional[Dict[str, str]] = None) -> str:
+    """R part of evaluate_formulas(), run in the R session thread"""
+    try:
+        from rpy2 import robjects
+        from rpy2.robjects import r
+    except Exception:
+        print("Warning: rpy2 not available. Install with: pip install rpy2")
+        print("Skipping formula evaluation")
+        return content
+
+    # Create R environment with variable values
+    for var, val in input_variables.items():
+        try:
+            # Convert Python values to R
+            if isinstance(val, (int, float)):
+                robjects.globalenv[var] = val
+            elif isinstance(val, str):
+                robjects.globalenv[var] = val
+            elif isinstance(val, (list, tuple)):
+                robjects.globalenv[var] = robjects.FloatVector(val)
+            else:
+                robjects.globalenv[var] = str(val)
+        except Exception as e:
+            print(f"Warning: Error setting R variable '{var}': {e}")
+
+    # Execute context lines (function definitions, imports, etc.)
+    if context_lines:
+        # Find minimum indentation for proper dedenting
+        non_empty_lines = [line for line in context_lines if line.strip()]
+        if non_empty_lines:
+            min_indent = min(len(line) - len(line.lstrip()) for line in non_empty_lines if line.strip())
+            dedented_lines = []
+            for line in context_lines:
+                if line.strip():  # Non-empty line
+                    dedented_lines.append(line[min_indent:] if len(line) > min_indent else line.lstrip())
+                else:  # Empty line
+                    dedented_lines.append("")
+
+            full_context = "\n".join(dedented_lines)
             try:
-                # Handle format suffix (e.g., "expr|0.0000" for number formatting)
-                format_spec = None
-                if '|' in formula:
-                    formula, format_spec = formula.split('|', 1)
-                    formula = formula.strip()
-                    format_spec = format_spec.strip()
-                
-                # Replace variables in formula with their values (R uses variable names directly)
-                # So we just remove the varprefix for R
-                r_formula = formula
-                for var in input_variables.keys():
-                    if len(var_delim) == 2:
-                        var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(var_delim[0])}{re.escape(var)}{re.escape(var_delim[1])}'
-                        r_formula = re.sub(var_pattern_delim, var, r_formula)
-                    var_pattern = rf'{re.escape(varprefix)}{re.escape(var)}\b'
-                    r_formula = re.sub(var_pattern, var, r_formula)
-
-                # Evaluate using R
-                result = r(r_formula)
-                # Convert R result to Python
-                if hasattr(result, '__len__') and len(result) == 1:
-                    value = result[0]
-                else:
-                    value = result if not (hasattr(result, '__len__') and len(result) == 0) else result
-                
-                # Apply format if specified
-                if format_spec:
-                    # Parse format like "0.0000" → 4 decimals
-                    if '.' in format_spec:
-                        decimals = len(format_spec.split('.')[1])
+                r(full_context)
+            except Exception as e:
+                print(f"Warning: Error executing R context: {e}")
+                # Try line by line if full context fails
+                for context_line in dedented_lines:
+                    if context_line.strip():
                         try:
-                            return f"{float(value):.{decimals}f}"
-                        except (ValueError, TypeError):
-                            return str(value)
-                    else:
+                            r(context_line)
+                        except Exception as e:
+                            print(f"Warning: Error executing R context line '{context_line}': {e}")
+
+    # Find and evaluate formulas
+    formula_pattern = _formula_pattern(formulaprefix, left_delim, right_delim)
+
+    def replace_formula(match):
+        formula = match.group(1)
+        if formula_values is not None and formula in formula_values:
+            # Value computed for all cases by precompute_formula_values()
+            return formula_values[formula]
+        try:
+            # Handle format suffix (e.g., "expr|0.0000" for number formatting)
+            format_spec = None
+            if '|' in formula:
+                formula, format_spec = formula.split('|', 1)
+                formula = formula.strip()
+                format_spec = format_spec.strip()
+
+            # Replace variables in formula with their values (R uses variable names directly)
+            # So we just remove the varprefix for R
+            r_formula = _substitute_formula_variables(
+                formula, {var: var for var in input_variables}, varprefix, var_delim
+            )
+
+            # Evaluate using R
+            result = r(r_formula)
+            # Convert R result to Python
+            if hasattr(result, '__len__') and len(result) == 1:
+                value = result[0]
+            else:
+                value = result if not (hasattr(result, '__len__') and len(result) == 0) else result
+
+            # Apply format if specified
+            if format_spec:
+                # Parse format like "0.0000" → 4 decimals
+                if '.' in format_spec:
+                    decimals = len(format_spec.split('.')[1])
+                    try:
+                        return f"{float(value):.{decimals}f}"
+                    except (ValueError, TypeError):
                         return str(value)
                 else:
                     return str(value)
-            except Exception as e:
-                print(f"Warning: Error evaluating R formula '{formula}': {e}")
-                return match.group(0)  # Return original if evaluation fails
+            else:
+                return str(value)
+        except Exception as e:
+            print(f"Warning: Error evaluating R formula '{formula}': {e}")
+            return match.group(0)  # Return original if evaluation fails
 
-        content = re.sub(formula_pattern, replace_formula, content)
+    content = re.sub(formula_pattern, replace_formula, content)
+
+    return content
+
+
+# Batch evaluation of Python formulas over all the cases of a design.
+#
+# evaluate_formulas() evaluates a formula from its text after variable
+# substitution ("2 * 1.5"), which differs for every case and therefore has to
+# be compiled again each time. precompute_formula_values() parses a formula
+# once with its variable references turned into placeholder names, so that
+# the same tree can be evaluated over the value columns of all cases.
+
+#: Binary operators applied to whole columns. On object arrays numpy calls
+#: the Python operator for each element, so results are those of eval().
+_BATCH_BINARY_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_BATCH_UNARY_OPERATORS = {ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+#: Operators giving bit-identical results on float64 arrays and Python floats
+_FLOAT64_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+
+#: Pure builtins that may be called once per element of a column
+_BATCH_BUILTINS = {abs, round, min, max, int, float, complex, bool, pow, divmod}
+
+_BATCH_NUMBER_TYPES = (int, float, complex, bool)
+
+#: str() of a variable value that the Python parser reads back as a number
+_SUBSTITUTED_INT = re.compile(r"-?(?:0|[1-9][0-9]*)\Z")
+_SUBSTITUTED_FLOAT = re.compile(r"-?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))(?:[eE][+-]?[0-9]+)?\Z")
+
+_BATCH_PLACEHOLDER = "_fz_batch_var_"
+
+
+class _NotBatchable(Exception):
+    """Raised when a formula cannot be evaluated over all cases at once"""
+
+
+def _substituted_number(value: Any, text: str) -> Union[int, float, bool]:
+    """
+    Value a formula sees where text, the str() of a variable value, has been
+    substituted. Raises _NotBatchable unless text is a plain number or boolean.
+    """
+    if type(value) in (int, bool) or (type(value) is float and math.isfinite(value)):
+        return value  # str() reads back exactly
+    if _SUBSTITUTED_INT.match(text):
+        return int(text)
+    if _SUBSTITUTED_FLOAT.match(text):
+        return float(text)
+    if text in ("True", "False"):
+        return text == "True"
+    raise _NotBatchable(text)
+
+
+def _object_column(values: List[Any]):
+    """1-d numpy object array holding values as they are"""
+    import numpy as np
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def _is_batch_pure(func: Any) -> bool:
+    """Whether func may be called for all cases at once, out of the per-case order"""
+    import numpy as np
+    if isinstance(func, np.ufunc):
+        return True
+    if getattr(func, "__module__", None) in ("math", "cmath"):
+        return True
+    try:
+        return func in _BATCH_BUILTINS
+    except TypeError:  # unhashable
+        return False
+
+
+class _FormulaBatch:
+    """
+    One formula of a template, parsed and compiled once for all cases.
+
+    Variable references ($x, $(x)) are replaced by placeholder names bound to
+    the number the substituted text denotes; bare variable names keep their
+    raw values, as in the per-case namespace. evaluate() returns for each
+    case either the rendered value, computed on whole columns (float64
+    arrays for plain arithmetic on floats, object arrays otherwise), or the
+    compiled code with its placeholder bindings, for evaluate_formulas() to
+    run in the case's own namespace.
+    """
+
+    def __init__(self, template: List[str], references: List[str], placeholders: Dict[str, str],
+                 expression: str, format_spec: Optional[str], var_combinations: List[Dict],
+                 namespace: Dict, namespace_is_constant: bool):
+        self.template = template
+        self.references = references
+        self.format_spec = format_spec
+        self.var_combinations = var_combinations
+        self.namespace = namespace
+        self.namespace_is_constant = namespace_is_constant
+        self.n = len(var_combinations)
+
+        self.texts = {}
+        self.columns = {}
+        negative = set()
+        for name, placeholder in placeholders.items():
+            values = [case[name] for case in var_combinations]
+            texts = [str(value) for value in values]
+            self.texts[name] = texts
+            self.columns[placeholder] = [_substituted_number(v, t) for v, t in zip(values, texts)]
+            if any(text.startswith("-") for text in texts):
+                negative.add(placeholder)
+
+        try:
+            self.tree = ast.parse(expression, mode="eval")
+        except SyntaxError:
+            raise _NotBatchable(expression)
+        self._check_placeholders(negative, len(references))
+        self.code = compile(self.tree, "<formula>", "eval")
+
+    def _check_placeholders(self, negative: Set[str], count: int) -> None:
+        """
+        Reject trees where a placeholder does not parse like the number it
+        stands for: inside a string literal, glued to other characters
+        ("$(x)e3" is another name), "$x.real" or "$x[0]" (not valid on a
+        literal), and a negative value split by "**" ("-2**2" is -4).
+        """
+        found = 0
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Name) and node.id.startswith(_BATCH_PLACEHOLDER):
+                if node.id not in self.columns:
+                    raise _NotBatchable(node.id)
+                found += 1
+            operand = None
+            if isinstance(node, (ast.Attribute, ast.Subscript)):
+                operand = node.value
+            elif isinstance(node, ast.Call):
+                operand = node.func
+            elif isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow) and \
+                    isinstance(node.left, ast.Name) and node.left.id in negative:
+                operand = node.left
+            if isinstance(operand, ast.Name) and operand.id in self.columns:
+                raise _NotBatchable(operand.id)
+        if found != count:
+            raise _NotBatchable("placeholder outside of a name")
+
+    def keys(self) -> List[str]:
+        """Formula text of each case, as found after variable substitution"""
+        return _formula_keys(self.template, self.references, self.texts, self.n)
+
+    def evaluate(self) -> List[Union[str, tuple]]:
+        """Rendered value, or (code, bindings, format_spec), for each case"""
+        import numpy as np
+
+        values = None
+        try:
+            with np.errstate(all="ignore"):
+                self._invalid = np.zeros(self.n, dtype=bool)
+                result, is_float = self._float64(self.tree.body)
+            if not is_float or np.ndim(result) == 0:
+                raise _NotBatchable("not a float column")
+            valid = np.isfinite(result) & ~self._invalid
+            values = result.tolist()
+        except _NotBatchable:
+            try:
+                result = self._objects(self.tree.body)
+                values = result.tolist() if isinstance(result, np.ndarray) else [result] * self.n
+                valid = [True] * self.n
+            except Exception:
+                values = None
+
+        entries = []
+        for i in range(self.n):
+            if values is not None and valid[i]:
+                try:
+                    entries.append(_render_formula_result(values[i], self.format_spec))
+                    continue
+                except Exception:
+                    pass
+            bindings = {placeholder: column[i] for placeholder, column in self.columns.items()}
+            entries.append((self.code, bindings, self.format_spec))
+        return entries
+
+    def _lookup(self, node: ast.AST) -> Any:
+        """Object a non-variable Name or attribute chain refers to"""
+        if not self.namespace_is_constant:
+            raise _NotBatchable("namespace may change between cases")
+        if isinstance(node, ast.Attribute):
+            try:
+                return getattr(self._lookup(node.value), node.attr)
+            except AttributeError:
+                raise _NotBatchable(node.attr)
+        if not isinstance(node, ast.Name) or node.id in self.columns or node.id in self.var_combinations[0]:
+            raise _NotBatchable(ast.dump(node))
+        if node.id in self.namespace:
+            return self.namespace[node.id]
+        if hasattr(builtins, node.id):
+            return getattr(builtins, node.id)
+        raise _NotBatchable(node.id)
+
+    def _column(self, node: ast.Name) -> Optional[List[Any]]:
+        """Values of a placeholder or bare variable name for all cases, None for other names"""
+        if node.id in self.columns:
+            return self.columns[node.id]
+        if node.id in self.var_combinations[0]:
+            return [case[node.id] for case in self.var_combinations]
+        return None
+
+    def _float64(self, node: ast.AST) -> tuple:
+        """(value, is_float) of +-*/ arithmetic on float columns, as float64 arrays"""
+        import numpy as np
+
+        if isinstance(node, ast.Constant) or isinstance(node, (ast.Name, ast.Attribute)):
+            if isinstance(node, ast.Constant):
+                value = node.value
+            else:
+                column = self._column(node) if isinstance(node, ast.Name) else None
+                if column is not None:
+                    if not all(type(v) is float for v in column):
+                        raise _NotBatchable("not a float column")
+                    return np.array(column, dtype=np.float64), True
+                value = self._lookup(node)
+            if type(value) is float:
+                return value, True
+            if type(value) is int and abs(value) <= 2 ** 53:
+                return value, False
+            raise _NotBatchable(repr(value))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _BATCH_UNARY_OPERATORS:
+            value, is_float = self._float64(node.operand)
+            return _BATCH_UNARY_OPERATORS[type(node.op)](value), is_float
+        if isinstance(node, ast.BinOp) and isinstance(node.op, _FLOAT64_OPERATORS):
+            left, left_float = self._float64(node.left)
+            right, right_float = self._float64(node.right)
+            if not (left_float or right_float):
+                raise _NotBatchable("integer arithmetic")
+            if isinstance(node.op, ast.Div):
+                # eval() raises ZeroDivisionError where numpy gives inf/nan
+                self._invalid |= np.equal(right, 0)
+            return _BATCH_BINARY_OPERATORS[type(node.op)](left, right), True
+        raise _NotBatchable(ast.dump(node))
+
+    def _objects(self, node: ast.AST) -> Any:
+        """Value as a Python number, or an object array with one element per case"""
+        import numpy as np
+
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, _BATCH_NUMBER_TYPES):
+                raise _NotBatchable(repr(node.value))
+            return node.value
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            column = self._column(node) if isinstance(node, ast.Name) else None
+            if column is not None:
+                if not all(isinstance(v, _BATCH_NUMBER_TYPES) for v in column):
+                    raise _NotBatchable("not a number column")
+                return _object_column(column)
+            value = self._lookup(node)
+            if not isinstance(value, _BATCH_NUMBER_TYPES):
+                raise _NotBatchable(repr(value))
+            return value
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _BATCH_UNARY_OPERATORS:
+            return _BATCH_UNARY_OPERATORS[type(node.op)](self._objects(node.operand))
+        if isinstance(node, ast.BinOp) and type(node.op) in _BATCH_BINARY_OPERATORS:
+            left = self._objects(node.left)
+            right = self._objects(node.right)
+            return _BATCH_BINARY_OPERATORS[type(node.op)](left, right)
+        if isinstance(node, ast.Call) and not node.keywords and \
+                not any(isinstance(arg, ast.Starred) for arg in node.args):
+            func = self._lookup(node.func)
+            if not _is_batch_pure(func):
+                raise _NotBatchable(repr(func))
+            args = [self._objects(arg) for arg in node.args]
+            columns = [arg if isinstance(arg, np.ndarray) else [arg] * self.n for arg in args]
+            results = [func(*case_args) for case_args in zip(*columns)] if args else [func()] * self.n
+            if not all(isinstance(v, _BATCH_NUMBER_TYPES) for v in results):
+                raise _NotBatchable(repr(func))
+            return _object_column(results)
+        raise _NotBatchable(ast.dump(node))
+
+
+def precompute_formula_values(content: str, model: Dict, var_combinations: List[Dict],
+                              interpreter: str = "python", varprefix: str = "$",
+                              var_delim: str = "()",
+                              context_cache: Optional[Dict] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Evaluate the formulas of a template for all cases at once.
+
+    Every Python formula is parsed and compiled once. Arithmetic on variables
+    is then computed on whole columns with numpy, other formulas get their
+    compiled code, run per case by evaluate_formulas(). R formulas made of
+    element-wise operations are evaluated over vectors, in one call to the R
+    session for the whole design. Only formulas whose result is guaranteed
+    to be the one of the substituted text are handled; the others (string
+    values, defaults, formulas depending on a context that uses the
+    variables, ...) are left to evaluate_formulas().
+
+    Args:
+        content: Template content, before variable substitution
+        model: Model definition dict
+        var_combinations: List of variable combinations (cases)
+        interpreter: Formula interpreter ("python" or "R")
+        varprefix: Variable prefix used to substitute the content
+        var_delim: Variable delimiters used to substitute the content
+        context_cache: Run-wide formula context cache (see evaluate_formulas)
 
+    Returns:
+        One dict per case, mapping the text of a formula after variable
+        substitution to its precomputed value, to be passed as
+        evaluate_formulas(formula_values=...). None if nothing applies.
+    """
+    formulaprefix = _get_formula_prefix(model)
+    delim = model.get("formula_delim", model.get("delim", "{}"))
+    if interpreter.lower() not in ("python", "r") or len(delim) != 2 or len(var_combinations) < 2 \
+            or formulaprefix + delim[0] not in content:
+        return None
+    # Substituted numbers must not contain prefix characters
+    if not varprefix or any(c.isalnum() or c in "+-._" for c in varprefix):
+        return None
+    names = tuple(var_combinations[0])
+    if any(tuple(case) != names for case in var_combinations) or \
+            not all(isinstance(name, str) and _WORD_NAME.fullmatch(name) for name in names):
+        return None
+    scan, hazard = _variable_scan_patterns(names, varprefix, var_delim, True)
+    if scan is None:
+        return None
+    formulas = list(dict.fromkeys(re.findall(_formula_pattern(formulaprefix, delim[0], delim[1]), content)))
+    context_lines = _formula_context_lines(content, _get_comment_char(model), formulaprefix)
+
+    if interpreter.lower() == "r":
+        templates = {}
+        for formula in formulas:
+            template = _formula_template(formula, scan, hazard, names, varprefix, _R_BATCH_PLACEHOLDER)
+            if template is not None:
+                templates[formula] = template
+        if not templates:
+            return None
+        from .rsession import get_r_session
+        return get_r_session().call(_precompute_r_formula_values, templates, context_lines,
+                                    var_combinations)
+
+    # Formulas share one namespace only when their context ignores the variables
+    dedented_lines = _dedent_context_lines(context_lines)
+    if dedented_lines:
+        if context_cache is None:
+            return None
+        namespace = _shared_context_namespace(dedented_lines, names, context_cache)
+        if namespace is None:
+            return None
+        tree = ast.parse("\n".join(dedented_lines))
+        namespace_is_constant = not any(isinstance(node, (ast.Global, ast.Nonlocal))
+                                        for node in ast.walk(tree))
     else:
-        # For other interpreters, we'd need to implement support
-        print(f"Warning: Interpreter '{interpreter}' not yet implemented, skipping formula evaluation")
+        namespace, namespace_is_constant = {}, True
 
-    return content
+    tables = [{} for _ in var_combinations]
+    for formula in formulas:
+        template = _formula_template(formula, scan, hazard, names, varprefix, _BATCH_PLACEHOLDER)
+        if template is None:
+            continue
+        try:
+            batch = _FormulaBatch(*template, var_combinations, namespace, namespace_is_constant)
+        except _NotBatchable:
+            continue
+        for table, key, entry in zip(tables, batch.keys(), batch.evaluate()):
+            table[key] = entry
+    return tables if any(tables) else None
+
+
+def _formula_template(formula: str, scan, hazard, names: tuple, varprefix: str,
+                      placeholder_prefix: str) -> Optional[tuple]:
+    """
+    Split a formula text (format suffix included) on its variable references.
+
+    Returns:
+        (template, references, placeholders, expression, format_spec): the
+        literal parts around the references, the referenced variable names,
+        a placeholder name per variable (the same in every formula), the
+        expression with references replaced by placeholders, and the format
+        suffix. None if a reference is unknown, has a default, or is glued
+        to another prefix character.
+    """
+    if hazard.search(formula):
+        return None
+    template, references = [], []
+    position = 0
+    for match in scan.finditer(formula):
+        groups = match.groupdict()
+        name = groups.get("sname") or groups.get("dname")
+        if name not in names or groups.get("default") is not None:
+            return None
+        template.append(formula[position:match.start()])
+        references.append(name)
+        position = match.end()
+    template.append(formula[position:])
+
+    placeholders = {name: placeholder_prefix + name for name in dict.fromkeys(references)}
+    expression = "".join(
+        literal + placeholders[name] for literal, name in zip(template, references)
+    ) + template[-1]
+    if any(c in expression for c in varprefix):
+        return None
+    format_spec = None
+    if '|' in expression:
+        expression, format_spec = expression.split('|', 1)
+        format_spec = format_spec.strip()
+    return template, references, placeholders, expression.strip(), format_spec
+
+
+def _formula_keys(template: List[str], references: List[str], texts: Dict[str, List[str]],
+                  n: int) -> List[str]:
+    """Formula text of each case after variable substitution, texts being the str() of the values"""
+    pattern = "{}".join(literal.replace("{", "{{").replace("}", "}}") for literal in template)
+    if not references:
+        return [pattern.format()] * n
+    rows = zip(*(texts[name] for name in references))
+    return [pattern.format(*row) for row in rows]
+
+
+_R_BATCH_PLACEHOLDER = ".fz_batch_var_"
+
+#: R function evaluating formulas over the variable columns of all cases. It
+#: returns for each formula a vector with one value per case, or NULL when the
+#: formula is not only made of element-wise base functions applied to the
+#: columns and to length-one numeric constants (it is then evaluated per case).
+_R_BATCH_FUNCTION = """
+local({
+  elementwise <- c("+", "-", "*", "/", "^", "%%", "%/%", "(", "==", "!=", "<", ">", "<=", ">=",
+                   "&", "|", "!", "exp", "log", "log10", "log2", "log1p", "expm1", "sqrt", "abs",
+                   "sin", "cos", "tan", "asin", "acos", "atan", "sinh", "cosh", "tanh", "floor",
+                   "ceiling", "trunc", "round", "signif", "pmin", "pmax", "ifelse")
+  function(context, expressions, counts, number_columns, value_columns, variables, n) {
+    if (nchar(context) > 0) {
+      used <- tryCatch(all.names(parse(text = context, keep.source = FALSE)),
+                       error = function(e) variables)
+      if (length(intersect(used, variables)) > 0) return(NULL)
+      ok <- tryCatch({ eval(parse(text = context), globalenv()); TRUE }, error = function(e) FALSE)
+      if (!ok) return(NULL)
+    }
+    columns <- c(lapply(number_columns, as.numeric), value_columns)
+    env <- list2env(columns, parent = globalenv())
+    lapply(seq_along(expressions), function(k) tryCatch({
+      expr <- parse(text = expressions[[k]], keep.source = FALSE)
+      if (length(expr) != 1) return(NULL)
+      expr <- expr[[1]]
+      symbols <- all.names(expr)
+      placeholders <- startsWith(symbols, ".fz_batch_var_")
+      if (sum(symbols[placeholders] %in% names(number_columns)) != counts[[k]] ||
+          sum(placeholders) != counts[[k]]) return(NULL)
+      functions <- setdiff(symbols, all.vars(expr))
+      if (!all(functions %in% elementwise)) return(NULL)
+      for (f in functions) {
+        if (!identical(get(f, envir = globalenv()), get(f, envir = baseenv()))) return(NULL)
+      }
+      for (v in setdiff(all.vars(expr), names(columns))) {
+        if (v %in% variables) return(NULL)
+        value <- get(v, envir = globalenv())
+        if (!(is.numeric(value) || is.logical(value)) || length(value) != 1) return(NULL)
+      }
+      value <- eval(expr, env)
+      if (!(is.numeric(value) || is.logical(value)) || !(length(value) %in% c(1, n))) return(NULL)
+      rep_len(as.vector(value), n)
+    }, error = function(e) NULL, warning = function(w) NULL))
+  }
+})
+"""
+
+_r_batch_function = None
+
+
+def _r_value_column(values: List[Any]):
+    """R vector holding a variable's values as evaluate_formulas() assigns them, or None"""
+    from rpy2 import robjects
+    kinds = {type(value) for value in values}
+    if kinds == {bool}:
+        return robjects.BoolVector(values)
+    if kinds == {int} and all(-2 ** 31 < value < 2 ** 31 for value in values):
+        return robjects.IntVector(values)
+    if kinds == {float}:
+        return robjects.FloatVector(values)
+    if kinds == {str}:
+        return robjects.StrVector(values)
+    return None
+
+
+def _precompute_r_formula_values(templates: Dict[str, tuple], context_lines: List[str],
+                                 var_combinations: List[Dict]) -> Optional[List[Dict[str, str]]]:
+    """R part of precompute_formula_values(), run in the R session thread"""
+    global _r_batch_function
+    try:
+        from rpy2 import robjects
+    except Exception:
+        return None
+    if _r_batch_function is None:
+        _r_batch_function = robjects.r(_R_BATCH_FUNCTION)
+
+    n = len(var_combinations)
+    names = list(var_combinations[0])
+    values = {name: [case[name] for case in var_combinations] for name in names}
+    texts = {name: [str(value) for value in column] for name, column in values.items()}
+
+    # $-references are evaluated from their text, as R parses it once substituted
+    usable = {}
+    for formula, (template, references, placeholders, expression, format_spec) in templates.items():
+        numeric = all(
+            all(_SUBSTITUTED_INT.match(t) or _SUBSTITUTED_FLOAT.match(t) for t in texts[name])
+            for name in placeholders
+        )
+        # "-2^2" is -4: a negative value must not be the base of a power
+        split_power = any(
+            literal.lstrip().startswith(("^", "**")) and any(t.startswith("-") for t in texts[name])
+            for name, literal in zip(references, template[1:])
+        )
+        if numeric and not split_power:
+            usable[formula] = (template, references, placeholders, expression, format_spec)
+    if not usable:
+        return None
+
+    number_columns = {}
+    for template, references, placeholders, expression, format_spec in usable.values():
+        for name, placeholder in placeholders.items():
+            number_columns[placeholder] = robjects.StrVector(texts[name])
+    value_columns = {}
+    for name in names:
+        column = _r_value_column(values[name])
+        if column is not None:
+            value_columns[name] = column
+
+    def r_list(items):
+        return robjects.ListVector(items) if items else robjects.r("list()")
+
+    context = "\n".join(_dedent_context_lines(context_lines))
+    results = _r_batch_function(
+        context,
+        robjects.StrVector([entry[3] for entry in usable.values()]),
+        robjects.IntVector([len(entry[1]) for entry in usable.values()]),
+        r_list(number_columns), r_list(value_columns), robjects.StrVector(names), n,
+    )
+    if len(results) != len(usable):
+        return None
+
+    tables = [{} for _ in var_combinations]
+    for (template, references, placeholders, expression, format_spec), result in zip(usable.values(), results):
+        if len(result) != n:
+            continue
+        keys = _formula_keys(template, references, texts, n)
+        for table, key, value in zip(tables, keys, list(result)):
+            table[key] = _render_formula_result(value, format_spec)
+    return tables if any(tables) else None
 
 
 def cast_output(value: str) -> Any:
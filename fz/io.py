@@ -9,7 +9,7 @@ import hashlib
 from pathlib import Path
 from typing import Dict, List, Optional, Any, TYPE_CHECKING
 
-from .logging import log_info, log_warning
+from .logging import log_debug, log_info, log_warning
 from datetime import datetime
 
 if TYPE_CHECKING:
@@ -50,6 +50,34 @@ def ensure_unique_directory(directory_path: Path) -> tuple[Path, Optional[Path]]
     return directory_path, new_path
 
 
+#: (device, inode, size, mtime_ns) -> MD5 of the files linked in several places
+_linked_file_hashes: Dict[tuple, str] = {}
+
+
+def _file_md5(file_path: Path) -> str:
+    """
+    MD5 checksum of a file
+
+    Files hard linked in several directories (shared inputs of the cases of
+    a run) are hashed once: their checksum is kept by inode, size and
+    modification time.
+    """
+    stat = file_path.stat()
+    key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns) if stat.st_nlink > 1 else None
+    if key is not None and key in _linked_file_hashes:
+        return _linked_file_hashes[key]
+
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    file_hash = hasher.hexdigest()
+
+    if key is not None:
+        _linked_file_hashes[key] = file_hash
+    return file_hash
+
+
 def create_hash_file(directory: Path, input_files_order: List[str] = None) -> None:
     """
     Create .fz_hash file containing MD5 checksums of all files in the directory
@@ -74,12 +102,7 @@ def create_hash_file(directory: Path, input_files_order: List[str] = None) -> No
             if file_path.exists() and file_path.is_file():
                 try:
                     # Calculate MD5 hash of file content
-                    hasher = hashlib.md5()
-                    with open(file_path, 'rb') as f:
-                        for chunk in iter(lambda: f.read(4096), b""):
-                            hasher.update(chunk)
-
-                    file_hash = hasher.hexdigest()
+                    file_hash = _file_md5(file_path)
                     hash_content.append(f"{file_hash}  {rel_path_str}")
                     processed_files.add(file_path)
 
@@ -94,12 +117,7 @@ def create_hash_file(directory: Path, input_files_order: List[str] = None) -> No
     for file_path in remaining_files:
         try:
             # Calculate MD5 hash of file content
-            hasher = hashlib.md5()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hasher.update(chunk)
-
-            file_hash = hasher.hexdigest()
+            file_hash = _file_md5(file_path)
             # Use relative path for consistent hashes across different locations
             rel_path = file_path.name
             hash_content.append(f"{file_hash}  {rel_path}")
@@ -229,6 +247,238 @@ def find_cache_match(cache_base_path: Path, current_hash_file: Path) -> Optional
     return None
 
 
+#: Output command results computed on a remote host, stored in the case directory
+REMOTE_OUTPUT_FILE = ".fz_remote_output.json"
+
+
+def save_remote_outputs(directory: Path, outputs: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Store the results of output commands run on a remote host.
+
+    Args:
+        directory: Case directory
+        outputs: Dict mapping output name to {"command", "returncode", "stdout", "stderr"}
+    """
+    with open(Path(directory) / REMOTE_OUTPUT_FILE, "w") as f:
+        json.dump(outputs, f, indent=1)
+
+
+def load_remote_outputs(directory: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the output command results computed on a remote host, if any.
+
+    Returns:
+        Dict mapping output name to {"command", "returncode", "stdout", "stderr"}
+        (empty if the directory has none or the file is unreadable)
+    """
+    remote_file = Path(directory) / REMOTE_OUTPUT_FILE
+    if not remote_file.is_file():
+        return {}
+    try:
+        with open(remote_file) as f:
+            outputs = json.load(f)
+    except (OSError, ValueError) as e:
+        log_warning(f"⚠️  Ignoring unreadable {remote_file}: {e}")
+        return {}
+    return outputs if isinstance(outputs, dict) else {}
+
+
+#: Format version of the incremental fzo manifest (bump on layout change)
+FZO_MANIFEST_VERSION = 3
+
+
+def directory_signature(directory: Path, exclude: Optional[Path] = None) -> tuple:
+    """
+    Snapshot of a result directory's files, used to detect changes cheaply.
+
+    Args:
+        directory: Directory to scan (recursively)
+        exclude: Optional file to leave out (e.g. a manifest stored inside)
+
+    Returns:
+        Sorted tuple of (relative path, mtime in ns, size) for every file
+    """
+    entries = []
+    pending = [(directory, "")]
+    while pending:
+        current, prefix = pending.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    rel = f"{prefix}{entry.name}"
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((entry.path, f"{rel}/"))
+                            continue
+                        if exclude is not None and entry.path == str(exclude):
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        # File vanished while scanning (running case)
+                        continue
+                    entries.append((rel, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            continue
+    return tuple(sorted(entries))
+
+
+def output_spec_fingerprint(output_spec: Dict[str, Any]) -> str:
+    """
+    Stable text identifying a model's output definitions.
+
+    Callables are identified by their qualified name, so editing a
+    callable's body without renaming it is not detected.
+    """
+    parts = []
+    for key, command in output_spec.items():
+        if callable(command):
+            command = f"callable:{getattr(command, '__module__', '')}.{getattr(command, '__qualname__', repr(command))}"
+        parts.append(f"{key}\0{command}")
+    return hashlib.md5("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _to_json_value(value: Any, path: list, nans: list) -> Any:
+    """
+    Convert a parsed output value to plain JSON types.
+
+    numpy scalars become Python numbers and NaN becomes None, its position
+    being appended to nans. Raises TypeError for values that would not come
+    back unchanged (tuples, nested arrays, non-string keys, objects...).
+    """
+    import numpy as np
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        nans.append(path)
+        return None
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [_to_json_value(v, path + [i], nans) for i, v in enumerate(value)]
+    if isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _to_json_value(v, path + [k], nans) for k, v in value.items()}
+    raise TypeError(f"cannot store {type(value).__name__} values")
+
+
+def _encode_manifest_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a parsed row to a JSON manifest entry.
+
+    Returns:
+        {"row": converted row, "arrays": numpy dtype of each value that was
+        a numpy array, "nans": key paths of the NaN values outside arrays}
+    """
+    import numpy as np
+    encoded = {}
+    arrays = {}
+    nans = []
+    for key, value in row.items():
+        if isinstance(value, np.ndarray):
+            arrays[key] = value.dtype.str
+            # NaN in a float array is restored by its dtype
+            encoded[key] = _to_json_value(value.tolist(), [key], [])
+        else:
+            encoded[key] = _to_json_value(value, [key], nans)
+    return {"row": encoded, "arrays": arrays, "nans": nans}
+
+
+def _decode_manifest_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Restore the numpy arrays and NaN values of a row read from the fzo manifest."""
+    row = entry["row"]
+    arrays = entry.get("arrays", {})
+    nans = entry.get("nans", [])
+    if not arrays and not nans:
+        return row
+    import numpy as np
+    for path in nans:
+        container = row
+        for part in path[:-1]:
+            container = container[part]
+        container[path[-1]] = float("nan")
+    for key, dtype in arrays.items():
+        row[key] = np.asarray(row[key], dtype=np.dtype(dtype))
+    return row
+
+
+def load_fzo_manifest(manifest_file: Path, fingerprint: str) -> Dict[str, Any]:
+    """
+    Load the cached per-directory results of a previous incremental fzo.
+
+    Args:
+        manifest_file: Manifest path
+        fingerprint: output_spec_fingerprint() of the current model; a
+            manifest written for other output definitions is discarded
+
+    Returns:
+        Dict mapping absolute directory path to {"signature", "row"}
+        (empty if the manifest is missing, unreadable or stale)
+    """
+    if not manifest_file.exists():
+        return {}
+    try:
+        # JSON, not pickle: a manifest shared or checked into a results tree
+        # must not be able to run code when loaded
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict) and isinstance(manifest.get("entries"), dict):
+            manifest["entries"] = {
+                path: {
+                    "signature": tuple(tuple(item) for item in entry["signature"]),
+                    "row": _decode_manifest_row(entry),
+                }
+                for path, entry in manifest["entries"].items()
+            }
+    except Exception as e:
+        log_warning(f"⚠️  Ignoring unreadable fzo manifest {manifest_file}: {e}")
+        return {}
+    if (
+        not isinstance(manifest, dict)
+        or manifest.get("version") != FZO_MANIFEST_VERSION
+        or manifest.get("output_spec") != fingerprint
+    ):
+        log_info(f"fzo manifest {manifest_file} is stale (model outputs changed), re-parsing all")
+        return {}
+    return manifest.get("entries", {})
+
+
+def save_fzo_manifest(manifest_file: Path, fingerprint: str, entries: Dict[str, Any]) -> None:
+    """
+    Write the incremental fzo manifest atomically.
+
+    Args:
+        manifest_file: Manifest path (parent directories are created)
+        fingerprint: output_spec_fingerprint() of the model
+        entries: Dict mapping absolute directory path to {"signature", "row"}.
+            numpy values are stored as plain numbers and lists and NaN as
+            null, and restored on load; entries holding other non-JSON
+            values (tuples, objects...) are left out, and re-parsed next time.
+    """
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    json_entries = {}
+    for path, entry in entries.items():
+        try:
+            json_entry = _encode_manifest_row(entry["row"])
+        except TypeError as e:
+            log_debug(f"fzo manifest: not caching {path} ({e})")
+            continue
+        json_entry["signature"] = [list(item) for item in entry["signature"]]
+        json_entries[path] = json_entry
+    manifest = {
+        "version": FZO_MANIFEST_VERSION,
+        "output_spec": fingerprint,
+        "entries": json_entries,
+    }
+    tmp_file = manifest_file.with_name(f".{manifest_file.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, manifest_file)
+    except Exception as e:
+        log_warning(f"⚠️  Could not write fzo manifest {manifest_file}: {e}")
+        if tmp_file.exists():
+            tmp_file.unlink()
+
+
 def load_aliases(name: str, alias_type: str = "models") -> Optional[Dict]:
     """Load model or calculator aliases from .fz directories"""
     search_dirs = [Path.cwd() / ".fz", Path.home() / ".fz"]
@@ -421,7 +671,8 @@ def flatten_dict_columns(df: "pandas.DataFrame") -> "pandas.DataFrame":
     - stats_basic_min: 1
     - stats_basic_max: 4
 
-    The original dict column is removed.
+    The original dict column is removed. Rows whose value is not a dict (or
+    lack some of the keys) get missing values in the new columns.
 
     Args:
         df: DataFrame potentially containing dict-valued columns
@@ -429,7 +680,6 @@ def flatten_dict_columns(df: "pandas.DataFrame") -> "pandas.DataFrame":
     Returns:
         DataFrame with dict columns recursively flattened
     """
-    
     if df.empty:
         return df
 
@@ -440,54 +690,320 @@ def flatten_dict_columns(df: "pandas.DataFrame") -> "pandas.DataFrame":
     while iteration < max_iterations:
         iteration += 1
 
-        # Track which columns contain dicts and need to be flattened
+        # Only object columns can hold dicts; sample the first non-missing value
         dict_columns = []
-
         for col in df.columns:
-            # Check if this column contains dict values
-            # Sample first non-None value to check type
-            sample_value = None
-            for val in df[col]:
-                if val is not None:
-                    sample_value = val
-                    break
-
-            if isinstance(sample_value, dict):
+            series = df[col]
+            if series.dtype != object:
+                continue
+            first_index = series.first_valid_index()
+            if first_index is not None and isinstance(series.loc[first_index], dict):
                 dict_columns.append(col)
 
         if not dict_columns:
             break  # No more dict columns to flatten
 
-        # Flatten each dict column
-        new_columns = {}
-
+        # Build all flattened columns at once: one record per row, assembled
+        # by the DataFrame constructor instead of cell by cell
+        flattened_frames = []
         for col in dict_columns:
-            # Process each row in this column
-            for row_idx, val in enumerate(df[col]):
-                if isinstance(val, dict):
-                    # Recursively flatten this dict
-                    flattened = flatten_dict_recursive(val, parent_key=col, sep='_')
-
-                    # Add flattened keys to new_columns
-                    for flat_key, flat_val in flattened.items():
-                        if flat_key not in new_columns:
-                            # Initialize column with None for all rows
-                            new_columns[flat_key] = [None] * len(df)
-                        new_columns[flat_key][row_idx] = flat_val
-
-        # Create new DataFrame with original columns plus flattened dict columns
+            records = [
+                flatten_dict_recursive(val, parent_key=col, sep='_')
+                if isinstance(val, dict) else {}
+                for val in df[col].tolist()
+            ]
+            flattened_frames.append(pd.DataFrame.from_records(records, index=df.index))
+
+        new_columns = pd.concat(flattened_frames, axis=1)
+        new_columns = new_columns.loc[:, ~new_columns.columns.duplicated(keep="last")]
+
+        # Flattened keys clashing with existing columns replace them in place,
+        # the others are appended; then drop the original dict columns
         df = df.copy()
+        existing = [c for c in new_columns.columns if c in df.columns and c not in dict_columns]
+        for col_name in existing:
+            df[col_name] = new_columns[col_name]
+        appended = new_columns.drop(columns=existing)
+        df = pd.concat([df.drop(columns=dict_columns), appended], axis=1)
+
+    return df
 
-        # Add new columns
-        for col_name, values in new_columns.items():
-            df[col_name] = values
 
-        # Drop original dict columns
-        df = df.drop(columns=dict_columns)
+#: Literals cast in bulk when parsing "key1=val1,key2=val2,..." directory names
+_INT_LITERAL = r"[+-]?[0-9]{1,18}"
+_FLOAT_LITERAL = r"[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+
+
+def _cast_dirname_value(value: str) -> Any:
+    """Cast one directory-name value: int if no '.', float otherwise, else str"""
+    try:
+        if "." not in value:
+            return int(value)
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _cast_dirname_column(values: "pandas.Series") -> "pandas.Series":
+    """
+    Cast a column of directory-name values like _cast_dirname_value, vectorized.
+
+    Plain integer and decimal literals (the overwhelming majority) are
+    converted with pd.to_numeric, values without any digit are kept as
+    strings, and anything else (exotic literals such as "1_000") falls back
+    to the scalar cast. Missing entries (a directory lacking that key) stay
+    missing.
+    """
+    present = values.notna()
+    text = values[present].astype(str)
+
+    is_int = text.str.fullmatch(_INT_LITERAL)
+    is_float = ~is_int & text.str.fullmatch(_FLOAT_LITERAL)
+    others = text[~(is_int | is_float)]
+    others = others[others.str.contains(r"[0-9]")]
+    if not (is_int | is_float).any() and others.empty:
+        # Plain strings: nothing to cast
+        return pd.Series(values.tolist(), index=values.index)
+
+    if (is_int | is_float).all() and present.all():
+        if is_int.all():
+            return pd.to_numeric(text).astype("int64")
+        return pd.to_numeric(text).astype("float64")
+
+    # Mixed or partial column: assemble Python scalars, let pandas infer dtype
+    result = pd.Series(values.tolist(), index=values.index, dtype=object)
+    if is_int.any():
+        ints = text[is_int]
+        result[ints.index] = pd.Series(pd.to_numeric(ints).tolist(), index=ints.index, dtype=object)
+    if is_float.any():
+        floats = text[is_float]
+        result[floats.index] = pd.Series(pd.to_numeric(floats).tolist(), index=floats.index, dtype=object)
+    if not others.empty:
+        result[others.index] = others.map(_cast_dirname_value)
+    # Same dtype inference as building the column from a plain list
+    return pd.Series(result.tolist(), index=values.index)
+
+
+def parse_dirname_variables(paths: "pandas.Series") -> Optional["pandas.DataFrame"]:
+    """
+    Extract input variables from "key1=val1,key2=val2,..." directory names.
+
+    Only the last path component is parsed. Values are cast to int when they
+    contain no '.', to float otherwise, and kept as strings when neither cast
+    applies. Keys appear in order of first occurrence; a directory lacking a
+    key gets a missing value.
+
+    Args:
+        paths: Series of result directory paths (one per fzo row)
+
+    Returns:
+        DataFrame of variables aligned on paths.index, or None when any
+        directory name does not follow the key=value pattern
+    """
+    if paths.empty:
+        return None
+
+    separators = re.escape(os.sep + (os.altsep or ""))
+    names = paths.astype(str).str.replace(f"^.*[{separators}]", "", regex=True)
+
+    # One entry per "key=value" part, indexed by the originating directory
+    parts = names.str.split(",").explode().astype(names.dtype)
+    if not parts.str.contains("=", regex=False).all():
+        return None
+    keys = parts.str.replace(r"(?s)=.*$", "", regex=True).str.strip()
+    values = parts.str.replace(r"(?s)^[^=]*=", "", regex=True).str.strip()
+
+    # Fast path: every directory name lists the same keys in the same order
+    # (always the case for fzr results), so the parts reshape into a table
+    n_keys = len(parts) // len(names)
+    if n_keys * len(names) == len(parts) and keys.iloc[:n_keys].is_unique:
+        key_grid = keys.to_numpy(dtype=object).reshape(len(names), n_keys)
+        if (key_grid == key_grid[0]).all():
+            value_grid = values.to_numpy(dtype=object).reshape(len(names), n_keys)
+            return pd.DataFrame(
+                {
+                    key: _cast_dirname_column(pd.Series(value_grid[:, j], index=paths.index))
+                    for j, key in enumerate(key_grid[0])
+                },
+                index=paths.index,
+            )
+
+    # General case: pivot (row, key) -> value; a key repeated within one name
+    # keeps its last value, a key absent from a name gives a missing value
+    pairs = pd.DataFrame({"row": parts.index, "key": keys.to_numpy(), "value": values.to_numpy()})
+    key_order = pairs["key"].unique().tolist()
+    pairs = pairs.drop_duplicates(subset=["row", "key"], keep="last")
+    table = pairs.pivot(index="row", columns="key", values="value")
+    table = table.reindex(index=paths.index, columns=key_order)
+
+    return pd.DataFrame(
+        {key: _cast_dirname_column(table[key]) for key in key_order},
+        index=paths.index,
+    )
+
+
+#: Storage formats for vector-valued (list) output cells in fzo/fzr DataFrames
+VECTOR_FORMATS = ("list", "numpy", "arrow")
+
+
+def resolve_vector_format(vector_format: Optional[str] = None) -> str:
+    """
+    Validate a vector storage format, falling back to FZ_VECTOR_FORMAT.
+
+    Args:
+        vector_format: "list" (default, plain Python lists), "numpy" (one
+            numpy array per cell) or "arrow" (a pyarrow-backed list column),
+            or None to use the configured default
+
+    Returns:
+        The lowercased, validated format name
+
+    Raises:
+        ValueError: If the format is not one of VECTOR_FORMATS
+    """
+    if vector_format is None:
+        from .config import get_config
+        vector_format = get_config().vector_format
+    vector_format = str(vector_format).lower()
+    if vector_format not in VECTOR_FORMATS:
+        raise ValueError(
+            f"Invalid vector_format '{vector_format}'. "
+            f"Must be one of: {', '.join(VECTOR_FORMATS)}"
+        )
+    return vector_format
+
+
+def to_vector_cell(value: Any, vector_format: str = "list") -> Any:
+    """
+    Convert a single list-valued output to the requested vector storage.
+
+    Only numeric lists are converted: lists of strings, dicts or mixed types
+    are kept as-is, as are scalars. The conversion happens as soon as a
+    case's output is parsed, so the boxed Python floats of a long series
+    are released right away instead of accumulating over all cases.
+
+    Args:
+        value: Parsed output value
+        vector_format: "list", "numpy" or "arrow" ("arrow" columns are built
+            from numpy cells, see convert_vector_columns)
+
+    Returns:
+        A numpy array for numeric lists (unless vector_format is "list"),
+        otherwise the value unchanged
+    """
+    if vector_format == "list" or not isinstance(value, (list, tuple)):
+        return value
+    import numpy as np
+    try:
+        array = np.asarray(value)
+    except (ValueError, TypeError):
+        # Ragged nested lists cannot be a single array
+        return value
+    if array.dtype.kind not in "biuf":
+        return value
+    return array
+
+
+def _is_numeric_vector(value: Any) -> bool:
+    """Return True if value is a 1-D numeric list/tuple/numpy array."""
+    import numpy as np
+    if isinstance(value, np.ndarray):
+        return value.ndim == 1 and value.dtype.kind in "biuf"
+    if isinstance(value, (list, tuple)):
+        return all(
+            isinstance(v, (int, float, np.number)) and not isinstance(v, bool)
+            for v in value
+        )
+    return False
+
+
+def convert_vector_columns(df: "pandas.DataFrame", vector_format: str = "list") -> "pandas.DataFrame":
+    """
+    Store vector-valued (list) output columns as numpy arrays or Arrow lists.
+
+    - "list": unchanged, one Python list per cell (legacy behavior)
+    - "numpy": one numpy array per cell (ragged lengths allowed)
+    - "arrow": a ``pd.ArrowDtype(pa.list_(...))`` column, i.e. one contiguous
+      Arrow buffer for the whole column, written by ``to_parquet`` without
+      conversion. Requires the optional ``pyarrow`` dependency. Columns
+      whose cells are not all 1-D numeric vectors fall back to numpy cells.
+
+    Args:
+        df: fzo/fzr result DataFrame
+        vector_format: "list", "numpy" or "arrow"
+
+    Returns:
+        DataFrame with vector columns converted
+    """
+    if vector_format == "list" or df.empty:
+        return df
+
+    import numpy as np
+    if vector_format == "arrow":
+        try:
+            import pyarrow as pa
+        except ImportError as exc:
+            raise ImportError(
+                "vector_format='arrow' requires the optional 'pyarrow' "
+                "package: pip install pyarrow"
+            ) from exc
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        first = df[col].first_valid_index()
+        if first is None:
+            continue
+        if not isinstance(df[col].loc[first], (list, tuple, np.ndarray)):
+            continue
+
+        cells = [to_vector_cell(v, "numpy") for v in df[col]]
+        if vector_format == "arrow":
+            non_null = [c for c in cells if c is not None]
+            if non_null and all(_is_numeric_vector(c) for c in non_null):
+                try:
+                    arrow_values = pa.array(cells)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    arrow_values = None
+                if arrow_values is not None:
+                    df[col] = pd.Series(
+                        arrow_values, index=df.index, dtype=pd.ArrowDtype(arrow_values.type)
+                    )
+                    continue
+        df[col] = pd.Series(cells, index=df.index, dtype=object)
 
     return df
 
 
+def vector_row(df: "pandas.DataFrame", position: int) -> "pandas.Series":
+    """
+    Return row ``position`` of a result DataFrame, with Arrow list cells as
+    numpy arrays (zero-copy when possible) instead of Python lists.
+
+    Used by fzd so that output expressions reduce Arrow-stored vectors with
+    numpy, like vectors stored with vector_format="numpy".
+    """
+    row = df.iloc[position]
+    # pandas < 2.0 has no Arrow-backed columns
+    arrow_dtype = getattr(pd, "ArrowDtype", None)
+    if arrow_dtype is None:
+        return row
+    arrow_cols = [
+        col for col in df.columns
+        if isinstance(df[col].dtype, arrow_dtype) and "list" in str(df[col].dtype)
+    ]
+    if not arrow_cols:
+        return row
+    import pyarrow as pa
+
+    row = row.astype(object)
+    for col in arrow_cols:
+        scalar = pa.array(df[col].array)[position]
+        row[col] = scalar.values.to_numpy(zero_copy_only=False) if scalar.is_valid else None
+    return row
+
+
 def get_and_process_analysis(
     algo_instance,
     all_input_vars: List[Dict[str, float]],
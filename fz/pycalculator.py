@@ -0,0 +1,125 @@
+"""
+Python functions as calculators: py://module:function
+
+A cheap Python model does not need a shell and an interpreter start per case.
+The function is imported once and called with the absolute path of each case
+directory, where it reads the compiled input files and writes its outputs,
+like a sh:// command run in that directory would. It returns None or 0 on
+success, or a nonzero exit code; an exception fails the case, with its
+traceback in the case err.txt.
+
+By default the function runs in the fz process, on the thread of the case.
+With FZ_PY_PROCESSES=N, cases run on a pool:// of N worker processes of this
+module instead (python -m fz.pycalculator module:function), which capture
+the function's prints in out.txt and err.txt and can be killed on timeout.
+"""
+import importlib
+import sys
+import threading
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Callable, Dict, TextIO, Tuple
+
+_functions: Dict[Tuple[str, str], Callable] = {}
+_functions_lock = threading.Lock()
+
+
+def parse_py_uri(py_uri: str) -> Tuple[str, str]:
+    """
+    Parse Python function URI into components
+
+    Args:
+        py_uri: Python function URI in format py://module:function
+
+    Returns:
+        Tuple of (module, function), module possibly dotted (package.module)
+    """
+    target = py_uri[5:] if py_uri.startswith("py://") else py_uri
+    module, sep, function = target.partition(":")
+    if not sep or not all(part.isidentifier() for part in module.split(".")) or not function.isidentifier():
+        raise ValueError(
+            f"Invalid Python calculator URI format: '{py_uri}'. "
+            "Expected format: py://module:function (e.g. py://mypkg.sim:run)"
+        )
+    return module, function
+
+
+def load_function(module: str, function: str, search_dir: str = None) -> Callable:
+    """
+    Import module and return its function, once per process
+
+    Args:
+        module: Module name, possibly dotted
+        function: Function name in the module
+        search_dir: Directory added to sys.path if the module is not found
+            (the directory fz was called from)
+
+    Raises:
+        ImportError: The module cannot be imported
+        AttributeError, TypeError: No such function in the module
+    """
+    key = (module, function)
+    with _functions_lock:
+        func = _functions.get(key)
+        if func is not None:
+            return func
+        try:
+            mod = importlib.import_module(module)
+        except ModuleNotFoundError as e:
+            if search_dir is None or search_dir in sys.path or e.name != module.split(".")[0]:
+                raise
+            sys.path.insert(0, search_dir)
+            mod = importlib.import_module(module)
+        func = getattr(mod, function)
+        if not callable(func):
+            raise TypeError(f"{module}.{function} is not callable")
+        _functions[key] = func
+        return func
+
+
+def call_function(func: Callable, working_dir: Path, err: TextIO = None) -> int:
+    """
+    Call func on a case directory, returning its exit code
+
+    An integer returned is the exit code, any other value means success. An
+    exception is printed to err (default sys.stderr) and gives exit code 1.
+    """
+    try:
+        result = func(Path(working_dir))
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc(file=err)
+        return 1
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    return 0
+
+
+def main(argv=None):
+    """Worker of the pool:// protocol calling module:function for each case"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python -m fz.pycalculator module:function", file=sys.stderr)
+        return 2
+    module, function = parse_py_uri(argv[0])
+    func = load_function(module, function, search_dir=str(Path.cwd()))
+    # Keep the protocol channel for fz: prints of the function go to the case files
+    protocol = sys.stdout
+    for line in sys.stdin:
+        command, _, case = line.rstrip("\n").partition(" ")
+        if command != "RUN" or not case:
+            continue
+        case_dir = Path(case)
+        # Appending, as fz also holds these files open for the stray output of the process
+        with open(case_dir / "out.txt", "a") as out, open(case_dir / "err.txt", "a") as err:
+            with redirect_stdout(out), redirect_stderr(err):
+                exit_code = call_function(func, case_dir)
+        protocol.write(f"DONE {exit_code}\n")
+        protocol.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+Single-threaded R session for fz formula evaluation
+
+rpy2 embeds one R interpreter per process, and R is not thread-safe: using it
+from several threads at once (e.g. cases compiled in worker threads) crashes
+the process. All R work of fz therefore goes through one RSession, a daemon
+thread that owns the embedded R and runs the submitted calls one at a time,
+in submission order.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class RSession:
+    """
+    Worker thread owning the embedded R interpreter
+
+    Calls submitted from any thread are queued and executed by the worker;
+    call() blocks until the result is available and re-raises exceptions in
+    the caller. A call made from the worker thread itself (a function running
+    in the session that needs another R evaluation) is executed directly.
+    """
+
+    def __init__(self, name: str = "fz-r-session"):
+        self._name = name
+        self._queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def in_session(self) -> bool:
+        """Whether the current thread is the session thread"""
+        return threading.current_thread() is self._thread
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs) for the session thread"""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in the session thread and return its result"""
+        if self.in_session():
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the session thread once the queued calls are done"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            if wait:
+                thread.join()
+
+
+_session: Optional[RSession] = None
+_session_lock = threading.Lock()
+
+
+def get_r_session() -> RSession:
+    """The process-wide R session, created on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = RSession()
+        return _session
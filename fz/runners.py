@@ -9,13 +9,22 @@ import hashlib
 import base64
 import socket
 import platform
+import re
+import shlex
+import fnmatch
+import stat
+import tarfile
 import uuid
 import threading
+import sys
+import traceback
 from collections import defaultdict
 
 from .logging import log_error, log_warning, log_info, log_debug
 from .config import get_config
 from .shell import run_command, replace_commands_in_string
+from .sshpool import get_ssh_pool, ssh_pool_key
+from .funzsession import FunzError, get_funz_sessions
 import getpass
 from datetime import datetime
 from pathlib import Path
@@ -34,7 +43,14 @@ except ImportError:
     AutoAddPolicy = None
     RejectPolicy = None
 
-from .io import load_aliases
+from .io import load_aliases, save_remote_outputs
+from .outparsers import (
+    is_python_expression,
+    is_jq_expression,
+    is_yq_expression,
+    is_xpath_expression,
+    strip_bash_prefix,
+)
 
 
 def _classify_sh_error(stderr: str, exit_code: int, command: str) -> Optional[str]:
@@ -1116,6 +1132,36 @@ def parse_slurm_uri(slurm_uri: str) -> Tuple[Optional[str], Optional[int], Optio
     return host, port, username, password, partition, script
 
 
+def parse_pool_uri(pool_uri: str) -> Tuple[int, str]:
+    """
+    Parse worker pool URI into components
+
+    Args:
+        pool_uri: Worker pool URI in format pool://N/command
+
+    Returns:
+        Tuple of (size, command)
+        - size is the number of worker processes (N >= 1)
+        - command is the shell command starting a worker
+    """
+    uri_part = pool_uri[7:] if pool_uri.startswith("pool://") else pool_uri
+    size_part, _, command = uri_part.partition("/")
+    try:
+        size = int(size_part)
+    except ValueError:
+        raise ValueError(
+            f"Invalid pool URI format: '{pool_uri}'. "
+            "Expected format: pool://N/command, N being the number of workers"
+        )
+    if size < 1:
+        raise ValueError(f"Invalid pool URI: number of workers must be at least 1, got {size}")
+    if not command.strip():
+        raise ValueError(
+            f"Invalid pool URI: command is required. Expected format: pool://N/command"
+        )
+    return size, command
+
+
 def _validate_calculator_uri(calculator_uri: str) -> None:
     """
     Validate calculator URI format and scheme
@@ -1142,7 +1188,7 @@ def _validate_calculator_uri(calculator_uri: str) -> None:
 
     # Extract and validate scheme
     scheme = calculator_uri.split("://", 1)[0].lower()
-    supported_schemes = ["sh", "ssh", "cache", "slurm", "funz"]
+    supported_schemes = ["sh", "ssh", "cache", "slurm", "funz", "pool", "py"]
 
     if scheme not in supported_schemes:
         raise ValueError(
@@ -1164,6 +1210,15 @@ def _validate_calculator_uri(calculator_uri: str) -> None:
         except ValueError as e:
             raise ValueError(f"Invalid SLURM calculator URI: {e}")
 
+    # Validate worker pool URI format if scheme is pool
+    if scheme == "pool":
+        parse_pool_uri(calculator_uri)
+
+    # Validate Python function URI format if scheme is py
+    if scheme == "py":
+        from .pycalculator import parse_py_uri
+        parse_py_uri(calculator_uri)
+
 
 def resolve_calculators(
     calculators: Union[str, List[str], List[Dict]], model_id: str = None
@@ -1254,7 +1309,8 @@ def run_calculation(
 
     Args:
         working_dir: Directory containing input files
-        calculator_uri: Calculator URI (e.g., "sh://command", "ssh://host/command", "slurm://partition/script")
+        calculator_uri: Calculator URI (e.g., "sh://command", "ssh://host/command", "slurm://partition/script",
+            "pool://4/command", "py://module:function")
         model: Model definition dict
         timeout: Timeout in seconds (None uses FZ_RUN_TIMEOUT from config, default 600)
         original_input_was_dir: Whether original input was a directory
@@ -1304,6 +1360,18 @@ def run_calculation(
             working_dir, base_uri, model, timeout, input_files_list
         )
 
+    elif base_uri.startswith("pool://"):
+        # Long-lived local worker processes
+        return run_pool_calculation(
+            working_dir, base_uri, model, timeout, original_cwd
+        )
+
+    elif base_uri.startswith("py://"):
+        # Python function called on the case directory
+        return run_py_calculation(
+            working_dir, base_uri, model, timeout, original_cwd
+        )
+
     else:
         # Default to local shell
         return run_local_calculation(
@@ -1796,6 +1864,395 @@ def run_local_calculation(
         os.chdir(original_cwd)
 
 
+def run_pool_calculation(
+    working_dir: Path,
+    pool_uri: str,
+    model: Dict,
+    timeout: int = None,
+    original_cwd: str = None,
+) -> Dict[str, Any]:
+    """
+    Run calculation on a long-lived local worker process (see fz/workerpool.py)
+
+    Args:
+        working_dir: Directory containing input files
+        pool_uri: Worker pool URI (e.g., "pool://4/python worker.py")
+        model: Model definition dict
+        timeout: Timeout in seconds (None uses FZ_RUN_TIMEOUT from config, default 600)
+        original_cwd: Original working directory, where the workers start
+
+    Returns:
+        Dict containing calculation results and status
+    """
+    from .core import is_interrupted
+    from .workerpool import get_worker_pool
+
+    if timeout is None:
+        timeout = get_config().run_timeout
+    if original_cwd is None:
+        original_cwd = os.getcwd()
+
+    if is_interrupted():
+        return {
+            "status": "interrupted",
+            "error": "Execution interrupted by user",
+            "command": pool_uri,
+        }
+
+    working_dir = Path(working_dir).resolve()
+    try:
+        size, command = parse_pool_uri(pool_uri)
+    except ValueError as e:
+        return {"status": "error", "error": str(e), "command": pool_uri}
+
+    # Workers outlive the case, so resolve their paths like sh:// does
+    resolved_command, _ = resolve_all_paths_in_command(command.replace("\\", "/"), original_cwd)
+    resolved_command = replace_commands_in_string(resolved_command)
+    pool = get_worker_pool(resolved_command, size, original_cwd)
+
+    log_info(f"Info: Running case on pool worker: {resolved_command}")
+    return _run_in_process_case(
+        working_dir, lambda: pool.run(working_dir, timeout), model, timeout, original_cwd,
+        command=resolved_command, log_command=f"pool://{size}/{resolved_command}", calculator="pool://",
+    )
+
+
+def run_py_calculation(
+    working_dir: Path,
+    py_uri: str,
+    model: Dict,
+    timeout: int = None,
+    original_cwd: str = None,
+) -> Dict[str, Any]:
+    """
+    Run calculation by calling a Python function on the case directory (see fz/pycalculator.py)
+
+    Args:
+        working_dir: Directory containing input files
+        py_uri: Python function URI (e.g., "py://mypkg.sim:run")
+        model: Model definition dict
+        timeout: Timeout in seconds (None uses FZ_RUN_TIMEOUT from config, default 600),
+            only enforced with FZ_PY_PROCESSES > 0
+        original_cwd: Original working directory, where the module is searched
+
+    Returns:
+        Dict containing calculation results and status
+    """
+    from .core import is_interrupted
+    from .pycalculator import call_function, load_function, parse_py_uri
+    from .workerpool import get_worker_pool
+
+    if timeout is None:
+        timeout = get_config().run_timeout
+    if original_cwd is None:
+        original_cwd = os.getcwd()
+
+    if is_interrupted():
+        return {
+            "status": "interrupted",
+            "error": "Execution interrupted by user",
+            "command": py_uri,
+        }
+
+    working_dir = Path(working_dir).resolve()
+    try:
+        module, function = parse_py_uri(py_uri)
+    except ValueError as e:
+        return {"status": "error", "error": str(e), "command": py_uri}
+    target = f"{module}:{function}"
+
+    processes = get_config().py_processes
+    if processes > 0:
+        # Worker processes of fz.pycalculator, speaking the pool:// protocol
+        command = f"{shlex.quote(sys.executable)} -m fz.pycalculator {target}"
+        pool = get_worker_pool(command, processes, original_cwd)
+        run = lambda: pool.run(working_dir, timeout)
+    else:
+        def run():
+            with open(working_dir / "out.txt", "w"), open(working_dir / "err.txt", "w") as err_file:
+                try:
+                    func = load_function(module, function, search_dir=original_cwd)
+                except Exception:
+                    traceback.print_exc(file=err_file)
+                    return 1
+                return call_function(func, working_dir, err_file)
+
+    log_info(f"Info: Calling Python function {target}")
+    return _run_in_process_case(
+        working_dir, run, model, timeout, original_cwd,
+        command=target, log_command=py_uri, calculator="py://",
+    )
+
+
+def _run_in_process_case(
+    working_dir: Path,
+    run: Callable[[], int],
+    model: Dict,
+    timeout: int,
+    original_cwd: str,
+    command: str,
+    log_command: str,
+    calculator: str,
+) -> Dict[str, Any]:
+    """
+    Run a case of a pool:// or py:// calculator and build its result like sh:// does
+
+    Args:
+        working_dir: Absolute case directory
+        run: Runs the case, writing out.txt and err.txt, and returns its exit code
+        model: Model definition dict
+        timeout: Timeout in seconds, for the error message
+        original_cwd: Original working directory
+        command: Command reported in the result
+        log_command: Command written in log.txt
+        calculator: Calculator reported in the result
+
+    Returns:
+        Dict containing calculation results and status
+    """
+    from .core import fzo
+    from .workerpool import WorkerExited
+
+    start_time = datetime.now()
+    env_info = get_environment_info()
+
+    try:
+        exit_code = run()
+    except WorkerExited as e:
+        exit_code = e.exit_code
+    except subprocess.TimeoutExpired:
+        return {
+            "status": "timeout",
+            "error": f"Command timed out after {timeout} seconds: '{command}'",
+            "command": command,
+        }
+    except KeyboardInterrupt:
+        return {
+            "status": "interrupted",
+            "error": "Calculation interrupted by user",
+            "command": command,
+        }
+    except OSError as e:
+        classified = classify_error(str(e), exit_code=getattr(e, 'errno', None), command=command, protocol="sh")
+        return {"status": "failed", "error": classified, "command": command}
+
+    end_time = datetime.now()
+    execution_time = (end_time - start_time).total_seconds()
+
+    with open(working_dir / "log.txt", "w") as log_file:
+        log_file.write(f"Command: {log_command}\n")
+        log_file.write(f"Exit code: {exit_code}\n")
+        log_file.write(f"Time start: {start_time.isoformat()}\n")
+        log_file.write(f"Time end: {end_time.isoformat()}\n")
+        log_file.write(f"Execution time: {execution_time:.3f} seconds\n")
+        log_file.write(f"User: {env_info['user']}\n")
+        log_file.write(f"Hostname: {env_info['hostname']}\n")
+        log_file.write(f"Operating system: {env_info['operating_system']}\n")
+        log_file.write(f"Platform: {env_info['platform']}\n")
+        log_file.write(f"Working directory: {working_dir}\n")
+        log_file.write(f"Original directory: {original_cwd}\n")
+        log_file.write(f"Timestamp: {time.ctime()}\n")
+
+    if exit_code != 0:
+        stderr_content = ""
+        try:
+            stderr_content = (working_dir / "err.txt").read_text().strip()
+        except OSError:
+            pass
+        return {
+            "status": "failed",
+            "exit_code": exit_code,
+            "error": classify_error(
+                stderr=stderr_content, exit_code=exit_code, command=command, protocol="sh"
+            ),
+            "stderr": stderr_content,
+            "command": command,
+        }
+
+    output_results = fzo(working_dir, model)
+    if hasattr(output_results, "to_dict"):
+        output_dict = output_results.iloc[0].to_dict()
+    else:
+        output_dict = output_results
+
+    output_error = output_dict.pop("_output_error", None)
+    output_dict["status"] = "done"
+    output_dict["calculator"] = calculator
+    output_dict["command"] = command
+    if output_error:
+        output_dict["error"] = f"Missing output: {output_error}"
+    return output_dict
+
+
+def _open_ssh_client(host: str, port: int, username: str, password: Optional[str], timeout: int):
+    """
+    Open an authenticated SSH connection
+
+    Args:
+        host: Remote SSH host
+        port: SSH port
+        username: SSH username
+        password: SSH password (None for key-based authentication)
+        timeout: Calculation timeout in seconds (the connection timeout is at most 30 s)
+
+    Returns:
+        Connected paramiko SSHClient
+    """
+    security_info = validate_ssh_connection_security(host, username, password)
+
+    ssh_client = paramiko.SSHClient()
+
+    # Set appropriate host key policy based on authentication method
+    config = get_config()
+    host_key_policy = get_host_key_policy(
+        password_provided=security_info["password_provided"],
+        auto_accept=config.ssh_auto_accept_hostkeys,
+    )
+    ssh_client.set_missing_host_key_policy(host_key_policy)
+
+    # Load known host keys
+    try:
+        ssh_client.load_system_host_keys()
+        ssh_client.load_host_keys(os.path.expanduser("~/.ssh/known_hosts"))
+    except Exception as e:
+        log_warning(f"Could not load host keys: {e}")
+
+    # Prepare connection arguments
+    connect_kwargs = {
+        "hostname": host,
+        "port": port,
+        "username": username,
+        "timeout": min(timeout, 30),  # Connection timeout
+    }
+
+    if password:
+        # Password provided: use only password auth, disable key lookup
+        connect_kwargs["password"] = password
+        connect_kwargs["look_for_keys"] = False
+        connect_kwargs["allow_agent"] = False
+        log_info("Disabled SSH agent and key lookup (password provided)")
+    else:
+        # No password: use key-based authentication
+        connect_kwargs["look_for_keys"] = True
+        connect_kwargs["allow_agent"] = True
+
+    try:
+        ssh_client.connect(**connect_kwargs)
+    except Exception:
+        ssh_client.close()
+        raise
+
+    # Set keepalive for long-running connections
+    transport = ssh_client.get_transport()
+    if transport:
+        transport.set_keepalive(config.ssh_keepalive)
+
+    return ssh_client
+
+
+def _remote_root_dir(lease) -> str:
+    """Remote working root (home directory) of a pooled connection, asked once per connection"""
+    with lease.info_lock:
+        if "remote_root" not in lease.info:
+            remote_root_dir = "~"  # Default to home directory
+            try:
+                stdin, stdout, stderr = lease.client.exec_command("pwd", timeout=10)
+                remote_root_dir = stdout.read().decode("utf-8").strip() or "~"
+            except Exception as e:
+                log_warning(
+                    f"Could not determine remote root directory, defaulting to ~/: {e}"
+                )
+            lease.info["remote_root"] = remote_root_dir
+        return lease.info["remote_root"]
+
+
+def _run_ssh_case(
+    lease,
+    working_dir: Path,
+    host: str,
+    username: str,
+    command: str,
+    model: Dict,
+    timeout: int,
+    start_time: datetime,
+    env_info: Dict,
+    input_files_list: List[str] = None,
+) -> Dict[str, Any]:
+    """Run one SSH calculation over a leased pooled connection (see run_ssh_calculation)"""
+    ssh_client = lease.client
+
+    # Create remote temporary directory in ./.fz/tmp (get absolute path)
+    remote_root_dir = _remote_root_dir(lease)
+
+    # Create unique remote directory using case-specific identifier
+    # Extract unique identifier from local working_dir to ensure each case gets its own remote dir
+    # working_dir typically looks like: /path/to/.fz/tmp/fz_temp_abc123.../case_name
+    # We use the last component of the path as a unique identifier for this calculation
+    local_dir_identifier = working_dir.name  # e.g., "x=1,y=2" or "single_case"
+
+    # Also include a UUID to handle edge cases where dir names might collide
+    # (e.g., same variable values running on different hosts or at different times)
+    unique_id = uuid.uuid4().hex[:8]  # Short UUID for additional uniqueness
+
+    # Build remote directory name with both case identifier and UUID
+    # This ensures parallel calculations to the same SSH host use distinct directories
+    remote_temp_dir = (
+        f"{remote_root_dir}/.fz/tmp/fz_calc_{local_dir_identifier}_{unique_id}"
+    )
+    log_info(f"🌐 SSH calculation using remote directory: {username}@{host}:{remote_temp_dir}")
+
+    # Upload, run and download the case (the remote directory is created by
+    # the control script, and removed later over the same connection)
+    result = _run_remote_case(
+        lease, working_dir, remote_temp_dir,
+        lambda tar_compress, deferred: _execute_remote_command(
+            ssh_client,
+            command,
+            remote_temp_dir,
+            working_dir,
+            timeout,
+            start_time,
+            env_info,
+            input_files_list,
+            tar_compress=tar_compress,
+            deferred=deferred,
+            remote_outputs=_remote_output_commands(model),
+        ),
+        output_files=_output_file_patterns(model),
+    )
+
+    # Parse output using fzo
+    from .core import fzo
+
+    if result["status"] == "done":
+        try:
+            output_results = fzo(working_dir, model)
+            # Convert DataFrame to dict if needed (fzo returns DataFrame when pandas available)
+            if hasattr(output_results, "to_dict"):
+                # DataFrame - convert to dict (first row as we only have one case)
+                output_dict = output_results.iloc[0].to_dict()
+            else:
+                # Already a dict
+                output_dict = output_results
+
+            # Propagate _output_error from fzo if present
+            output_error = output_dict.pop("_output_error", None)
+            result.update(output_dict)
+            result["calculator"] = f"ssh://{host}"
+            result["command"] = command
+            if output_error:
+                result["error"] = f"Missing output on remote server: {output_error}"
+        except Exception as e:
+            log_warning(f"Could not parse output: {e}")
+            result["error"] = f"Output parsing failed after successful remote execution: {e}"
+
+    # Add command to result even if not done
+    if "command" not in result:
+        result["command"] = command
+
+    return result
+
+
 def run_ssh_calculation(
     working_dir: Path,
     ssh_uri: str,
@@ -1862,143 +2319,19 @@ def run_ssh_calculation(
         else:
             log_info("Using key-based authentication")
 
-        # Create SSH client
-        ssh_client = paramiko.SSHClient()
-
-        # Set appropriate host key policy based on authentication method
-        config = get_config()
-        host_key_policy = get_host_key_policy(
-            password_provided=security_info["password_provided"],
-            auto_accept=config.ssh_auto_accept_hostkeys,
-        )
-        ssh_client.set_missing_host_key_policy(host_key_policy)
-
-        # Load known host keys
-        try:
-            ssh_client.load_system_host_keys()
-            ssh_client.load_host_keys(os.path.expanduser("~/.ssh/known_hosts"))
-        except Exception as e:
-            log_warning(f"Could not load host keys: {e}")
-
-        # Prepare connection arguments
-        connect_kwargs = {
-            "hostname": host,
-            "port": port,
-            "username": username,
-            "timeout": min(timeout, 30),  # Connection timeout
-        }
-
-        if password:
-            # Password provided: use only password auth, disable key lookup
-            connect_kwargs["password"] = password
-            connect_kwargs["look_for_keys"] = False
-            connect_kwargs["allow_agent"] = False
-            log_info("Disabled SSH agent and key lookup (password provided)")
-        else:
-            # No password: use key-based authentication
-            connect_kwargs["look_for_keys"] = True
-            connect_kwargs["allow_agent"] = True
-
-        ssh_client.connect(**connect_kwargs)
-
-        # Set keepalive for long-running connections
-        transport = ssh_client.get_transport()
-        if transport:
-            transport.set_keepalive(config.ssh_keepalive)
-
-        # Create SFTP client for file transfer
-        sftp = ssh_client.open_sftp()
-
-        # Create remote temporary directory in ./.fz/tmp (get absolute path)
-        # Get SSH remote root dir (absolute)
-        remote_root_dir = "~"  # Default to home directory
-        try:
-            stdin, stdout, stderr = ssh_client.exec_command("pwd", timeout=10)
-            remote_root_dir = stdout.read().decode("utf-8").strip()
-        except Exception as e:
-            log_warning(
-                f"Could not determine remote root directory, defaulting to ~/: {e}"
-            )
-
-        # Create unique remote directory using case-specific identifier
-        # Extract unique identifier from local working_dir to ensure each case gets its own remote dir
-        # working_dir typically looks like: /path/to/.fz/tmp/fz_temp_abc123.../case_name
-        # We use the last component of the path as a unique identifier for this calculation
-        local_dir_identifier = working_dir.name  # e.g., "x=1,y=2" or "single_case"
-
-        # Also include a UUID to handle edge cases where dir names might collide
-        # (e.g., same variable values running on different hosts or at different times)
-        unique_id = uuid.uuid4().hex[:8]  # Short UUID for additional uniqueness
-
-        # Build remote directory name with both case identifier and UUID
-        # This ensures parallel calculations to the same SSH host use distinct directories
-        remote_temp_dir = (
-            f"{remote_root_dir}/.fz/tmp/fz_calc_{local_dir_identifier}_{unique_id}"
-        )
-        ssh_client.exec_command(f"mkdir -p {remote_temp_dir}")
-
-        log_info(f"Created remote directory: {remote_temp_dir}")
-        log_info(f"🌐 SSH calculation using remote directory: {username}@{host}:{remote_temp_dir}")
-
-        try:
-            # Transfer input files to remote
-            _transfer_files_to_remote(sftp, working_dir, remote_temp_dir)
-
-            # Execute command on remote
-            result = _execute_remote_command(
-                ssh_client,
-                command,
-                remote_temp_dir,
-                working_dir,
-                timeout,
-                start_time,
-                env_info,
-                input_files_list,
-            )
-
-            # Transfer results back
-            _transfer_results_from_remote(sftp, remote_temp_dir, working_dir)
-
-            # Parse output using fzo
-            from .core import fzo
-
-            if result["status"] == "done":
-                try:
-                    output_results = fzo(working_dir, model)
-                    # Convert DataFrame to dict if needed (fzo returns DataFrame when pandas available)
-                    if hasattr(output_results, "to_dict"):
-                        # DataFrame - convert to dict (first row as we only have one case)
-                        output_dict = output_results.iloc[0].to_dict()
-                    else:
-                        # Already a dict
-                        output_dict = output_results
-
-                    # Propagate _output_error from fzo if present
-                    output_error = output_dict.pop("_output_error", None)
-                    result.update(output_dict)
-                    result["calculator"] = f"ssh://{host}"
-                    result["command"] = command
-                    if output_error:
-                        result["error"] = f"Missing output on remote server: {output_error}"
-                except Exception as e:
-                    log_warning(f"Could not parse output: {e}")
-                    result["error"] = f"Output parsing failed after successful remote execution: {e}"
-
-            # Add command to result even if not done
-            if "command" not in result:
-                result["command"] = command
-
-            return result
-
-        finally:
-            # Cleanup remote directory
+        key = ssh_pool_key(host, port, username, password)
+        with get_ssh_pool().lease(
+            key, lambda: _open_ssh_client(host, port, username, password, timeout)
+        ) as lease:
             try:
-                ssh_client.exec_command(f"rm -rf {remote_temp_dir}")
-                log_info(f"Cleaned up remote directory: {remote_temp_dir}")
-            except Exception as e:
-                log_warning(f"Could not cleanup remote directory: {e}")
-
-            sftp.close()
+                return _run_ssh_case(
+                    lease, working_dir, host, username, command, model,
+                    timeout, start_time, env_info, input_files_list,
+                )
+            except Exception:
+                # Do not hand a connection in an unknown state to the next case
+                lease.invalidate()
+                raise
 
     except Exception as e:
         # Classify SSH-level errors for better diagnostics
@@ -2010,11 +2343,6 @@ def run_ssh_calculation(
             protocol="ssh",
         )
         return {"status": "error", "error": f"SSH calculation failed: {error_msg}", "command": ssh_uri}
-    finally:
-        try:
-            ssh_client.close()
-        except:
-            pass
 
 
 def run_slurm_calculation(
@@ -2064,6 +2392,10 @@ def run_slurm_calculation(
         # Check if this is local or remote SLURM execution
         if host is None:
             # Local SLURM execution
+            if get_config().slurm_mode in ("array", "alloc"):
+                return _run_local_slurm_batch_calculation(
+                    working_dir, partition, script, model, timeout, start_time, env_info, input_files_list
+                )
             return _run_local_slurm_calculation(
                 working_dir, partition, script, model, timeout, start_time, env_info, input_files_list
             )
@@ -2116,7 +2448,7 @@ def _run_local_slurm_calculation(
     Returns:
         Dict containing calculation results and status
     """
-    from .core import is_interrupted, fzo
+    from .core import is_interrupted
 
     # Check for interrupt before starting
     if is_interrupted():
@@ -2186,72 +2518,9 @@ def _run_local_slurm_calculation(
         # Small delay to ensure streams are closed
         time.sleep(0.01)
 
-        # Create enhanced log file
-        end_time = datetime.now()
-        execution_time = (end_time - start_time).total_seconds()
-
-        log_file_path = working_dir / "log.txt"
-        with open(log_file_path, "w") as log_file:
-            log_file.write(f"Command: {full_command}\n")
-            log_file.write(f"Exit code: {result.returncode}\n")
-            log_file.write(f"SLURM partition: {partition}\n")
-            log_file.write(f"Time start: {start_time.isoformat()}\n")
-            log_file.write(f"Time end: {end_time.isoformat()}\n")
-            log_file.write(f"Execution time: {execution_time:.3f} seconds\n")
-            log_file.write(f"User: {env_info['user']}\n")
-            log_file.write(f"Hostname: {env_info['hostname']}\n")
-            log_file.write(f"Operating system: {env_info['operating_system']}\n")
-            log_file.write(f"Platform: {env_info['platform']}\n")
-            log_file.write(f"Working directory: {working_dir}\n")
-            log_file.write(f"Timestamp: {time.ctime()}\n")
-
-        if result.returncode != 0:
-            # Read stderr for error details
-            stderr_content = ""
-            try:
-                if err_file_path.exists():
-                    with open(err_file_path, "r") as f:
-                        stderr_content = f.read().strip()
-            except Exception:
-                pass
-
-            # Classify the error to provide a human-readable message
-            error_message = classify_error(
-                stderr=stderr_content,
-                exit_code=result.returncode,
-                command=full_command,
-                protocol="slurm",
-            )
-
-            return {
-                "status": "failed",
-                "exit_code": result.returncode,
-                "error": error_message,
-                "stderr": stderr_content,
-                "command": full_command,
-            }
-
-        # Parse output
-        output_results = fzo(working_dir, model)
-
-        # Convert DataFrame to dict if needed
-        if hasattr(output_results, "to_dict"):
-            output_dict = output_results.iloc[0].to_dict()
-        else:
-            output_dict = output_results
-
-        # Propagate _output_error from fzo if present
-        output_error = output_dict.pop("_output_error", None)
-
-        output_dict["status"] = "done"
-        output_dict["calculator"] = f"slurm://{partition}"
-        output_dict["command"] = full_command
-
-        # If output parsing had errors, report them
-        if output_error:
-            output_dict["error"] = f"Missing output: {output_error}"
-
-        return output_dict
+        return _finish_local_slurm_case(
+            working_dir, partition, full_command, result.returncode, start_time, env_info, model
+        )
 
     except subprocess.TimeoutExpired:
         return {
@@ -2284,6 +2553,182 @@ def _run_local_slurm_calculation(
         os.chdir(original_cwd)
 
 
+def _finish_local_slurm_case(
+    working_dir: Path,
+    partition: str,
+    full_command: str,
+    returncode: Optional[int],
+    start_time: datetime,
+    env_info: Dict,
+    model: Dict,
+    extra_log_lines: List[str] = None,
+) -> Dict[str, Any]:
+    """
+    Write the log.txt of a finished local SLURM case and build its result
+
+    Args:
+        working_dir: Case directory, holding out.txt and err.txt
+        partition: SLURM partition name
+        full_command: Command run for the case
+        returncode: Exit code of the command (None if unknown)
+        start_time: Calculation start time
+        env_info: Environment information
+        model: Model definition dict
+        extra_log_lines: Lines added to log.txt after the partition
+
+    Returns:
+        Dict containing calculation results and status
+    """
+    from .core import fzo
+
+    # Create enhanced log file
+    end_time = datetime.now()
+    execution_time = (end_time - start_time).total_seconds()
+
+    log_file_path = working_dir / "log.txt"
+    with open(log_file_path, "w") as log_file:
+        log_file.write(f"Command: {full_command}\n")
+        log_file.write(f"Exit code: {returncode}\n")
+        log_file.write(f"SLURM partition: {partition}\n")
+        for line in extra_log_lines or []:
+            log_file.write(f"{line}\n")
+        log_file.write(f"Time start: {start_time.isoformat()}\n")
+        log_file.write(f"Time end: {end_time.isoformat()}\n")
+        log_file.write(f"Execution time: {execution_time:.3f} seconds\n")
+        log_file.write(f"User: {env_info['user']}\n")
+        log_file.write(f"Hostname: {env_info['hostname']}\n")
+        log_file.write(f"Operating system: {env_info['operating_system']}\n")
+        log_file.write(f"Platform: {env_info['platform']}\n")
+        log_file.write(f"Working directory: {working_dir}\n")
+        log_file.write(f"Timestamp: {time.ctime()}\n")
+
+    if returncode != 0:
+        # Read stderr for error details
+        stderr_content = ""
+        err_file_path = working_dir / "err.txt"
+        try:
+            if err_file_path.exists():
+                with open(err_file_path, "r") as f:
+                    stderr_content = f.read().strip()
+        except Exception:
+            pass
+
+        # Classify the error to provide a human-readable message
+        error_message = classify_error(
+            stderr=stderr_content,
+            exit_code=returncode,
+            command=full_command,
+            protocol="slurm",
+        )
+
+        return {
+            "status": "failed",
+            "exit_code": returncode,
+            "error": error_message,
+            "stderr": stderr_content,
+            "command": full_command,
+        }
+
+    # Parse output
+    output_results = fzo(working_dir, model)
+
+    # Convert DataFrame to dict if needed
+    if hasattr(output_results, "to_dict"):
+        output_dict = output_results.iloc[0].to_dict()
+    else:
+        output_dict = output_results
+
+    # Propagate _output_error from fzo if present
+    output_error = output_dict.pop("_output_error", None)
+
+    output_dict["status"] = "done"
+    output_dict["calculator"] = f"slurm://{partition}"
+    output_dict["command"] = full_command
+
+    # If output parsing had errors, report them
+    if output_error:
+        output_dict["error"] = f"Missing output: {output_error}"
+
+    return output_dict
+
+
+def _run_local_slurm_batch_calculation(
+    working_dir: Path,
+    partition: str,
+    script: str,
+    model: Dict,
+    timeout: int,
+    start_time: datetime,
+    env_info: Dict,
+    input_files_list: List[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run a local SLURM case as a task of a job array (FZ_SLURM_MODE=array), or
+    in a shared allocation (FZ_SLURM_MODE=alloc)
+
+    In array mode the case is handed to the process-wide SlurmArrayScheduler,
+    which submits it with the other cases pending at that time in one
+    "sbatch --array" job and polls the state of all its tasks at once. In
+    allocation mode it is queued for the fz worker of the partition's
+    allocation (SlurmAllocationScheduler).
+
+    Args:
+        working_dir: Directory containing input files
+        partition: SLURM partition name
+        script: Script to execute for the case
+        model: Model definition dict
+        timeout: Timeout in seconds (from submission, queue time included)
+        start_time: Calculation start time
+        env_info: Environment information
+        input_files_list: List of input file names in order
+
+    Returns:
+        Dict containing calculation results and status
+    """
+    from .core import is_interrupted
+    from .slurmalloc import get_slurm_allocation
+    from .slurmarray import get_slurm_scheduler
+
+    input_argument = " ".join(input_files_list) if input_files_list else "."
+    full_command = f"{script} {input_argument}"
+    if get_config().slurm_mode == "alloc":
+        scheduler = get_slurm_allocation()
+    else:
+        scheduler = get_slurm_scheduler()
+    task = scheduler.submit(working_dir.resolve(), partition, full_command)
+    log_info(f"Queued SLURM case: {full_command} (partition {partition})")
+
+    deadline = time.monotonic() + timeout
+    while not task.done.wait(0.5):
+        if is_interrupted():
+            log_warning(f"⚠️  Interrupt detected, cancelling SLURM case {task.job_id or task.name}...")
+            scheduler.cancel(task)
+            return {
+                "status": "interrupted",
+                "error": "SLURM calculation interrupted by user",
+                "command": full_command,
+            }
+        if time.monotonic() >= deadline:
+            scheduler.cancel(task)
+            return {
+                "status": "timeout",
+                "error": f"SLURM job timed out after {timeout} seconds on partition '{partition}'",
+                "command": full_command,
+            }
+
+    if task.error:
+        return {"status": "error", "error": task.error, "command": full_command}
+
+    returncode = task.exit_code
+    if returncode is None and task.state != "COMPLETED":
+        # Killed before its command returned (e.g. time limit, node failure)
+        returncode = 1
+    return _finish_local_slurm_case(
+        working_dir, partition, full_command, returncode, start_time, env_info, model,
+        extra_log_lines=[f"SLURM job: {task.job_id}", f"SLURM state: {task.state}"],
+    )
+
+
 def _run_remote_slurm_calculation(
     working_dir: Path,
     host: str,
@@ -2335,134 +2780,78 @@ def _run_remote_slurm_calculation(
 
     log_info(f"Connecting to SSH for SLURM: {username}@{host}:{port}")
 
-    ssh_client = None
     try:
-        # Create SSH client
-        ssh_client = paramiko.SSHClient()
-
-        # Set appropriate host key policy
-        config = get_config()
-        host_key_policy = get_host_key_policy(
-            password_provided=security_info["password_provided"],
-            auto_accept=config.ssh_auto_accept_hostkeys,
-        )
-        ssh_client.set_missing_host_key_policy(host_key_policy)
-
-        # Load known host keys
-        try:
-            ssh_client.load_system_host_keys()
-            ssh_client.load_host_keys(os.path.expanduser("~/.ssh/known_hosts"))
-        except Exception as e:
-            log_warning(f"Could not load host keys: {e}")
-
-        # Prepare connection arguments
-        connect_kwargs = {
-            "hostname": host,
-            "port": port,
-            "username": username,
-            "timeout": min(timeout, 30),
-        }
-
-        if password:
-            connect_kwargs["password"] = password
-            connect_kwargs["look_for_keys"] = False
-            connect_kwargs["allow_agent"] = False
-        else:
-            connect_kwargs["look_for_keys"] = True
-            connect_kwargs["allow_agent"] = True
+        with get_ssh_pool().lease(
+            ssh_pool_key(host, port, username, password),
+            lambda: _open_ssh_client(host, port, username, password, timeout),
+        ) as lease:
+            ssh_client = lease.client
 
-        ssh_client.connect(**connect_kwargs)
-
-        # Set keepalive
-        transport = ssh_client.get_transport()
-        if transport:
-            transport.set_keepalive(config.ssh_keepalive)
-
-        # Create SFTP client
-        sftp = ssh_client.open_sftp()
-
-        # Create remote temporary directory
-        try:
-            stdin, stdout, stderr = ssh_client.exec_command("pwd", timeout=10)
-            remote_root_dir = stdout.read().decode("utf-8").strip()
-        except Exception as e:
-            log_warning(f"Could not determine remote root directory, defaulting to ~/: {e}")
-            remote_root_dir = "~"
+            # Create remote temporary directory
+            remote_root_dir = _remote_root_dir(lease)
 
-        # Create unique remote directory
-        local_dir_identifier = working_dir.name
-        unique_id = uuid.uuid4().hex[:8]
-        remote_temp_dir = f"{remote_root_dir}/.fz/tmp/fz_slurm_{local_dir_identifier}_{unique_id}"
+            # Create unique remote directory
+            local_dir_identifier = working_dir.name
+            unique_id = uuid.uuid4().hex[:8]
+            remote_temp_dir = f"{remote_root_dir}/.fz/tmp/fz_slurm_{local_dir_identifier}_{unique_id}"
 
-        ssh_client.exec_command(f"mkdir -p {remote_temp_dir}")
-        log_info(f"Created remote directory: {remote_temp_dir}")
-        log_info(f"🖥️  SLURM calculation on remote: {username}@{host}:{remote_temp_dir}")
+            log_info(f"🖥️  SLURM calculation on remote: {username}@{host}:{remote_temp_dir}")
 
-        try:
-            # Transfer input files to remote
-            _transfer_files_to_remote(sftp, working_dir, remote_temp_dir)
-
-            # Execute SLURM command on remote
-            result = _execute_remote_slurm_command(
-                ssh_client,
-                partition,
-                script,
-                remote_temp_dir,
-                working_dir,
-                timeout,
-                start_time,
-                env_info,
-                input_files_list,
-            )
+            try:
+                # Upload, run and download the case
+                result = _run_remote_case(
+                    lease, working_dir, remote_temp_dir,
+                    lambda tar_compress, deferred: _execute_remote_slurm_command(
+                        ssh_client,
+                        partition,
+                        script,
+                        remote_temp_dir,
+                        working_dir,
+                        timeout,
+                        start_time,
+                        env_info,
+                        input_files_list,
+                        tar_compress=tar_compress,
+                        deferred=deferred,
+                        remote_outputs=_remote_output_commands(model),
+                    ),
+                output_files=_output_file_patterns(model),
+                )
 
-            # Transfer results back
-            _transfer_results_from_remote(sftp, remote_temp_dir, working_dir)
+                # Parse output using fzo
+                from .core import fzo
 
-            # Parse output using fzo
-            from .core import fzo
+                if result["status"] == "done":
+                    try:
+                        output_results = fzo(working_dir, model)
+                        if hasattr(output_results, "to_dict"):
+                            output_dict = output_results.iloc[0].to_dict()
+                        else:
+                            output_dict = output_results
+
+                        # Propagate _output_error from fzo if present
+                        output_error = output_dict.pop("_output_error", None)
+                        result.update(output_dict)
+                        result["calculator"] = f"slurm://{host}:{partition}"
+                        result["command"] = f"srun --partition={partition} {script}"
+                        if output_error:
+                            result["error"] = f"Missing output on remote SLURM node: {output_error}"
+                    except Exception as e:
+                        log_warning(f"Could not parse output: {e}")
+                        result["error"] = f"Output parsing failed after successful remote SLURM execution: {e}"
 
-            if result["status"] == "done":
-                try:
-                    output_results = fzo(working_dir, model)
-                    if hasattr(output_results, "to_dict"):
-                        output_dict = output_results.iloc[0].to_dict()
-                    else:
-                        output_dict = output_results
-
-                    # Propagate _output_error from fzo if present
-                    output_error = output_dict.pop("_output_error", None)
-                    result.update(output_dict)
-                    result["calculator"] = f"slurm://{host}:{partition}"
+                if "command" not in result:
                     result["command"] = f"srun --partition={partition} {script}"
-                    if output_error:
-                        result["error"] = f"Missing output on remote SLURM node: {output_error}"
-                except Exception as e:
-                    log_warning(f"Could not parse output: {e}")
-                    result["error"] = f"Output parsing failed after successful remote SLURM execution: {e}"
-
-            if "command" not in result:
-                result["command"] = f"srun --partition={partition} {script}"
-
-            return result
 
-        finally:
-            # Cleanup remote directory
-            try:
-                ssh_client.exec_command(f"rm -rf {remote_temp_dir}")
-                log_info(f"Cleaned up remote directory: {remote_temp_dir}")
-            except Exception as e:
-                log_warning(f"Could not cleanup remote directory: {e}")
+                return result
 
-            sftp.close()
+            except Exception:
+                # Do not hand a connection in an unknown state to the next case
+                lease.invalidate()
+                raise
 
     except Exception as e:
         return {"status": "error", "error": f"Remote SLURM calculation failed: {str(e)}"}
-    finally:
-        if ssh_client:
-            try:
-                ssh_client.close()
-            except:
-                pass
 
 
 def _execute_remote_slurm_command(
@@ -2475,27 +2864,34 @@ def _execute_remote_slurm_command(
     start_time: datetime,
     env_info: Dict,
     input_files_list: List[str] = None,
+    tar_compress: Optional[bool] = None,
+    deferred: List[str] = None,
+    remote_outputs: Dict[str, str] = None,
 ) -> Dict[str, Any]:
     """
     Execute SLURM command on remote server with interrupt handling
 
+    The whole case runs in one exec request (see _remote_control_script).
+
     Args:
         ssh_client: SSH client connection
         partition: SLURM partition name
         script: Script to execute
-        remote_dir: Remote directory path
+        remote_dir: Remote directory path (created if missing)
         local_dir: Local directory path
         timeout: Timeout in seconds
         start_time: Start time of execution
         env_info: Environment information
         input_files_list: List of input file names in order
+        tar_compress: Upload local_dir as a (gzip compressed if True) tar stream first
+        deferred: Commands to run in the background first (e.g. cleanups)
+        remote_outputs: Model output commands to evaluate on the remote, by output name
 
     Returns:
         Dict with execution results
     """
     from .core import is_interrupted
 
-    # Check for interrupt before starting
     if is_interrupted():
         return {
             "status": "interrupted",
@@ -2503,153 +2899,57 @@ def _execute_remote_slurm_command(
             "command": f"srun --partition={partition} {script}",
         }
 
-    # Build arguments from input files list
     input_argument = " ".join(input_files_list) if input_files_list else "."
 
-    # Construct full SLURM command
-    full_command = f"cd {remote_dir} && srun --partition={partition} {script} {input_argument}"
+    run_line = f"srun --partition={partition} {script} {input_argument}"
+    full_command = f"cd {shlex.quote(remote_dir)} && {run_line}"
 
     log_info(f"Executing remote SLURM command: {full_command}")
 
-    # Execute command
-    command_start_time = datetime.now()
-    stdin, stdout, stderr = ssh_client.exec_command(full_command, timeout=timeout)
-
-    # Get the channel for polling
-    channel = stdout.channel
-
-    # Poll for completion with interrupt checking
-    poll_interval = 0.5
-    elapsed_time = 0.0
-
-    try:
-        while not channel.exit_status_ready():
-            # Check if user requested interrupt
-            if is_interrupted():
-                log_warning(f"⚠️  Interrupt detected, terminating remote SLURM job...")
-                try:
-                    channel.send('\x03')  # Send Ctrl+C
-                    time.sleep(0.5)
-
-                    if not channel.exit_status_ready():
-                        # Try to cancel the SLURM job
-                        # Note: This is a best-effort attempt. In production, you might want to
-                        # track the SLURM job ID and use scancel
-                        kill_cmd = f"pkill -P $(pgrep -f 'srun.*{partition}')"
-                        try:
-                            ssh_client.exec_command(kill_cmd, timeout=2)
-                        except:
-                            pass
-                except Exception as e:
-                    log_warning(f"⚠️  Could not terminate remote SLURM job: {e}")
-
-                raise KeyboardInterrupt("Remote SLURM job interrupted by user")
-
-            # Check for timeout
-            if elapsed_time >= timeout:
-                log_warning(f"⚠️  Remote SLURM job timeout after {timeout}s")
-                try:
-                    channel.send('\x03')
-                    time.sleep(0.5)
-                except:
-                    pass
-                return {
-                    "status": "timeout",
-                    "error": f"SLURM job timed out after {timeout} seconds",
-                    "command": full_command,
-                }
-
-            time.sleep(poll_interval)
-            elapsed_time += poll_interval
-
-        # Get exit status
-        exit_code = channel.recv_exit_status()
-        command_end_time = datetime.now()
-
-    except KeyboardInterrupt:
-        try:
-            channel.close()
-        except:
-            pass
+    run = _run_control_script(
+        ssh_client, run_line, remote_dir, local_dir, timeout, start_time, env_info,
+        kill_pattern=f"srun.*{partition}",
+        extra_log_lines=[f"SLURM partition: {partition}"],
+        tar_compress=tar_compress, deferred=deferred,
+        output_commands=[strip_bash_prefix(c) for c in (remote_outputs or {}).values()],
+    )
+    if run["status"] == "timeout":
+        return {
+            "status": "timeout",
+            "error": f"SLURM job timed out after {timeout} seconds",
+            "command": full_command,
+            "_upload": run["upload"],
+        }
+    if run["status"] == "interrupted":
         return {
             "status": "interrupted",
             "error": "Remote SLURM calculation interrupted by user",
             "command": full_command,
+            "_upload": run["upload"],
         }
 
-    # Get output
-    stdout_data = stdout.read().decode("utf-8")
-    stderr_data = stderr.read().decode("utf-8")
-
-    # Calculate timing
-    total_execution_time = (command_end_time - start_time).total_seconds()
-    command_execution_time = (command_end_time - command_start_time).total_seconds()
-
-    # Get remote system information
-    remote_info_cmd = "hostname; whoami; pwd; uname -s; uname -a"
-    try:
-        _, remote_stdout, _ = ssh_client.exec_command(remote_info_cmd, timeout=10)
-        remote_info_lines = remote_stdout.read().decode("utf-8").strip().split("\n")
-        remote_hostname = remote_info_lines[0] if len(remote_info_lines) > 0 else "unknown"
-        remote_user = remote_info_lines[1] if len(remote_info_lines) > 1 else "unknown"
-        remote_pwd = remote_info_lines[2] if len(remote_info_lines) > 2 else "unknown"
-        remote_os = remote_info_lines[3] if len(remote_info_lines) > 3 else "unknown"
-        remote_platform = remote_info_lines[4] if len(remote_info_lines) > 4 else "unknown"
-    except:
-        remote_hostname = remote_user = remote_pwd = remote_os = remote_platform = "unknown"
-
-    # Create enhanced log files remotely
-    log_command = f"""cd {remote_dir}
-
-# Create enhanced log.txt
-cat > log.txt << 'EOF'
-Command: {full_command}
-Exit code: {exit_code}
-SLURM partition: {partition}
-Time start: {start_time.isoformat()}
-Time end: {command_end_time.isoformat()}
-Command execution time: {command_execution_time:.3f} seconds
-Total execution time: {total_execution_time:.3f} seconds
-Local user: {env_info.get('user', 'unknown')}
-Local hostname: {env_info.get('hostname', 'unknown')}
-Local operating system: {env_info.get('operating_system', 'unknown')}
-Local working directory: {env_info.get('working_dir', 'unknown')}
-Remote user: {remote_user}
-Remote hostname: {remote_hostname}
-Remote operating system: {remote_os}
-Remote platform: {remote_platform}
-Remote working directory: {remote_pwd}
-Timestamp: $(date)
-EOF
-
-# Create output files
-cat > out.txt << 'EOF'
-{stdout_data}
-EOF
-
-cat > err.txt << 'EOF'
-{stderr_data}
-EOF
-"""
-    ssh_client.exec_command(log_command, timeout=30)
-
+    exit_code = run["exit_code"]
+    stderr_data = run["stderr"]
     if exit_code != 0:
-        # Classify the error to provide a human-readable message
         error_message = classify_error(
             stderr=stderr_data,
             exit_code=exit_code,
             command=f"srun --partition={partition} {script}",
             protocol="slurm",
         )
-        return {
+        result = {
             "status": "failed",
             "exit_code": exit_code,
             "error": error_message,
             "stderr": stderr_data,
             "command": full_command,
         }
-
-    return {"status": "done", "stdout": stdout_data, "stderr": stderr_data}
+    else:
+        result = {"status": "done", "stderr": stderr_data}
+    result["_upload"] = run["upload"]
+    result["_log_lines"] = run["log_lines"]
+    result["_remote_outputs"] = _remote_output_results(remote_outputs, run["outputs"])
+    return result
 
 
 def _parse_funz_broadcast(data: bytes) -> Optional[Dict[str, Any]]:
@@ -2794,26 +3094,6 @@ def run_funz_calculation(
     start_time = datetime.now()
     env_info = get_environment_info()
 
-    # Funz protocol constants (per org.funz.Protocol in Java source)
-    METHOD_RESERVE = "RESERVE"
-    METHOD_UNRESERVE = "UNRESERVE"
-    METHOD_PUT_FILE = "PUTFILE"
-    METHOD_NEW_CASE = "NEWCASE"
-    METHOD_EXECUTE = "EXECUTE"
-    METHOD_ARCH_RES = "ARCHIVE"
-    METHOD_GET_ARCH = "GETFILE"
-    METHOD_INTERRUPT = "INTERUPT"  # Note: typo in original Java code
-
-    RET_YES = "Y"
-    RET_NO = "N"
-    RET_ERROR = "E"
-    RET_INFO = "I"
-    RET_HEARTBEAT = "H"
-    RET_SYNC = "S"
-
-    END_OF_REQ = "/"
-    ARCHIVE_FILE = "results.zip"
-
     try:
         # Parse Funz URI: funz://:<port>/<code>
         # Format: funz://[host]:<port>/<code>
@@ -2860,475 +3140,106 @@ def run_funz_calculation(
         if not code:
             return {"status": "error", "error": "Funz URI must specify code"}
 
-        log_info(f"📡 Discovering Funz calculator via UDP broadcast on port {udp_port}...")
+        log_info(f"📡 Looking up Funz calculator broadcasting on UDP port {udp_port}...")
         log_info(f"🔧 Code: {code}")
         log_debug(f"Working directory: {working_dir}")
         log_debug(f"Timeout: {timeout}s")
 
-        # Discover TCP port via UDP broadcast
+        # Take a reserved session kept from a previous case, or claim a
+        # calculator from the live registry of UDP broadcasts: an idle one
+        # offering the code, waiting for a broadcast only if none is known
+        sessions = get_funz_sessions()
         try:
-            log_debug(f"Listening for Funz calculator broadcasts on UDP port {udp_port}")
-            servers = discover_funz_servers(
-                udp_port,
-                listen_duration=10,
-                stop_when=lambda s: s["idle"] and code in s["codes"],
-            )
-            log_debug(f"Discovered servers: {servers}")
-
-            if not servers:
-                log_error(f"❌ UDP discovery timeout - no calculator found on port {udp_port}")
-                return {"status": "error", "error": f"No calculator found on UDP port {udp_port}"}
-
-            # Prefer a server that is idle and offers the requested code, then
-            # any server offering the code, then fall back to the first one seen.
-            server = next(
-                (s for s in servers if s["idle"] and code in s["codes"]),
-                next(
-                    (s for s in servers if code in s["codes"]),
-                    servers[0],
-                ),
-            )
-
-            tcp_port = server["tcp_port"]
-            calculator_name = server["name"]
-            available_codes = server["codes"]
-
-            log_info(f"✅ Discovered calculator '{calculator_name}' at {host}:{tcp_port}")
-            log_debug(f"Available codes: {available_codes}, activity: {server['activity']}")
-
-            # Verify requested code is available
-            if code not in available_codes:
-                log_warning(f"⚠️  Requested code '{code}' not in available codes: {available_codes}")
-
+            session = sessions.checkout(host, udp_port, code, timeout=get_config().funz_discovery_timeout)
         except OSError as e:
             log_error(f"❌ UDP discovery failed: {e}")
             return {"status": "error", "error": f"UDP discovery failed: {str(e)}"}
 
-        # Create TCP socket connection to discovered port
-        log_debug(f"Creating TCP socket connection to {host}:{tcp_port}")
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        connection_timeout = min(timeout, 30)
-        sock.settimeout(connection_timeout)
-        log_debug(f"Socket timeout set to {connection_timeout}s")
-
-        try:
-            log_debug(f"Attempting TCP connection to {host}:{tcp_port}...")
-            sock.connect((host, tcp_port))
-            log_info(f"✅ Connected to Funz server at {host}:{tcp_port}")
-            log_debug(f"Socket state: connected, local={sock.getsockname()}, remote={sock.getpeername()}")
-
-            # Create buffered reader/writer
-            sock_file = sock.makefile('rw', buffering=1, encoding='utf-8', newline='\n')
-            log_debug("Socket file created with UTF-8 encoding and line buffering")
-
-            def send_message(*lines):
-                """Send a protocol message"""
-                log_debug(f"→ Sending message: {lines}")
-                for line in lines:
-                    sock_file.write(str(line) + '\n')
-                sock_file.write(END_OF_REQ + '\n')
-                sock_file.flush()
-                log_debug(f"→ Message sent and flushed")
-
-            def read_response():
-                """Read a protocol response until END_OF_REQ
-
-                Returns:
-                    Tuple of (status, response_lines) where:
-                    - status is the first line (RET_YES, RET_NO, RET_ERROR, etc.) or None on timeout/error
-                    - response_lines is the full response including status line
-                """
-                response = []
-                line_count = 0
-
-                # Set socket timeout for reading
-                original_timeout = sock.gettimeout()
-                sock.settimeout(timeout)
-
-                try:
-                    while True:
-                        try:
-                            line = sock_file.readline().strip()
-                        except socket.timeout:
-                            log_error(f"❌ Timeout waiting for response after {timeout}s")
-                            sock.settimeout(original_timeout)
-                            return "TIMEOUT", []
-
-                        line_count += 1
-                        log_debug(f"← Received line {line_count}: '{line}'")
-
-                        if not line:
-                            # Connection closed
-                            log_warning(f"⚠️  Connection closed by server (empty line received)")
-                            sock.settimeout(original_timeout)
-                            return None, []
-
-                        if line == END_OF_REQ:
-                            log_debug(f"← End of response marker received (total {line_count} lines)")
-                            break
-
-                        # Handle special responses
-                        if line == RET_HEARTBEAT:
-                            log_debug("← Heartbeat received, ignoring")
-                            continue  # Ignore heartbeats
-
-                        if line == RET_INFO:
-                            # Info message - read next line
-                            info_line = sock_file.readline().strip()
-                            log_info(f"ℹ️  Funz info: {info_line}")
-                            continue
-
-                        response.append(line)
-
-                    if not response:
-                        log_debug("← Empty response received")
-                        sock.settimeout(original_timeout)
-                        return None, []
-
-                    log_debug(f"← Response parsed: status={response[0]}, lines={len(response)}")
-                    sock.settimeout(original_timeout)
-                    return response[0], response
-
-                except Exception as e:
-                    log_error(f"❌ Error reading response: {e}")
-                    sock.settimeout(original_timeout)
-                    return "ERROR", []
-
-            # Step 1: Reserve calculator (two-phase protocol)
-            log_info("🔒 Step 1: Reserving calculator...")
-
-            # Phase 1: Send RESERVE command
-            log_debug(f"Sending {METHOD_RESERVE} request (phase 1)")
-            send_message(METHOD_RESERVE)
-            ret, response = read_response()
-
-            # Check for errors/timeout
-            if ret == "TIMEOUT":
-                log_error(f"❌ Reservation timed out")
-                return {"status": "timeout", "error": "Calculator reservation timed out"}
-            elif ret == "ERROR":
-                log_error(f"❌ Error during reservation")
-                return {"status": "error", "error": "Error during calculator reservation"}
-            elif ret != RET_YES:
-                error_msg = response[1] if len(response) > 1 else "Unknown error"
-                log_error(f"❌ Calculator reservation failed: {error_msg}")
-                log_debug(f"Full response: {response}")
-                return {"status": "error", "error": f"Failed to reserve calculator: {error_msg}"}
-
-            log_debug(f"✅ Phase 1 complete")
-
-            # Phase 2: Send project code and tagged values
-            tagged_values = {
-                "USERNAME": getpass.getuser()
-            }
-
-            log_debug(f"Sending project code '{code}' and tagged values (phase 2)")
-            # Send code
-            sock_file.write(code + '\n')
-            # Send number of tagged values
-            sock_file.write(str(len(tagged_values)) + '\n')
-            # Send each tagged value
-            for key, value in tagged_values.items():
-                sock_file.write(key + '\n')
-                sock_file.write(str(value) + '\n')
-            sock_file.flush()
-
-            # Read phase 2 response
-            ret, response = read_response()
-
-            if ret == "TIMEOUT":
-                log_error(f"❌ Reservation phase 2 timed out")
-                return {"status": "timeout", "error": "Calculator reservation phase 2 timed out"}
-            elif ret != RET_YES:
-                error_msg = response[1] if len(response) > 1 else "Unknown error"
-                log_error(f"❌ Calculator reservation phase 2 failed: {error_msg}")
-                return {"status": "error", "error": f"Failed to reserve calculator (phase 2): {error_msg}"}
-
-            # Get secret code from response (for authentication)
-            # Response contains: [RET_YES, secret, ip, security]
-            secret_code = response[1] if len(response) > 1 else None
-            log_info(f"✅ Calculator reserved successfully")
-            log_debug(f"Secret code: {secret_code}")
+        if session is None:
+            log_error(f"❌ UDP discovery timeout - no calculator found on port {udp_port}")
+            return {"status": "error", "error": f"No calculator found on UDP port {udp_port}"}
 
+        while True:
+            reused = session.is_open
+            tcp_port = session.tcp_port
             try:
-                # Step 2: Create new case (MUST come before uploading files!)
-                # The Funz protocol requires NEW_CASE before PUT_FILE
-                log_info("📝 Step 2: Creating new case...")
-
-                # Prepare variables (must include USERNAME)
-                variables = {
-                    "USERNAME": getpass.getuser()
-                }
-
-                log_debug(f"Sending {METHOD_NEW_CASE} request with variables: {variables}")
-                send_message(METHOD_NEW_CASE)
+                if not reused:
+                    server = session.server
+                    log_info(f"✅ Discovered calculator '{server['name']}' at {host}:{tcp_port}")
+                    log_debug(f"Available codes: {server['codes']}, activity: {server['activity']}")
+                    # Verify requested code is available
+                    if code not in server["codes"]:
+                        log_warning(f"⚠️  Requested code '{code}' not in available codes: {server['codes']}")
+                    session.open(timeout)
+                execution_time = session.run_case(working_dir, timeout)
+                break
+            except FunzError as e:
+                if e.broken:
+                    session.close()
+                else:
+                    sessions.give_back(session)
+                if reused and e.broken and not e.started:
+                    # The kept session went stale: run the case with a new reservation
+                    log_warning(f"⚠️  Funz session to {host}:{tcp_port} lost ({e}), reserving again")
+                    session = sessions.checkout(host, udp_port, code, timeout=get_config().funz_discovery_timeout)
+                    if session is None:
+                        return {"status": "error", "error": f"No calculator found on UDP port {udp_port}"}
+                    continue
+                return {"status": e.status, "error": str(e)}
+            except BaseException:
+                session.close()
+                raise
 
-                # Send variable count
-                sock_file.write(str(len(variables)) + '\n')
+        sessions.give_back(session)
 
-                # Send each variable
-                for key, value in variables.items():
-                    # Truncate multi-line values to first line
-                    value_str = str(value).split('\n')[0]
-                    if '\n' in str(value):
-                        value_str += "..."
+        # Create log file
+        end_time = datetime.now()
+        total_time = (end_time - start_time).total_seconds()
 
-                    sock_file.write(key + '\n')
-                    sock_file.write(value_str + '\n')
+        log_file_path = working_dir / "log.txt"
+        with open(log_file_path, "w") as log_file:
+            log_file.write(f"Calculator: funz://{host}:{tcp_port}/{code}\n")
+            log_file.write(f"Exit code: 0\n")
+            log_file.write(f"Time start: {start_time.isoformat()}\n")
+            log_file.write(f"Time end: {end_time.isoformat()}\n")
+            log_file.write(f"Execution time: {execution_time:.3f} seconds\n")
+            log_file.write(f"Total time: {total_time:.3f} seconds\n")
+            log_file.write(f"User: {env_info['user']}\n")
+            log_file.write(f"Hostname: {env_info['hostname']}\n")
+            log_file.write(f"Funz server: {host}:{tcp_port}\n")
+            log_file.write(f"Timestamp: {time.ctime()}\n")
 
-                sock_file.flush()
+        # Parse output using fzo
+        try:
+            output_results = fzo(working_dir, model)
 
-                # Read response
-                ret, case_response = read_response()
+            # Convert DataFrame to dict if needed
+            if hasattr(output_results, "to_dict"):
+                output_dict = output_results.iloc[0].to_dict()
+            else:
+                output_dict = output_results
 
-                if ret == "TIMEOUT":
-                    log_error(f"❌ New case creation timed out")
-                    return {"status": "timeout", "error": "New case creation timed out"}
-                elif ret != RET_YES:
-                    error_msg = case_response[1] if len(case_response) > 1 else "Unknown error"
-                    log_error(f"❌ Failed to create new case: {error_msg}")
-                    return {"status": "error", "error": f"Failed to create new case: {error_msg}"}
+            output_dict["status"] = "done"
+            output_dict["calculator"] = f"funz://{host}:{tcp_port}"
+            output_dict["command"] = code
 
-                log_info(f"✅ Case created successfully")
+            return output_dict
 
-                # Step 3: Upload input files (after NEW_CASE)
-                log_info("📤 Step 3: Uploading input files...")
-                files_to_upload = [item for item in working_dir.iterdir() if item.is_file()]
-                log_debug(f"Found {len(files_to_upload)} files to upload")
+        except Exception as e:
+            log_warning(f"Could not parse output: {e}")
+            return {
+                "status": "done",
+                "calculator": f"funz://{host}:{tcp_port}",
+                "command": code,
+                "error": f"Output parsing failed: {str(e)}"
+            }
 
-                uploaded_count = 0
-                for item in files_to_upload:
-                    # Send PUT_FILE request
-                    file_size = item.stat().st_size
-                    relative_path = item.name
-
-                    log_info(f"  📄 Uploading {relative_path} ({file_size} bytes)")
-                    log_debug(f"Sending {METHOD_PUT_FILE} request for {relative_path}")
-                    send_message(METHOD_PUT_FILE, relative_path, file_size)
-
-                    # Wait for acknowledgment
-                    ret, ack_response = read_response()
-                    if ret != RET_YES:
-                        log_warning(f"❌ Failed to upload {relative_path}: {ack_response}")
-                        continue
-
-                    log_debug(f"Server ready to receive {relative_path}")
-
-                    # Send file content
-                    with open(item, 'rb') as f:
-                        file_data = f.read()
-                        bytes_sent = sock.sendall(file_data)
-                        log_debug(f"Sent {len(file_data)} bytes of file data")
-
-                    uploaded_count += 1
-                    log_debug(f"✅ Successfully uploaded {relative_path}")
-
-                log_info(f"✅ Uploaded {uploaded_count}/{len(files_to_upload)} files")
-
-                # Step 4: Execute calculation
-                log_info(f"⚙️  Step 4: Executing calculation...")
-                log_info(f"  Code: {code}")
-                log_debug(f"Sending {METHOD_EXECUTE} request")
-                send_message(METHOD_EXECUTE, code)
-
-                # Read execution response (may include INFO messages)
-                execution_start = datetime.now()
-                log_debug(f"Execution started at {execution_start.isoformat()}")
-                ret, response = read_response()
-
-                # Check for interrupt during execution
-                if is_interrupted():
-                    log_warning("⚠️  Interrupt detected, sending interrupt to Funz server...")
-                    send_message(METHOD_INTERRUPT, secret_code if secret_code else "")
-                    raise KeyboardInterrupt("Execution interrupted by user")
-
-                if ret == "TIMEOUT":
-                    log_error(f"❌ Execution timed out after {timeout}s")
-                    return {"status": "timeout", "error": f"Execution timed out after {timeout}s"}
-                elif ret == "ERROR":
-                    log_error(f"❌ Error during execution")
-                    return {"status": "error", "error": "Error during execution"}
-                elif ret != RET_YES:
-                    error_msg = response[1] if len(response) > 1 else "Execution failed"
-                    log_error(f"❌ Execution failed: {error_msg}")
-                    log_debug(f"Full response: {response}")
-                    return {"status": "failed", "error": error_msg}
-
-                execution_end = datetime.now()
-                execution_time = (execution_end - execution_start).total_seconds()
-
-                log_info(f"✅ Execution completed in {execution_time:.2f}s")
-                log_debug(f"Execution ended at {execution_end.isoformat()}")
-
-                # Step 5: Archive results (required before GET_ARCH)
-                log_info("📦 Step 5: Archiving results...")
-                log_debug(f"Sending {METHOD_ARCH_RES} request")
-                send_message(METHOD_ARCH_RES)
-                ret, arch_response = read_response()
-
-                if ret != RET_YES:
-                    log_error(f"❌ Failed to archive results: {arch_response}")
-                    return {"status": "error", "error": "Failed to archive results"}
-
-                log_info(f"✅ Results archived successfully")
-
-                # Step 6: Download results archive
-                log_info("📥 Step 6: Downloading results...")
-                log_debug(f"Sending {METHOD_GET_ARCH} request")
-                send_message(METHOD_GET_ARCH)
-
-                # Read response (should be Y\n/\n, possibly with INFO messages)
-                ret, response = read_response()
-
-                if ret == "TIMEOUT":
-                    log_error(f"❌ Archive download timed out")
-                    return {"status": "timeout", "error": "Archive download timed out"}
-                elif ret != RET_YES:
-                    error_msg = response[1] if len(response) > 1 else "Unknown error"
-                    log_error(f"❌ Failed to get results archive: {error_msg}")
-                    return {"status": "error", "error": f"Failed to get results archive: {error_msg}"}
-
-                # Read lines until we find one that's all digits (the size)
-                # Skip any additional protocol responses (Y, /, INFO lines, etc.)
-                # This is necessary because transferArchive sends multiple Y\n/\n responses
-                max_lines = 50
-                archive_size = None
-
-                try:
-                    for i in range(max_lines):
-                        line = sock_file.readline().strip()
-                        log_debug(f"Reading size line {i}: '{line}'")
-
-                        if not line:
-                            log_error(f"❌ Connection closed while reading archive size")
-                            return {"status": "error", "error": "Connection closed while reading archive size"}
-
-                        if line.isdigit():
-                            archive_size = int(line)
-                            log_info(f"  Archive size: {archive_size} bytes ({archive_size/1024:.2f} KB)")
-                            break
-                except socket.timeout:
-                    log_error(f"❌ Timeout while reading archive size")
-                    return {"status": "timeout", "error": "Timeout while reading archive size"}
-
-                if archive_size is None:
-                    log_error(f"❌ Could not find archive size in {max_lines} lines")
-                    return {"status": "error", "error": "Could not determine archive size"}
-
-                # Send acknowledgment (just a line, per Java: _reader.readLine())
-                log_debug(f"Sending ACK for archive transfer")
-                sock_file.write("ACK\n")
-                sock_file.flush()
-
-                # Receive archive data
-                archive_data = b""
-                bytes_received = 0
-                chunk_count = 0
-
-                log_debug(f"Receiving archive data in chunks...")
-                while bytes_received < archive_size:
-                    chunk_size = min(4096, archive_size - bytes_received)
-                    chunk = sock.recv(chunk_size)
-                    if not chunk:
-                        log_warning(f"⚠️  Connection closed before all data received ({bytes_received}/{archive_size} bytes)")
-                        break
-                    archive_data += chunk
-                    bytes_received += len(chunk)
-                    chunk_count += 1
-
-                    # Log progress every 100 chunks or at the end
-                    if chunk_count % 100 == 0 or bytes_received >= archive_size:
-                        progress = (bytes_received / archive_size * 100) if archive_size > 0 else 100
-                        log_debug(f"Download progress: {bytes_received}/{archive_size} bytes ({progress:.1f}%)")
-
-                log_info(f"✅ Downloaded {bytes_received} bytes in {chunk_count} chunks")
-
-                # Extract archive to working directory
-                if archive_data:
-                    import zipfile
-                    import io
-
-                    log_debug(f"Extracting ZIP archive ({len(archive_data)} bytes)")
-                    try:
-                        with zipfile.ZipFile(io.BytesIO(archive_data)) as zf:
-                            file_list = zf.namelist()
-                            log_debug(f"Archive contains {len(file_list)} files: {file_list}")
-                            zf.extractall(working_dir)
-                            log_info(f"✅ Extracted {len(file_list)} files to {working_dir}")
-                    except Exception as e:
-                        log_error(f"❌ Failed to extract archive: {e}")
-                        log_debug(f"Archive data (first 100 bytes): {archive_data[:100]}")
-                else:
-                    log_warning("⚠️  No archive data received")
-
-                # Create log file
-                end_time = datetime.now()
-                total_time = (end_time - start_time).total_seconds()
-
-                log_file_path = working_dir / "log.txt"
-                with open(log_file_path, "w") as log_file:
-                    log_file.write(f"Calculator: funz://{host}:{tcp_port}/{code}\n")
-                    log_file.write(f"Exit code: 0\n")
-                    log_file.write(f"Time start: {start_time.isoformat()}\n")
-                    log_file.write(f"Time end: {end_time.isoformat()}\n")
-                    log_file.write(f"Execution time: {execution_time:.3f} seconds\n")
-                    log_file.write(f"Total time: {total_time:.3f} seconds\n")
-                    log_file.write(f"User: {env_info['user']}\n")
-                    log_file.write(f"Hostname: {env_info['hostname']}\n")
-                    log_file.write(f"Funz server: {host}:{tcp_port}\n")
-                    log_file.write(f"Timestamp: {time.ctime()}\n")
-
-                # Parse output using fzo
-                try:
-                    output_results = fzo(working_dir, model)
-
-                    # Convert DataFrame to dict if needed
-                    if hasattr(output_results, "to_dict"):
-                        output_dict = output_results.iloc[0].to_dict()
-                    else:
-                        output_dict = output_results
-
-                    output_dict["status"] = "done"
-                    output_dict["calculator"] = f"funz://{host}:{tcp_port}"
-                    output_dict["command"] = code
-
-                    return output_dict
-
-                except Exception as e:
-                    log_warning(f"Could not parse output: {e}")
-                    return {
-                        "status": "done",
-                        "calculator": f"funz://{host}:{tcp_port}",
-                        "command": code,
-                        "error": f"Output parsing failed: {str(e)}"
-                    }
-
-            finally:
-                # Step 6: Unreserve calculator
-                log_info("Unreserving calculator...")
-                try:
-                    send_message(METHOD_UNRESERVE, secret_code if secret_code else "")
-                    read_response()  # Ignore response
-                except Exception as e:
-                    log_warning(f"Failed to unreserve: {e}")
-
-        finally:
-            try:
-                sock_file.close()
-            except:
-                pass
-
-            try:
-                sock.close()
-            except:
-                pass
-
-    except KeyboardInterrupt:
-        return {
-            "status": "interrupted",
-            "error": "Funz calculation interrupted by user",
-            "command": code if 'code' in locals() else funz_uri,
-        }
+    except KeyboardInterrupt:
+        return {
+            "status": "interrupted",
+            "error": "Funz calculation interrupted by user",
+            "command": code if 'code' in locals() else funz_uri,
+        }
 
     except socket.timeout:
         return {
@@ -3347,68 +3258,444 @@ def run_funz_calculation(
             "command": code if 'code' in locals() else funz_uri,
         }
 
-def _transfer_files_to_remote(sftp, local_dir: Path, remote_dir: str) -> None:
+def _transfer_files_to_remote(sftp, local_dir: Path, remote_dir: str) -> int:
     """
     Transfer files from local directory to remote directory via SFTP
+
+    Subdirectories are transferred recursively.
+
+    Returns:
+        Number of bytes transferred
     """
+    transferred = 0
     for item in local_dir.iterdir():
-        if item.is_file():
+        remote_path = f"{remote_dir}/{item.name}"
+        if item.is_dir():
+            try:
+                sftp.mkdir(remote_path)
+            except IOError:
+                pass  # Already exists
+            transferred += _transfer_files_to_remote(sftp, item, remote_path)
+        elif item.is_file():
             local_path = str(item)
-            remote_path = f"{remote_dir}/{item.name}"
             log_info(
                 f"Transferring {item.name} from local ({local_path}) to remote ({remote_path})"
             )
             sftp.put(local_path, remote_path)
+            transferred += item.stat().st_size
+    return transferred
 
 
-def _execute_remote_command(
+class _CountingStream:
+    """File-like wrapper counting the bytes written to or read from a channel file"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.count = 0
+
+    def write(self, data):
+        self.stream.write(data)
+        self.count += len(data)
+        return len(data)
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.count += len(data)
+        return data
+
+
+def _write_tar(stream, local_dir: Path, compress: bool = False) -> int:
+    """
+    Write local_dir (subdirectories included) as a tar archive to a channel file
+
+    Args:
+        stream: Writable channel file (stdin of a remote "tar -x")
+        local_dir: Local case directory
+        compress: Compress the archive with gzip
+
+    Returns:
+        Number of (possibly compressed) bytes written
+    """
+    counting = _CountingStream(stream)
+    with tarfile.open(fileobj=counting, mode="w|gz" if compress else "w|",
+                      format=tarfile.GNU_FORMAT, dereference=True) as tar:
+        for item in sorted(local_dir.iterdir()):
+            tar.add(str(item), arcname=item.name)
+    return counting.count
+
+
+def _is_within(path: str, root: Path) -> bool:
+    """Whether path (resolved) is root or below it"""
+    return os.path.commonpath([os.path.realpath(path), str(root)]) == str(root)
+
+
+def _tar_member_target(member: tarfile.TarInfo, root: Path) -> Path:
+    """
+    Local path of a member of an archive received from a remote, checked to
+    stay inside the case directory
+
+    Args:
+        member: Archive member
+        root: Resolved local case directory
+
+    Returns:
+        Path of the member under root
+
+    Raises:
+        RuntimeError: For absolute or parent paths, links pointing outside
+            root, and special files
+    """
+    name = os.path.normpath(member.name)
+    if os.path.isabs(name) or name == os.pardir or name.startswith(os.pardir + os.sep):
+        raise RuntimeError(f"unsafe path in remote archive: {member.name}")
+    if name == os.curdir:
+        return root
+    target = root / name
+    # The member itself may be a local link, replaced: only its directory is resolved
+    if not _is_within(str(target.parent), root):
+        raise RuntimeError(f"unsafe path in remote archive: {member.name}")
+    if member.issym():
+        link = os.path.join(os.path.dirname(str(target)), member.linkname)
+        if os.path.isabs(member.linkname) or not _is_within(link, root):
+            raise RuntimeError(f"unsafe link in remote archive: {member.name} -> {member.linkname}")
+    elif member.islnk():
+        if os.path.isabs(member.linkname) or not _is_within(str(root / member.linkname), root):
+            raise RuntimeError(f"unsafe link in remote archive: {member.name} -> {member.linkname}")
+    elif not (member.isfile() or member.isdir()):
+        raise RuntimeError(f"unsupported file type in remote archive: {member.name}")
+    return target
+
+def _tar_from_remote(ssh_client, remote_dir: str, local_dir: Path, compress: bool = False,
+                     patterns: Optional[List[str]] = None) -> int:
+    """
+    Fetch remote_dir as a tar archive streamed by "tar -c" on the remote, in one exec channel
+
+    Files already present locally are replaced, not overwritten in place, so that
+    input files hard linked between cases are left untouched.
+
+    Args:
+        ssh_client: SSH client connection
+        remote_dir: Remote case directory
+        local_dir: Local directory to extract into
+        compress: Compress the stream with gzip
+        patterns: Shell glob patterns of the files to fetch, None for all
+
+    Returns:
+        Number of (possibly compressed) bytes received
+
+    Raises:
+        RuntimeError: If the remote tar fails
+    """
+    flags = f"-c{'z' if compress else ''}f"
+    if patterns is None:
+        command = f"tar {flags} - -C {shlex.quote(remote_dir)} ."
+    else:
+        # Patterns are expanded by the remote shell; the ones matching nothing are dropped
+        script = (
+            f"cd {shlex.quote(remote_dir)} && set -- && "
+            f"for f in {' '.join(_shell_glob(p) for p in patterns)}; "
+            f"do [ -e \"$f\" ] && set -- \"$@\" \"$f\"; done; "
+            f"tar {flags} - \"$@\""
+        )
+        command = f"sh -c {shlex.quote(script)}"
+    stdin, stdout, stderr = ssh_client.exec_command(command)
+    stdin.close()
+    stream = _CountingStream(stdout)
+    extract_kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    root = local_dir.resolve()
+    with tarfile.open(fileobj=stream, mode="r|gz" if compress else "r|") as tar:
+        for member in tar:
+            # Checked before anything is removed or written, on every Python version
+            target = _tar_member_target(member, root)
+            if not member.isdir() and (target.is_file() or target.is_symlink()):
+                target.unlink()
+            tar.extract(member, str(local_dir), **extract_kwargs)
+    exit_status = stdout.channel.recv_exit_status()
+    if exit_status != 0:
+        raise RuntimeError(
+            f"remote tar exited with code {exit_status}: "
+            f"{stderr.read().decode('utf-8', errors='replace').strip()}"
+        )
+    return stream.count
+
+
+def _sftp_makedirs(sftp, remote_dir: str) -> None:
+    """Create a remote directory and its missing parents over SFTP"""
+    path = ""
+    for part in remote_dir.split("/"):
+        path = f"{path}/{part}" if path or remote_dir.startswith("/") else part
+        if not part or part == "~":
+            continue
+        try:
+            sftp.stat(path)
+        except IOError:
+            sftp.mkdir(path)
+
+
+def _upload_case_sftp(lease, local_dir: Path, remote_dir: str) -> Dict[str, Any]:
+    """
+    Transfer a case directory to the remote file by file over SFTP
+
+    Returns:
+        Transfer statistics: mode, bytes, seconds
+    """
+    start = time.time()
+    sftp = lease.sftp()
+    _sftp_makedirs(sftp, remote_dir)
+    sent = _transfer_files_to_remote(sftp, local_dir, remote_dir)
+    return {"mode": "sftp", "bytes": sent, "seconds": time.time() - start}
+
+
+def _download_case(lease, remote_dir: str, local_dir: Path, mode: str,
+                   patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Transfer a case directory back from the remote, with the mode used for its upload
+
+    Args:
+        lease: SSHLease of the connection
+        remote_dir: Remote case directory
+        local_dir: Local case directory
+        mode: Transfer mode of the upload (tar, tar.gz or sftp)
+        patterns: Shell glob patterns (relative to remote_dir) of the files to
+            download, None for all
+
+    Returns:
+        Transfer statistics: mode, bytes, seconds
+    """
+    start = time.time()
+    if mode != "sftp":
+        try:
+            received = _tar_from_remote(
+                lease.client, remote_dir, local_dir, mode == "tar.gz", patterns
+            )
+            return {"mode": mode, "bytes": received, "seconds": time.time() - start}
+        except (RuntimeError, tarfile.TarError) as e:
+            log_warning(f"Tar transfer from remote failed, using SFTP: {e}")
+            start = time.time()
+    received = _transfer_results_from_remote(lease.sftp(), remote_dir, local_dir, patterns)
+    return {"mode": "sftp", "bytes": received, "seconds": time.time() - start}
+
+
+def _append_to_log(local_dir: Path, lines: List[str]) -> None:
+    """Append lines to the log.txt of a case"""
+    try:
+        with open(local_dir / "log.txt", "a") as log_file:
+            log_file.writelines(f"{line}\n" for line in lines)
+    except Exception as e:
+        log_warning(f"Could not complete log.txt: {e}")
+
+
+class _RemoteUploadError(RuntimeError):
+    """The remote control script could not extract the uploaded case (e.g. no tar)"""
+
+
+#: First line of the reply block printed by the remote control script
+_REPLY_MARKER = "FZ-REPLY"
+
+#: Bytes of the command stderr sent back in the reply (for error messages)
+_REPLY_STDERR_TAIL = 4096
+
+
+def _heredoc_escape(text: str) -> str:
+    """Escape text for an unquoted shell here-document"""
+    return text.replace("\\", "\\\\").replace("$", "\\$").replace("`", "\\`")
+
+
+def _remote_control_script(
+    remote_dir: str,
+    run_line: str,
+    log_lines: List[str],
+    tar_compress: Optional[bool] = None,
+    deferred: List[str] = None,
+    output_commands: List[str] = None,
+) -> str:
+    """
+    Shell script running a whole case on the remote host in one exec request
+
+    The script starts the deferred commands of the connection in the background,
+    creates and enters remote_dir, extracts the case tar archive from its stdin
+    (if tar_compress is not None), runs run_line with stdout and stderr written
+    to out.txt and err.txt, writes log.txt, and prints a reply block:
+
+        FZ-REPLY
+        <stage: setup, upload or run>
+        <exit code>
+        <hostname>, <user>, <working directory>, <OS>, <platform> (run stage only)
+        <exit code> <base64 stdout> <base64 stderr> of each output command
+        <tail of err.txt>
+
+    Args:
+        remote_dir: Remote case directory
+        run_line: Command line to run in remote_dir
+        log_lines: log.txt lines known locally, written after "Exit code"
+        tar_compress: Extract a (gzip compressed if True) tar archive from stdin
+        deferred: Commands to run in the background first (e.g. cleanups)
+        output_commands: Shell output commands to run in remote_dir after run_line
+
+    Returns:
+        Script text for "sh -c"
+    """
+    fail = "{{ printf '%s\\n' {marker} {stage} {code}; exit {code}; }}"
+    script = []
+    if deferred:
+        script.append(f"({'; '.join(deferred)}) </dev/null >/dev/null 2>&1 &")
+    script.append(
+        f"mkdir -p {shlex.quote(remote_dir)} && cd {shlex.quote(remote_dir)} || "
+        + fail.format(marker=_REPLY_MARKER, stage="setup", code=97)
+    )
+    if tar_compress is not None:
+        script.append(
+            f"tar -x{'z' if tar_compress else ''}f - || "
+            + fail.format(marker=_REPLY_MARKER, stage="upload", code=98)
+        )
+    log_text = "\n".join(_heredoc_escape(line) for line in log_lines)
+    script.append(f"""{{ {run_line}
+}} </dev/null >out.txt 2>err.txt
+fz_exit=$?
+fz_host=$(hostname 2>/dev/null || echo unknown)
+fz_user=$(whoami 2>/dev/null || echo unknown)
+fz_pwd=$(pwd)
+fz_os=$(uname -s 2>/dev/null || echo unknown)
+fz_platform=$(uname -a 2>/dev/null || echo unknown)
+cat > log.txt <<FZ_LOG_EOF
+Command: {_heredoc_escape(run_line)}
+Exit code: $fz_exit
+{log_text}
+Remote user: $fz_user
+Remote hostname: $fz_host
+Remote operating system: $fz_os
+Remote platform: $fz_platform
+Remote working directory: $fz_pwd
+Timestamp: $(date)
+FZ_LOG_EOF
+printf '%s\\n' {_REPLY_MARKER} run "$fz_exit" "$fz_host" "$fz_user" "$fz_pwd" "$fz_os" "$fz_platform\"""")
+    for output_command in output_commands or []:
+        script.append(f"""{{ {output_command}
+}} </dev/null >.fz_output 2>.fz_output_err
+fz_rc=$?
+printf '%s %s %s\\n' "$fz_rc" "$(base64 <.fz_output | tr -d '\\n')" "$(base64 <.fz_output_err | tr -d '\\n')\"""")
+    if output_commands:
+        script.append("rm -f .fz_output .fz_output_err")
+    script.append(f"""tail -c {_REPLY_STDERR_TAIL} err.txt
+exit $fz_exit""")
+    return "\n".join(script)
+
+
+def _parse_control_reply(stdout_data: str, n_outputs: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Parse the reply block of the remote control script
+
+    Args:
+        stdout_data: stdout of the control script
+        n_outputs: Number of output commands the script ran
+
+    Returns:
+        Dict with stage, exit_code, and for the run stage the remote host facts,
+        "outputs" (list of (returncode, stdout, stderr), when n_outputs) and
+        "stderr" (None if there is no reply block)
+    """
+    _, marker, reply = stdout_data.partition(_REPLY_MARKER + "\n")
+    if not marker:
+        return None
+    fields = reply.split("\n")
+    try:
+        parsed = {"stage": fields[0], "exit_code": int(fields[1])}
+    except (IndexError, ValueError):
+        return None
+    if parsed["stage"] == "run":
+        keys = ("hostname", "user", "working_dir", "operating_system", "platform")
+        parsed.update(zip(keys, fields[2:7]))
+        if n_outputs:
+            outputs = []
+            for line in fields[7:7 + n_outputs]:
+                returncode, out, err = (line.split(" ") + ["", "", ""])[:3]
+                outputs.append((
+                    int(returncode or 1),
+                    base64.b64decode(out).decode("utf-8", errors="replace"),
+                    base64.b64decode(err).decode("utf-8", errors="replace"),
+                ))
+            parsed["outputs"] = outputs
+        parsed["stderr"] = "\n".join(fields[7 + n_outputs:])
+    return parsed
+
+
+def _run_control_script(
     ssh_client,
-    command: str,
+    run_line: str,
     remote_dir: str,
     local_dir: Path,
     timeout: int,
-    start_time: datetime = None,
-    env_info: Dict = None,
-    input_files_list: List[str] = None,
+    start_time: Optional[datetime],
+    env_info: Optional[Dict],
+    kill_pattern: str,
+    extra_log_lines: List[str] = None,
+    tar_compress: Optional[bool] = None,
+    deferred: List[str] = None,
+    output_commands: List[str] = None,
 ) -> Dict[str, Any]:
     """
-    Execute command on remote server with interrupt handling
+    Run a case on the remote host with its control script, with interrupt handling
 
     Args:
         ssh_client: SSH client connection
-        command: Command to execute
-        remote_dir: Remote directory path
-        local_dir: Local directory path
+        run_line: Command line to run in remote_dir
+        remote_dir: Remote case directory
+        local_dir: Local case directory (uploaded if tar_compress is not None)
         timeout: Timeout in seconds
-        start_time: Start time of execution
-        env_info: Environment information
-        input_files_list: List of input file names in order (from .fz_hash)
-    """
-    # Import here to avoid circular imports
-    from .core import is_interrupted
-
-    # Check for interrupt before starting
-    if is_interrupted():
-        return {
-            "status": "interrupted",
-            "error": "Execution interrupted by user",
-            "command": command,
-        }
-
-    # Build arguments from input files list
-    input_argument = " ".join(input_files_list) if input_files_list else "."
+        start_time: Start time of the case
+        env_info: Local environment information
+        kill_pattern: pgrep pattern of the remote process, to kill it on interrupt
+        extra_log_lines: Additional log.txt lines (after the local information)
+        tar_compress: Upload local_dir as a (gzip compressed if True) tar stream
+        deferred: Commands to run in the background first
+        output_commands: Shell output commands to run on the remote after the case
 
-    # Construct full command
-    if command:
-        full_command = f"cd {remote_dir} && {command} {input_argument}"
-    else:
-        full_command = f"cd {remote_dir} && ./{input_argument}"
+    Returns:
+        Dict with "status" (interrupted, timeout or completed), "upload" (transfer
+        statistics or None), and when completed: "exit_code", "stderr", "reply"
+        (parsed reply block or None), "outputs" ((returncode, stdout, stderr) of
+        each output command, or None) and "log_lines" to append to the local log.txt
 
-    log_info(f"Executing remote command: {full_command}")
+    Raises:
+        _RemoteUploadError: If the remote could not extract the uploaded case
+    """
+    from .core import is_interrupted
 
-    # Execute command
+    env_info = env_info or {}
+    log_lines = [
+        f"Time start: {start_time.isoformat() if start_time else 'unknown'}",
+        f"Local user: {env_info.get('user', 'unknown')}",
+        f"Local hostname: {env_info.get('hostname', 'unknown')}",
+        f"Local operating system: {env_info.get('operating_system', 'unknown')}",
+        f"Local working directory: {env_info.get('working_dir', 'unknown')}",
+    ] + list(extra_log_lines or [])
+    output_commands = list(output_commands or [])
+    script = _remote_control_script(
+        remote_dir, run_line, log_lines, tar_compress, deferred, output_commands
+    )
+
+    # Execute the control script (and stream the case into it)
     command_start_time = datetime.now()
-    stdin, stdout, stderr = ssh_client.exec_command(full_command, timeout=timeout)
+    stdin, stdout, stderr = ssh_client.exec_command(f"sh -c {shlex.quote(script)}", timeout=timeout)
+    upload = None
+    if tar_compress is not None:
+        upload_start = time.time()
+        try:
+            sent = _write_tar(stdin, local_dir, tar_compress)
+        except OSError:
+            # The remote tar exited early: the reply tells why
+            sent = 0
+        finally:
+            try:
+                stdin.channel.shutdown_write()
+            except OSError:
+                pass
+        upload = {
+            "mode": "tar.gz" if tar_compress else "tar",
+            "bytes": sent,
+            "seconds": time.time() - upload_start,
+        }
+        command_start_time = datetime.now()
 
     # Get the channel for polling
     channel = stdout.channel
@@ -3416,24 +3703,20 @@ def _execute_remote_command(
     # Poll for completion with interrupt checking
     poll_interval = 0.5  # Poll every 500ms
     elapsed_time = 0.0
-    exit_code = None
 
     try:
         while not channel.exit_status_ready():
             # Check if user requested interrupt
             if is_interrupted():
                 log_warning(f"⚠️  Interrupt detected, terminating remote process...")
-                # Send SIGTERM to remote process group
                 try:
-                    # Try to kill the remote process
                     # Use channel.send to send Ctrl+C
                     channel.send('\x03')  # Send Ctrl+C (SIGINT)
                     time.sleep(0.5)  # Give process time to terminate
 
-                    # If still running, force kill
+                    # If still running, force kill the process tree
                     if not channel.exit_status_ready():
-                        # Try killing the process tree
-                        kill_cmd = f"pkill -P $(pgrep -f '{command[:50]}')"  # Kill process tree
+                        kill_cmd = f"pkill -P $(pgrep -f '{kill_pattern}')"
                         try:
                             ssh_client.exec_command(kill_cmd, timeout=2)
                         except:
@@ -3451,11 +3734,7 @@ def _execute_remote_command(
                     time.sleep(0.5)
                 except:
                     pass
-                return {
-                    "status": "timeout",
-                    "error": f"Command timed out after {timeout} seconds",
-                    "command": full_command,
-                }
+                return {"status": "timeout", "upload": upload}
 
             # Sleep briefly before next poll
             time.sleep(poll_interval)
@@ -3471,76 +3750,262 @@ def _execute_remote_command(
             channel.close()
         except:
             pass
-        return {
-            "status": "interrupted",
-            "error": "Remote calculation interrupted by user",
-            "command": full_command,
-        }
-
-    # Get output
-    stdout_data = stdout.read().decode("utf-8")
-    stderr_data = stderr.read().decode("utf-8")
+        return {"status": "interrupted", "upload": upload}
+
+    # The command output stays in out.txt/err.txt: only the reply comes back
+    stdout_data = stdout.read().decode("utf-8", errors="replace")
+    stderr_data = stderr.read().decode("utf-8", errors="replace")
+    reply = _parse_control_reply(stdout_data, len(output_commands))
+    if reply is not None:
+        if reply["stage"] == "upload":
+            raise _RemoteUploadError(stderr_data.strip() or "remote tar failed")
+        exit_code = reply["exit_code"]
+        if reply["stage"] == "run":
+            stderr_data = reply["stderr"]
+        else:
+            stderr_data = stderr_data or f"Could not create remote directory {remote_dir}"
 
     # Calculate timing
+    command_execution_time = (command_end_time - command_start_time).total_seconds()
     if start_time:
         total_execution_time = (command_end_time - start_time).total_seconds()
-        command_execution_time = (command_end_time - command_start_time).total_seconds()
     else:
-        total_execution_time = command_execution_time = 0.0
+        total_execution_time = command_execution_time
+
+    return {
+        "status": "completed",
+        "exit_code": exit_code,
+        "stderr": stderr_data,
+        "reply": reply,
+        "outputs": reply.get("outputs") if reply else None,
+        "upload": upload,
+        "log_lines": [
+            f"Time end: {command_end_time.isoformat()}",
+            f"Command execution time: {command_execution_time:.3f} seconds",
+            f"Total execution time: {total_execution_time:.3f} seconds",
+        ],
+    }
+
+
+def _remote_output_commands(model: Dict) -> Dict[str, str]:
+    """
+    Output commands of a model to evaluate on the remote host
+
+    Only with the model "remote_output" option, and only shell commands: python://,
+    jq://, yq:// and xpath:// outputs and callables are evaluated locally on the
+    downloaded files.
+
+    Returns:
+        Dict mapping output name to command (empty if remote_output is off)
+    """
+    if not model.get("remote_output"):
+        return {}
+    return {
+        key: command for key, command in model.get("output", {}).items()
+        if isinstance(command, str)
+        and not is_python_expression(command)
+        and not is_jq_expression(command)
+        and not is_yq_expression(command)
+        and not is_xpath_expression(command)
+    }
+
+
+def _remote_output_results(
+    remote_outputs: Optional[Dict[str, str]], outputs: Optional[List[Tuple[int, str, str]]]
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Pair the output commands run on the remote with their results (see save_remote_outputs)"""
+    if not remote_outputs or outputs is None:
+        return None
+    return {
+        key: {"command": command, "returncode": returncode, "stdout": out, "stderr": err}
+        for (key, command), (returncode, out, err) in zip(remote_outputs.items(), outputs)
+    }
+
+
+#: Files always downloaded after a remote case, whatever the model output_files
+_ALWAYS_FETCHED = ("log.txt", "out.txt", "err.txt")
+
+
+#: Wildcards of output_files patterns, and character classes of safe characters
+_GLOB_TOKEN = re.compile(r"(\*|\?|\[[!^]?[\w.-]+\])")
+
+
+def _shell_glob(pattern: str) -> str:
+    """
+    A glob pattern as a shell word: wildcards and character classes are left
+    to the shell, everything else is quoted
+
+    Raises:
+        ValueError: For character classes holding other characters than
+            letters, digits, "_", "." and "-"
+    """
+    words = []
+    for i, part in enumerate(_GLOB_TOKEN.split(pattern)):
+        if i % 2:
+            words.append(part)
+        elif "[" in part and "]" in part[part.index("["):]:
+            raise ValueError(
+                f"Unsupported character class in output_files pattern {pattern!r}: "
+                "only letters, digits, '_', '.' and '-' are allowed between brackets"
+            )
+        elif part:
+            words.append(shlex.quote(part))
+    return "".join(words)
+
+
+def _output_file_patterns(model: Dict) -> Optional[List[str]]:
+    """
+    Files to download after a remote case (model "output_files"), None for all
+
+    Raises:
+        ValueError: For patterns that cannot be passed to the remote shell
+    """
+    patterns = model.get("output_files")
+    if patterns is None:
+        return None
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    for pattern in patterns:
+        _shell_glob(pattern)
+    return list(_ALWAYS_FETCHED) + [p for p in patterns if p not in _ALWAYS_FETCHED]
+
+
+def _run_remote_case(lease, working_dir: Path, remote_dir: str, execute: Callable,
+                     output_files: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Run a case over a leased connection: upload, execute, download, schedule cleanup
+
+    The case is uploaded as a tar stream into the control script (or over SFTP,
+    as configured by FZ_SSH_TRANSFER, and on hosts without tar), and fetched back
+    with one more exec request. The remote directory is removed later, by the next
+    control script on the connection or when the connection closes.
+
+    Args:
+        lease: SSHLease of the connection
+        working_dir: Local case directory
+        remote_dir: Remote case directory
+        execute: _execute_remote_command-like callable taking tar_compress and deferred
+        output_files: Shell glob patterns of the files to download (None for all)
+
+    Returns:
+        Result dict from execute
+    """
+    config = get_config()
+    upload = None
+    tar_compress = None
+    if config.ssh_transfer == "tar" and lease.info.get("tar", True):
+        tar_compress = config.ssh_compress
+    else:
+        upload = _upload_case_sftp(lease, working_dir, remote_dir)
 
-    # Get remote system information
-    remote_info_cmd = "hostname; whoami; pwd; uname -s; uname -a"
     try:
-        _, remote_stdout, _ = ssh_client.exec_command(remote_info_cmd, timeout=10)
-        remote_info_lines = remote_stdout.read().decode("utf-8").strip().split("\n")
-        remote_hostname = (
-            remote_info_lines[0] if len(remote_info_lines) > 0 else "unknown"
-        )
-        remote_user = remote_info_lines[1] if len(remote_info_lines) > 1 else "unknown"
-        remote_pwd = remote_info_lines[2] if len(remote_info_lines) > 2 else "unknown"
-        remote_os = remote_info_lines[3] if len(remote_info_lines) > 3 else "unknown"
-        remote_platform = (
-            remote_info_lines[4] if len(remote_info_lines) > 4 else "unknown"
-        )
-    except:
-        remote_hostname = remote_user = remote_pwd = remote_os = remote_platform = (
-            "unknown"
-        )
+        try:
+            result = execute(tar_compress=tar_compress, deferred=lease.take_deferred())
+        except _RemoteUploadError as e:
+            log_warning(f"Tar transfer to remote failed, using SFTP: {e}")
+            lease.info["tar"] = False
+            upload = _upload_case_sftp(lease, working_dir, remote_dir)
+            result = execute(tar_compress=None, deferred=None)
+
+        upload = result.pop("_upload", None) or upload
+        log_lines = result.pop("_log_lines", None)
+        remote_outputs = result.pop("_remote_outputs", None)
+        if log_lines is None:
+            # Timed out or interrupted: fetch what the case wrote so far (out.txt,
+            # err.txt...) for diagnosis, unless it never started or the connection is down
+            if upload is not None and lease.is_active():
+                try:
+                    _download_case(lease, remote_dir, working_dir, upload["mode"], output_files)
+                except Exception as e:
+                    log_warning(f"Could not fetch the partial results of {working_dir.name}: {e}")
+            return result
 
-    # Create enhanced log files remotely
-    log_command = f"""cd {remote_dir}
-
-# Create enhanced log.txt
-cat > log.txt << 'EOF'
-Command: {full_command}
-Exit code: {exit_code}
-Time start: {start_time.isoformat() if start_time else 'unknown'}
-Time end: {command_end_time.isoformat()}
-Command execution time: {command_execution_time:.3f} seconds
-Total execution time: {total_execution_time:.3f} seconds
-Local user: {env_info.get('user', 'unknown') if env_info else 'unknown'}
-Local hostname: {env_info.get('hostname', 'unknown') if env_info else 'unknown'}
-Local operating system: {env_info.get('operating_system', 'unknown') if env_info else 'unknown'}
-Local working directory: {env_info.get('working_dir', 'unknown') if env_info else 'unknown'}
-Remote user: {remote_user}
-Remote hostname: {remote_hostname}
-Remote operating system: {remote_os}
-Remote platform: {remote_platform}
-Remote working directory: {remote_pwd}
-Timestamp: $(date)
-EOF
+        download = _download_case(lease, remote_dir, working_dir, upload["mode"], output_files)
+        if remote_outputs:
+            save_remote_outputs(working_dir, remote_outputs)
+        _append_to_log(working_dir, log_lines + [
+            f"Transfer mode: {download['mode']}",
+            f"Transfer to remote: {upload['bytes']} bytes in {upload['seconds']:.3f} seconds",
+            f"Transfer from remote: {download['bytes']} bytes in {download['seconds']:.3f} seconds",
+        ])
+        return result
+    finally:
+        lease.defer(f"rm -rf {shlex.quote(remote_dir)}")
 
-# Create output files
-cat > out.txt << 'EOF'
-{stdout_data}
-EOF
 
-cat > err.txt << 'EOF'
-{stderr_data}
-EOF
-"""
-    ssh_client.exec_command(log_command, timeout=30)
+def _execute_remote_command(
+    ssh_client,
+    command: str,
+    remote_dir: str,
+    local_dir: Path,
+    timeout: int,
+    start_time: datetime = None,
+    env_info: Dict = None,
+    input_files_list: List[str] = None,
+    tar_compress: Optional[bool] = None,
+    deferred: List[str] = None,
+    remote_outputs: Dict[str, str] = None,
+) -> Dict[str, Any]:
+    """
+    Execute command on remote server with interrupt handling
+
+    The whole case runs in one exec request (see _remote_control_script).
 
+    Args:
+        ssh_client: SSH client connection
+        command: Command to execute
+        remote_dir: Remote directory path (created if missing)
+        local_dir: Local directory path
+        timeout: Timeout in seconds
+        start_time: Start time of execution
+        env_info: Environment information
+        input_files_list: List of input file names in order (from .fz_hash)
+        tar_compress: Upload local_dir as a (gzip compressed if True) tar stream first
+        deferred: Commands to run in the background first (e.g. cleanups)
+        remote_outputs: Model output commands to evaluate on the remote, by output name
+    """
+    # Import here to avoid circular imports
+    from .core import is_interrupted
+
+    # Check for interrupt before starting
+    if is_interrupted():
+        return {
+            "status": "interrupted",
+            "error": "Execution interrupted by user",
+            "command": command,
+        }
+
+    # Build arguments from input files list
+    input_argument = " ".join(input_files_list) if input_files_list else "."
+
+    # Construct full command
+    run_line = f"{command} {input_argument}" if command else f"./{input_argument}"
+    full_command = f"cd {shlex.quote(remote_dir)} && {run_line}"
+
+    log_info(f"Executing remote command: {full_command}")
+
+    run = _run_control_script(
+        ssh_client, run_line, remote_dir, local_dir, timeout, start_time, env_info,
+        kill_pattern=command[:50], tar_compress=tar_compress, deferred=deferred,
+        output_commands=[strip_bash_prefix(c) for c in (remote_outputs or {}).values()],
+    )
+    if run["status"] == "timeout":
+        return {
+            "status": "timeout",
+            "error": f"Command timed out after {timeout} seconds",
+            "command": full_command,
+            "_upload": run["upload"],
+        }
+    if run["status"] == "interrupted":
+        return {
+            "status": "interrupted",
+            "error": "Remote calculation interrupted by user",
+            "command": full_command,
+            "_upload": run["upload"],
+        }
+
+    exit_code = run["exit_code"]
+    stderr_data = run["stderr"]
     if exit_code != 0:
         # Classify the error to provide a human-readable message
         error_message = classify_error(
@@ -3549,38 +4014,79 @@ EOF
             command=command,
             protocol="ssh",
         )
-        return {
+        result = {
             "status": "failed",
             "exit_code": exit_code,
             "error": error_message,
             "stderr": stderr_data,
             "command": command,
         }
-
-    return {"status": "done", "stdout": stdout_data, "stderr": stderr_data}
+    else:
+        result = {"status": "done", "stderr": stderr_data}
+    result["_upload"] = run["upload"]
+    result["_log_lines"] = run["log_lines"]
+    result["_remote_outputs"] = _remote_output_results(remote_outputs, run["outputs"])
+    return result
 
 
-def _transfer_results_from_remote(sftp, remote_dir: str, local_dir: Path) -> None:
+def _transfer_results_from_remote(sftp, remote_dir: str, local_dir: Path,
+                                  patterns: Optional[List[str]] = None) -> int:
     """
     Transfer result files from remote directory back to local directory
+
+    Subdirectories are transferred recursively.
+
+    Args:
+        sftp: SFTP client
+        remote_dir: Remote case directory
+        local_dir: Local case directory
+        patterns: Shell glob patterns (relative to remote_dir) of the files to
+            transfer, None for all; a matching directory is transferred whole
+
+    Returns:
+        Number of bytes transferred
     """
+    return _sftp_get_tree(sftp, remote_dir, local_dir, patterns, "")
+
+
+def _sftp_get_tree(sftp, remote_dir: str, local_dir: Path,
+                   patterns: Optional[List[str]], prefix: str) -> int:
+    """Recursive part of _transfer_results_from_remote (prefix: path relative to the case)"""
+    transferred = 0
     try:
         # List remote files
-        remote_files = sftp.listdir(remote_dir)
+        remote_files = sftp.listdir_attr(remote_dir)
 
-        for filename in remote_files:
+        for attr in remote_files:
+            filename = attr.filename
             if filename not in [".", ".."]:
                 remote_path = f"{remote_dir}/{filename}"
                 local_path = local_dir / filename
+                relative = prefix + filename
+                selected = patterns is None or any(fnmatch.fnmatch(relative, p) for p in patterns)
 
                 try:
-                    log_info(f"Transferring {filename} from remote")
+                    if stat.S_ISDIR(attr.st_mode or 0):
+                        transferred += _sftp_get_tree(
+                            sftp, remote_path, local_path,
+                            None if selected else patterns, relative + "/",
+                        )
+                        continue
+                    if not selected:
+                        continue
+                    log_info(f"Transferring {relative} from remote")
+                    local_path.parent.mkdir(parents=True, exist_ok=True)
+                    if local_path.is_file():
+                        # Replace rather than overwrite (input files may be hard links)
+                        local_path.unlink()
                     sftp.get(remote_path, str(local_path))
+                    transferred += attr.st_size or 0
                 except Exception as e:
                     log_warning(f"Could not transfer {filename}: {e}")
 
     except Exception as e:
         log_warning(f"Could not list remote files: {e}")
+    return transferred
 
 
 def select_calculator_for_case(calculator_uris: List[str], case_index: int) -> str:
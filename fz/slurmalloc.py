@@ -0,0 +1,373 @@
+"""
+Allocation backend for local slurm:// calculators (FZ_SLURM_MODE=alloc)
+
+For cases lasting seconds, SLURM scheduling latency dominates: each srun or
+array task waits in the queue on its own. In allocation mode one batch job
+per partition is submitted, and an fz worker running inside it (python -m
+fz.slurmalloc) pulls the cases from the driver and runs them, several at a
+time, until the queue stays empty or the walltime nears. A sweep of many
+short cases thus costs one queue wait.
+
+Driver and worker share a queue directory on the shared file system:
+
+- pending/<name>.json: a case to run ({"dir", "command"}), written by the driver
+- running/<name>.json: the case claimed by a worker (atomic rename)
+- done/<name>.json: the case result ({"exit_code", "host", "start", "end"})
+- cancel/<name>: a case to kill, written by the driver
+- stop: written by the driver when it exits, for the worker to stop
+
+When the allocation ends while cases are pending, the driver submits a new
+one; cases that were running in it fail (and are retried by fzr).
+"""
+import argparse
+import atexit
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logging import log_debug, log_info, log_warning
+from .slurmarray import ACTIVE_STATES, GATHER_DELAY, ArrayTask, _run
+
+#: Seconds between two scans of the queue by a worker waiting for cases
+WORKER_POLL = 0.2
+
+#: Seconds of walltime kept in reserve when deciding to start one more case
+WALLTIME_MARGIN = 10.0
+
+
+def _write_json(path: Path, data: Dict):
+    """Write a JSON file atomically (readers never see it partially written)"""
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+
+class _Allocation:
+    """The queue and current batch job of a partition"""
+
+    def __init__(self, queue_dir: Path):
+        self.queue_dir = queue_dir
+        for sub in ("pending", "running", "done", "cancel"):
+            (queue_dir / sub).mkdir(parents=True, exist_ok=True)
+        self.job_id: Optional[str] = None
+        self.tasks: Dict[str, ArrayTask] = {}
+
+
+class SlurmAllocationScheduler:
+    """
+    Runs cases inside long-lived SLURM allocations fed through a queue directory
+
+    Args:
+        queue_root: Directory for the queues (on a file system shared with the compute nodes)
+        poll_interval: Seconds between two checks of the queues and allocations
+        tasks: Cases run at the same time in an allocation (--ntasks)
+        walltime: Allocation time limit in minutes (--time)
+        idle_timeout: Seconds without a case after which a worker releases its allocation
+        run: Runs a command (argument list), returning (exit code, stdout, stderr)
+    """
+
+    def __init__(self, queue_root: Path, poll_interval: float = 5.0, tasks: int = 1,
+                 walltime: int = 60, idle_timeout: float = 60.0,
+                 run: Callable[[List[str]], Tuple[int, str, str]] = _run):
+        self.queue_root = Path(queue_root)
+        self.poll_interval = poll_interval
+        self.tasks = max(1, tasks)
+        self.walltime = walltime
+        self.idle_timeout = idle_timeout
+        self._run = run
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._allocations: Dict[str, _Allocation] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, working_dir: Path, partition: str, command: str) -> ArrayTask:
+        """
+        Queue a case for the allocation of its partition
+
+        Args:
+            working_dir: Case directory (on a file system shared with the compute nodes)
+            partition: SLURM partition
+            command: Shell command to run in working_dir
+
+        Returns:
+            ArrayTask whose done event is set when the case has finished
+        """
+        task = ArrayTask(working_dir, partition, command)
+        name = f"{time.time_ns()}_{uuid.uuid4().hex[:8]}"
+        with self._lock:
+            allocation = self._allocations.get(partition)
+            if allocation is None:
+                allocation = self._allocations[partition] = _Allocation(
+                    self.queue_root / f"{partition}_{uuid.uuid4().hex[:8]}"
+                )
+            _write_json(allocation.queue_dir / "pending" / f"{name}.json",
+                        {"dir": str(task.working_dir), "command": command})
+            task.name = name
+            task.state = "PENDING"
+            allocation.tasks[name] = task
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="fz-slurm-alloc", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return task
+
+    def cancel(self, task: ArrayTask):
+        """Withdraw a task: removed from the queue, or killed by the worker"""
+        with self._lock:
+            allocation = self._allocations.get(task.partition)
+            if allocation is None or allocation.tasks.pop(task.name, None) is None:
+                return
+        pending = allocation.queue_dir / "pending" / f"{task.name}.json"
+        try:
+            pending.unlink()
+        except FileNotFoundError:
+            # Already claimed by the worker
+            (allocation.queue_dir / "cancel" / task.name).touch()
+        task._finish("CANCELLED")
+
+    def stop(self):
+        """Ask the workers to stop once their running cases are done"""
+        with self._lock:
+            allocations = list(self._allocations.values())
+        for allocation in allocations:
+            try:
+                (allocation.queue_dir / "stop").touch()
+            except OSError:
+                pass
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not any(a.tasks for a in self._allocations.values()):
+                    self._thread = None
+                    return
+            if self._wake.wait(self.poll_interval):
+                self._wake.clear()
+                time.sleep(GATHER_DELAY)
+            try:
+                self._poll()
+            except Exception as e:
+                log_warning(f"⚠️  SLURM allocation scheduler error: {e}")
+
+    def _poll(self):
+        with self._lock:
+            allocations = dict(self._allocations)
+        for allocation in allocations.values():
+            self._collect(allocation)
+
+        # One squeue query for the allocations of all partitions
+        job_ids = [a.job_id for a in allocations.values() if a.job_id]
+        if job_ids:
+            code, out, err = self._run(["squeue", "-h", "-o", "%i %T", "-j", ",".join(job_ids)])
+            if code != 0 and "invalid job id" not in err.lower():
+                log_debug(f"squeue failed (exit code {code}): {err.strip()}")
+                return
+            alive = {f[0] for f in (line.split() for line in out.splitlines())
+                     if len(f) >= 2 and f[1] in ACTIVE_STATES}
+            for allocation in allocations.values():
+                if allocation.job_id and allocation.job_id not in alive:
+                    self._ended(allocation)
+
+        for partition, allocation in allocations.items():
+            with self._lock:
+                waiting = allocation.job_id is None and allocation.tasks
+            if waiting and any((allocation.queue_dir / "pending").glob("*.json")):
+                self._submit(partition, allocation)
+
+    def _collect(self, allocation: _Allocation):
+        """Finish the tasks whose result the worker has written"""
+        for done in (allocation.queue_dir / "done").glob("*.json"):
+            name = done.stem
+            try:
+                result = json.loads(done.read_text())
+            except (OSError, ValueError):
+                continue
+            done.unlink(missing_ok=True)
+            with self._lock:
+                task = allocation.tasks.pop(name, None)
+            if task is not None:
+                exit_code = result.get("exit_code")
+                task.job_id = allocation.job_id
+                task._finish("COMPLETED" if exit_code == 0 else "FAILED", exit_code)
+
+    def _ended(self, allocation: _Allocation):
+        """The batch job of allocation has left the queue"""
+        log_info(f"SLURM allocation {allocation.job_id} ended")
+        self._collect(allocation)
+        for running in (allocation.queue_dir / "running").glob("*.json"):
+            with self._lock:
+                task = allocation.tasks.pop(running.stem, None)
+            running.unlink(missing_ok=True)
+            if task is not None:
+                task._finish("FAILED", error=f"SLURM allocation {allocation.job_id} "
+                                             "ended while the case was running")
+        allocation.job_id = None
+
+    def _submit(self, partition: str, allocation: _Allocation):
+        """Submit the batch job running a worker on allocation's queue"""
+        (allocation.queue_dir / "stop").unlink(missing_ok=True)
+        script = allocation.queue_dir / "job.sh"
+        worker = " ".join(shlex.quote(arg) for arg in (
+            sys.executable, "-m", "fz.slurmalloc", str(allocation.queue_dir),
+            "--slots", str(self.tasks), "--walltime", str(self.walltime * 60),
+            "--idle-timeout", str(self.idle_timeout),
+        ))
+        script.write_text(
+            "#!/bin/sh\n"
+            f"#SBATCH --partition={partition}\n"
+            f"#SBATCH --ntasks={self.tasks}\n"
+            f"#SBATCH --time={self.walltime}\n"
+            "#SBATCH --job-name=fz-worker\n"
+            f"#SBATCH --output={shlex.quote(str(allocation.queue_dir / 'worker.log'))}\n"
+            f"exec {worker}\n"
+        )
+        code, out, err = self._run(["sbatch", "--parsable", str(script)])
+        job_id = out.strip().split(";")[0]
+        if code != 0 or not job_id:
+            message = f"sbatch failed (exit code {code}): {err.strip()}"
+            log_warning(f"⚠️  {message}")
+            with self._lock:
+                tasks, allocation.tasks = allocation.tasks, {}
+            for name, task in tasks.items():
+                (allocation.queue_dir / "pending" / f"{name}.json").unlink(missing_ok=True)
+                task._finish("FAILED", error=message)
+            return
+        allocation.job_id = job_id
+        log_info(f"Submitted SLURM allocation {job_id} ({self.tasks} tasks, "
+                 f"{self.walltime} min, partition {partition})")
+
+
+_scheduler: Optional[SlurmAllocationScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_slurm_allocation() -> SlurmAllocationScheduler:
+    """The process-wide SLURM allocation scheduler, created on first use from the configuration"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from .config import get_config
+            config = get_config()
+            _scheduler = SlurmAllocationScheduler(
+                queue_root=Path.cwd() / ".fz" / "slurm",
+                poll_interval=config.slurm_poll_interval,
+                tasks=config.slurm_alloc_tasks,
+                walltime=config.slurm_alloc_time,
+                idle_timeout=config.slurm_alloc_idle,
+            )
+            atexit.register(_scheduler.stop)
+        return _scheduler
+
+
+def _launch(command: str, working_dir: str, out, err) -> subprocess.Popen:
+    """Start a case: a job step in multi-node allocations, a subprocess otherwise"""
+    args = ["sh", "-c", command]
+    if int(os.environ.get("SLURM_JOB_NUM_NODES", "1")) > 1:
+        args = ["srun", "--exclusive", "--nodes=1", "--ntasks=1", "--cpus-per-task=1"] + args
+    return subprocess.Popen(args, cwd=working_dir, stdin=subprocess.DEVNULL, stdout=out, stderr=err)
+
+
+def _run_case(queue_dir: Path, name: str, spec: Dict) -> int:
+    """Run a claimed case, killing it if the driver cancels it; returns its exit code"""
+    cancelled = queue_dir / "cancel" / name
+    try:
+        with open(Path(spec["dir"]) / "out.txt", "w") as out, \
+                open(Path(spec["dir"]) / "err.txt", "w") as err:
+            proc = _launch(spec["command"], spec["dir"], out, err)
+            while True:
+                try:
+                    return proc.wait(timeout=0.5)
+                except subprocess.TimeoutExpired:
+                    if cancelled.exists():
+                        proc.kill()
+    except OSError as e:
+        print(f"Could not run case {spec.get('dir')}: {e}", file=sys.stderr)
+        return 97
+    finally:
+        cancelled.unlink(missing_ok=True)
+
+
+def run_worker(queue_dir: Path, slots: int = 1, walltime: float = 3600.0,
+               idle_timeout: float = 60.0):
+    """
+    Run the cases of a queue directory, slots at a time, inside an allocation
+
+    Stops when no case was queued nor running for idle_timeout seconds, when the remaining
+    walltime is shorter than the longest case so far, or when the driver asks.
+
+    Args:
+        queue_dir: Queue directory written by SlurmAllocationScheduler
+        slots: Cases run at the same time
+        walltime: Seconds of the allocation time limit
+        idle_timeout: Seconds without a case before stopping
+    """
+    queue_dir = Path(queue_dir)
+    deadline = time.monotonic() + walltime
+    host = socket.gethostname()
+    # busy: slots running a case; the others wait for new cases meanwhile
+    state = {"idle_since": time.monotonic(), "longest": 0.0, "busy": 0}
+    lock = threading.Lock()
+
+    def claim() -> Optional[Tuple[str, Dict]]:
+        for pending in sorted((queue_dir / "pending").glob("*.json")):
+            running = queue_dir / "running" / pending.name
+            try:
+                pending.rename(running)
+                return pending.stem, json.loads(running.read_text())
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def slot():
+        while not (queue_dir / "stop").exists():
+            with lock:
+                if time.monotonic() + state["longest"] + WALLTIME_MARGIN > deadline:
+                    return
+            with lock:
+                case = claim()
+                if case is not None:
+                    state["busy"] += 1
+                elif not state["busy"] and time.monotonic() - state["idle_since"] > idle_timeout:
+                    return
+            if case is None:
+                time.sleep(WORKER_POLL)
+                continue
+            name, spec = case
+            start = time.time()
+            exit_code = _run_case(queue_dir, name, spec)
+            end = time.time()
+            with lock:
+                state["longest"] = max(state["longest"], end - start)
+                state["busy"] -= 1
+                state["idle_since"] = time.monotonic()
+            _write_json(queue_dir / "done" / f"{name}.json",
+                        {"exit_code": exit_code, "host": host, "start": start, "end": end})
+            (queue_dir / "running" / f"{name}.json").unlink(missing_ok=True)
+
+    threads = [threading.Thread(target=slot) for _ in range(max(1, slots))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="fz worker of a SLURM allocation")
+    parser.add_argument("queue_dir")
+    parser.add_argument("--slots", type=int, default=1)
+    parser.add_argument("--walltime", type=float, default=3600.0)
+    parser.add_argument("--idle-timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+    run_worker(Path(args.queue_dir), args.slots, args.walltime, args.idle_timeout)
+
+
+if __name__ == "__main__":
+    main()
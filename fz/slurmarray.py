@@ -0,0 +1,333 @@
+"""
+Job-array backend for local slurm:// calculators (FZ_SLURM_MODE=array)
+
+With the default srun backend every case runs a blocking "srun" of its own, so
+a study of thousands of cases means as many srun processes registering with
+the controller. In array mode the cases submitted by the fzr workers are
+gathered and submitted together as "sbatch --array" jobs, one array task per
+case, and a single thread tracks all of them with one squeue query (and one
+sacct query for the tasks that left the queue) per poll interval.
+
+Each array task runs a small script written in its case directory, which
+records the command exit code in .fz_slurm_exit; the case directories must
+therefore be visible from the compute nodes (shared file system), as for srun.
+"""
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .logging import log_debug, log_info, log_warning
+
+#: File of a case directory holding the exit code of its command
+EXIT_FILE = ".fz_slurm_exit"
+
+#: Script of a case directory run by its array task
+TASK_SCRIPT = ".fz_slurm_task.sh"
+
+#: SLURM job states of tasks still queued or running
+ACTIVE_STATES = {
+    "PENDING", "CONFIGURING", "RUNNING", "COMPLETING", "SUSPENDED",
+    "REQUEUED", "REQUEUE_HOLD", "REQUEUE_FED", "RESIZING", "SIGNALING", "STAGE_OUT",
+}
+
+#: Seconds to wait after a submission for more cases to join the same array
+GATHER_DELAY = 0.5
+
+#: Maximum number of job ids in one squeue or sacct query
+QUERY_CHUNK = 200
+
+
+class ArrayTask:
+    """
+    A case submitted as a SLURM array task
+
+    Attributes:
+        working_dir: Case directory
+        partition: SLURM partition
+        command: Shell command run in working_dir
+        job_id: Array task id ("<array job id>_<index>"), or id of the allocation
+            that ran the case (allocation mode), once known
+        name: Queue entry of the case (allocation mode)
+        state: Last known SLURM state (None before submission)
+        exit_code: Exit code of the command, once done
+        error: Submission or tracking error, if any
+        done: Set when the task has finished (or could not be submitted)
+    """
+
+    def __init__(self, working_dir: Path, partition: str, command: str):
+        self.working_dir = Path(working_dir)
+        self.partition = partition
+        self.command = command
+        self.job_id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.state: Optional[str] = None
+        self.exit_code: Optional[int] = None
+        self.error: Optional[str] = None
+        self.submit_time: Optional[float] = None
+        self.done = threading.Event()
+
+    def _finish(self, state: str, exit_code: Optional[int] = None, error: Optional[str] = None):
+        self.state = state
+        self.exit_code = exit_code
+        self.error = error
+        self.done.set()
+
+
+def _run(args: List[str]) -> Tuple[int, str, str]:
+    """Run a SLURM command, returning (exit code, stdout, stderr)"""
+    try:
+        proc = subprocess.run(args, capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return 1, "", str(e)
+    return proc.returncode, proc.stdout, proc.stderr
+
+
+def _parse_exit_code(value: str) -> Optional[int]:
+    """sacct ExitCode ("2:0": exit code and signal) to an exit code"""
+    code, _, signal = value.partition(":")
+    try:
+        code, signal = int(code), int(signal or 0)
+    except ValueError:
+        return None
+    return 128 + signal if code == 0 and signal else code
+
+
+class SlurmArrayScheduler:
+    """
+    Submits cases as SLURM job arrays and tracks them with bulk queries
+
+    Args:
+        poll_interval: Seconds between two squeue queries
+        max_array_size: Maximum number of tasks in one array job
+        run: Runs a command (argument list), returning (exit code, stdout, stderr)
+    """
+
+    def __init__(self, poll_interval: float = 5.0, max_array_size: int = 1000,
+                 run: Callable[[List[str]], Tuple[int, str, str]] = _run):
+        self.poll_interval = poll_interval
+        self.max_array_size = max(1, max_array_size)
+        self._run = run
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: List[ArrayTask] = []
+        self._active: Dict[str, ArrayTask] = {}
+        self._arrays: Dict[str, List[Path]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, working_dir: Path, partition: str, command: str) -> ArrayTask:
+        """
+        Queue a case for the next array submission
+
+        Args:
+            working_dir: Case directory (on a file system shared with the compute nodes)
+            partition: SLURM partition
+            command: Shell command to run in working_dir
+
+        Returns:
+            ArrayTask whose done event is set when the case has finished
+        """
+        task = ArrayTask(working_dir, partition, command)
+        with self._lock:
+            self._pending.append(task)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="fz-slurm-array", daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return task
+
+    def cancel(self, task: ArrayTask):
+        """Withdraw a task: removed from the queue, or cancelled with scancel"""
+        with self._lock:
+            if task in self._pending:
+                self._pending.remove(task)
+                task._finish("CANCELLED")
+                return
+            job_id = task.job_id
+            self._active.pop(job_id, None)
+        if job_id and not task.done.is_set():
+            code, _, err = self._run(["scancel", job_id])
+            if code != 0:
+                log_warning(f"⚠️  Could not cancel SLURM task {job_id}: {err.strip()}")
+            task._finish("CANCELLED")
+
+    def _loop(self):
+        while True:
+            with self._lock:
+                if not self._pending and not self._active:
+                    self._thread = None
+                    return
+            if self._wake.wait(self.poll_interval):
+                self._wake.clear()
+                time.sleep(GATHER_DELAY)
+            try:
+                self._submit_pending()
+                self._poll()
+            except Exception as e:
+                log_warning(f"⚠️  SLURM array scheduler error: {e}")
+
+    def _submit_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        groups: Dict[Tuple[str, Path], List[ArrayTask]] = {}
+        for task in pending:
+            groups.setdefault((task.partition, task.working_dir.parent), []).append(task)
+        for (partition, parent), tasks in groups.items():
+            for start in range(0, len(tasks), self.max_array_size):
+                self._submit_array(partition, parent, tasks[start:start + self.max_array_size])
+
+    def _submit_array(self, partition: str, parent: Path, tasks: List[ArrayTask]):
+        """Submit tasks as one array job, its files written in their parent directory"""
+        name = f".fz_array_{uuid.uuid4().hex[:8]}"
+        list_file = parent / f"{name}.txt"
+        script_file = parent / f"{name}.sh"
+        try:
+            for task in tasks:
+                (task.working_dir / TASK_SCRIPT).write_text(
+                    "#!/bin/sh\n"
+                    f"cd {shlex.quote(str(task.working_dir))} || exit 97\n"
+                    f"rm -f {EXIT_FILE}\n"
+                    f"( {task.command}\n) </dev/null >out.txt 2>err.txt\n"
+                    f"fz_exit=$?\necho $fz_exit >{EXIT_FILE}\nexit $fz_exit\n"
+                )
+            list_file.write_text("".join(f"{task.working_dir}\n" for task in tasks))
+            script_file.write_text(
+                "#!/bin/sh\n"
+                f"#SBATCH --partition={partition}\n"
+                f"#SBATCH --array=0-{len(tasks) - 1}\n"
+                "#SBATCH --job-name=fz\n"
+                "#SBATCH --output=/dev/null\n"
+                f"case_dir=$(sed -n \"$((SLURM_ARRAY_TASK_ID + 1))p\" {shlex.quote(str(list_file))})\n"
+                f"exec sh \"$case_dir/{TASK_SCRIPT}\"\n"
+            )
+        except OSError as e:
+            for task in tasks:
+                task._finish("FAILED", error=f"Could not write SLURM array files: {e}")
+            return
+
+        code, out, err = self._run(["sbatch", "--parsable", str(script_file)])
+        # --parsable prints "<job id>[;<cluster>]"
+        array_id = out.strip().split(";")[0]
+        if code != 0 or not array_id:
+            message = f"sbatch failed (exit code {code}): {err.strip()}"
+            log_warning(f"⚠️  {message}")
+            for task in tasks:
+                task._finish("FAILED", error=message)
+            for path in (list_file, script_file):
+                path.unlink(missing_ok=True)
+            return
+
+        log_info(f"Submitted SLURM array job {array_id} ({len(tasks)} cases, partition {partition})")
+        now = time.monotonic()
+        with self._lock:
+            self._arrays[array_id] = [list_file, script_file]
+            for index, task in enumerate(tasks):
+                task.job_id = f"{array_id}_{index}"
+                task.state = "PENDING"
+                task.submit_time = now
+                self._active[task.job_id] = task
+
+    def _poll(self):
+        """Update the active tasks with one squeue query (and one sacct query)"""
+        with self._lock:
+            active = dict(self._active)
+        if not active:
+            return
+        array_ids = sorted({job_id.split("_")[0] for job_id in active})
+
+        queued: Dict[str, str] = {}
+        for start in range(0, len(array_ids), QUERY_CHUNK):
+            chunk = array_ids[start:start + QUERY_CHUNK]
+            code, out, err = self._run(["squeue", "-h", "-r", "-o", "%i %T", "-j", ",".join(chunk)])
+            if code != 0 and "invalid job id" not in err.lower():
+                log_debug(f"squeue failed (exit code {code}): {err.strip()}")
+                return
+            for line in out.splitlines():
+                fields = line.split()
+                if len(fields) >= 2:
+                    queued[fields[0]] = fields[1]
+
+        finished = []
+        for job_id, task in active.items():
+            state = queued.get(job_id)
+            if state in ACTIVE_STATES:
+                task.state = state
+            else:
+                finished.append(task)
+        if finished:
+            self._resolve(finished)
+
+    def _resolve(self, tasks: List[ArrayTask]):
+        """Final state and exit code of tasks that left the queue"""
+        accounting: Dict[str, Tuple[str, Optional[int]]] = {}
+        array_ids = sorted({task.job_id.split("_")[0] for task in tasks})
+        for start in range(0, len(array_ids), QUERY_CHUNK):
+            chunk = array_ids[start:start + QUERY_CHUNK]
+            code, out, _ = self._run(
+                ["sacct", "-n", "-P", "-X", "-o", "JobID,State,ExitCode", "-j", ",".join(chunk)]
+            )
+            if code != 0:
+                continue
+            for line in out.splitlines():
+                fields = line.strip().split("|")
+                if len(fields) >= 3:
+                    # States may carry a suffix, e.g. "CANCELLED by 1000"
+                    accounting[fields[0]] = (fields[1].split()[0] if fields[1] else "", _parse_exit_code(fields[2]))
+
+        for task in tasks:
+            state, exit_code = accounting.get(task.job_id, (None, None))
+            if state in ACTIVE_STATES:
+                # Left squeue between the two queries' views: check again next poll
+                continue
+            recorded = _read_exit_code(task.working_dir)
+            for name in (TASK_SCRIPT, EXIT_FILE):
+                (task.working_dir / name).unlink(missing_ok=True)
+            if recorded is not None:
+                exit_code = recorded
+            if state is None:
+                # No accounting (e.g. disabled): rely on the recorded exit code
+                state = "COMPLETED" if exit_code == 0 else "FAILED"
+            elif state == "COMPLETED" and exit_code is None:
+                exit_code = 0
+            with self._lock:
+                self._active.pop(task.job_id, None)
+                self._cleanup_arrays()
+            task._finish(state, exit_code)
+
+    def _cleanup_arrays(self):
+        """Remove the files of array jobs without active tasks (lock held)"""
+        active_arrays = {job_id.split("_")[0] for job_id in self._active}
+        for array_id in [a for a in self._arrays if a not in active_arrays]:
+            for path in self._arrays.pop(array_id):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+def _read_exit_code(working_dir: Path) -> Optional[int]:
+    try:
+        return int((working_dir / EXIT_FILE).read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+_scheduler: Optional[SlurmArrayScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_slurm_scheduler() -> SlurmArrayScheduler:
+    """The process-wide SLURM array scheduler, created on first use from the configuration"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            from .config import get_config
+            config = get_config()
+            _scheduler = SlurmArrayScheduler(
+                poll_interval=config.slurm_poll_interval,
+                max_array_size=config.slurm_array_size,
+            )
+        return _scheduler
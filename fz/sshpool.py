@@ -0,0 +1,337 @@
+"""
+Pool of authenticated SSH connections for the ssh:// and remote slurm:// calculators
+
+Opening an SSH connection costs a TCP and key exchange handshake, host key
+checks and authentication: 1-3 s against a busy login node, and many cases
+connecting at once trip the server's MaxStartups limit. Calculations to the
+same (host, port, user, credentials) therefore lease a connection from a process-wide pool
+and run their exec and SFTP channels over it, several calculations sharing a
+connection at the same time. Connections live across fzr calls and fzd
+iterations; they are checked before reuse and closed after staying idle.
+"""
+import atexit
+import hashlib
+import hmac
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from .logging import log_debug, log_info
+
+#: Calculations running over one connection at the same time. Each uses an
+#: exec and an SFTP channel, and OpenSSH allows 10 sessions per connection
+#: by default (MaxSessions).
+LEASES_PER_CONNECTION = 4
+
+#: Process-local secret of the credential fingerprints in pool keys
+_KEY_SECRET = os.urandom(32)
+
+
+def ssh_pool_key(host: str, port: int, username: str, password: Optional[str] = None) -> tuple:
+    """
+    Pool key of a connection: its host, port and user, and a fingerprint of its password
+
+    A URI with another (or a wrong) password must not reuse a connection
+    authenticated with the right one. The fingerprint is a keyed hash, so the
+    key does not keep the password nor a plain hash of it.
+    """
+    fingerprint = None
+    if password is not None:
+        fingerprint = hmac.new(_KEY_SECRET, password.encode("utf-8"), hashlib.sha256).hexdigest()
+    return (host, port, username, fingerprint)
+
+
+class _PooledConnection:
+    """An SSH client with its lease count, idle SFTP sessions and cached facts"""
+
+    def __init__(self, client):
+        self.client = client
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.idle_sftp: List[Any] = []
+        # Per-connection facts cached by callers (e.g. the remote home directory)
+        self.info: Dict[str, Any] = {}
+        self.info_lock = threading.Lock()
+        # Remote commands to run later over this connection (e.g. cleanups)
+        self.deferred: List[str] = []
+        self.broken = False
+
+    def is_active(self) -> bool:
+        transport = self.client.get_transport()
+        return bool(transport is not None and transport.is_active())
+
+    def run_deferred(self, timeout: float = 30.0):
+        """Run the deferred commands in one exec request and wait for them"""
+        commands, self.deferred = self.deferred, []
+        if not commands or not self.is_active():
+            return
+        try:
+            _, stdout, _ = self.client.exec_command("; ".join(commands), timeout=timeout)
+            stdout.channel.recv_exit_status()
+        except Exception as e:
+            log_debug(f"Could not run deferred SSH commands: {e}")
+
+    def close(self):
+        self.run_deferred()
+        for sftp in self.idle_sftp:
+            try:
+                sftp.close()
+            except Exception:
+                pass
+        self.idle_sftp = []
+        try:
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHLease:
+    """
+    A calculation's use of a pooled connection
+
+    Attributes:
+        client: The connected paramiko SSHClient (exec channels)
+        info: Facts cached for the connection, shared by its leases
+        info_lock: Lock to hold while computing a missing info entry
+    """
+
+    def __init__(self, connection: _PooledConnection, pool: "SSHConnectionPool"):
+        self._connection = connection
+        self._pool = pool
+        self.client = connection.client
+        self.info = connection.info
+        self.info_lock = connection.info_lock
+        self._sftp = None
+
+    def sftp(self):
+        """SFTP session of this lease, reused from the connection when possible"""
+        if self._sftp is None:
+            self._sftp = self._pool._take_idle_sftp(self._connection)
+            if self._sftp is None:
+                self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def is_active(self) -> bool:
+        """Whether the connection is still up"""
+        return self._connection.is_active()
+
+    def defer(self, command: str):
+        """
+        Run a shell command later over this connection
+
+        Deferred commands are handed to the next calculation with take_deferred(),
+        or run together when the connection is closed.
+        """
+        with self.info_lock:
+            self._connection.deferred.append(command)
+
+    def take_deferred(self) -> List[str]:
+        """Remove and return the deferred commands, for the caller to run"""
+        with self.info_lock:
+            commands, self._connection.deferred = self._connection.deferred, []
+        return commands
+
+    def invalidate(self):
+        """Mark the connection broken: it is closed when its leases end"""
+        self._connection.broken = True
+
+
+class SSHConnectionPool:
+    """
+    Authenticated SSH connections, by ssh_pool_key() key
+
+    Args:
+        max_per_host: Maximum number of leases of one key at the same time
+            (further calculations wait); None for no limit
+        leases_per_connection: Leases sharing one connection
+        idle_timeout: Seconds after which an unused connection is closed
+        health_check_interval: Idle seconds after which a connection is
+            probed before being reused
+    """
+
+    def __init__(self, max_per_host: Optional[int] = None,
+                 leases_per_connection: int = LEASES_PER_CONNECTION,
+                 idle_timeout: float = 300.0, health_check_interval: float = 30.0):
+        self.max_per_host = max_per_host
+        self.leases_per_connection = leases_per_connection
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._connections: Dict[Hashable, List[_PooledConnection]] = {}
+        self._connect_locks: Dict[Hashable, threading.Lock] = {}
+        self._host_slots: Dict[Hashable, threading.BoundedSemaphore] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def connection_count(self, key: Hashable) -> int:
+        """Number of open pooled connections for a key"""
+        with self._lock:
+            return len(self._connections.get(key, []))
+
+    @contextmanager
+    def lease(self, key: Hashable, connect: Callable[[], Any]) -> Iterator[SSHLease]:
+        """
+        Lease a connection for key, opening one with connect() if needed
+
+        Connections of a key are opened one at a time, so that a burst of
+        calculations does not open many unauthenticated connections at once.
+
+        Args:
+            key: Connection identity, see ssh_pool_key()
+            connect: Returns a new connected paramiko SSHClient
+
+        Yields:
+            SSHLease for the calculation
+        """
+        with self._lock:
+            slots = self._host_slots.get(key)
+            if slots is None and self.max_per_host:
+                slots = self._host_slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            connect_lock = self._connect_locks.setdefault(key, threading.Lock())
+        if slots is not None:
+            slots.acquire()
+        try:
+            connection = self._acquire(key, connect, connect_lock)
+            lease = SSHLease(connection, self)
+            try:
+                yield lease
+            finally:
+                self._release(key, connection, lease)
+        finally:
+            if slots is not None:
+                slots.release()
+
+    def _take(self, key: Hashable) -> Optional[_PooledConnection]:
+        """Least used connection of key with a free lease (pool lock held)"""
+        candidates = [
+            c for c in self._connections.get(key, [])
+            if not c.broken and c.leases < self.leases_per_connection
+        ]
+        if not candidates:
+            return None
+        connection = min(candidates, key=lambda c: c.leases)
+        connection.leases += 1
+        return connection
+
+    def _acquire(self, key, connect, connect_lock) -> _PooledConnection:
+        while True:
+            with self._lock:
+                connection = self._take(key)
+            if connection is None:
+                with connect_lock:
+                    # Another calculation may have connected meanwhile
+                    with self._lock:
+                        connection = self._take(key)
+                    if connection is None:
+                        connection = _PooledConnection(connect())
+                        connection.leases = 1
+                        with self._lock:
+                            self._connections.setdefault(key, []).append(connection)
+                            self._start_reaper()
+                        log_info(f"Opened pooled SSH connection to {key}")
+                        return connection
+            if self._healthy(connection):
+                return connection
+            log_debug(f"Dropping dead pooled SSH connection to {key}")
+            with self._lock:
+                connection.leases -= 1
+            self._discard(key, connection)
+
+    def _healthy(self, connection: _PooledConnection) -> bool:
+        if not connection.is_active():
+            return False
+        if time.monotonic() - connection.last_used < self.health_check_interval:
+            return True
+        try:
+            connection.client.get_transport().send_ignore()
+            return True
+        except Exception:
+            return False
+
+    def _release(self, key, connection: _PooledConnection, lease: SSHLease):
+        sftp = lease._sftp
+        with self._lock:
+            connection.leases -= 1
+            connection.last_used = time.monotonic()
+            if sftp is not None:
+                if not connection.broken and not sftp.sock.closed:
+                    connection.idle_sftp.append(sftp)
+                    sftp = None
+            close = connection.leases == 0 and (connection.broken or not connection.is_active())
+        if sftp is not None:
+            try:
+                sftp.close()
+            except Exception:
+                pass
+        if close:
+            self._discard(key, connection)
+
+    def _take_idle_sftp(self, connection: _PooledConnection):
+        """An idle SFTP session of connection, or None (leases release theirs concurrently)"""
+        with self._lock:
+            return connection.idle_sftp.pop() if connection.idle_sftp else None
+
+    def _discard(self, key, connection: _PooledConnection):
+        with self._lock:
+            connections = self._connections.get(key, [])
+            if connection in connections:
+                connections.remove(connection)
+            connection.broken = True
+            idle = connection.leases <= 0
+        if idle:
+            connection.close()
+
+    def expire_idle(self):
+        """Close the connections unused for idle_timeout seconds"""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, connections in self._connections.items():
+                for connection in list(connections):
+                    if connection.leases == 0 and now - connection.last_used >= self.idle_timeout:
+                        connections.remove(connection)
+                        expired.append((key, connection))
+        for key, connection in expired:
+            log_debug(f"Closing idle pooled SSH connection to {key}")
+            connection.close()
+
+    def _start_reaper(self):
+        """Start the idle expiry thread (pool lock held)"""
+        if self._reaper is None or not self._reaper.is_alive():
+            self._stop.clear()
+            self._reaper = threading.Thread(target=self._reap, name="fz-ssh-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while not self._stop.wait(max(0.1, min(self.idle_timeout / 2, 30.0))):
+            self.expire_idle()
+
+    def close_all(self):
+        """Close every pooled connection"""
+        self._stop.set()
+        with self._lock:
+            connections = [c for cs in self._connections.values() for c in cs]
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+
+_pool: Optional[SSHConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_ssh_pool() -> SSHConnectionPool:
+    """The process-wide SSH connection pool, created on first use from the configuration"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from .config import get_config
+            config = get_config()
+            _pool = SSHConnectionPool(
+                max_per_host=config.ssh_max_sessions,
+                idle_timeout=config.ssh_pool_idle_timeout,
+            )
+            atexit.register(_pool.close_all)
+        return _pool
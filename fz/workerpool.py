@@ -0,0 +1,307 @@
+"""
+Long-lived worker processes for the pool:// calculator
+
+Simulators written in Python or Java spend seconds starting their interpreter
+or JVM and loading libraries, often longer than a case takes to solve. A
+pool://N/command calculator starts up to N processes of command once, and
+hands them cases over a line protocol on their standard input and output:
+
+    fz -> worker:   RUN <absolute path of the case directory>
+    worker -> fz:   DONE <exit code>
+
+The worker runs the case in that directory as the sh:// command would, and
+flushes its standard output after each line. The other lines it prints while
+running a case go to the case out.txt, and its standard error to the case
+err.txt. A worker is restarted when it exits or is killed (crash, timeout,
+interrupt), and after FZ_POOL_MAX_CASES cases. Pools live across fzr calls
+and fzd iterations, until the end of the process.
+"""
+import atexit
+import os
+import queue
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from .logging import log_debug, log_info, log_warning
+from .shell import run_command
+
+#: Seconds between two checks for interrupts and timeouts while a case runs
+POLL_INTERVAL = 0.5
+
+#: Seconds a stopped worker has to exit after its standard input is closed
+STOP_GRACE = 5.0
+
+
+class WorkerExited(Exception):
+    """The worker exited before replying to a case"""
+
+    def __init__(self, exit_code: Optional[int], started: bool = True):
+        super().__init__(f"Worker exited with code {exit_code} before finishing the case")
+        self.exit_code = exit_code
+        # False when the worker was gone before it was given the case
+        self.started = started
+
+
+class _Worker:
+    """A worker process, with threads pumping its standard output and error"""
+
+    def __init__(self, command: str, cwd: str):
+        self.command = command
+        self.cases = 0
+        self.process = run_command(
+            command, shell=True, cwd=cwd, use_popen=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            encoding="utf-8", errors="replace", bufsize=1, start_new_session=os.name == "posix",
+        )
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._err_lock = threading.Lock()
+        self._err_file: Optional[TextIO] = None
+        for target, name in ((self._read_stdout, "out"), (self._read_stderr, "err")):
+            threading.Thread(target=target, name=f"fz-pool-{name}-{self.process.pid}", daemon=True).start()
+        log_debug(f"Started pool worker {self.process.pid}: {command}")
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_stdout(self):
+        with self.process.stdout:
+            for line in self.process.stdout:
+                self._lines.put(line)
+        self._lines.put(None)
+
+    def _read_stderr(self):
+        with self.process.stderr:
+            for line in self.process.stderr:
+                with self._err_lock:
+                    if self._err_file is not None:
+                        self._err_file.write(line)
+                    else:
+                        log_debug(f"Pool worker {self.process.pid}: {line.rstrip()}")
+
+    def run(self, working_dir: Path, timeout: float) -> int:
+        """
+        Run a case in working_dir, writing its out.txt and err.txt
+
+        Args:
+            working_dir: Case directory
+            timeout: Seconds the case may last
+
+        Returns:
+            Exit code replied by the worker
+
+        Raises:
+            WorkerExited: The worker exited before replying
+            subprocess.TimeoutExpired: The case lasted more than timeout seconds
+            KeyboardInterrupt: The user interrupted the run
+        """
+        from .core import is_interrupted
+
+        working_dir = Path(working_dir).resolve()
+        # Lines of an earlier case arriving late are not part of this one
+        while not self._lines.empty():
+            if self._lines.get_nowait() is None:
+                raise WorkerExited(self.process.wait(), started=False)
+
+        with open(working_dir / "out.txt", "w") as out_file, open(working_dir / "err.txt", "w") as err_file:
+            with self._err_lock:
+                self._err_file = err_file
+            try:
+                try:
+                    self.process.stdin.write(f"RUN {working_dir}\n")
+                    self.process.stdin.flush()
+                except OSError:
+                    raise WorkerExited(self.process.wait(), started=False)
+
+                deadline = time.monotonic() + timeout
+                while True:
+                    if is_interrupted():
+                        raise KeyboardInterrupt("Process interrupted by user")
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(self.command, timeout)
+                    try:
+                        line = self._lines.get(timeout=min(POLL_INTERVAL, remaining))
+                    except queue.Empty:
+                        continue
+                    if line is None:
+                        raise WorkerExited(self.process.wait())
+                    reply = line.split()
+                    if len(reply) == 2 and reply[0] == "DONE":
+                        try:
+                            exit_code = int(reply[1])
+                        except ValueError:
+                            out_file.write(line)
+                            continue
+                        self.cases += 1
+                        return exit_code
+                    out_file.write(line)
+            finally:
+                with self._err_lock:
+                    self._err_file = None
+
+    def stop(self):
+        """Close the standard input of the worker, killing it if it does not exit"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            self.kill()
+
+    def kill(self):
+        """Kill the worker and the processes it started"""
+        try:
+            if os.name == "posix":
+                os.killpg(self.process.pid, signal.SIGKILL)
+            elif self.alive:
+                self.process.kill()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=STOP_GRACE)
+        except subprocess.TimeoutExpired:
+            log_warning(f"⚠️  Pool worker {self.process.pid} did not exit")
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+
+class WorkerPool:
+    """
+    Up to size worker processes of one command, started on demand
+
+    Args:
+        command: Shell command starting a worker
+        size: Maximum number of workers (and of cases running at once)
+        cwd: Directory the workers start in
+        max_cases: Cases a worker runs before it is restarted (0: no limit)
+
+    Attributes:
+        started: Number of worker processes started so far
+    """
+
+    def __init__(self, command: str, size: int, cwd: str, max_cases: int = 0):
+        self.command = command
+        self.size = size
+        self.cwd = cwd
+        self.max_cases = max_cases
+        self.started = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: List[_Worker] = []
+        self._busy: List[_Worker] = []
+        self._closed = False
+
+    def run(self, working_dir: Path, timeout: float) -> int:
+        """
+        Run a case on an idle worker, starting one if none is
+
+        A worker killed by a timeout or an interrupt, or which exited, is not
+        reused: the next case starts a fresh one.
+
+        Returns:
+            Exit code replied by the worker
+
+        Raises:
+            WorkerExited, subprocess.TimeoutExpired, KeyboardInterrupt: as
+                _Worker.run
+            OSError: The worker could not be started
+        """
+        self._slots.acquire()
+        try:
+            worker = self._take()
+            try:
+                exit_code = worker.run(working_dir, timeout)
+            except WorkerExited as e:
+                self._discard(worker)
+                if e.started or worker.cases == 0:
+                    raise
+                # A reused worker exited while idle: run the case on a fresh one
+                log_info(f"♻️  Pool worker exited (code {e.exit_code}) between cases, restarting")
+                worker = self._take()
+                try:
+                    exit_code = worker.run(working_dir, timeout)
+                except BaseException:
+                    self._discard(worker)
+                    raise
+            except BaseException:
+                self._discard(worker)
+                raise
+            self._give_back(worker)
+            return exit_code
+        finally:
+            self._slots.release()
+
+    def _take(self) -> _Worker:
+        with self._lock:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.alive:
+                    self._busy.append(worker)
+                    return worker
+                log_info(f"♻️  Pool worker {worker.process.pid} exited (code {worker.process.returncode}), restarting")
+                worker.kill()
+            self.started += 1
+        worker = _Worker(self.command, self.cwd)
+        with self._lock:
+            self._busy.append(worker)
+        return worker
+
+    def _give_back(self, worker: _Worker):
+        with self._lock:
+            self._busy.remove(worker)
+            if not self._closed and (not self.max_cases or worker.cases < self.max_cases):
+                self._idle.append(worker)
+                return
+        log_debug(f"Pool worker {worker.process.pid} ran {worker.cases} case(s), restarting")
+        threading.Thread(target=worker.stop, daemon=True).start()
+
+    def _discard(self, worker: _Worker):
+        with self._lock:
+            self._busy.remove(worker)
+        worker.kill()
+
+    def close(self):
+        """Stop the idle workers, and kill the busy ones"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            busy = list(self._busy)
+        for worker in busy:
+            worker.kill()
+        for worker in idle:
+            worker.stop()
+
+
+_pools: Dict[Tuple[str, int, str], WorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_worker_pool(command: str, size: int, cwd: str) -> WorkerPool:
+    """The process-wide pool of size workers of command started in cwd, created on first use"""
+    key = (command, size, cwd)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            from .config import get_config
+            if not _pools:
+                atexit.register(close_worker_pools)
+            pool = _pools[key] = WorkerPool(command, size, cwd, max_cases=get_config().pool_max_cases)
+        return pool
+
+
+def close_worker_pools():
+    """Stop the workers of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -118,3 +118,92 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "requires_paramiko: mark test as requiring paramiko library for SSH"
     )
+
+
+@pytest.fixture
+def fake_ssh_server(tmp_path, monkeypatch):
+    """
+    In-process SSH server (tests/fake_ssh_server.py) and a fresh SSH pool.
+
+    HOME points to a temporary directory, which is the remote working root,
+    and unknown host keys are accepted.
+    """
+    pytest.importorskip("paramiko")
+    import fz.sshpool
+    from fake_ssh_server import FakeSSHServer
+    from fz.config import get_config
+
+    home = tmp_path / "home"
+    (home / ".ssh").mkdir(parents=True)
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setenv("FZ_SSH_AUTO_ACCEPT_HOSTKEYS", "true")
+    get_config().reload()
+    monkeypatch.setattr(fz.sshpool, "_pool", None)
+
+    server = FakeSSHServer(home)
+    yield server
+    fz.sshpool.get_ssh_pool().close_all()
+    server.close()
+    # Restore the environment (including variables set by the test) first
+    monkeypatch.undo()
+    get_config().reload()
+
+
+@pytest.fixture
+def fake_slurm(tmp_path, monkeypatch):
+    """
+    Fake sbatch/squeue/sacct/scancel (tests/fake_slurm.py) first on PATH, the
+    job-array mode with fast polling, and fresh SLURM schedulers.
+
+    Yields the state directory of the fake commands.
+    """
+    import fz.slurmalloc
+    import fz.slurmarray
+    import fake_slurm
+    from fz.config import get_config
+
+    state_dir = tmp_path / "slurm_state"
+    fake_slurm.install(tmp_path / "slurm_bin", state_dir)
+    monkeypatch.setenv("PATH", f"{tmp_path / 'slurm_bin'}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FZ_SLURM_MODE", "array")
+    monkeypatch.setenv("FZ_SLURM_POLL_INTERVAL", "0.2")
+    get_config().reload()
+    monkeypatch.setattr(fz.slurmarray, "_scheduler", None)
+    monkeypatch.setattr(fz.slurmalloc, "_scheduler", None)
+
+    yield state_dir
+    if fz.slurmalloc._scheduler is not None:
+        fz.slurmalloc._scheduler.stop()
+    monkeypatch.undo()
+    get_config().reload()
+
+
+@pytest.fixture
+def fake_funz(monkeypatch):
+    """
+    An emulated Funz calculator (fz/funzemulator.py) offering the "bash" code,
+    running "bash input.txt > out.txt" and broadcasting on a free UDP port,
+    with a fresh calculator registry and session pool.
+
+    Yields the FunzCalculatorEmulator.
+    """
+    import socket
+    import fz.funzregistry
+    import fz.funzsession
+    from fz.config import get_config
+    from fz.funzemulator import FunzCalculatorEmulator
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("", 0))
+        udp_port = sock.getsockname()[1]
+    monkeypatch.setattr(fz.funzregistry, "_registry", None)
+    monkeypatch.setattr(fz.funzsession, "_sessions", None)
+    calculator = FunzCalculatorEmulator(udp_port, command="bash input.txt > out.txt",
+                                        broadcast_interval=0.2)
+
+    yield calculator
+    fz.funzsession.close_funz_sessions()
+    fz.funzregistry.get_funz_registry().close()
+    calculator.close()
+    monkeypatch.undo()
+    get_config().reload()
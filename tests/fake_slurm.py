@@ -0,0 +1,143 @@
+"""
+Fake SLURM commands for the slurm:// tests (no SLURM installation needed).
+
+install(bin_dir, state_dir) writes sbatch, squeue, sacct and scancel stand-ins
+in bin_dir, sharing their state in state_dir:
+
+- sbatch --parsable SCRIPT runs the script in the background; with an
+  #SBATCH --array=0-N directive it runs the tasks ("<job id>_<index>") one at
+  a time, with SLURM_ARRAY_TASK_ID set
+- squeue -h -r -o "%i %T" -j IDS lists the queued and running tasks
+- sacct -n -P -X -o JobID,State,ExitCode -j IDS lists the finished tasks
+- scancel ID kills a task
+
+Every invocation is appended to state_dir/calls.log ("<command> <args>").
+"""
+import sys
+from pathlib import Path
+
+_COMMON = '''#!{python}
+import os, re, signal, subprocess, sys, time
+from pathlib import Path
+
+STATE = Path({state_dir!r})
+JOBS = STATE / "jobs"
+JOBS.mkdir(parents=True, exist_ok=True)
+if sys.argv[1:2] != ["--fake-run"]:
+    with open(STATE / "calls.log", "a") as f:
+        f.write(" ".join([os.path.basename(sys.argv[0])] + sys.argv[1:]) + "\\n")
+
+
+def read(task):
+    try:
+        state, pid, code = (JOBS / task).read_text().split()
+    except (OSError, ValueError):
+        return None
+    return state, int(pid), code
+
+
+def write(task, state, pid=0, code="0:0"):
+    tmp = JOBS / (task + ".tmp")
+    tmp.write_text(f"{{state}} {{pid}} {{code}}")
+    tmp.replace(JOBS / task)
+
+
+def tasks_of(ids):
+    arrays = set(ids.split(","))
+    return sorted((p.name for p in JOBS.iterdir()
+                   if not p.name.endswith(".tmp") and p.name.split("_")[0] in arrays),
+                  key=lambda t: [int(i) for i in t.split("_")])
+
+
+def option(flag):
+    return sys.argv[sys.argv.index(flag) + 1]
+'''
+
+_SBATCH = '''
+if sys.argv[1] == "--fake-run":
+    # Background part: run the array tasks one by one
+    job_id, count, script = sys.argv[2], int(sys.argv[3]), sys.argv[4]
+    for index in range(max(count, 1)):
+        task = f"{{job_id}}_{{index}}" if count else job_id
+        if read(task)[0] == "CANCELLED":
+            continue
+        env = dict(os.environ, SLURM_JOB_ID=job_id)
+        if count:
+            env.update(SLURM_ARRAY_JOB_ID=job_id, SLURM_ARRAY_TASK_ID=str(index))
+        proc = subprocess.Popen(["sh", script], env=env, start_new_session=True,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        write(task, "RUNNING", proc.pid)
+        code = proc.wait()
+        if read(task)[0] == "CANCELLED":
+            continue
+        write(task, "COMPLETED" if code == 0 else "FAILED", 0,
+              f"{{code}}:0" if code >= 0 else f"0:{{-code}}")
+    sys.exit(0)
+
+script = sys.argv[-1]
+match = re.search(r"^#SBATCH --array=0-(\\d+)$", Path(script).read_text(), re.M)
+count = int(match.group(1)) + 1 if match else 0
+counter = STATE / "next_job_id"
+job_id = str(int(counter.read_text()) if counter.exists() else 1)
+counter.write_text(str(int(job_id) + 1))
+for index in range(count):
+    write(f"{{job_id}}_{{index}}", "PENDING")
+if not count:
+    write(job_id, "PENDING")
+subprocess.Popen([sys.executable, __file__, "--fake-run", job_id, str(count), script],
+                 start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+print(job_id)
+'''
+
+_SQUEUE = '''
+tasks = tasks_of(option("-j"))
+if not tasks:
+    print("slurm_load_jobs error: Invalid job id specified", file=sys.stderr)
+    sys.exit(1)
+for task in tasks:
+    state = read(task)
+    if state and state[0] in ("PENDING", "RUNNING"):
+        print(task, state[0])
+'''
+
+_SACCT = '''
+for task in tasks_of(option("-j")):
+    state = read(task)
+    if state:
+        print(f"{{task}}|{{state[0]}}|{{state[2]}}")
+'''
+
+_SCANCEL = '''
+task = sys.argv[1]
+state = read(task)
+if state is None:
+    print(f"scancel: error: Invalid job id {{task}}", file=sys.stderr)
+    sys.exit(1)
+if state[0] == "RUNNING" and state[1]:
+    try:
+        os.killpg(state[1], signal.SIGTERM)
+    except OSError:
+        pass
+if state[0] in ("PENDING", "RUNNING"):
+    write(task, "CANCELLED", 0, "0:15")
+'''
+
+
+def install(bin_dir, state_dir, commands=("sbatch", "squeue", "sacct", "scancel")):
+    """Write the fake SLURM commands in bin_dir (to be put first on PATH)"""
+    bin_dir, state_dir = Path(bin_dir), Path(state_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    bodies = {"sbatch": _SBATCH, "squeue": _SQUEUE, "sacct": _SACCT, "scancel": _SCANCEL}
+    for name in commands:
+        path = bin_dir / name
+        path.write_text(_COMMON.format(python=sys.executable, state_dir=str(state_dir))
+                        + bodies[name].format())
+        path.chmod(0o755)
+
+
+def calls(state_dir, command=None):
+    """Recorded invocations, optionally only those of one command"""
+    log = Path(state_dir) / "calls.log"
+    lines = log.read_text().splitlines() if log.exists() else []
+    return [line for line in lines if command is None or line.split()[0] == command]
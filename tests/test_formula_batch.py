@@ -0,0 +1,127 @@
+"""
+Tests for batch formula evaluation (precompute_formula_values).
+
+fzc/fzr parse and compile each Python formula of a template once, and
+evaluate arithmetic on variables over all cases with numpy. The rendered
+inputs must stay byte-identical to evaluating every formula with eval() on
+its substituted text, which these tests use as the reference.
+"""
+import random
+
+import pytest
+
+from fz import fzc
+from fz.interpreter import (
+    evaluate_formulas,
+    precompute_formula_values,
+    replace_variables_in_content,
+)
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+
+
+def render_all(content, cases, model=MODEL, batch=True):
+    """Compile content for every case, with or without precomputed formulas"""
+    cache = {}
+    tables = precompute_formula_values(content, model, cases, context_cache=cache) if batch else None
+    rendered = []
+    for i, case in enumerate(cases):
+        text = replace_variables_in_content(content, case)
+        rendered.append(evaluate_formulas(text, model, case, context_cache=cache,
+                                          formula_values=tables[i] if tables else None))
+    return rendered
+
+
+def assert_same_as_per_case(content, cases, capsys=None):
+    expected = render_all(content, cases, batch=False)
+    expected_out = capsys.readouterr().out if capsys else None
+    assert render_all(content, cases) == expected
+    if capsys:
+        assert capsys.readouterr().out == expected_out
+
+
+def test_format_suffix_and_arithmetic_are_precomputed():
+    content = "a = @{$x * 2 + $(y) / 3 | 0.000}\nb = @{-$x / $y}\n"
+    cases = [{"x": x, "y": y} for x in (0.1, 1.5, 2.0) for y in (0.3, 7.25)]
+    tables = precompute_formula_values(content, MODEL, cases)
+    assert all(isinstance(v, str) for table in tables for v in table.values())
+    assert tables[0]["0.1 * 2 + 0.3 / 3 | 0.000"] == "0.300"
+    assert_same_as_per_case(content, cases)
+
+
+@pytest.mark.parametrize("formula", [
+    "$x**2",           # "-2**2" is -4, not 4
+    "$x // 3 + $x % 3",
+    "2 ** $x",
+    "abs($x) + round($x / 3, 2)",
+    "x + $x",          # bare name keeps the raw value
+    "'$x' * 2",        # inside a string literal
+    "$(x)e3",
+    "$x / ($x - 1)",   # division by zero for one case
+    "$x if $x > 0 else 0",
+    "$(x~5) + 1",
+])
+def test_mixed_signs_and_types_match_per_case(formula, capsys):
+    cases = [{"x": x} for x in (-2, 0, 1, 3, 2.5, -0.5, True)]
+    assert_same_as_per_case(f"v = @{{{formula}}}\n", cases, capsys)
+
+
+def test_string_values_are_left_to_per_case_evaluation(capsys):
+    content = "v = @{$name.upper()}\nw = @{len('$name')}\n"
+    cases = [{"name": "a"}, {"name": "bc"}]
+    assert precompute_formula_values(content, MODEL, cases) is None
+    assert_same_as_per_case(content, cases, capsys)
+
+
+def test_context_functions_keep_case_order():
+    content = (
+        "#@calls = []\n"
+        "#@def f(a):\n"
+        "#@    calls.append(a)\n"
+        "#@    return len(calls)\n"
+        "u = @{f($x)}\nv = @{f($x * 10)}\n"
+    )
+    cases = [{"x": x} for x in (1, 2, 3)]
+    assert render_all(content, cases) == render_all(content, cases, batch=False)
+    assert render_all(content, cases)[-1].splitlines()[-2:] == ["u = 5", "v = 6"]
+
+
+def test_context_using_a_variable_is_not_precomputed():
+    content = "#@y = x * 2\nv = @{y + $x}\n"
+    assert precompute_formula_values(content, MODEL, [{"x": 1}, {"x": 2}], context_cache={}) is None
+
+
+def test_randomized_against_per_case(capsys):
+    rng = random.Random(7)
+    atoms = ["$x", "$(y)", "$z", "x", "2", "0.5", "3", "k", "math.pi"]
+    operators = [" + ", " - ", " * ", " / ", " // ", " % ", " ** "]
+    values = [0, 1, -1, 2, 0.1, -2.5, 1e-05, 1e16, 7.0, True]
+    content_head = "#@import math\n#@k = 1.25\n"
+    for _ in range(60):
+        lines = []
+        for j in range(4):
+            expr = rng.choice(atoms)
+            for _ in range(rng.randint(0, 3)):
+                expr = f"{expr}{rng.choice(operators)}{rng.choice(atoms)}"
+                if rng.random() < 0.3:
+                    expr = f"({expr})"
+            if rng.random() < 0.3:
+                expr = f"math.sqrt(abs({expr}))"
+            suffix = rng.choice(["", " | 0.00", " | 0.0000", " | 0"])
+            lines.append(f"v{j} = @{{{expr}{suffix}}}")
+        content = content_head + "\n".join(lines) + "\n"
+        cases = [{n: rng.choice(values) for n in ("x", "y", "z")} for _ in range(12)]
+        assert_same_as_per_case(content, cases, capsys)
+
+
+def test_fzc_output_matches_per_case_evaluation(tmp_path):
+    template = "#@import math\nT = @{$T0 + 273.15 | 0.00}\nP = @{math.exp(-$E / $T0)}\nN = $n\n"
+    (tmp_path / "input.txt").write_text(template)
+    variables = {"T0": [10.5, 20.0, 35.25], "E": [1.0, 2.5], "n": [1, 2]}
+    fzc(str(tmp_path / "input.txt"), variables, MODEL, output_dir=str(tmp_path / "out"))
+
+    for case_dir in (tmp_path / "out").iterdir():
+        case = dict(part.split("=") for part in case_dir.name.split(","))
+        case = {"T0": float(case["T0"]), "E": float(case["E"]), "n": int(case["n"])}
+        expected = evaluate_formulas(replace_variables_in_content(template, case), MODEL, case)
+        assert (case_dir / "input.txt").read_text() == expected
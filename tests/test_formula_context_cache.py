@@ -0,0 +1,86 @@
+"""
+Tests for run-wide execution of formula context lines (#@...).
+
+fzc/fzr execute a Python formula context once per run when it does not
+refer to any variable, and give each case a copy of that namespace with its
+own variables. Contexts that read or assign a variable are executed again
+for every case.
+"""
+import builtins
+
+import pytest
+
+from fz import fzc
+from fz.interpreter import evaluate_formulas
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+
+COUNTING_CONTEXT = (
+    "#@import builtins\n"
+    "#@builtins._fz_context_runs = getattr(builtins, '_fz_context_runs', 0) + 1\n"
+    "#@table = {1: 10.0, 2: 20.0}\n"
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_counter():
+    builtins._fz_context_runs = 0
+    yield
+    del builtins._fz_context_runs
+
+
+def test_independent_context_runs_once_with_cache():
+    content = COUNTING_CONTEXT + "v = @{table[$k] * 2}\n"
+    cache = {}
+    results = [evaluate_formulas(content, MODEL, {"k": k}, context_cache=cache) for k in (1, 2, 1)]
+    assert builtins._fz_context_runs == 1
+    assert [r.splitlines()[-1] for r in results] == ["v = 20.0", "v = 40.0", "v = 20.0"]
+
+
+def test_without_cache_context_runs_every_call():
+    content = COUNTING_CONTEXT + "v = @{table[$k]}\n"
+    for k in (1, 2):
+        evaluate_formulas(content, MODEL, {"k": k})
+    assert builtins._fz_context_runs == 2
+
+
+def test_context_reading_a_variable_runs_per_case():
+    content = "#@y = x * 2\nv = @{y + 1}\n"
+    cache = {}
+    results = [evaluate_formulas(content, MODEL, {"x": x}, context_cache=cache) for x in (1, 5)]
+    assert [r.splitlines()[-1] for r in results] == ["v = 3", "v = 11"]
+
+
+def test_function_body_using_a_variable_runs_per_case():
+    content = "#@def scaled(a):\n#@    return a * factor\nv = @{scaled(2)}\n"
+    cache = {}
+    results = [evaluate_formulas(content, MODEL, {"factor": f}, context_cache=cache) for f in (3, 4)]
+    assert [r.splitlines()[-1] for r in results] == ["v = 6", "v = 8"]
+
+
+def test_cases_do_not_leak_variables_into_shared_namespace():
+    content = COUNTING_CONTEXT + "v = @{'a' in dir()}\n"
+    cache = {}
+    evaluate_formulas(content, MODEL, {"a": 1}, context_cache=cache)
+    result = evaluate_formulas(content, MODEL, {"b": 1}, context_cache=cache)
+    assert result.splitlines()[-1] == "v = False"
+    assert builtins._fz_context_runs == 1
+
+
+def test_dynamic_namespace_access_is_never_shared():
+    content = "#@g = globals().get('x')\nv = @{g}\n"
+    cache = {}
+    results = [evaluate_formulas(content, MODEL, {"x": x}, context_cache=cache) for x in (1, 2)]
+    assert [r.splitlines()[-1] for r in results] == ["v = 1", "v = 2"]
+
+
+def test_fzc_executes_context_once_for_all_cases_and_files(tmp_path):
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    (input_dir / "a.txt").write_text(COUNTING_CONTEXT + "a = @{table[$k]}\n")
+    (input_dir / "b.txt").write_text(COUNTING_CONTEXT + "b = @{table[$k] + 1}\n")
+
+    fzc(str(input_dir), {"k": [1, 2]}, MODEL, output_dir=str(tmp_path / "out"))
+
+    assert builtins._fz_context_runs == 1
+    assert (tmp_path / "out" / "k=2" / "b.txt").read_text().splitlines()[-1] == "b = 21.0"
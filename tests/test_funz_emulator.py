@@ -0,0 +1,71 @@
+"""
+End-to-end tests of funz:// calculators against several emulated Funz
+calculators (fz/funzemulator.py) sharing one UDP port.
+"""
+import pytest
+
+from fz.funzemulator import PAYLOAD_FILE, _parse_size, start_emulators
+from fz.runners import run_funz_calculation
+
+MODEL = {"varprefix": "$", "output": {"by": "cut -d' ' -f3 out.txt"}}
+
+
+@pytest.fixture
+def emulators(fake_funz):
+    """Emulated calculators on the UDP port of fake_funz (emulated runs only)"""
+    fake_funz.command = None
+    started = []
+
+    def start(count, **options):
+        started.extend(start_emulators(count, fake_funz.udp_port, broadcast_interval=0.2, **options))
+        return [fake_funz] + started
+
+    yield start
+    for emulator in started:
+        emulator.close()
+
+
+def test_cases_spread_over_calculators(emulators, tmp_path, monkeypatch):
+    from fz import fzr
+
+    calculators = emulators(3, exec_time=0.3)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("x = $x\n")
+
+    result = fzr("input.txt", {"x": list(range(8))}, MODEL,
+                 calculators=[f"funz://:{calculators[0].udp_port}/bash"] * 4, results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 8
+    assert sum(c.cases for c in calculators) == 8
+    assert len(set(result["by"])) > 1
+
+
+def test_failed_cases_go_to_another_calculator(emulators, tmp_path, monkeypatch):
+    from fz import fzr
+
+    calculators = emulators(1, failure_rate=1.0, name="broken")
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("x = $x\n")
+
+    result = fzr("input.txt", {"x": [1, 2, 3]}, MODEL,
+                 calculators=[f"funz://:{calculators[0].udp_port}/bash"] * 2, results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 3
+    assert set(result["by"]) == {"emulator"}
+    assert calculators[1].failures > 0
+
+
+def test_archive_size(emulators, tmp_path):
+    calculators = emulators(0)
+    calculators[0].archive_size = 5 * 1024 * 1024 + 3
+    (tmp_path / "input.txt").write_text("x = 1\n")
+
+    result = run_funz_calculation(tmp_path, f"funz://:{calculators[0].udp_port}/bash", MODEL, timeout=30)
+
+    assert result["status"] == "done"
+    assert (tmp_path / PAYLOAD_FILE).stat().st_size == 5 * 1024 * 1024 + 3
+
+
+@pytest.mark.parametrize("value,expected", [("1500", 1500), ("64K", 65536), ("1.5M", 1572864), ("1g", 1024 ** 3)])
+def test_parse_size(value, expected):
+    assert _parse_size(value) == expected
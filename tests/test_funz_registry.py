@@ -0,0 +1,123 @@
+"""
+Tests for the live registry of Funz calculators (fz/funzregistry.py).
+
+Calculator broadcasts are sent by UDP to localhost, in the format of
+org.funz.calculator.network.Host.buildPacket().
+"""
+import socket
+import threading
+import time
+
+import pytest
+
+import fz.funzregistry
+from fz.config import get_config
+from fz.funzregistry import FunzRegistry
+from fz.runners import run_funz_calculation
+
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("", 0))
+        return sock.getsockname()[1]
+
+
+def broadcast(udp_port, tcp_port, activity="idle", codes=("bash",), name="calc"):
+    packet = "\n".join([name, str(tcp_port), "0", "Linux", activity, str(len(codes)), *codes]) + "\n"
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.sendto(packet.encode(), ("127.0.0.1", udp_port))
+
+
+@pytest.fixture
+def registry():
+    registry = FunzRegistry(ttl=30.0)
+    yield registry
+    registry.close()
+
+
+def test_acquire_waits_for_broadcast(registry):
+    port = free_udp_port()
+    registry.listen(port)
+    threading.Timer(0.3, broadcast, (port, 19001)).start()
+
+    server = registry.acquire(port, "bash", timeout=10)
+
+    assert server["tcp_port"] == 19001
+    assert server["host"] == "127.0.0.1"
+    assert server["codes"] == ["bash"]
+
+
+def test_known_calculator_is_picked_without_waiting(registry):
+    port = free_udp_port()
+    registry.listen(port)
+    broadcast(port, 19001)
+    registry.acquire(port, "bash", timeout=10)
+    registry.release(port, registry.servers(port)[0])
+
+    start = time.monotonic()
+    server = registry.acquire(port, "bash", timeout=10)
+
+    assert server["tcp_port"] == 19001
+    assert time.monotonic() - start < 1
+
+
+def test_parallel_cases_get_distinct_calculators(registry):
+    port = free_udp_port()
+    registry.listen(port)
+    for tcp_port in (19001, 19002):
+        broadcast(port, tcp_port)
+
+    first = registry.acquire(port, "bash", timeout=10)
+    second = registry.acquire(port, "bash", timeout=10)
+    assert {first["tcp_port"], second["tcp_port"]} == {19001, 19002}
+
+    # Both claimed: a third case waits, then is handed the first calculator released
+    threading.Timer(0.3, registry.release, (port, first)).start()
+    third = registry.acquire(port, "bash", timeout=10)
+    assert third["tcp_port"] == first["tcp_port"]
+
+
+def test_fallback_to_busy_calculator(registry):
+    port = free_udp_port()
+    registry.listen(port)
+    broadcast(port, 19001, activity="already reserved by someone", codes=("R",))
+    broadcast(port, 19002, activity="already reserved by someone", codes=("bash",))
+    time.sleep(0.3)
+
+    server = registry.acquire(port, "bash", timeout=0.5)
+
+    assert server["tcp_port"] == 19002
+    assert not server["idle"]
+
+
+def test_silent_calculators_expire():
+    registry = FunzRegistry(ttl=0.5)
+    port = free_udp_port()
+    try:
+        registry.listen(port)
+        broadcast(port, 19001)
+        time.sleep(0.3)
+        assert len(registry.servers(port)) == 1
+
+        time.sleep(0.5)
+        assert registry.servers(port) == []
+        assert registry.acquire(port, "bash", timeout=0.2) is None
+    finally:
+        registry.close()
+
+
+def test_no_calculator_found(tmp_path, monkeypatch):
+    monkeypatch.setenv("FZ_FUNZ_DISCOVERY_TIMEOUT", "0.5")
+    get_config().reload()
+    monkeypatch.setattr(fz.funzregistry, "_registry", None)
+    (tmp_path / "input.txt").write_text("x = 1\n")
+    port = free_udp_port()
+    try:
+        result = run_funz_calculation(tmp_path, f"funz://:{port}/bash", {"output": {}}, timeout=5)
+    finally:
+        fz.funzregistry.get_funz_registry().close()
+        monkeypatch.undo()
+        get_config().reload()
+
+    assert result["status"] == "error"
+    assert result["error"] == f"No calculator found on UDP port {port}"
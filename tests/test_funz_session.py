@@ -0,0 +1,104 @@
+"""
+Tests for reserved Funz sessions kept across cases (FZ_FUNZ_SESSION_IDLE).
+
+Against an emulated calculator (fz/funzemulator.py): with sessions enabled,
+consecutive cases run their NEWCASE...GETFILE cycle on one reservation, which
+is released when idle or at the end of the fzr run.
+"""
+import time
+
+from fz.config import get_config
+from fz.funzsession import close_funz_sessions
+from fz.runners import run_funz_calculation
+
+MODEL = {"varprefix": "$", "output": {"x": "cat out.txt"}}
+
+
+def session_idle(monkeypatch, seconds):
+    monkeypatch.setenv("FZ_FUNZ_SESSION_IDLE", str(seconds))
+    get_config().reload()
+
+
+def run_case(calculator, tmp_path, x):
+    case = tmp_path / f"x={x}"
+    case.mkdir()
+    (case / "input.txt").write_text(f"echo {x}\n")
+    return run_funz_calculation(case, f"funz://:{calculator.udp_port}/bash", MODEL, timeout=30)
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_one_reservation_per_case_by_default(fake_funz, tmp_path):
+    results = [run_case(fake_funz, tmp_path, x) for x in (1, 2)]
+
+    assert [r["x"] for r in results] == [1, 2]
+    assert fake_funz.requests["RESERVE"] == 2
+    assert fake_funz.requests["UNRESERVE"] == 2
+
+
+def test_session_is_kept_across_cases(fake_funz, tmp_path, monkeypatch):
+    session_idle(monkeypatch, 60)
+
+    results = [run_case(fake_funz, tmp_path, x) for x in (1, 2, 3)]
+
+    assert [r["x"] for r in results] == [1, 2, 3]
+    assert fake_funz.requests["RESERVE"] == 1
+    assert fake_funz.requests["NEWCASE"] == 3
+    assert fake_funz.requests["UNRESERVE"] == 0
+
+    close_funz_sessions()
+    assert fake_funz.requests["UNRESERVE"] == 1
+
+
+def test_idle_session_is_released(fake_funz, tmp_path, monkeypatch):
+    session_idle(monkeypatch, 0.3)
+
+    assert run_case(fake_funz, tmp_path, 1)["status"] == "done"
+
+    wait_for(lambda: fake_funz.requests["UNRESERVE"] == 1)
+    assert fake_funz.reserved_by is None
+
+
+def test_failed_case_keeps_session(fake_funz, tmp_path, monkeypatch):
+    session_idle(monkeypatch, 60)
+    fake_funz.command = "exit 3"
+    failed = run_case(fake_funz, tmp_path, 1)
+    fake_funz.command = "bash input.txt > out.txt"
+    done = run_case(fake_funz, tmp_path, 2)
+
+    assert failed["status"] == "failed"
+    assert failed["error"] == "exit code 3"
+    assert done["x"] == 2
+    assert fake_funz.requests["RESERVE"] == 1
+
+
+def test_lost_session_falls_back_to_new_reservation(fake_funz, tmp_path, monkeypatch):
+    session_idle(monkeypatch, 60)
+    assert run_case(fake_funz, tmp_path, 1)["status"] == "done"
+
+    fake_funz.drop_connections()
+    wait_for(lambda: fake_funz.reserved_by is None)
+    result = run_case(fake_funz, tmp_path, 2)
+
+    assert result["x"] == 2
+    assert fake_funz.requests["RESERVE"] == 2
+
+
+def test_sessions_are_released_at_end_of_run(fake_funz, tmp_path, monkeypatch):
+    from fz import fzr
+
+    session_idle(monkeypatch, 60)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("echo $x\n")
+
+    result = fzr("input.txt", {"x": [1, 2, 3]}, MODEL,
+                 calculators=f"funz://:{fake_funz.udp_port}/bash", results_dir="results")
+
+    assert list(result["x"]) == [1, 2, 3]
+    assert fake_funz.requests["RESERVE"] == 1
+    assert fake_funz.requests["UNRESERVE"] == 1
@@ -0,0 +1,38 @@
+"""
+Tests for the Funz file transfers: uploads with socket.sendfile(), result
+archives received through a reused buffer into memory or a temporary file.
+"""
+import os
+
+import pytest
+
+import fz.funzsession
+from fz.runners import run_funz_calculation
+
+MODEL = {"output": {"size": "wc -c < big.out"}}
+
+
+@pytest.mark.parametrize("spool_size", [64 * 1024 * 1024, 1024])
+def test_binary_files_round_trip(fake_funz, tmp_path, monkeypatch, spool_size):
+    # A small spool size receives the archive in a temporary file
+    monkeypatch.setattr(fz.funzsession, "ARCHIVE_SPOOL_SIZE", spool_size)
+    monkeypatch.setattr(fz.funzsession, "RECEIVE_BUFFER_SIZE", 4096)
+    fake_funz.command = "cp big.in big.out"
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    (tmp_path / "big.in").write_bytes(data)
+
+    result = run_funz_calculation(tmp_path, f"funz://:{fake_funz.udp_port}/bash", MODEL, timeout=30)
+
+    assert result["status"] == "done"
+    assert result["size"] == len(data)
+    assert (tmp_path / "big.out").read_bytes() == data
+
+
+def test_empty_file(fake_funz, tmp_path):
+    fake_funz.command = "cp big.in big.out"
+    (tmp_path / "big.in").write_bytes(b"")
+
+    result = run_funz_calculation(tmp_path, f"funz://:{fake_funz.udp_port}/bash", MODEL, timeout=30)
+
+    assert result["status"] == "done"
+    assert result["size"] == 0
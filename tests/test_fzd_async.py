@@ -0,0 +1,105 @@
+"""
+Tests for fzd(asynchronous=True): the algorithm is told each result as soon
+as its case finishes, and asked for new points whenever a calculator frees
+up, instead of waiting for the slowest case of each batch.
+"""
+import csv
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+import fz
+
+MONTECARLO = str(Path(__file__).parent.parent / "examples" / "algorithms" / "montecarlo_uniform.py")
+RANDOMSAMPLING = str(Path(__file__).parent.parent / "examples" / "algorithms" / "randomsampling.py")
+
+# Initial design x=1,5 then one point per ask(), up to 6 points: x=2,3,4,6
+ALGORITHM = textwrap.dedent('''
+    class AskTell:
+        def __init__(self, **options):
+            self.todo = [2, 3, 4, 6]
+            self.told = []
+            self.asked = []
+
+        def get_initial_design(self, input_vars, output_vars):
+            return [{"x": 1}, {"x": 5}]
+
+        def get_next_design(self, X, Y):
+            return []
+
+        def tell(self, x, y):
+            self.told.append((x["x"], y))
+
+        def ask(self, n):
+            self.asked.append(n)
+            return [{"x": self.todo.pop(0)}] if self.todo else []
+
+        def get_analysis(self, X, Y):
+            return {"text": "told " + str(self.told), "data": {"told": self.told, "asked": self.asked}}
+''')
+
+
+@pytest.fixture
+def algorithm(tmp_path):
+    path = tmp_path / "asktell.py"
+    path.write_text(ALGORITHM)
+    return str(path)
+
+
+@pytest.fixture
+def sleeper(tmp_path, monkeypatch):
+    """An input file whose case sleeps x/2 seconds, then writes y = 10 * x (no output for x=4)"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("x = $x\n")
+    (tmp_path / "calc.py").write_text(textwrap.dedent('''
+        import time
+        x = float(open("input.txt").read().split("=")[1])
+        time.sleep(x / 2)
+        if x != 4:
+            open("y.txt", "w").write(str(10 * x))
+    '''))
+    model = {"varprefix": "$", "output": {"y": "cat y.txt"}}
+    return model, [f"sh://{sys.executable} {tmp_path / 'calc.py'}"] * 2
+
+
+def test_file_model_told_in_completion_order(algorithm, sleeper, tmp_path):
+    model, calculators = sleeper
+    result = fz.fzd("input.txt", {"x": "[0;10]"}, model, "y", algorithm,
+                    calculators=calculators, analysis_dir="analysis", asynchronous=True)
+
+    told = result["analysis"]["data"]["told"]
+    # x=5 keeps a calculator busy while x=1 then x=2 run on the other one
+    assert [x for x, _ in told] == [1, 2, 5, 3, 4, 6]
+    assert dict(told) == {1: 10.0, 2: 20.0, 3: 30.0, 4: None, 5: 50.0, 6: 60.0}
+    # Asked for the calculator that freed up, then for both once all were done
+    assert result["analysis"]["data"]["asked"] == [1, 1, 1, 1, 1, 2]
+    assert list(result["XY"]["x"]) == [1, 2, 5, 3, 4, 6]
+    assert (tmp_path / "analysis" / "iter001" / "x=3" / "y.txt").read_text() == "30.0"
+    with open(tmp_path / "analysis" / "Y_1.csv") as f:
+        assert [row["output"] for row in csv.DictReader(f)] == ["10.0", "20.0", "50.0", "30.0", "NA", "60.0"]
+
+
+def test_function_model(algorithm, tmp_path):
+    result = fz.fzd(None, {"x": "[0;10]"}, lambda x: {"y": x * x}, "y", algorithm,
+                    analysis_dir=str(tmp_path / "analysis"), asynchronous=True)
+
+    assert result["analysis"]["data"]["told"] == [(1, 1), (5, 25), (2, 4), (3, 9), (4, 16), (6, 36)]
+    with open(tmp_path / "analysis" / "iter001" / "values.csv") as f:
+        assert [row["y"] for row in csv.DictReader(f)] == ["1", "25", "4", "9", "16", "36"]
+
+
+def test_montecarlo_ask_tell(tmp_path):
+    options = {"batch_sample_size": 4, "max_iterations": 3, "target_confidence_range": 0.0}
+    result = fz.fzd(None, {"x": "[0;1]"}, lambda x: {"y": 2 * x}, "y", MONTECARLO,
+                    algorithm_options=options, analysis_dir=str(tmp_path / "analysis"), asynchronous=True)
+
+    assert len(result["XY"]) == 12
+    assert list(result["XY"]["y"]) == [2 * x for x in result["XY"]["x"]]
+
+
+def test_algorithm_without_ask_tell(tmp_path):
+    with pytest.raises(ValueError, match="ask"):
+        fz.fzd(None, {"x": "[0;1]"}, lambda x: {"y": x}, "y", RANDOMSAMPLING,
+               analysis_dir=str(tmp_path / "analysis"), asynchronous=True)
@@ -0,0 +1,82 @@
+"""
+Tests for fzd(parallel="process"): Python callable models evaluated on a
+pool of worker processes, in chunks, with results kept in design order.
+Sequential evaluation in the calling thread stays the default.
+"""
+import csv
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import fz
+
+ALGORITHM = str(Path(__file__).parent.parent / "examples" / "algorithms" / "randomsampling.py")
+OPTIONS = {"nvalues": 12, "seed": 3}
+
+
+def double(x):
+    return {"y": 2 * x, "pid": os.getpid()}
+
+
+def fails_above_half(x):
+    if x > 0.5:
+        raise ValueError("x too large")
+    return {"y": 2 * x, "pid": os.getpid()}
+
+
+def run(tmp_path, model, **kwargs):
+    kwargs.setdefault("analysis_dir", str(tmp_path / "analysis"))
+    return fz.fzd(None, {"x": "[0;1]"}, model, "y", ALGORITHM, algorithm_options=OPTIONS, **kwargs)
+
+
+def values(tmp_path):
+    with open(tmp_path / "analysis" / "iter001" / "values.csv") as f:
+        return list(csv.DictReader(f))
+
+
+def test_process_pool_matches_sequential(tmp_path):
+    sequential = run(tmp_path / "seq", double)["XY"]
+    result = run(tmp_path, double, calculators=3, parallel="process")
+
+    assert list(result["XY"]["x"]) == list(sequential["x"])
+    assert list(result["XY"]["y"]) == [2 * x for x in sequential["x"]]
+    pids = {int(row["pid"]) for row in values(tmp_path)}
+    assert os.getpid() not in pids
+    assert len(pids) <= 3
+
+
+def test_sequential_by_default(tmp_path):
+    run(tmp_path, double, calculators=3)
+
+    assert {int(row["pid"]) for row in values(tmp_path)} == {os.getpid()}
+
+
+def test_failed_points_in_process_pool(tmp_path):
+    result = run(tmp_path, fails_above_half, calculators=2, parallel="process")
+
+    for x, y in zip(result["XY"]["x"], result["XY"]["y"]):
+        if x > 0.5:
+            assert pd.isna(y)
+        else:
+            assert y == 2 * x
+    assert any(row["error"] == "x too large" for row in values(tmp_path))
+
+
+def test_unpicklable_function_runs_sequentially(tmp_path):
+    result = run(tmp_path, lambda x: {"y": 2 * x, "pid": os.getpid()}, calculators=2, parallel="process")
+
+    assert list(result["XY"]["y"]) == [2 * x for x in result["XY"]["x"]]
+    assert {int(row["pid"]) for row in values(tmp_path)} == {os.getpid()}
+
+
+def test_invalid_parallel(tmp_path):
+    with pytest.raises(ValueError):
+        run(tmp_path, double, parallel="threads")
+
+
+def test_process_parallel_requires_function_model(tmp_path):
+    with pytest.raises(ValueError):
+        fz.fzd(str(tmp_path), {"x": "[0;1]"}, {"output": {"y": "cat y"}}, "y", ALGORITHM,
+               calculators=["sh://true"], parallel="process", analysis_dir=str(tmp_path / "analysis"))
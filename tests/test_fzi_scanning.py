@@ -0,0 +1,100 @@
+"""
+Tests for input tree scanning (scan_input_files) used by fzi.
+
+Each text file is read once, binary files are recognized from their first
+block, files without any variable or formula marker are skipped, and results
+are cached by path, size and modification time.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from fz import fzi
+from fz.interpreter import parse_variables_from_path, scan_input_files
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+
+
+def make_tree(root):
+    (root / "sub").mkdir(parents=True)
+    (root / "input.txt").write_text("x = ${x~1.5}\n#@k = 2\ny = @{$x * k}\n")
+    (root / "sub" / "more.txt").write_text("z = $z\r\nw = ${w~3}\r\n")
+    (root / "sub" / "plain.txt").write_text("no markers here\n" * 100)
+    (root / "mesh.bin").write_bytes(b"\x00\x01$x\xff" * 5000)
+    (root / "latin1.txt").write_bytes("caf\xe9 $bad\n".encode("latin-1"))
+    return root
+
+
+def test_binary_and_marker_free_files_are_skipped(tmp_path):
+    root = make_tree(tmp_path / "tree")
+    scanned = dict(scan_input_files(root, ("$", "@")))
+    assert sorted(p.name for p in scanned) == ["input.txt", "more.txt"]
+    # Newlines are normalized as when reading in text mode
+    assert scanned[root / "sub" / "more.txt"] == "z = $z\nw = ${w~3}\n"
+
+
+def test_single_file_and_missing_path(tmp_path):
+    f = tmp_path / "one.txt"
+    f.write_text("a = $a\n")
+    assert scan_input_files(f, ("$",)) == [(f, "a = $a\n")]
+    assert scan_input_files(f, ("@",)) == []
+    with pytest.raises(FileNotFoundError):
+        scan_input_files(tmp_path / "missing", ("$",))
+
+
+def test_cache_follows_size_and_mtime(tmp_path):
+    f = tmp_path / "input.txt"
+    f.write_text("a = $a\n")
+    assert parse_variables_from_path(f, "$", "{}") == {"a"}
+
+    # Same size and mtime: the cached text is used
+    mtime = f.stat().st_mtime_ns
+    f.write_text("b = $b\n")
+    os.utime(f, ns=(mtime, mtime))
+    assert parse_variables_from_path(f, "$", "{}") == {"a"}
+
+    os.utime(f, ns=(mtime + 1_000_000_000, mtime + 1_000_000_000))
+    assert parse_variables_from_path(f, "$", "{}") == {"b"}
+
+    f.write_text("b = $b\nc = $c\n")
+    assert parse_variables_from_path(f, "$", "{}") == {"b", "c"}
+
+
+def test_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    import fz.interpreter as interpreter
+
+    monkeypatch.setattr(interpreter, "_scan_cache", interpreter.OrderedDict())
+    monkeypatch.setattr(interpreter, "_scan_cache_size", 0)
+    monkeypatch.setattr(interpreter, "_SCAN_CACHE_MAX_TOTAL", 25)
+    files = []
+    for i in range(3):
+        files.append(tmp_path / f"in{i}.txt")
+        files[-1].write_text(f"v{i} = $v{i}\n")  # 9 characters
+    scan_input_files(files[0], ("$",))
+    scan_input_files(files[1], ("$",))
+    scan_input_files(files[0], ("$",))  # in0 used most recently
+    scan_input_files(files[2], ("$",))
+
+    cached = [Path(key[0]).name for key in interpreter._scan_cache]
+    assert cached == ["in0.txt", "in2.txt"]
+    assert interpreter._scan_cache_size == 18
+
+
+def test_fzi_on_mixed_tree(tmp_path):
+    root = make_tree(tmp_path / "tree")
+    result = fzi(str(root), MODEL)
+    assert result["x"] == 1.5
+    assert result["w"] == 3
+    assert "z" in result and result["z"] is None
+    assert "bad" not in result
+    assert "x * k" in result
+
+
+def test_fzi_on_many_files(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    for i in range(200):
+        (root / f"f{i:03d}.txt").write_text(f"v{i} = ${{v{i}~{i}}}\n" if i % 10 == 0 else "data\n")
+    result = fzi(str(root), MODEL)
+    assert result == {f"v{i}": i for i in range(0, 200, 10)}
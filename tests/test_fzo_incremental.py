@@ -0,0 +1,175 @@
+"""
+Tests for incremental fzo (manifest=...): only result directories whose
+files changed since the previous call are re-parsed, the others reuse the
+values cached in the manifest.
+"""
+import os
+from pathlib import Path
+
+import pytest
+
+from fz import fzo
+from fz.io import directory_signature
+
+parsed_dirs = []
+
+
+def read_value(output_dir: Path):
+    """Callable output recording which directories are actually parsed"""
+    parsed_dirs.append(output_dir.name)
+    out = output_dir / "out.txt"
+    return float(out.read_text()) if out.exists() else None
+
+
+MODEL = {"output": {"value": read_value}}
+
+
+@pytest.fixture
+def campaign(tmp_path):
+    parsed_dirs.clear()
+    results = tmp_path / "results"
+    for x in range(4):
+        case_dir = results / f"x={x}"
+        case_dir.mkdir(parents=True)
+        (case_dir / "out.txt").write_text(str(x * 1.5))
+    return results
+
+
+def touch(path: Path, content: str):
+    """Rewrite a file making sure its mtime changes even on coarse clocks"""
+    before = path.stat().st_mtime_ns if path.exists() else 0
+    path.write_text(content)
+    os.utime(path, ns=(before + 10**9, before + 10**9))
+
+
+def test_second_call_reuses_unchanged_directories(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    first = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert sorted(parsed_dirs) == ["x=0", "x=1", "x=2", "x=3"]
+    assert manifest.exists()
+
+    parsed_dirs.clear()
+    second = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert parsed_dirs == []
+    assert second["value"].tolist() == first["value"].tolist()
+    assert second["x"].tolist() == [0, 1, 2, 3]
+
+
+def test_only_changed_and_new_directories_are_parsed(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    fzo(str(campaign / "*"), MODEL, manifest=manifest)
+
+    parsed_dirs.clear()
+    touch(campaign / "x=2" / "out.txt", "42.0")
+    new_case = campaign / "x=4"
+    new_case.mkdir()
+    (new_case / "out.txt").write_text("6.0")
+
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert sorted(parsed_dirs) == ["x=2", "x=4"]
+    assert df.set_index("x")["value"].to_dict() == {0: 0.0, 1: 1.5, 2: 42.0, 3: 4.5, 4: 6.0}
+
+
+def test_removed_directories_leave_the_result(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    for f in (campaign / "x=3").iterdir():
+        f.unlink()
+    (campaign / "x=3").rmdir()
+
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert df["x"].tolist() == [0, 1, 2]
+
+
+def test_running_case_is_reparsed_once_finished(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    running = campaign / "x=9"
+    running.mkdir()
+    (running / "log.txt").write_text("started")
+
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert df.set_index("x")["value"].isna()[9]
+
+    parsed_dirs.clear()
+    (running / "out.txt").write_text("9.0")
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert parsed_dirs == ["x=9"]
+    assert df.set_index("x")["value"][9] == 9.0
+
+
+def test_changed_output_definitions_invalidate_manifest(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    fzo(str(campaign / "*"), MODEL, manifest=manifest)
+
+    parsed_dirs.clear()
+    model = {"output": {"value": read_value, "raw": "python://read('out.txt')"}}
+    df = fzo(str(campaign / "*"), model, manifest=manifest)
+    assert len(parsed_dirs) == 4
+    assert df["raw"].tolist() == ["0.0", "1.5", "3.0", "4.5"]
+
+
+def test_corrupt_manifest_is_ignored(campaign, tmp_path):
+    manifest = tmp_path / "fzo.manifest"
+    manifest.write_bytes(b"not a manifest")
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert len(parsed_dirs) == 4 and len(df) == 4
+
+
+class _Payload:
+    def __reduce__(self):
+        return (Path.touch, (Path(os.environ["FZ_TEST_PWNED"]),))
+
+
+def test_pickled_manifest_is_not_unpickled(campaign, tmp_path, monkeypatch):
+    import pickle
+
+    monkeypatch.setenv("FZ_TEST_PWNED", str(tmp_path / "pwned"))
+    manifest = tmp_path / "fzo.manifest"
+    manifest.write_bytes(pickle.dumps({"version": 2, "entries": _Payload()}))
+    df = fzo(str(campaign / "*"), MODEL, manifest=manifest)
+    assert not (tmp_path / "pwned").exists()
+    assert len(parsed_dirs) == 4 and len(df) == 4
+
+
+def read_stats(output_dir: Path):
+    """Callable output returning numpy scalars, as numeric parsers do"""
+    import numpy as np
+    parsed_dirs.append(output_dir.name)
+    value = float((output_dir / "out.txt").read_text())
+    return {"mean": np.float64(value), "count": np.int64(3), "missing": float("nan")}
+
+
+def read_series(output_dir: Path):
+    import numpy as np
+    parsed_dirs.append(output_dir.name)
+    value = float((output_dir / "out.txt").read_text())
+    return np.array([value, np.nan, 2 * value])
+
+
+def test_numpy_values_are_cached(campaign, tmp_path):
+    import numpy as np
+
+    model = {"output": {"stats": read_stats, "series": read_series}}
+    manifest = tmp_path / "fzo.manifest"
+    first = fzo(str(campaign / "*"), model, manifest=manifest, vector_format="numpy")
+    assert len(parsed_dirs) == 8
+
+    parsed_dirs.clear()
+    second = fzo(str(campaign / "*"), model, manifest=manifest, vector_format="numpy")
+    assert parsed_dirs == []
+    for a, b in zip(first["series"], second["series"]):
+        assert isinstance(b, np.ndarray) and b.dtype == a.dtype
+        np.testing.assert_array_equal(a, b)
+    assert second.drop(columns="series").equals(first.drop(columns="series"))
+
+
+def test_directory_signature_tracks_nested_files(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "data.csv").write_text("a")
+    (tmp_path / "out.txt").write_text("b")
+    signature = directory_signature(tmp_path)
+    assert [entry[0] for entry in signature] == ["out.txt", "sub/data.csv"]
+
+    touch(tmp_path / "sub" / "data.csv", "aa")
+    assert directory_signature(tmp_path) != signature
+    assert directory_signature(tmp_path, exclude=tmp_path / "out.txt")[0][0] == "sub/data.csv"
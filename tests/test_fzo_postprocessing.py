@@ -0,0 +1,185 @@
+"""
+Tests for fzo's DataFrame post-processing: variable extraction from
+"key1=val1,key2=val2,..." directory names and dict-column flattening.
+
+Both steps are vectorized; these tests check them against the former
+row-by-row implementations (kept here as references) and include a
+benchmark over synthetic 100k-row frames.
+"""
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fz.io import flatten_dict_columns, flatten_dict_recursive, parse_dirname_variables
+
+
+def legacy_parse_dirnames(paths):
+    """Row-by-row directory-name parsing, as previously done in fzo()"""
+    parsed_vars = {}
+    for path_val in paths:
+        last_component = Path(path_val).name
+        if "=" not in last_component:
+            return None
+        row_vars = {}
+        for part in last_component.split(","):
+            if "=" not in part:
+                return None
+            key, val = part.split("=", 1)
+            row_vars[key.strip()] = val.strip()
+        for key in row_vars:
+            parsed_vars.setdefault(key, []).append(row_vars[key])
+    columns = {}
+    for key, values in parsed_vars.items():
+        cast_values = []
+        for v in values:
+            try:
+                cast_values.append(int(v) if "." not in v else float(v))
+            except ValueError:
+                cast_values.append(v)
+        columns[key] = cast_values
+    return pd.DataFrame(columns)
+
+
+def legacy_flatten(df):
+    """Cell-by-cell dict flattening, as previously done in flatten_dict_columns()"""
+    while True:
+        dict_columns = []
+        for col in df.columns:
+            sample = next((v for v in df[col] if v is not None), None)
+            if isinstance(sample, dict):
+                dict_columns.append(col)
+        if not dict_columns:
+            return df
+        new_columns = {}
+        for col in dict_columns:
+            for row_idx, val in enumerate(df[col]):
+                if isinstance(val, dict):
+                    for k, v in flatten_dict_recursive(val, col, "_").items():
+                        new_columns.setdefault(k, [None] * len(df))[row_idx] = v
+        df = df.copy()
+        for name, values in new_columns.items():
+            df[name] = values
+        df = df.drop(columns=dict_columns)
+
+
+class TestParseDirnameVariables:
+
+    def test_casts_like_legacy(self):
+        values = ["1", "-2", "+3", "2.5", ".5", "1.", "1e5", "1.5e3", "abc",
+                  "1_000", "inf", "nan", "1.2.3", "", "007", "12345678901234567890"]
+        paths = pd.Series([f"results/v={v}" for v in values])
+        result = parse_dirname_variables(paths)
+        expected = legacy_parse_dirnames(paths)
+        assert result["v"].tolist() == expected["v"].tolist()
+        assert [type(v) for v in result["v"]] == [type(v) for v in expected["v"]]
+
+    @pytest.mark.parametrize("values, dtype", [
+        (["1", "2", "3"], "int64"),
+        (["1", "2.5"], "float64"),
+        (["a", "b"], None),
+    ])
+    def test_column_dtypes(self, values, dtype):
+        paths = pd.Series([f"r/x={v}" for v in values])
+        result = parse_dirname_variables(paths)
+        if dtype is None:
+            assert pd.api.types.is_string_dtype(result["x"])
+        else:
+            assert result["x"].dtype == dtype
+        assert result["x"].dtype == legacy_parse_dirnames(paths)["x"].dtype
+
+    def test_key_order_whitespace_and_repeated_keys(self):
+        paths = pd.Series(["r/b=1, a = x ", "r/b=2,a=y,b=3"])
+        result = parse_dirname_variables(paths)
+        assert result.columns.tolist() == ["b", "a"]
+        assert result["b"].tolist() == [1, 3]
+        assert result["a"].tolist() == ["x", "y"]
+
+    @pytest.mark.parametrize("paths", [
+        ["r/x=1", "r/plain"],
+        ["r/x=1,flag"],
+        ["r/x=1", "."],
+    ])
+    def test_non_matching_names_give_none(self, paths):
+        assert parse_dirname_variables(pd.Series(paths)) is None
+
+    def test_keys_missing_in_some_directories(self):
+        result = parse_dirname_variables(pd.Series(["r/x=1", "r/y=2.0,x=3"]))
+        assert result["x"].tolist() == [1, 3]
+        assert pd.isna(result["y"].iloc[0]) and result["y"].iloc[1] == 2.0
+
+    def test_only_last_component_is_parsed(self):
+        result = parse_dirname_variables(pd.Series(["a=1/x=2", "a=3/x=4"]))
+        assert result.columns.tolist() == ["x"]
+
+    def test_randomized_against_legacy(self):
+        rng = random.Random(42)
+        pool = ["1", "2", "-7", "3.25", "0.1", "abc", "1e3", "x.y", "10"]
+        for _ in range(50):
+            keys = rng.sample(["a", "b", "c"], k=2)
+            paths = pd.Series([
+                "results/" + ",".join(f"{k}={rng.choice(pool)}" for k in keys)
+                for _ in range(rng.randint(1, 8))
+            ])
+            result = parse_dirname_variables(paths)
+            expected = legacy_parse_dirnames(paths)
+            pd.testing.assert_frame_equal(result, expected)
+
+
+class TestFlattenMatchesLegacy:
+
+    def test_nested_and_partial_dicts(self):
+        df = pd.DataFrame({
+            "path": ["a", "b", "c"],
+            "out": [{"s": {"min": 1, "max": 4}, "n": 2}, None, {"s": {"min": 0}, "k": "x"}],
+            "v": [1.0, 2.0, 3.0],
+        })
+        result = flatten_dict_columns(df)
+        expected = legacy_flatten(df)
+        assert result.columns.tolist() == expected.columns.tolist()
+        for col in expected.columns:
+            assert result[col].isna().tolist() == expected[col].isna().tolist()
+            assert result[col].dropna().tolist() == expected[col].dropna().tolist()
+
+    def test_flattened_key_replaces_existing_column_in_place(self):
+        df = pd.DataFrame({"out_a": [0, 0], "out": [{"a": 1}, {"a": 2}], "z": [5, 6]})
+        result = flatten_dict_columns(df)
+        assert result.columns.tolist() == ["out_a", "z"]
+        assert result["out_a"].tolist() == [1, 2]
+
+    def test_non_object_columns_untouched(self):
+        df = pd.DataFrame({"x": np.arange(3), "y": [None, None, None]})
+        result = flatten_dict_columns(df)
+        pd.testing.assert_frame_equal(result, df)
+
+
+@pytest.mark.slow
+def test_benchmark_100k_rows():
+    """Post-processing of a 100k-directory fzo stays well under a few seconds"""
+    n = 100_000
+    rng = np.random.default_rng(0)
+    paths = pd.Series([
+        f"results/x={i},y={v:.6f},method={'ab'[i % 2]}"
+        for i, v in enumerate(rng.random(n))
+    ])
+    df = pd.DataFrame({
+        "path": paths,
+        "out": [{"stats": {"min": i, "max": i + 1}, "n": i} for i in range(n)],
+        "empty": [None] * n,
+    })
+
+    start = time.perf_counter()
+    variables = parse_dirname_variables(df["path"])
+    parse_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    flat = flatten_dict_columns(df)
+    flatten_time = time.perf_counter() - start
+
+    print(f"\n100k rows: dirname parsing {parse_time:.2f}s, flattening {flatten_time:.2f}s")
+    assert variables["x"].dtype == "int64" and variables["y"].dtype == "float64"
+    assert flat["out_stats_max"].iloc[-1] == n
+    assert parse_time + flatten_time < 30
@@ -0,0 +1,150 @@
+"""
+Tests for parallel case compilation (compile_to_result_directories(jobs=...)).
+
+Blocks of cases are compiled in worker processes; the result directories,
+including their .fz_hash files, must be byte-identical to a sequential
+compilation. The benchmarks compare compile times with the number of jobs.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+import fz.helpers
+from fz import fzc
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+
+
+@pytest.fixture
+def template(tmp_path):
+    src = tmp_path / "template"
+    (src / "sub").mkdir(parents=True)
+    (src / "main.txt").write_text(
+        "#@import math\n#@def area(r):\n#@    return math.pi * r ** 2\n"
+        "r = ${r}\nA = @{area($r) | 0.0000}\nn = ${n~1}\n"
+    )
+    (src / "sub" / "mesh.dat").write_bytes(b"\x00mesh" * 100)
+    (src / "sub" / "params.txt").write_text("T = ${T}\nratio = @{$T / $r}\n")
+    return src
+
+
+def read_tree(root):
+    return {
+        str(p.relative_to(root)): p.read_bytes()
+        for p in sorted(root.rglob("*")) if p.is_file()
+    }
+
+
+def test_parallel_output_matches_sequential(template, tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(fz.helpers, "_MIN_CASES_PER_COMPILE_JOB", 1)
+    model = dict(MODEL, shared_files=["sub/mesh.dat"])
+    variables = {"r": [0.5, 1, 2.5, 4], "T": [280, 300, 320], "n": [1, 2]}
+
+    fzc(str(template), variables, model, output_dir=str(tmp_path / "seq"), jobs=1)
+    capsys.readouterr()
+    fzc(str(template), variables, model, output_dir=str(tmp_path / "par"), jobs=3)
+
+    assert read_tree(tmp_path / "par") == read_tree(tmp_path / "seq")
+    assert "Compiled 24/24 cases (100.0%)" in capsys.readouterr().err
+    # Shared input files are stored once across processes
+    inodes = {(d / "sub" / "mesh.dat").stat().st_ino for d in (tmp_path / "par").iterdir()}
+    assert len(inodes) == 1
+
+
+def test_jobs_from_config_and_cpu_count(template, tmp_path, monkeypatch):
+    monkeypatch.setattr(fz.helpers, "_MIN_CASES_PER_COMPILE_JOB", 1)
+    monkeypatch.setenv("FZ_COMPILE_JOBS", "0")
+    from fz.config import get_config
+    get_config().reload()
+    try:
+        assert get_config().compile_jobs == 0
+        fzc(str(template), {"r": [1, 2, 3], "T": [300]}, MODEL, output_dir=str(tmp_path / "out"))
+    finally:
+        monkeypatch.delenv("FZ_COMPILE_JOBS")
+        get_config().reload()
+    assert len(list((tmp_path / "out").iterdir())) == 3
+
+
+def test_small_designs_are_compiled_in_process(template, tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("no process pool expected")
+
+    monkeypatch.setattr("concurrent.futures.ProcessPoolExecutor", no_pool)
+    fzc(str(template), {"r": [1, 2], "T": [300]}, MODEL, output_dir=str(tmp_path / "out"), jobs=8)
+    assert len(list((tmp_path / "out").iterdir())) == 2
+
+
+def test_unpicklable_model_is_compiled_in_process(template, tmp_path, monkeypatch):
+    monkeypatch.setattr(fz.helpers, "_MIN_CASES_PER_COMPILE_JOB", 1)
+    warnings = []
+    monkeypatch.setattr(fz.helpers, "log_warning", warnings.append)
+    model = dict(MODEL, output={"A": lambda path: None})
+    variables = {"r": [1, 2, 3, 4], "T": [300]}
+
+    fzc(str(template), variables, MODEL, output_dir=str(tmp_path / "seq"), jobs=1)
+    fzc(str(template), variables, model, output_dir=str(tmp_path / "par"), jobs=2)
+
+    assert any("compiling in-process" in w for w in warnings)
+    assert read_tree(tmp_path / "par") == read_tree(tmp_path / "seq")
+
+
+def test_fzc_cli_jobs_option(template, tmp_path, monkeypatch):
+    from fz.cli import fzc_main
+
+    monkeypatch.setattr(fz.helpers, "_MIN_CASES_PER_COMPILE_JOB", 1)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", [
+        "fzc", str(template), "--model", '{"varprefix": "$", "formulaprefix": "@", "delim": "{}", '
+        '"commentline": "#"}', "--variables", '{"r": [1, 2, 3, 4], "T": 300}',
+        "--output_dir", "out", "--jobs", "2",
+    ])
+    assert fzc_main() == 0
+    assert len(list((tmp_path / "out").iterdir())) == 4
+
+
+@pytest.mark.slow
+def test_benchmark_compile_scaling(tmp_path):
+    """Compile 500 cases of a 20-file template with 1 job and with one per CPU"""
+    src = tmp_path / "template"
+    src.mkdir()
+    for i in range(20):
+        lines = [f"#@k{i} = {i}"] + [f"v{j} = @{{$x * k{i} + {j} | 0.000}} ${{y}}" for j in range(50)]
+        (src / f"file{i:02d}.txt").write_text("\n".join(lines) + "\n")
+    variables = {"x": list(range(100)), "y": list(range(5))}
+
+    timings = {}
+    for jobs in sorted({1, max(2, os.cpu_count() or 1)}):
+        start = time.perf_counter()
+        fzc(str(src), variables, MODEL, output_dir=str(tmp_path / f"out{jobs}"), jobs=jobs)
+        timings[jobs] = time.perf_counter() - start
+
+    print("\n500 cases x 20 files: " + ", ".join(f"{j} jobs {t:.1f}s" for j, t in timings.items()))
+    assert read_tree(tmp_path / f"out{max(timings)}") == read_tree(tmp_path / "out1")
+
+
+@pytest.mark.slow
+@pytest.mark.skipif((os.cpu_count() or 1) < 2, reason="needs at least 2 CPUs")
+def test_benchmark_formula_speedup(tmp_path):
+    """Compiling a CPU-bound formula deck with one job per CPU is faster than with 1 job"""
+    src = tmp_path / "template"
+    src.mkdir()
+    lines = ["#@import math"] + [
+        f"f{j} = @{{sum(math.sin($x * i + {j}) for i in range(10000)) | 0.000}}" for j in range(20)
+    ]
+    (src / "deck.txt").write_text("\n".join(lines) + "\n")
+    variables = {"x": [i / 10 for i in range(64)]}
+    jobs = min(os.cpu_count(), 4)
+
+    timings = {}
+    for n in (1, jobs):
+        start = time.perf_counter()
+        fzc(str(src), variables, MODEL, output_dir=str(tmp_path / f"out{n}"), jobs=n)
+        timings[n] = time.perf_counter() - start
+
+    speedup = timings[1] / timings[jobs]
+    print(f"\n64 cases x 20 formulas: 1 job {timings[1]:.1f}s, {jobs} jobs {timings[jobs]:.1f}s "
+          f"(speedup {speedup:.2f})")
+    assert read_tree(tmp_path / f"out{jobs}") == read_tree(tmp_path / "out1")
+    assert speedup > 1.3
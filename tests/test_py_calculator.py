@@ -0,0 +1,115 @@
+"""
+Tests for the py://module:function calculator (fz/pycalculator.py), calling
+a Python function on each case directory in-process or on worker processes.
+"""
+import os
+import sys
+import textwrap
+
+import pytest
+
+import fz.pycalculator
+from fz.config import get_config
+from fz.runners import _validate_calculator_uri, run_py_calculation
+from fz.workerpool import close_worker_pools
+
+MODEL = {"varprefix": "$", "output": {"y": "cat y.txt", "pid": "cat pid.txt"}}
+
+SIMULATOR = textwrap.dedent('''
+    import os
+
+    def run(case):
+        x = float((case / "input.txt").read_text().split("=")[1])
+        print(f"solving {x}")
+        (case / "y.txt").write_text(str(x * x))
+        (case / "pid.txt").write_text(str(os.getpid()))
+
+    def fail(case):
+        raise ValueError("no convergence")
+
+    def exit_code(case):
+        return 4
+''')
+
+
+@pytest.fixture
+def simulator(tmp_path, monkeypatch):
+    """A module of model functions in tmp_path, with a name unique to the test"""
+    name = f"fz_test_sim_{tmp_path.name.replace('-', '_')}"
+    (tmp_path / f"{name}.py").write_text(SIMULATOR)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    monkeypatch.setattr(fz.pycalculator, "_functions", {})
+    yield name
+    close_worker_pools()
+    sys.modules.pop(name, None)
+
+
+def run_case(tmp_path, uri, x=3):
+    case = tmp_path / f"x={x}"
+    case.mkdir()
+    (case / "input.txt").write_text(f"x = {x}\n")
+    return case, run_py_calculation(case, uri, MODEL, timeout=30, original_cwd=str(tmp_path))
+
+
+def test_fzr_in_process(simulator, tmp_path):
+    from fz import fzr
+
+    (tmp_path / "input.txt").write_text("x = $x\n")
+    result = fzr("input.txt", {"x": [1, 2, 3]}, MODEL,
+                 calculators=f"py://{simulator}:run", results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 3
+    assert list(result["y"]) == [1, 4, 9]
+    assert set(result["pid"]) == {os.getpid()}
+    info = (tmp_path / "results" / "x=2" / "info.txt").read_text()
+    assert "state=done" in info
+    assert "output.y=4" in info
+    assert (tmp_path / "results" / "x=2" / "log.txt").exists()
+
+
+def test_fzr_on_worker_processes(simulator, tmp_path, monkeypatch):
+    from fz import fzr
+
+    monkeypatch.setenv("FZ_PY_PROCESSES", "2")
+    get_config().reload()
+    try:
+        (tmp_path / "input.txt").write_text("x = $x\n")
+        result = fzr("input.txt", {"x": [1, 2, 3, 4]}, MODEL,
+                     calculators=f"py://{simulator}:run", results_dir="results")
+    finally:
+        monkeypatch.delenv("FZ_PY_PROCESSES")
+        get_config().reload()
+
+    assert list(result["y"]) == [1, 4, 9, 16]
+    assert os.getpid() not in set(result["pid"])
+    assert len(set(result["pid"])) <= 2
+    assert (tmp_path / "results" / "x=3" / "out.txt").read_text() == "solving 3.0\n"
+
+
+def test_exception_fails_case(simulator, tmp_path):
+    case, result = run_case(tmp_path, f"py://{simulator}:fail")
+
+    assert result["status"] == "failed"
+    assert result["exit_code"] == 1
+    assert "ValueError: no convergence" in (case / "err.txt").read_text()
+
+
+def test_exit_code_returned(simulator, tmp_path):
+    _, result = run_case(tmp_path, f"py://{simulator}:exit_code")
+
+    assert result["status"] == "failed"
+    assert result["exit_code"] == 4
+
+
+def test_missing_module_fails_case(simulator, tmp_path):
+    case, result = run_case(tmp_path, "py://fz_test_no_such_module:run")
+
+    assert result["status"] == "failed"
+    assert "ModuleNotFoundError" in (case / "err.txt").read_text()
+
+
+@pytest.mark.parametrize("uri", ["py://sim", "py://sim:", "py://:run", "py://my-sim:run", "py://sim:run()"])
+def test_invalid_py_uri(uri):
+    with pytest.raises(ValueError):
+        _validate_calculator_uri(uri)
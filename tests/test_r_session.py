@@ -0,0 +1,114 @@
+"""
+Tests for the single-threaded R session (fz.rsession) and batched R formulas.
+
+All rpy2 calls of fz run in one worker thread; the batch tests need rpy2 and
+compare precomputed R formulas with the per-case evaluation.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fz.interpreter import evaluate_formulas, precompute_formula_values, replace_variables_in_content
+from fz.rsession import RSession, get_r_session
+
+
+def _check_rpy2_available():
+    """Helper function to check if rpy2 is installed and functional"""
+    try:
+        import rpy2
+        import rpy2.robjects
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture
+def session():
+    session = RSession(name="test-r-session")
+    yield session
+    session.shutdown()
+
+
+def test_calls_run_in_one_thread_in_submission_order(session):
+    seen = []
+
+    def record(i):
+        seen.append((i, threading.current_thread().name))
+        return i * 2
+
+    futures = [session.submit(record, i) for i in range(50)]
+    assert [f.result() for f in futures] == [i * 2 for i in range(50)]
+    assert [i for i, _ in seen] == list(range(50))
+    assert {name for _, name in seen} == {"test-r-session"}
+
+
+def test_calls_from_many_threads_are_serialized(session):
+    active = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def work(i):
+        with lock:
+            active.append(i)
+            overlaps.append(len(active))
+        threading.Event().wait(0.001)
+        with lock:
+            active.remove(i)
+        return i
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: session.call(work, i), range(40)))
+    assert results == list(range(40))
+    assert max(overlaps) == 1
+
+
+def test_exceptions_are_raised_in_the_caller(session):
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        session.call(fail)
+    assert session.call(lambda: "still running") == "still running"
+
+
+def test_nested_call_runs_directly(session):
+    def outer():
+        return session.call(lambda: threading.current_thread().name)
+
+    assert session.call(outer) == "test-r-session"
+
+
+def test_shared_session_is_a_singleton():
+    assert get_r_session() is get_r_session()
+
+
+def test_r_formulas_from_threads_without_rpy2_keep_content():
+    if _check_rpy2_available():
+        pytest.skip("rpy2 installed")
+    model = {"formulaprefix": "@", "delim": "{}", "commentline": "#"}
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(
+            lambda x: evaluate_formulas("v = @{2 * x}", model, {"x": x}, interpreter="R"), range(8)
+        ))
+    assert results == ["v = @{2 * x}"] * 8
+    assert precompute_formula_values("v = @{2 * $x}", model, [{"x": 1}, {"x": 2}], "R") is None
+
+
+@pytest.mark.skipif(not _check_rpy2_available(), reason="rpy2 not installed")
+def test_batched_r_formulas_match_per_case():
+    model = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+    content = (
+        "#@k <- 2.5\n"
+        "a = @{$x * k + $(y) | 0.000}\n"
+        "b = @{sqrt(abs($x)) / $y}\n"
+        "c = @{$x^2}\n"
+        "d = @{if ($x > 0) 1 else 0}\n"
+    )
+    cases = [{"x": x, "y": y} for x in (-2, 0.5, 3) for y in (1, 2.25)]
+    tables = precompute_formula_values(content, model, cases, "R")
+    assert tables is not None and "0.5 * k + 1 | 0.000" in tables[2]
+    for i, case in enumerate(cases):
+        text = replace_variables_in_content(content, case)
+        expected = evaluate_formulas(text, model, case, interpreter="R")
+        assert evaluate_formulas(text, model, case, interpreter="R", formula_values=tables[i]) == expected
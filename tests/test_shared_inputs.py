@@ -0,0 +1,119 @@
+"""
+Tests for shared input files.
+
+Input files without variables nor formulas declared in the model
+"shared_files" (or large ones, with "shared_files": True) are stored once per
+run: the cases' result and temp directories hard link the same read-only
+file, which is hashed once.
+"""
+import os
+import sys
+
+import pytest
+
+import fz.helpers
+import fz.io
+from fz import fzc, fzr
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+
+
+@pytest.fixture
+def case_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(fz.helpers, "_SHARED_FILE_MIN_SIZE", 1000)
+    src = tmp_path / "case"
+    (src / "mesh").mkdir(parents=True)
+    (src / "input.txt").write_text("x = ${x}\n")
+    (src / "mesh" / "grid.bin").write_bytes(b"\x00$@{}" * 1000)
+    (src / "small.dat").write_text("1 2 3\n")
+    return src
+
+
+def inodes(out, rel_path):
+    return {(p / rel_path).stat().st_ino for p in out.iterdir() if p.is_dir()}
+
+
+def test_files_are_copied_by_default(case_dir, tmp_path):
+    out = tmp_path / "out"
+    fzc(str(case_dir), {"x": [1, 2]}, MODEL, output_dir=str(out))
+    assert len(inodes(out, "mesh/grid.bin")) == 2
+
+
+def test_large_marker_free_files_are_linked(case_dir, tmp_path):
+    out = tmp_path / "out"
+    fzc(str(case_dir), {"x": [1, 2, 3]}, dict(MODEL, shared_files=True), output_dir=str(out))
+
+    assert len(inodes(out, "mesh/grid.bin")) == 1
+    assert len(inodes(out, "small.dat")) == 3
+    assert len(inodes(out, "input.txt")) == 3
+    assert (out / "x=2" / "mesh" / "grid.bin").read_bytes() == (case_dir / "mesh" / "grid.bin").read_bytes()
+    # The input itself is not linked
+    assert (case_dir / "mesh" / "grid.bin").stat().st_nlink == 1
+
+
+def test_shared_files_declaration(case_dir, tmp_path):
+    out = tmp_path / "out"
+    model = dict(MODEL, shared_files=["*.dat", "input.txt"])
+    fzc(str(case_dir), {"x": [1, 2]}, model, output_dir=str(out))
+
+    assert len(inodes(out, "small.dat")) == 1
+    # Files with variables are compiled for each case anyway
+    assert len(inodes(out, "input.txt")) == 2
+    assert (out / "x=2" / "input.txt").read_text() == "x = 2\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="shared files stay writable on Windows")
+def test_shared_files_are_read_only(case_dir, tmp_path):
+    out = tmp_path / "out"
+    fzc(str(case_dir), {"x": [1, 2]}, dict(MODEL, shared_files=["small.dat"]), output_dir=str(out))
+
+    assert not (out / "x=2" / "small.dat").stat().st_mode & 0o222
+    assert os.access(case_dir / "small.dat", os.W_OK)
+
+
+def test_only_staged_files_are_relinked(tmp_path):
+    # A hard link fz did not make is copied like any other file
+    src = tmp_path / "data.txt"
+    src.write_text("data")
+    os.link(src, tmp_path / "other.txt")
+    fz.helpers._copy_or_relink(str(src), str(tmp_path / "copy.txt"))
+    assert (tmp_path / "copy.txt").stat().st_nlink == 1
+
+
+def test_sharing_disabled(case_dir, tmp_path):
+    out = tmp_path / "out"
+    fzc(str(case_dir), {"x": [1, 2]}, dict(MODEL, shared_files=False), output_dir=str(out))
+    assert len(inodes(out, "mesh/grid.bin")) == 2
+
+
+def test_linked_files_are_hashed_once(tmp_path, monkeypatch):
+    calls = []
+    original = fz.io.hashlib.md5
+    monkeypatch.setattr(fz.io.hashlib, "md5", lambda *a: calls.append(1) or original(*a))
+
+    shared = tmp_path / "a" / "mesh.bin"
+    shared.parent.mkdir()
+    shared.write_bytes(b"mesh")
+    for name in ("b", "c"):
+        (tmp_path / name).mkdir()
+        os.link(shared, tmp_path / name / "mesh.bin")
+    for name in ("a", "b", "c"):
+        fz.io.create_hash_file(tmp_path / name, ["mesh.bin"])
+
+    assert len(calls) == 1
+    assert len({(tmp_path / n / ".fz_hash").read_text() for n in "abc"}) == 1
+
+
+def test_fzr_with_shared_files(case_dir, tmp_path):
+    runner = tmp_path / "runner.sh"
+    runner.write_text("#!/bin/bash\nwc -c < mesh/grid.bin > size.txt\ncp input.txt copy.txt\n")
+    model = dict(MODEL, shared_files=True, output={"size": "cat size.txt"})
+
+    result = fzr(str(case_dir), {"x": [1, 2, 3]}, model,
+                 calculators=f"sh://bash {runner}", results_dir=str(tmp_path / "results"))
+
+    assert list(result["status"]) == ["done"] * 3
+    assert list(result["size"]) == [5000] * 3
+    assert len(inodes(tmp_path / "results", "mesh/grid.bin")) == 1
+    assert (tmp_path / "results" / "x=3" / "copy.txt").read_text() == "x = 3\n"
@@ -0,0 +1,175 @@
+"""
+Tests for the allocation mode of local slurm:// calculators (FZ_SLURM_MODE=alloc).
+
+Against the fake sbatch/squeue/scancel of tests/fake_slurm.py: one batch job
+runs an fz worker (python -m fz.slurmalloc) which pulls the cases from the
+queue directory, and is submitted again once released.
+"""
+import json
+import subprocess
+import threading
+import time
+
+import pytest
+
+from fake_slurm import calls
+from fz.config import get_config
+from fz.runners import run_slurm_calculation
+from fz.slurmalloc import run_worker
+
+MODEL = {"varprefix": "$", "output": {"x": "cut -d= -f2 out.txt"}}
+
+
+@pytest.fixture
+def alloc(fake_slurm, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("FZ_SLURM_MODE", "alloc")
+    monkeypatch.setenv("FZ_SLURM_ALLOC_TASKS", "2")
+    monkeypatch.setenv("FZ_SLURM_ALLOC_IDLE", "1")
+    get_config().reload()
+    return fake_slurm
+
+
+def make_case(root, x):
+    case = root / "cases" / f"x={x}"
+    case.mkdir(parents=True)
+    (case / "input.txt").write_text(f"x = {x}\n")
+    return case
+
+
+def wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.1)
+
+
+def test_cases_run_in_one_allocation(alloc, tmp_path):
+    from fz import fzr
+
+    (tmp_path / "input.txt").write_text("x = $x\n")
+
+    result = fzr("input.txt", {"x": [1, 2, 3, 4, 5, 6]}, MODEL,
+                 calculators="slurm://:compute/cat", results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 6
+    assert list(result["x"]) == [1, 2, 3, 4, 5, 6]
+    submissions = calls(alloc, "sbatch")
+    assert len(submissions) == 1
+    job_script = open(submissions[0].split()[-1]).read()
+    assert "#SBATCH --ntasks=2" in job_script
+    assert "-m fz.slurmalloc" in job_script
+    log = (tmp_path / "results" / "x=4" / "log.txt").read_text()
+    assert "SLURM job: 1\n" in log
+    assert "SLURM state: COMPLETED" in log
+
+
+def test_released_allocation_is_submitted_again(alloc, tmp_path):
+    first = run_slurm_calculation(make_case(tmp_path, 1), "slurm://:compute/cat", MODEL,
+                                  timeout=30, input_files_list=["input.txt"])
+    assert first["x"] == 1
+    # The idle worker releases the allocation
+    wait_for(lambda: (alloc / "jobs" / "1").read_text().startswith("COMPLETED"))
+
+    second = run_slurm_calculation(make_case(tmp_path, 2), "slurm://:compute/cat", MODEL,
+                                   timeout=30, input_files_list=["input.txt"])
+    assert second["x"] == 2
+    assert len(calls(alloc, "sbatch")) == 2
+
+
+def test_failed_case(alloc, tmp_path):
+    case = make_case(tmp_path, 1)
+
+    result = run_slurm_calculation(case, "slurm://:compute/echo oops >&2; exit 3;", MODEL,
+                                   timeout=30, input_files_list=["input.txt"])
+
+    assert result["status"] == "failed"
+    assert result["exit_code"] == 3
+    assert "oops" in result["stderr"]
+
+
+def test_timeout_kills_running_case(alloc, tmp_path):
+    case = make_case(tmp_path, 1)
+
+    result = run_slurm_calculation(case, "slurm://:compute/sleep 60;", MODEL,
+                                   timeout=4, input_files_list=["input.txt"])
+
+    assert result["status"] == "timeout"
+    queue = next((tmp_path / ".fz" / "slurm").iterdir())
+    wait_for(lambda: not list((queue / "running").iterdir()))
+    # The allocation itself is kept for the next cases
+    assert calls(alloc, "scancel") == []
+
+
+def test_cases_of_an_ended_allocation_fail(alloc, tmp_path):
+    case = make_case(tmp_path, 1)
+    results = []
+    thread = threading.Thread(target=lambda: results.append(run_slurm_calculation(
+        case, "slurm://:compute/sleep 60;", MODEL, timeout=60, input_files_list=["input.txt"])))
+    thread.start()
+    wait_for(lambda: list((tmp_path / ".fz" / "slurm").glob("*/running/*.json")))
+
+    subprocess.run(["scancel", "1"], check=True)
+    thread.join(30)
+
+    assert results[0]["status"] == "error"
+    assert "ended while the case was running" in results[0]["error"]
+
+
+def test_worker(tmp_path):
+    queue = tmp_path / "queue"
+    for sub in ("pending", "running", "done", "cancel"):
+        (queue / sub).mkdir(parents=True)
+    for i, command in enumerate(["exit 0", "exit 4", "echo hi"]):
+        case = tmp_path / f"case{i}"
+        case.mkdir()
+        (queue / "pending" / f"{i}.json").write_text(json.dumps({"dir": str(case), "command": command}))
+
+    run_worker(queue, slots=2, walltime=100, idle_timeout=0.5)
+
+    done = {p.stem: json.loads(p.read_text())["exit_code"] for p in (queue / "done").iterdir()}
+    assert done == {"0": 0, "1": 4, "2": 0}
+    assert (tmp_path / "case2" / "out.txt").read_text() == "hi\n"
+    assert not list((queue / "running").iterdir())
+
+
+def test_worker_slots_wait_while_a_case_runs(tmp_path):
+    queue = tmp_path / "queue"
+    for sub in ("pending", "running", "done", "cancel"):
+        (queue / sub).mkdir(parents=True)
+
+    def add_case(name, command):
+        case = tmp_path / name
+        case.mkdir()
+        (queue / "pending" / f"{name}.json").write_text(json.dumps({"dir": str(case), "command": command}))
+
+    def add_short_cases():
+        wait_for(lambda: (queue / "done" / "long.json").exists())
+        add_case("short1", "sleep 1")
+        add_case("short2", "sleep 1")
+
+    # A case longer than idle_timeout: the other slot must not stop meanwhile
+    add_case("long", "sleep 1.5")
+    feeder = threading.Thread(target=add_short_cases)
+    feeder.start()
+    run_worker(queue, slots=2, walltime=100, idle_timeout=0.5)
+    feeder.join()
+
+    done = {p.stem: json.loads(p.read_text()) for p in (queue / "done").iterdir()}
+    assert sorted(done) == ["long", "short1", "short2"]
+    # The short cases ran side by side, one per slot
+    assert done["short2"]["start"] < done["short1"]["end"]
+    assert done["short1"]["start"] < done["short2"]["end"]
+
+
+def test_worker_stops_before_walltime(tmp_path):
+    queue = tmp_path / "queue"
+    for sub in ("pending", "running", "done", "cancel"):
+        (queue / sub).mkdir(parents=True)
+    (tmp_path / "case").mkdir()
+    (queue / "pending" / "0.json").write_text(json.dumps({"dir": str(tmp_path / "case"), "command": "true"}))
+
+    # Less walltime left than the safety margin: no case is started
+    run_worker(queue, walltime=5, idle_timeout=60)
+
+    assert list((queue / "pending").iterdir())
@@ -0,0 +1,138 @@
+"""
+Tests for the job-array backend of local slurm:// calculators (FZ_SLURM_MODE=array).
+
+Against the fake sbatch/squeue/sacct/scancel of tests/fake_slurm.py: the
+cases of a run are submitted as one array job, and their states are polled
+with one squeue query for all of them.
+"""
+import pytest
+
+from fake_slurm import calls
+from fz.config import get_config
+from fz.helpers import _expand_array_calculators
+from fz.runners import run_slurm_calculation
+from fz.slurmarray import ArrayTask, SlurmArrayScheduler, _parse_exit_code
+
+MODEL = {"varprefix": "$", "output": {"x": "cut -d= -f2 out.txt"}}
+
+
+def make_case(root, x):
+    case = root / f"x={x}"
+    case.mkdir(parents=True)
+    (case / "input.txt").write_text(f"x = {x}\n")
+    return case
+
+
+def test_cases_share_one_array_job(fake_slurm, tmp_path, monkeypatch):
+    from fz import fzr
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("x = $x\n")
+
+    result = fzr("input.txt", {"x": [1, 2, 3, 4, 5]}, MODEL,
+                 calculators="slurm://:compute/cat", results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 5
+    assert list(result["x"]) == [1, 2, 3, 4, 5]
+    assert len(calls(fake_slurm, "sbatch")) == 1
+    # States of the 5 tasks are fetched together at each poll
+    assert all(line.endswith("-j 1") for line in calls(fake_slurm, "squeue"))
+
+    log = (tmp_path / "results" / "x=3" / "log.txt").read_text()
+    assert "SLURM partition: compute" in log
+    assert "SLURM job: 1_" in log
+    assert "SLURM state: COMPLETED" in log
+    # The array and task files are removed once done
+    assert not list(tmp_path.rglob(".fz_array_*"))
+    assert not list(tmp_path.rglob(".fz_slurm_*"))
+
+
+def test_failed_task(fake_slurm, tmp_path):
+    case = make_case(tmp_path, 1)
+
+    result = run_slurm_calculation(case, "slurm://:compute/echo oops >&2; exit 3;", MODEL,
+                                   timeout=30, input_files_list=["input.txt"])
+
+    assert result["status"] == "failed"
+    assert result["exit_code"] == 3
+    assert "oops" in result["stderr"]
+    assert "SLURM state: FAILED" in (case / "log.txt").read_text()
+
+
+def test_exit_code_without_accounting(fake_slurm, tmp_path):
+    # sacct fails (accounting disabled): the recorded exit code is used
+    (tmp_path / "slurm_bin" / "sacct").write_text("#!/bin/sh\nexit 1\n")
+    cases = [make_case(tmp_path, x) for x in (1, 2)]
+
+    ok = run_slurm_calculation(cases[0], "slurm://:compute/cat", MODEL,
+                               timeout=30, input_files_list=["input.txt"])
+    failed = run_slurm_calculation(cases[1], "slurm://:compute/exit 2;", MODEL,
+                                   timeout=30, input_files_list=["input.txt"])
+
+    assert ok["status"] == "done"
+    assert ok["x"] == 1
+    assert failed["status"] == "failed"
+    assert failed["exit_code"] == 2
+
+
+def test_timeout_cancels_task(fake_slurm, tmp_path):
+    case = make_case(tmp_path, 1)
+
+    result = run_slurm_calculation(case, "slurm://:compute/sleep 30;", MODEL,
+                                   timeout=2, input_files_list=["input.txt"])
+
+    assert result["status"] == "timeout"
+    assert calls(fake_slurm, "scancel") == ["scancel 1_0"]
+
+
+def test_sbatch_failure(fake_slurm, tmp_path):
+    (tmp_path / "slurm_bin" / "sbatch").write_text(
+        "#!/bin/sh\necho 'sbatch: error: invalid partition specified: nope' >&2\nexit 1\n"
+    )
+    case = make_case(tmp_path, 1)
+
+    result = run_slurm_calculation(case, "slurm://:nope/cat", MODEL,
+                                   timeout=30, input_files_list=["input.txt"])
+
+    assert result["status"] == "error"
+    assert "invalid partition" in result["error"]
+
+
+def test_arrays_are_split_by_size(tmp_path):
+    arrays = []
+
+    def run(args):
+        if args[0] == "sbatch":
+            arrays.append(open(args[-1]).read())
+            return 0, f"{len(arrays)}\n", ""
+        return 0, "", ""
+
+    scheduler = SlurmArrayScheduler(max_array_size=2, run=run)
+    tasks = [ArrayTask(make_case(tmp_path, x), "compute", "cat input.txt") for x in range(5)]
+    scheduler._pending = list(tasks)
+    scheduler._submit_pending()
+
+    assert [a.count("#SBATCH --array=0-1") for a in arrays] == [1, 1, 0]
+    assert "#SBATCH --array=0-0" in arrays[2]
+    assert [t.job_id for t in tasks] == ["1_0", "1_1", "2_0", "2_1", "3_0"]
+    assert "cat input.txt" in (tasks[0].working_dir / ".fz_slurm_task.sh").read_text()
+
+
+def test_expand_array_calculators(monkeypatch):
+    calculators = ["slurm://:compute/run.sh", "sh://run.sh", "slurm://user@hpc:compute/run.sh"]
+    assert _expand_array_calculators(calculators, 3) == calculators
+
+    monkeypatch.setenv("FZ_SLURM_MODE", "array")
+    monkeypatch.setenv("FZ_SLURM_ARRAY_SIZE", "2")
+    get_config().reload()
+    try:
+        assert _expand_array_calculators(calculators, 3) == [calculators[0]] * 2 + calculators[1:]
+        assert _expand_array_calculators(calculators, 1) == calculators
+    finally:
+        monkeypatch.undo()
+        get_config().reload()
+
+
+@pytest.mark.parametrize("value,expected", [("0:0", 0), ("2:0", 2), ("0:9", 137), ("", None)])
+def test_parse_exit_code(value, expected):
+    assert _parse_exit_code(value) == expected
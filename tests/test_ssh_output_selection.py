@@ -0,0 +1,140 @@
+"""
+Tests for selective result retrieval of SSH cases (model "output_files" and
+"remote_output").
+
+Against the in-process SSH server of tests/fake_ssh_server.py: only the
+files matching output_files come back (log.txt, out.txt and err.txt always
+do), and with remote_output the shell output commands run on the remote,
+their results being stored in the case directory for fzo.
+"""
+import json
+import re
+from pathlib import Path
+
+import pytest
+
+from fz.config import get_config
+from fz.io import REMOTE_OUTPUT_FILE
+from fz.runners import run_ssh_calculation
+
+pytestmark = pytest.mark.requires_paramiko
+
+# A large scratch file, a small result and a result in a subdirectory
+SCRIPT = ("head -c 200000 /dev/zero > big.dat && wc -c < big.dat > size.txt && "
+          "mkdir -p res && echo 7 > res/y.txt && cat")
+
+
+@pytest.fixture
+def case(tmp_path):
+    case = tmp_path / "cases" / "x=3"
+    case.mkdir(parents=True)
+    (case / "input.txt").write_text("x = 3\n")
+    return case
+
+
+def run(server, case, model):
+    return run_ssh_calculation(case, server.uri(SCRIPT), model, timeout=30,
+                               input_files_list=["input.txt"])
+
+
+@pytest.mark.parametrize("transfer", ["tar", "sftp"])
+def test_output_files_allowlist(fake_ssh_server, case, monkeypatch, transfer):
+    monkeypatch.setenv("FZ_SSH_TRANSFER", transfer)
+    get_config().reload()
+    model = {
+        "output": {"size": "cat size.txt", "y": "cat res/y.txt"},
+        "output_files": ["*.txt", "res"],
+    }
+
+    result = run(fake_ssh_server, case, model)
+
+    assert result["status"] == "done"
+    assert result["size"] == 200000
+    assert result["y"] == 7
+    assert not (case / "big.dat").exists()
+    assert (case / "out.txt").read_text() == "x = 3\n"
+    assert "Exit code: 0" in (case / "log.txt").read_text()
+    received = int(re.search(r"Transfer from remote: (\d+) bytes",
+                             (case / "log.txt").read_text()).group(1))
+    assert received < 200000
+
+
+@pytest.mark.parametrize("transfer", ["tar", "sftp"])
+def test_output_files_are_not_shell_code(fake_ssh_server, case, tmp_path, monkeypatch, transfer):
+    monkeypatch.setenv("FZ_SSH_TRANSFER", transfer)
+    get_config().reload()
+    model = {"output": {}, "output_files": ["odd name*.txt", "$(touch pwned)", "`touch pwned`"]}
+
+    result = run_ssh_calculation(case, fake_ssh_server.uri("echo 1 > 'odd name;1.txt'; cat"), model,
+                                 timeout=30, input_files_list=["input.txt"])
+
+    assert result["status"] == "done"
+    assert (case / "odd name;1.txt").read_text() == "1\n"
+    assert not list(Path(fake_ssh_server.root_dir).rglob("pwned"))
+
+
+def test_output_files_unsafe_character_class(fake_ssh_server, case):
+    model = {"output": {}, "output_files": ["res[;a]"]}
+
+    result = run(fake_ssh_server, case, model)
+
+    assert result["status"] == "error"
+    assert "output_files pattern" in result["error"]
+    # Rejected before the case runs
+    assert fake_ssh_server.commands == ["pwd"]
+
+
+def test_remote_output_skips_downloads(fake_ssh_server, case):
+    model = {
+        "output": {"size": "cat big.dat | wc -c", "x": "cut -d= -f2 out.txt",
+                   "missing": "cat no_such_file"},
+        "output_files": [],
+        "remote_output": True,
+    }
+
+    result = run(fake_ssh_server, case, model)
+
+    assert result["status"] == "done"
+    assert result["size"] == 200000
+    assert result["x"] == 3
+    assert result["missing"] is None
+    assert not (case / "big.dat").exists()
+    stored = json.loads((case / REMOTE_OUTPUT_FILE).read_text())
+    assert stored["size"] == {"command": "cat big.dat | wc -c", "returncode": 0,
+                              "stdout": "200000\n", "stderr": ""}
+    assert stored["missing"]["returncode"] != 0
+    # Evaluated within the control script: no extra exec request
+    assert len(fake_ssh_server.commands) == 3
+
+
+def test_changed_output_command_runs_locally(fake_ssh_server, case):
+    from fz import fzo
+
+    model = {"output": {"size": "cat big.dat | wc -c"}, "output_files": [], "remote_output": True}
+    run(fake_ssh_server, case, model)
+
+    assert fzo(str(case), model)["size"].tolist() == [200000]
+    # Not the command run remotely: evaluated on the (absent) local file
+    changed = {"output": {"size": "wc -c < big.dat"}}
+    assert fzo(str(case), changed)["size"].tolist() == [None]
+
+
+def test_remote_output_with_fzr(fake_ssh_server, tmp_path, monkeypatch):
+    from fz import fzr
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("x = $x\n")
+    model = {
+        "varprefix": "$",
+        "output": {"x": "cut -d= -f2 input.txt", "big": "wc -c < big.dat"},
+        "output_files": "out.txt",
+        "remote_output": True,
+    }
+
+    result = fzr("input.txt", {"x": [1, 2]}, model,
+                 calculators=fake_ssh_server.uri("head -c 50000 /dev/zero > big.dat; cat"))
+
+    assert list(result["status"]) == ["done", "done"]
+    assert list(result["x"]) == [1, 2]
+    assert list(result["big"]) == [50000, 50000]
+    assert not list((tmp_path / "results").rglob("big.dat"))
@@ -0,0 +1,236 @@
+"""
+Tests for the SSH connection pool (fz/sshpool.py).
+
+The pool is tested with fake clients for lease accounting, per-host limits,
+health checks and idle expiry, and end-to-end against the in-process SSH
+server of tests/fake_ssh_server.py: successive and concurrent ssh://
+calculations to one host open a single connection.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import fz.sshpool
+from fz.sshpool import SSHConnectionPool
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+        self.ignores = 0
+
+    def is_active(self):
+        return self.active
+
+    def send_ignore(self):
+        if not self.active:
+            raise EOFError("connection lost")
+        self.ignores += 1
+
+
+class FakeSFTP:
+    class sock:
+        closed = False
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+        self.sftp_opened = 0
+
+    def get_transport(self):
+        return self.transport
+
+    def open_sftp(self):
+        self.sftp_opened += 1
+        return FakeSFTP()
+
+    def close(self):
+        self.closed = True
+        self.transport.active = False
+
+
+@pytest.fixture
+def clients():
+    return []
+
+
+@pytest.fixture
+def connect(clients):
+    def connect():
+        client = FakeClient()
+        clients.append(client)
+        return client
+    return connect
+
+
+def test_connection_and_sftp_are_reused(connect, clients):
+    pool = SSHConnectionPool()
+    for _ in range(3):
+        with pool.lease("host", connect) as lease:
+            lease.sftp()
+            lease.info.setdefault("remote_root", "/home/fz")
+
+    assert len(clients) == 1
+    assert clients[0].sftp_opened == 1
+    with pool.lease("host", connect) as lease:
+        assert lease.info["remote_root"] == "/home/fz"
+    pool.close_all()
+    assert clients[0].closed
+
+
+def test_leases_per_connection(connect, clients):
+    pool = SSHConnectionPool(leases_per_connection=2)
+    with pool.lease("host", connect) as a, pool.lease("host", connect) as b:
+        assert a.client is b.client
+        with pool.lease("host", connect) as c:
+            assert c.client is not a.client
+        # Other keys never share a connection
+        with pool.lease("other", connect) as d:
+            assert d.client not in (a.client, c.client)
+    assert len(clients) == 3
+    assert pool.connection_count("host") == 2
+
+
+def test_max_per_host_waits_for_a_free_slot(connect):
+    pool = SSHConnectionPool(max_per_host=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def calculation(_):
+        with pool.lease("host", connect):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+    with ThreadPoolExecutor(6) as executor:
+        list(executor.map(calculation, range(6)))
+    assert max(peak) == 2
+
+
+def test_dead_connections_are_replaced(connect, clients):
+    pool = SSHConnectionPool()
+    with pool.lease("host", connect):
+        pass
+    clients[0].transport.active = False
+
+    with pool.lease("host", connect) as lease:
+        assert lease.client is clients[1]
+    assert clients[0].closed
+    assert pool.connection_count("host") == 1
+
+
+def test_idle_connections_are_probed(connect, clients):
+    pool = SSHConnectionPool(health_check_interval=0)
+    with pool.lease("host", connect):
+        pass
+    with pool.lease("host", connect):
+        pass
+    assert clients[0].transport.ignores == 1
+
+
+def test_invalidated_connection_is_closed(connect, clients):
+    pool = SSHConnectionPool()
+    with pytest.raises(RuntimeError):
+        with pool.lease("host", connect) as lease:
+            lease.sftp()
+            lease.invalidate()
+            raise RuntimeError("transfer failed")
+    assert clients[0].closed
+    assert pool.connection_count("host") == 0
+
+
+def test_idle_expiry(connect, clients):
+    pool = SSHConnectionPool(idle_timeout=0.2)
+    with pool.lease("host", connect):
+        pool.expire_idle()
+        assert not clients[0].closed
+    deadline = time.monotonic() + 5
+    while not clients[0].closed and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert clients[0].closed
+    assert pool.connection_count("host") == 0
+    pool.close_all()
+
+
+def test_idle_sftp_taken_by_one_lease(connect, clients):
+    pool = SSHConnectionPool()
+    with pool.lease("host", connect) as lease:
+        idle = lease.sftp()
+    with pool.lease("host", connect) as a, pool.lease("host", connect) as b:
+        sessions = [a.sftp(), b.sftp()]
+    assert a.client is b.client
+    # The idle session went to one lease, the other opened its own
+    assert sessions.count(idle) == 1
+    assert clients[0].sftp_opened == 2
+    pool.close_all()
+
+
+def test_pool_key_depends_on_password():
+    from fz.sshpool import ssh_pool_key
+
+    key = ssh_pool_key("host", 22, "user", "secret")
+    assert key == ssh_pool_key("host", 22, "user", "secret")
+    assert key != ssh_pool_key("host", 22, "user", "wrong")
+    assert key != ssh_pool_key("host", 22, "user")
+    assert "secret" not in repr(key)
+
+
+@pytest.mark.requires_paramiko
+class TestPooledSSHCalculations:
+    """ssh:// calculations against an in-process SSH server"""
+
+    def make_case(self, root, x):
+        case = root / f"x={x}"
+        case.mkdir(parents=True)
+        (case / "input.txt").write_text(f"x = {x}\n")
+        return case
+
+    def test_cases_share_one_connection(self, fake_ssh_server, tmp_path):
+        from fz.runners import run_ssh_calculation
+
+        # The input file names are appended to the command: stdout goes to out.txt
+        model = {"output": {"y": "cut -d= -f2 out.txt"}}
+        uri = fake_ssh_server.uri("cat")
+        cases = [self.make_case(tmp_path / "cases", x) for x in range(6)]
+
+        with ThreadPoolExecutor(3) as executor:
+            results = list(executor.map(
+                lambda case: run_ssh_calculation(case, uri, model, timeout=30,
+                                                input_files_list=["input.txt"]),
+            cases,
+            ))
+
+        assert [r["status"] for r in results] == ["done"] * 6
+        assert [r["y"] for r in results] == list(range(6))
+        assert (cases[2] / "out.txt").read_text().strip() == "x = 2"
+        assert fake_ssh_server.connections == 1
+        # The remote home directory is asked once for the connection
+        assert fake_ssh_server.commands.count("pwd") == 1
+
+    def test_connection_survives_fzr_calls(self, fake_ssh_server, tmp_path, monkeypatch):
+        from fz import fzr
+
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "input.txt").write_text("x = $x\n")
+        model = {"varprefix": "$", "output": {"x": "cut -d= -f2 input.txt"}}
+        uri = fake_ssh_server.uri("true")
+
+        for values in ([1, 2], [3]):
+            result = fzr("input.txt", {"x": values}, model, calculators=uri,
+                         results_dir=f"results{values[0]}")
+            assert list(result["status"]) == ["done"] * len(values)
+            assert list(result["x"]) == values
+        assert fake_ssh_server.connections == 1
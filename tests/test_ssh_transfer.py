@@ -0,0 +1,177 @@
+"""
+Tests for SSH case transfers (FZ_SSH_TRANSFER / FZ_SSH_COMPRESS).
+
+Against the in-process SSH server of tests/fake_ssh_server.py: by default a
+case directory, subdirectories included, goes to the remote as one tar
+stream and comes back as another; SFTP transfers file by file. Transfer
+statistics are appended to the case log.txt.
+"""
+import io
+import os
+import re
+import tarfile
+
+import pytest
+
+from fz.config import get_config
+from fz.runners import _tar_from_remote, run_ssh_calculation
+
+pytestmark = pytest.mark.requires_paramiko
+
+# Writes results at the top level and in a subdirectory
+SCRIPT = "mkdir -p res/deep && wc -l < data/part1.txt > res/deep/n.txt && cat"
+MODEL = {"output": {"n": "cat res/deep/n.txt", "x": "cut -d= -f2 out.txt"}}
+
+
+@pytest.fixture
+def case(tmp_path):
+    case = tmp_path / "cases" / "x=3"
+    (case / "data").mkdir(parents=True)
+    (case / "input.txt").write_text("x = 3\n")
+    for i in range(50):
+        (case / "data" / f"part{i}.txt").write_text("line\n" * i)
+    return case
+
+
+def run(server, case, command=SCRIPT):
+    return run_ssh_calculation(case, server.uri(command), MODEL, timeout=30,
+                               input_files_list=["input.txt"])
+
+
+def tar_commands(server):
+    """tar invocations of the exec requests: "-x..." (upload), "-c..." (download)"""
+    return [t for c in server.commands for t in re.findall(r"\btar (-[xc]z?f) -", c)]
+
+
+def test_tar_transfer_of_directory_trees(fake_ssh_server, case):
+    result = run(fake_ssh_server, case)
+
+    assert result["status"] == "done"
+    assert result["n"] == 1
+    assert result["x"] == 3
+    assert (case / "res" / "deep" / "n.txt").read_text().strip() == "1"
+    # One archive each way
+    assert tar_commands(fake_ssh_server) == ["-xf", "-cf"]
+
+    log = (case / "log.txt").read_text()
+    assert "Transfer mode: tar\n" in log
+    sent = int(re.search(r"Transfer to remote: (\d+) bytes in [\d.]+ seconds", log).group(1))
+    received = int(re.search(r"Transfer from remote: (\d+) bytes in [\d.]+ seconds", log).group(1))
+    # The tar streams hold the 50 data files (1225 lines) and their headers
+    assert sent > 1225 * 5
+    assert received >= sent
+
+
+def test_compressed_tar_transfer(fake_ssh_server, case, monkeypatch):
+    monkeypatch.setenv("FZ_SSH_COMPRESS", "true")
+    get_config().reload()
+
+    result = run(fake_ssh_server, case)
+
+    assert result["status"] == "done"
+    assert result["n"] == 1
+    assert tar_commands(fake_ssh_server) == ["-xzf", "-czf"]
+    log = (case / "log.txt").read_text()
+    assert "Transfer mode: tar.gz\n" in log
+    sent = int(re.search(r"Transfer to remote: (\d+) bytes", log).group(1))
+    assert sent < 1225 * 5
+
+
+def test_sftp_transfer_of_directory_trees(fake_ssh_server, case, monkeypatch):
+    monkeypatch.setenv("FZ_SSH_TRANSFER", "sftp")
+    get_config().reload()
+
+    result = run(fake_ssh_server, case)
+
+    assert result["status"] == "done"
+    assert result["n"] == 1
+    assert tar_commands(fake_ssh_server) == []
+    assert "Transfer mode: sftp\n" in (case / "log.txt").read_text()
+
+
+def test_fallback_to_sftp_without_remote_tar(fake_ssh_server, case, tmp_path, monkeypatch):
+    # The remote shell finds a tar that cannot run
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "tar").write_text("#!/bin/sh\necho 'tar: not installed' >&2\nexit 127\n")
+    (bin_dir / "tar").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    for _ in range(2):
+        result = run(fake_ssh_server, case)
+        assert result["status"] == "done"
+        assert result["n"] == 1
+    # Tar is tried once per connection
+    assert tar_commands(fake_ssh_server) == ["-xf"]
+    assert "Transfer mode: sftp\n" in (case / "log.txt").read_text()
+
+
+def test_hard_linked_inputs_are_not_overwritten(fake_ssh_server, case, tmp_path):
+    shared = tmp_path / "shared.txt"
+    shared.write_text("shared\n")
+    os.link(shared, case / "shared.txt")
+
+    result = run(fake_ssh_server, case, "echo changed > shared.txt; cat")
+
+    assert result["status"] == "done"
+    assert (case / "shared.txt").read_text() == "changed\n"
+    assert shared.read_text() == "shared\n"
+
+
+class _FakeTarClient:
+    """SSH client whose exec_command returns a prepared tar stream"""
+
+    def __init__(self, members):
+        self.data = io.BytesIO()
+        with tarfile.open(fileobj=self.data, mode="w") as tar:
+            for name, kind, link in members:
+                info = tarfile.TarInfo(name)
+                info.type = kind
+                info.linkname = link or ""
+                content = b"remote\n" if kind == tarfile.REGTYPE else b""
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+
+    def exec_command(self, command):
+        stdout = io.BytesIO(self.data.getvalue())
+        stdout.channel = type("Channel", (), {"recv_exit_status": lambda self: 0})()
+        return io.BytesIO(), stdout, io.BytesIO()
+
+
+@pytest.mark.parametrize("data_filter", [True, False])
+@pytest.mark.parametrize("member", [
+    ("../victim.txt", tarfile.REGTYPE, None),
+    ("{victim}", tarfile.REGTYPE, None),
+    ("escape", tarfile.SYMTYPE, "../victim.txt"),
+    ("escape", tarfile.SYMTYPE, "{victim}"),
+    ("escape", tarfile.LNKTYPE, "../victim.txt"),
+])
+def test_tar_members_outside_the_case_are_rejected(tmp_path, monkeypatch, member, data_filter):
+    if not data_filter:
+        monkeypatch.delattr(tarfile, "data_filter", raising=False)
+    victim = tmp_path / "victim.txt"
+    victim.write_text("local\n")
+    case = tmp_path / "case"
+    case.mkdir()
+    name, kind, link = member
+    name, link = name.format(victim=victim), link and link.format(victim=victim)
+
+    client = _FakeTarClient([("out.txt", tarfile.REGTYPE, None), (name, kind, link)])
+    with pytest.raises(RuntimeError, match="unsafe"):
+        _tar_from_remote(client, "/remote/case", case)
+
+    assert victim.read_text() == "local\n"
+    assert sorted(os.listdir(case)) == ["out.txt"]
+
+
+def test_tar_links_inside_the_case_are_extracted(tmp_path):
+    case = tmp_path / "case"
+    case.mkdir()
+    client = _FakeTarClient([
+        ("./", tarfile.DIRTYPE, None),
+        ("./res", tarfile.DIRTYPE, None),
+        ("./res/out.txt", tarfile.REGTYPE, None),
+        ("./latest", tarfile.SYMTYPE, "res/out.txt"),
+    ])
+    _tar_from_remote(client, "/remote/case", case)
+    assert (case / "latest").read_text() == "remote\n"
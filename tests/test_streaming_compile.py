@@ -0,0 +1,100 @@
+"""
+Tests for the compilation of input files in chunks (large input decks).
+
+Files above fz.helpers._STREAM_COMPILE_THRESHOLD are compiled chunk by chunk,
+with markers open at the end of a chunk carried over to the next one. The
+tests lower the threshold and chunk sizes so that markers fall on chunk
+boundaries, and compare with the compilation of the whole content.
+"""
+import random
+
+import pytest
+
+import fz.helpers
+from fz import fzc
+
+MODEL = {"varprefix": "$", "formulaprefix": "@", "delim": "{}", "commentline": "#"}
+VARIABLES = {"x": [1.5, -2], "name": ["abc"]}
+
+
+def compile_tree(src, out, threshold=None, chunk_size=None, carry_size=None, monkeypatch=None):
+    if threshold is not None:
+        monkeypatch.setattr(fz.helpers, "_STREAM_COMPILE_THRESHOLD", threshold)
+    if chunk_size is not None:
+        monkeypatch.setattr(fz.helpers, "_STREAM_CHUNK_SIZE", chunk_size)
+    if carry_size is not None:
+        monkeypatch.setattr(fz.helpers, "_STREAM_CARRY_SIZE", carry_size)
+    fzc(str(src), VARIABLES, MODEL, output_dir=str(out))
+    return {
+        str(p.relative_to(out)): p.read_bytes()
+        for p in sorted(out.rglob("*")) if p.is_file() and p.name != ".fz_hash"
+    }
+
+
+def make_deck(path, rng, lines=300, newline="\n"):
+    parts = ["#@k = 3\n", "#@kx = $x * 2\n", "#@def f(a):\n", "#@    return a * k + kx\n"]
+    for i in range(lines):
+        choice = rng.random()
+        if choice < 0.3:
+            parts.append(f"v{i} = ${{x}} {'pad ' * rng.randint(0, 5)}\n")
+        elif choice < 0.5:
+            parts.append(f"w{i} = @{{f($x) + {i} | 0.00}}\n")
+        elif choice < 0.6:
+            parts.append(f"n{i} = $name ${{missing~{i}}}\n")
+        elif choice < 0.65:
+            # Formula spanning two lines
+            parts.append(f"s{i} = @{{($x +\n{i})}}\n")
+        else:
+            parts.append("0.0 " * rng.randint(1, 20) + "\n")
+    parts.append("#@k2 = k * ${x}\nlast = @{k2 + kx}")
+    path.write_bytes("".join(parts).replace("\n", newline).encode())
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1000])
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+def test_streamed_output_matches_whole_file(tmp_path, monkeypatch, chunk_size, newline):
+    src = tmp_path / "src"
+    src.mkdir()
+    make_deck(src / "deck.txt", random.Random(chunk_size), newline=newline)
+
+    expected = compile_tree(src, tmp_path / "whole")
+    streamed = compile_tree(src, tmp_path / "streamed", threshold=0, chunk_size=chunk_size,
+                            monkeypatch=monkeypatch)
+    assert streamed == expected
+    assert b"@{" not in b"".join(streamed.values())
+
+
+def test_single_line_file_is_streamed(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "line.txt").write_text("a=${x} " * 50 + "b=@{$x * 2} c=$name")
+    expected = compile_tree(src, tmp_path / "whole")
+    streamed = compile_tree(src, tmp_path / "streamed", threshold=0, chunk_size=16,
+                            monkeypatch=monkeypatch)
+    assert streamed == expected
+
+
+def test_marker_free_and_binary_files_are_copied(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    plain = b"mixed\r\nline endings\nkept\r\n"
+    binary = b"\x00\xff${x}\xfe" * 100
+    (src / "plain.txt").write_bytes(plain)
+    (src / "mesh.bin").write_bytes(binary)
+    (src / "input.txt").write_text("x = ${x}\n")
+
+    for out, kwargs in (("whole", {}), ("streamed", {"threshold": 0, "chunk_size": 8})):
+        result = compile_tree(src, tmp_path / out, monkeypatch=monkeypatch, **kwargs)
+        assert result["x=1.5,name=abc/plain.txt"] == plain
+        assert result["x=-2,name=abc/mesh.bin"] == binary
+        assert result["x=1.5,name=abc/input.txt"] == b"x = 1.5\n"
+
+
+def test_is_template_file_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(fz.helpers, "_STREAM_CHUNK_SIZE", 4)
+    f = tmp_path / "f.txt"
+    f.write_bytes(b"abc#" + b"@rest")
+    assert fz.helpers._is_template_file(f, ("#@",))
+    assert not fz.helpers._is_template_file(f, ("$", "@{"))
+    f.write_bytes(b"\x00abc$x")
+    assert not fz.helpers._is_template_file(f, ("$",))
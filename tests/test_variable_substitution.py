@@ -0,0 +1,139 @@
+"""
+Differential tests for single-pass variable substitution.
+
+replace_variables_in_content() and formula variable substitution resolve
+all $(var), $(var~default) and $var references in one scan. These tests
+compare them with the former implementation (one re.sub for delimited
+forms, then one per variable), kept here verbatim as a reference, on
+hand-written edge cases and on randomly generated templates.
+"""
+import random
+import re
+
+import pytest
+
+from fz.interpreter import (
+    _substitute_formula_variables,
+    evaluate_formulas,
+    replace_variables_in_content,
+)
+
+
+def reference_replace_variables(content, input_variables, varprefix="$", delim="()"):
+    """replace_variables_in_content() before single-pass substitution"""
+    if len(delim) == 2:
+        left_delim, right_delim = delim[0], delim[1]
+        esc_varprefix = re.escape(varprefix)
+        esc_left = re.escape(left_delim)
+        esc_right = re.escape(right_delim)
+        delim_pattern = rf"{esc_varprefix}{esc_left}([a-zA-Z_][a-zA-Z0-9_]*)(?:~([^{esc_right}]*))?{esc_right}"
+
+        def replace_delimited(match):
+            var_name = match.group(1)
+            default_value = match.group(2)
+            if var_name in input_variables:
+                return str(input_variables[var_name])
+            elif default_value is not None:
+                print(f"Warning: Variable '{var_name}' not found in input_variables, using default value: '{default_value}'")
+                return default_value
+            else:
+                return match.group(0)
+
+        content = re.sub(delim_pattern, replace_delimited, content)
+        for var, val in input_variables.items():
+            content = re.sub(rf"{esc_varprefix}{re.escape(var)}\b", str(val), content)
+    else:
+        for var, val in input_variables.items():
+            content = re.sub(rf"{re.escape(varprefix)}{re.escape(var)}\b", str(val), content)
+    return content
+
+
+def reference_formula_substitution(formula, input_variables, varprefix="$", var_delim="()"):
+    """Per-variable formula substitution before single-pass substitution"""
+    for var, val in input_variables.items():
+        if len(var_delim) == 2:
+            var_pattern_delim = rf'{re.escape(varprefix)}{re.escape(var_delim[0])}{re.escape(var)}{re.escape(var_delim[1])}'
+            formula = re.sub(var_pattern_delim, str(val), formula)
+        formula = re.sub(rf'{re.escape(varprefix)}{re.escape(var)}\b', str(val), formula)
+    return formula
+
+
+def both(func, reference, capsys, *args):
+    """Run implementation and reference, return (result, stdout) pairs"""
+    try:
+        expected = (reference(*args), None)
+    except Exception as e:  # e.g. re.error on "\d" in a value
+        expected = (None, type(e))
+    expected_out = capsys.readouterr().out
+    try:
+        actual = (func(*args), None)
+    except Exception as e:
+        actual = (None, type(e))
+    actual_out = capsys.readouterr().out
+    return (actual, actual_out), (expected, expected_out)
+
+
+@pytest.mark.parametrize("content, variables", [
+    ("x = $x\ny = $(y)\n", {"x": 1, "y": 2.5}),
+    ("$(missing~3.14) and $(missing)", {"x": 1}),
+    ("$a$b $ab $a_1 $abc", {"a": 1, "ab": 2, "a_1": 3}),
+    ("$$a $(a)$b $a$(b)", {"a": "b", "b": 7}),
+    ("$a", {"a": "$b", "b": 1}),
+    ("$a", {"a": "C:\\temp"}),
+    ("$a", {"a": "\\d"}),
+    ("$(z~$a) $(z~x)y", {"a": 5}),
+    ("no variables here", {"a": 1}),
+    ("$x.y $x-1 $x(2)", {"x": 10}),
+    ("$(x) $x", {}),
+    ("price: $é and $(é)", {"é": 4}),
+])
+def test_content_edge_cases(content, variables, capsys):
+    actual, expected = both(replace_variables_in_content, reference_replace_variables,
+                            capsys, content, variables)
+    assert actual == expected
+
+
+@pytest.mark.parametrize("varprefix, delim", [("$", "()"), ("$", "{}"), ("@", "[]"), ("%", ""), ("$$", "()")])
+def test_content_randomized(varprefix, delim, capsys):
+    rng = random.Random(f"{varprefix}{delim}")
+    left, right = (delim[0], delim[1]) if delim else ("(", ")")
+    names = ["a", "ab", "b", "a_1", "T"]
+    tokens = [" ", "\n", "x", "1", ".", "-", left, right, "~", varprefix]
+    tokens += [f"{varprefix}{n}" for n in names + ["zz"]]
+    tokens += [f"{varprefix}{left}{n}{right}" for n in names + ["zz"]]
+    tokens += [f"{varprefix}{left}{n}~{d}{right}" for n in ("a", "zz") for d in ("3", "", "q;c;[0,1]")]
+    value_pool = [1, 2.5, "s", "ab", "x y", "-1", "(", varprefix, "\\1", "b", "T"]
+
+    for _ in range(300):
+        content = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 12)))
+        variables = {n: rng.choice(value_pool) for n in rng.sample(names, rng.randint(0, len(names)))}
+        actual, expected = both(replace_variables_in_content, reference_replace_variables,
+                                capsys, content, variables, varprefix, delim)
+        assert actual == expected, (content, variables)
+
+
+@pytest.mark.parametrize("var_delim", ["()", ""])
+def test_formula_randomized(var_delim, capsys):
+    rng = random.Random(var_delim)
+    names = ["x", "xy", "y", "n_2"]
+    tokens = [" ", "+", "*", "2", "(", ")", "$", "$$"]
+    tokens += [f"${n}" for n in names + ["q"]] + [f"$({n})" for n in names + ["q"]]
+    for _ in range(300):
+        formula = "".join(rng.choice(tokens) for _ in range(rng.randint(0, 10)))
+        variables = {n: rng.choice([1, 0.5, "x", "$y", "-3"]) for n in rng.sample(names, rng.randint(0, 4))}
+        actual, expected = both(_substitute_formula_variables, reference_formula_substitution,
+                                capsys, formula, variables, "$", var_delim)
+        assert actual == expected, (formula, variables)
+
+
+def test_formulas_end_to_end():
+    model = {"varprefix": "$", "formulaprefix": "@", "formula_delim": "{}", "var_delim": "()"}
+    content = "r = @{$x * 2 | 0.00}\ns = @{$(y) + $x}\n"
+    assert evaluate_formulas(content, model, {"x": 1.5, "y": 2}) == "r = 3.00\ns = 3.5\n"
+
+
+def test_large_template_single_pass_matches_reference():
+    variables = {f"var{i}": i * 1.5 for i in range(40)}
+    lines = [f"line {i}: $var{i % 40} $(var{(i * 7) % 40}) $(unknown~{i})" for i in range(5000)]
+    content = "\n".join(lines)
+    assert replace_variables_in_content(content, variables) == reference_replace_variables(content, variables)
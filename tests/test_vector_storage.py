@@ -0,0 +1,143 @@
+"""
+Tests for the columnar storage of vector outputs (vector_format).
+
+fzo()/fzr() keep vector-valued outputs as plain Python lists by default
+(see tests/test_vector_outputs.py). With vector_format="numpy" each cell
+holds a numpy array instead, and with vector_format="arrow" the whole
+column becomes a pyarrow list column, written to Parquet without any
+conversion. fzd's output-expression reductions (mean, sum, ...) operate on
+those arrays directly.
+
+These tests are shell-free: they only use python:// outputs on result
+directories written by hand.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from fz import fzo
+from fz.algorithms import evaluate_output_expression
+from fz.io import (
+    convert_vector_columns,
+    resolve_vector_format,
+    to_vector_cell,
+    vector_row,
+)
+
+MODEL = {
+    "output": {
+        "series": "python://grep(r'v=(\\S+)', 'out.txt', all=True)",
+        "first": "python://grep(r'v=(\\S+)', 'out.txt')",
+        "labels": "python://grep(r'label=(\\S+)', 'out.txt', all=True)",
+    }
+}
+
+
+@pytest.fixture
+def results_tree(tmp_path):
+    """Two result directories with ragged series: n=2 and n=3 values."""
+    for n in (2, 3):
+        case_dir = tmp_path / "results" / f"n={n}"
+        case_dir.mkdir(parents=True)
+        lines = [f"v={i + 0.5}" for i in range(1, n + 1)] + ["label=a", "label=b"]
+        (case_dir / "out.txt").write_text("\n".join(lines) + "\n")
+    return tmp_path / "results"
+
+
+def test_resolve_vector_format_defaults_to_list(monkeypatch):
+    from fz.config import get_config
+    monkeypatch.setattr(get_config(), "vector_format", "list")
+    assert resolve_vector_format(None) == "list"
+    assert resolve_vector_format("NumPy") == "numpy"
+
+
+def test_resolve_vector_format_rejects_unknown():
+    with pytest.raises(ValueError, match="vector_format"):
+        resolve_vector_format("pickle")
+
+
+def test_to_vector_cell_only_converts_numeric_lists():
+    assert isinstance(to_vector_cell([1.0, 2.0], "numpy"), np.ndarray)
+    assert to_vector_cell([1.0, 2.0], "list") == [1.0, 2.0]
+    assert to_vector_cell(["a", "b"], "numpy") == ["a", "b"]
+    assert to_vector_cell(3.5, "numpy") == 3.5
+    assert to_vector_cell(None, "numpy") is None
+
+
+def test_fzo_list_format_is_unchanged(results_tree):
+    df = fzo(str(results_tree / "*"), MODEL)
+    assert df["series"].iloc[0] == [1.5, 2.5]
+    assert isinstance(df["series"].iloc[1], list)
+
+
+def test_fzo_numpy_format(results_tree):
+    df = fzo(str(results_tree / "*"), MODEL, vector_format="numpy")
+    first, second = df["series"].iloc[0], df["series"].iloc[1]
+    assert isinstance(first, np.ndarray) and first.dtype == np.float64
+    np.testing.assert_array_equal(second, [1.5, 2.5, 3.5])
+    # Scalars and non-numeric lists are left alone
+    assert df["first"].iloc[0] == 1.5
+    assert df["labels"].iloc[0] == ["a", "b"]
+
+
+def test_fzo_arrow_format_and_parquet_roundtrip(results_tree, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    df = fzo(str(results_tree / "*"), MODEL, vector_format="arrow")
+    assert isinstance(df["series"].dtype, pd.ArrowDtype)
+    assert df["series"].iloc[1] == [1.5, 2.5, 3.5]
+
+    parquet_file = tmp_path / "results.parquet"
+    df.to_parquet(parquet_file)
+    table = pq.read_table(parquet_file)
+    assert pa.types.is_list(table.schema.field("series").type)
+    assert table.column("series").to_pylist() == [[1.5, 2.5], [1.5, 2.5, 3.5]]
+
+
+def test_convert_vector_columns_keeps_missing_values():
+    pytest.importorskip("pyarrow")
+    df = pd.DataFrame({"series": [[1.0, 2.0], None, [3.0]], "x": [1, 2, 3]})
+    converted = convert_vector_columns(df, "arrow")
+    assert isinstance(converted["series"].dtype, pd.ArrowDtype)
+    assert converted["series"].isna().tolist() == [False, True, False]
+    # Original frame untouched
+    assert isinstance(df["series"].iloc[0], list)
+
+
+def test_vector_row_yields_numpy_arrays_for_arrow_columns(results_tree):
+    pytest.importorskip("pyarrow")
+    df = fzo(str(results_tree / "*"), MODEL, vector_format="arrow")
+    row = vector_row(df, 1)
+    assert isinstance(row["series"], np.ndarray)
+    np.testing.assert_array_equal(row["series"], [1.5, 2.5, 3.5])
+
+
+def test_vector_row_without_arrow_dtype(results_tree, monkeypatch):
+    # pandas < 2.0: no pd.ArrowDtype, rows are returned as they are
+    df = fzo(str(results_tree / "*"), MODEL)
+    monkeypatch.delattr(pd, "ArrowDtype", raising=False)
+    row = vector_row(df, 1)
+    assert row["series"] == [1.5, 2.5, 3.5]
+
+
+class TestReductionsOnArrays:
+
+    def test_reductions_match_list_results(self):
+        values = [1.0, 2.0, 4.0, 8.0]
+        for expr in ("mean(s)", "median(s)", "sum(s)", "stdev(s)", "variance(s)",
+                     "max(s)", "min(s)", "sorted(s)[1]", "s[-1]", "len(s)"):
+            as_list = evaluate_output_expression(expr, {"s": values})
+            as_array = evaluate_output_expression(expr, {"s": np.array(values)})
+            assert as_array == pytest.approx(as_list), expr
+
+    def test_generator_reductions_still_use_python(self):
+        result = evaluate_output_expression(
+            "sum((x - y) ** 2 for x, y in zip(a, b))",
+            {"a": np.array([1.0, 2.0]), "b": np.array([0.0, 0.0])},
+        )
+        assert result == 5.0
+
+    def test_unreduced_array_error_names_output(self):
+        with pytest.raises(ValueError, match="series"):
+            evaluate_output_expression("series", {"series": np.array([1.0, 2.0])})
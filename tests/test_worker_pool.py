@@ -0,0 +1,124 @@
+"""
+Tests for the pool:// calculator: long-lived worker processes receiving
+cases over a line protocol on stdin/stdout (fz/workerpool.py).
+"""
+import sys
+import textwrap
+
+import pytest
+
+from fz.config import get_config
+from fz.runners import _validate_calculator_uri, parse_pool_uri, run_pool_calculation
+from fz.workerpool import close_worker_pools
+
+MODEL = {"varprefix": "$", "output": {"y": "cat y.txt"}}
+
+WORKER = textwrap.dedent('''
+    import os, sys, time
+    with open("starts.txt", "a") as f:
+        f.write(f"{os.getpid()}\\n")
+    for line in sys.stdin:
+        case = line.split(" ", 1)[1].strip()
+        x = int(open(os.path.join(case, "input.txt")).read().split("=")[1])
+        if x < 0:
+            os._exit(3)
+        if x == 99:
+            time.sleep(30)
+        print(f"solving {x}", flush=True)
+        print(f"warning {x}", file=sys.stderr, flush=True)
+        with open(os.path.join(case, "y.txt"), "w") as f:
+            f.write(str(x * x))
+        print(f"DONE {0 if x != 7 else 2}", flush=True)
+''')
+
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    """A worker script in tmp_path, recording its process starts in starts.txt"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "worker.py").write_text(WORKER)
+    yield f"{sys.executable} worker.py"
+    close_worker_pools()
+
+
+def starts(tmp_path):
+    path = tmp_path / "starts.txt"
+    return len(path.read_text().split()) if path.exists() else 0
+
+
+def run_case(tmp_path, uri, x, timeout=30):
+    case = tmp_path / f"x={x}"
+    case.mkdir()
+    (case / "input.txt").write_text(f"x = {x}\n")
+    return case, run_pool_calculation(case, uri, MODEL, timeout=timeout, original_cwd=str(tmp_path))
+
+
+def test_fzr_reuses_workers(worker, tmp_path):
+    from fz import fzr
+
+    (tmp_path / "input.txt").write_text("x = $x\n")
+    result = fzr("input.txt", {"x": [1, 2, 3, 4, 5, 6]}, MODEL,
+                 calculators=f"pool://2/{worker}", results_dir="results")
+
+    assert list(result["status"]) == ["done"] * 6
+    assert list(result["y"]) == [1, 4, 9, 16, 25, 36]
+    assert starts(tmp_path) <= 2
+    assert (tmp_path / "results" / "x=3" / "out.txt").read_text() == "solving 3\n"
+    assert (tmp_path / "results" / "x=3" / "err.txt").read_text() == "warning 3\n"
+
+
+def test_worker_restarted_after_max_cases(worker, tmp_path, monkeypatch):
+    monkeypatch.setenv("FZ_POOL_MAX_CASES", "2")
+    get_config().reload()
+    try:
+        results = [run_case(tmp_path, f"pool://1/{worker}", x)[1] for x in range(5)]
+    finally:
+        monkeypatch.delenv("FZ_POOL_MAX_CASES")
+        get_config().reload()
+
+    assert [r["y"] for r in results] == [0, 1, 4, 9, 16]
+    assert starts(tmp_path) == 3
+
+
+def test_crashed_worker_fails_case_and_restarts(worker, tmp_path):
+    uri = f"pool://1/{worker}"
+    first = run_case(tmp_path, uri, 1)[1]
+    crashed = run_case(tmp_path, uri, -1)[1]
+    after = run_case(tmp_path, uri, 2)[1]
+
+    assert first["status"] == "done"
+    assert crashed["status"] == "failed"
+    assert crashed["exit_code"] == 3
+    assert after["y"] == 4
+    assert starts(tmp_path) == 2
+
+
+def test_nonzero_exit_code_keeps_worker(worker, tmp_path):
+    uri = f"pool://1/{worker}"
+    failed = run_case(tmp_path, uri, 7)[1]
+    done = run_case(tmp_path, uri, 2)[1]
+
+    assert failed["status"] == "failed"
+    assert failed["exit_code"] == 2
+    assert done["y"] == 4
+    assert starts(tmp_path) == 1
+
+
+def test_timeout_kills_worker(worker, tmp_path):
+    uri = f"pool://1/{worker}"
+    timed_out = run_case(tmp_path, uri, 99, timeout=1)[1]
+    after = run_case(tmp_path, uri, 3)[1]
+
+    assert timed_out["status"] == "timeout"
+    assert after["y"] == 9
+    assert starts(tmp_path) == 2
+
+
+@pytest.mark.parametrize("uri", ["pool://cmd", "pool://0/cmd", "pool://2/", "pool://x/cmd"])
+def test_invalid_pool_uri(uri):
+    with pytest.raises(ValueError):
+        _validate_calculator_uri(uri)
+
+
+def test_parse_pool_uri():
+    assert parse_pool_uri("pool://4/python worker.py --fast") == (4, "python worker.py --fast")